@@ -0,0 +1,27 @@
+"""add (user_id, created_at, id) index on notifications for keyset pagination
+
+Revision ID: a8c4e6f2d913
+Revises: f3a9d2c7b814
+Create Date: 2026-10-19 18:47:03.216540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c4e6f2d913'
+down_revision: Union[str, Sequence[str], None] = 'f3a9d2c7b814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notifications_user_created_id', 'notifications', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_user_created_id', table_name='notifications')
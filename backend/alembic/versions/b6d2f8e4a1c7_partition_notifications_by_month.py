@@ -0,0 +1,119 @@
+"""partition notifications by month on created_at
+
+Tabela jest przebudowywana jako PARTITION BY RANGE (created_at): stara
+zostaje przemianowana, nowa (partycjonowana) przejmuje nazwę, indeksy
+i sekwencję id, dane są przepisywane, a stara kasowana. Partycje
+powstają dla każdego miesiąca z danymi + 3 kolejnych; dalsze zakłada
+api/v1/notifications/partitions.py.
+
+Revision ID: b6d2f8e4a1c7
+Revises: a8c4e6f2d913
+Create Date: 2026-10-19 19:32:11.482107
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2f8e4a1c7'
+down_revision: Union[str, Sequence[str], None] = 'a8c4e6f2d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    "ix_notifications_id",
+    "ix_notifications_user_id",
+    "ix_notifications_user_unread",
+    "ix_notifications_user_created_id",
+)
+
+
+def _rename_existing(suffix_from: str, suffix_to: str) -> None:
+    op.execute(f"ALTER TABLE notifications{suffix_from} RENAME TO notifications{suffix_to}")
+    op.execute(f"ALTER TABLE notifications{suffix_to} RENAME CONSTRAINT notifications{suffix_from}_pkey TO notifications{suffix_to}_pkey")
+    for index in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {index}{suffix_from} RENAME TO {index}{suffix_to}")
+    # Sekwencja ma przeżyć skasowanie starej tabeli
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY NONE")
+
+
+def _create_indexes() -> None:
+    op.execute("CREATE INDEX ix_notifications_id ON notifications (id)")
+    op.execute("CREATE INDEX ix_notifications_user_id ON notifications (user_id)")
+    op.execute("CREATE INDEX ix_notifications_user_unread ON notifications (user_id) WHERE is_read = false")
+    op.execute("CREATE INDEX ix_notifications_user_created_id ON notifications (user_id, created_at, id)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rename_existing("", "_unpartitioned")
+
+    op.execute("""
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            type VARCHAR(50) NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}',
+            is_read BOOLEAN NOT NULL DEFAULT false,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            read_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT notifications_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    _create_indexes()
+    op.execute("CREATE TABLE notifications_default PARTITION OF notifications DEFAULT")
+
+    # Miesiące z danymi + 3 do przodu (nazwy jak partitions.partition_name)
+    op.execute("""
+        DO $$
+        DECLARE
+            month date := date_trunc('month', LEAST(
+                (SELECT min(created_at) FROM notifications_unpartitioned), now()
+            ))::date;
+            last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF notifications FOR VALUES FROM (%L) TO (%L)',
+                    'notifications_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month, (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("""
+        INSERT INTO notifications (id, user_id, type, payload, is_read, created_at, read_at)
+        SELECT id, user_id, type, payload, is_read, created_at, read_at FROM notifications_unpartitioned
+    """)
+    op.execute("DROP TABLE notifications_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rename_existing("", "_partitioned")
+
+    op.execute("""
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            type VARCHAR(50) NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}',
+            is_read BOOLEAN NOT NULL DEFAULT false,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            read_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT notifications_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.execute("""
+        INSERT INTO notifications (id, user_id, type, payload, is_read, created_at, read_at)
+        SELECT id, user_id, type, payload, is_read, created_at, read_at FROM notifications_partitioned
+    """)
+    # Partycje giną razem z tabelą-rodzicem (razem z ich indeksami)
+    op.execute("DROP TABLE notifications_partitioned")
+    _create_indexes()
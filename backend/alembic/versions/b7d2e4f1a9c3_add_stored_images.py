@@ -0,0 +1,42 @@
+"""add stored_images (content-addressed board images)
+
+Revision ID: b7d2e4f1a9c3
+Revises: 453de1d21145
+Create Date: 2026-10-19 10:12:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f1a9c3'
+down_revision: Union[str, Sequence[str], None] = '453de1d21145'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stored_images',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=50), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False, server_default='1'),
+    sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path')
+    )
+    op.create_index(op.f('ix_stored_images_id'), 'stored_images', ['id'], unique=False)
+    op.create_index(op.f('ix_stored_images_content_hash'), 'stored_images', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stored_images_content_hash'), table_name='stored_images')
+    op.drop_index(op.f('ix_stored_images_id'), table_name='stored_images')
+    op.drop_table('stored_images')
@@ -0,0 +1,33 @@
+"""add image variants to stored_images
+
+Revision ID: c4a8f2e91d07
+Revises: b7d2e4f1a9c3
+Create Date: 2026-10-19 11:02:17.542210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8f2e91d07'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4f1a9c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stored_images', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('stored_images', sa.Column('height', sa.Integer(), nullable=True))
+    op.add_column('stored_images', sa.Column('variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('stored_images', 'variants')
+    op.drop_column('stored_images', 'height')
+    op.drop_column('stored_images', 'width')
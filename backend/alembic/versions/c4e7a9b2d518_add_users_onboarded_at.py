@@ -0,0 +1,31 @@
+"""add users.onboarded_at (onboarding w tle, idempotentny)
+
+Istniejący userzy mają już startowy workspace — dostają onboarded_at = created_at.
+
+Revision ID: c4e7a9b2d518
+Revises: b6d2f8e4a1c7
+Create Date: 2026-10-19 21:14:37.260945
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a9b2d518'
+down_revision: Union[str, Sequence[str], None] = 'b6d2f8e4a1c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('onboarded_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE users SET onboarded_at = COALESCE(created_at, now())")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'onboarded_at')
@@ -0,0 +1,31 @@
+"""add expression index on board_elements (data ->> 'src') for image elements
+
+Revision ID: d2b8f5a7c914
+Revises: c4e7a9b2d518
+Create Date: 2026-10-20 09:12:05.481337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b8f5a7c914'
+down_revision: Union[str, Sequence[str], None] = 'c4e7a9b2d518'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_board_elements_image_src', 'board_elements', [sa.text("(data ->> 'src')")],
+        unique=False, postgresql_where=sa.text("type = 'image'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_board_elements_image_src', table_name='board_elements')
@@ -0,0 +1,30 @@
+"""drop board_users.is_online (presence moved to Redis)
+
+Revision ID: d9e3b7a5c210
+Revises: c4a8f2e91d07
+Create Date: 2026-10-19 14:20:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e3b7a5c210'
+down_revision: Union[str, Sequence[str], None] = 'c4a8f2e91d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index(op.f('ix_board_users_is_online'), table_name='board_users')
+    op.drop_column('board_users', 'is_online')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('board_users', sa.Column('is_online', sa.Boolean(), nullable=True))
+    op.create_index(op.f('ix_board_users_is_online'), 'board_users', ['is_online'], unique=False)
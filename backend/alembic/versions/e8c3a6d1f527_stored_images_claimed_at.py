@@ -0,0 +1,37 @@
+"""stored_images: claimed_at instead of ref_count
+
+Referencje obrazów wynikają z elementów (board_elements.data->>'src');
+licznik podbijany przy każdym uploadzie/dedupie nigdy nie spadał dla
+obrazów, których nikt nie wstawił na tablicę. Istniejące wiersze dostają
+claimed_at = created_at.
+
+Revision ID: e8c3a6d1f527
+Revises: d2b8f5a7c914
+Create Date: 2026-10-20 10:03:51.902214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c3a6d1f527'
+down_revision: Union[str, Sequence[str], None] = 'd2b8f5a7c914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stored_images', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE stored_images SET claimed_at = created_at")
+    op.alter_column('stored_images', 'claimed_at', nullable=False, server_default=sa.func.now())
+    op.drop_column('stored_images', 'ref_count')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('stored_images', sa.Column('ref_count', sa.Integer(), nullable=False, server_default='1'))
+    op.drop_column('stored_images', 'claimed_at')
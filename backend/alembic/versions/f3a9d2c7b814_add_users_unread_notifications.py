@@ -0,0 +1,34 @@
+"""add users.unread_notifications (denormalised unread counter)
+
+Revision ID: f3a9d2c7b814
+Revises: e5f1c8a3d472
+Create Date: 2026-10-19 17:32:48.905126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9d2c7b814'
+down_revision: Union[str, Sequence[str], None] = 'e5f1c8a3d472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('unread_notifications', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE users SET unread_notifications = (
+            SELECT count(*) FROM notifications
+            WHERE notifications.user_id = users.id AND notifications.is_read = false
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'unread_notifications')
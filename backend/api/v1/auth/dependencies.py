@@ -1,56 +1,112 @@
 """
 AUTH DEPENDENCIES - Współdzielone funkcje autoryzacji
 Używane przez wszystkie endpointy które wymagają zalogowania
+
+  get_current_user     — pełny User (z cache principal_cache.py, baza tylko przy chybieniu)
+  get_current_user_id  — samo id z tokena, bez bazy i Redis; dla endpointów,
+                         które potrzebują tylko `current_user.id` (zapis
+                         elementów tablicy, heartbeat obecności)
 """
+from typing import Any, Dict
+
 from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from jose import JWTError, jwt
 
 from core.database import get_db
 from core.models import User
 from core.config import get_settings
 from core.exceptions import AuthenticationError, NotFoundError, AppException
+from .principal_cache import principal_cache, principal_data, token_digest
 
 security = HTTPBearer(auto_error=False)
 settings = get_settings()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Sprawdza JWT token i zwraca zalogowanego użytkownika.
-    """
-
-    if not credentials:
-        raise AuthenticationError("Nieprawidłowy token autoryzacyjny")
-
-    token = credentials.credentials
-    
-    try:        
+def _decode_claims(token: str) -> tuple[int, float]:
+    """(user_id, exp) z access tokena albo AuthenticationError."""
+    try:
         payload = jwt.decode(
             token,
             settings.secret_key,
             algorithms=[settings.algorithm]
         )
-                
+
         user_id_str = payload.get("sub")
         if user_id_str is None:
             raise AuthenticationError("Nieprawidłowy token autoryzacyjny")
-            
-        user_id = int(user_id_str)
-            
+
+        return int(user_id_str), float(payload.get("exp", float("inf")))
+
     except (JWTError, ValueError):
         raise AuthenticationError("Nieprawidłowy token autoryzacyjny")
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if user is None:
-        raise NotFoundError("Użytkownik nie istnieje")
-    
-    if not user.is_active:
+
+
+def decode_access_token(token: str) -> int:
+    """
+    Weryfikuje access token (JWT) i zwraca user_id z `sub`.
+    Rzuca AuthenticationError — wspólne dla nagłówka Bearer i WebSocketów.
+    """
+    return _decode_claims(token)[0]
+
+
+def _attach_cached_user(db: Session, data: Dict[str, Any]) -> User:
+    """User z danych z cache, przypięty do sesji bez SELECT-a (zmiany commitują się normalnie)."""
+    existing = db.identity_map.get(identity_key(User, data["id"]))
+    if existing is not None:
+        return existing
+    user = User(**data)
+    # Kolumny spoza cache (hashed_password, unread_notifications) są
+    # oznaczane jako wygasłe — doładują się z bazy przy pierwszym dostępie
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Sprawdza JWT token i zwraca zalogowanego użytkownika.
+    """
+
+    if not credentials:
+        raise AuthenticationError("Nieprawidłowy token autoryzacyjny")
+
+    digest = token_digest(credentials.credentials)
+    cached = principal_cache.get_local(digest)
+    if cached is not None:
+        data = cached[1]
+    else:
+        user_id, token_exp = _decode_claims(credentials.credentials)
+        data = await principal_cache.get_shared(user_id)
+        if data is None:
+            user = db.query(User).filter(User.id == user_id).first()
+
+            if user is None:
+                raise NotFoundError("Użytkownik nie istnieje")
+
+            data = principal_data(user)
+            await principal_cache.put_shared(user_id, data)
+        principal_cache.put_local(digest, user_id, token_exp, data)
+
+    if not data["is_active"]:
         raise AppException("Konto niezweryfikowane", code="AUTH_ERROR", status_code=403)
-    
-    return user
\ No newline at end of file
+
+    return _attach_cached_user(db, data)
+
+
+def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> int:
+    """
+    Samo id zalogowanego usera — tylko weryfikacja podpisu i ważności JWT.
+    Access token dostaje wyłącznie aktywny user (login/weryfikacja maila),
+    a uprawnienia do zasobu i tak sprawdza serwis.
+    """
+    if not credentials:
+        raise AuthenticationError("Nieprawidłowy token autoryzacyjny")
+    return decode_access_token(credentials.credentials)
@@ -0,0 +1,153 @@
+"""
+Weryfikacja Google ID tokenów z lokalnym cache kluczy (JWKS).
+
+DLACZEGO:
+  id_token.verify_oauth2_token(…, google_requests.Request(), …) przy
+  KAŻDYM logowaniu Google synchronicznie pobierał certyfikaty Google
+  (requests, blokujące I/O w event loopie). Wolne Google = zamrożony worker.
+
+JAK:
+  GoogleKeySet trzyma klucze publiczne z GOOGLE_JWKS_URL (kid → JWK)
+  i pobiera je asynchronicznie (httpx), tylko gdy trzeba:
+
+    - świeże klucze               → weryfikacja w całości lokalnie
+    - blisko wygaśnięcia (max-age
+      z Cache-Control)            → weryfikacja na starych kluczach +
+                                    odświeżenie w tle
+    - nieznany `kid` (Google
+      obrócił klucze)             → jedno odświeżenie od razu (nie
+                                    częściej niż MIN_REFRESH_INTERVAL_SECONDS)
+
+  Google publikuje nowy klucz na długo przed użyciem go do podpisu, więc
+  w praktyce sieć jest poza ścieżką logowania.
+
+Testy:
+  GoogleKeySet(keys=[jwk, …]) albo transport=httpx.MockTransport — bez sieci.
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from jose import JWTError, jwt
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_MAX_AGE_SECONDS = 3600
+REFRESH_AHEAD_SECONDS = 300
+MIN_REFRESH_INTERVAL_SECONDS = 30
+REQUEST_TIMEOUT_SECONDS = 5.0
+CLOCK_SKEW_SECONDS = 10
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _max_age(cache_control: Optional[str]) -> int:
+    match = _MAX_AGE.search(cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE_SECONDS
+
+
+class GoogleKeySet:
+    """Klucze publiczne Google z cache wg Cache-Control i odświeżaniem w tle."""
+
+    def __init__(
+        self,
+        url: str = GOOGLE_JWKS_URL,
+        keys: Optional[List[Dict[str, Any]]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self._transport = transport
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        if keys is not None:
+            # Zestaw podany z zewnątrz (testy, offline) — ważny "na zawsze"
+            self._set_keys(keys, float("inf"))
+
+    def _set_keys(self, keys: List[Dict[str, Any]], expires_at: float) -> None:
+        self._keys = {key["kid"]: key for key in keys if "kid" in key}
+        self._expires_at = expires_at
+
+    async def refresh(self) -> None:
+        """Pobiera JWKS. Błąd sieci zostawia poprzednie klucze (i loguje)."""
+        self._last_fetch = time.monotonic()
+        try:
+            async with httpx.AsyncClient(transport=self._transport, timeout=REQUEST_TIMEOUT_SECONDS) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+                keys = response.json()["keys"]
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            logger.warning(f"Google JWKS: pobranie kluczy nieudane: {e}")
+            return
+        self._set_keys(keys, time.monotonic() + _max_age(response.headers.get("cache-control")))
+        logger.info(f"Google JWKS: {len(self._keys)} kluczy")
+
+    def _refresh_in_background(self) -> None:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh(), name="google-jwks:refresh")
+
+    async def get_key(self, kid: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            if self._expires_at - now < REFRESH_AHEAD_SECONDS:
+                self._refresh_in_background()
+            return key
+        if key is not None:
+            # Przeterminowane, ale klucz znany — nie czekamy na Google
+            self._refresh_in_background()
+            return key
+        if now - self._last_fetch >= MIN_REFRESH_INTERVAL_SECONDS:
+            await self.refresh()
+        return self._keys.get(kid)
+
+
+_key_set: GoogleKeySet | None = None
+
+
+def get_google_key_set() -> GoogleKeySet:
+    """Klucze Google dla tego workera (singleton, pobierane przy pierwszym logowaniu)."""
+    global _key_set
+    if _key_set is None:
+        _key_set = GoogleKeySet()
+    return _key_set
+
+
+async def verify_google_id_token(
+    token: str,
+    audience: str,
+    key_set: Optional[GoogleKeySet] = None,
+) -> Dict[str, Any]:
+    """
+    Sprawdza podpis (RS256, klucz po `kid`), `aud`, `iss` i `exp` tokena.
+    Zwraca claims. Jak google-auth — rzuca ValueError, gdy token jest zły.
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except JWTError as e:
+        raise ValueError(f"Nieczytelny token: {e}")
+    if not kid:
+        raise ValueError("Token bez 'kid'")
+
+    key = await (key_set or get_google_key_set()).get_key(kid)
+    if key is None:
+        raise ValueError(f"Nieznany klucz Google: {kid}")
+
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=GOOGLE_ISSUERS,
+            options={"leeway": CLOCK_SKEW_SECONDS, "verify_at_hash": False},
+        )
+    except JWTError as e:
+        raise ValueError(str(e))
@@ -0,0 +1,140 @@
+"""
+Pula wątków dla bcrypt — hashowanie i weryfikacja haseł poza event loopem.
+
+DLACZEGO:
+  passlib bcrypt to ~250 ms czystego CPU na wywołanie. Wołany wprost
+  z async handlera (rejestracja, logowanie, reset hasła) blokował cały
+  event loop workera — fala logowań na początku lekcji zamrażała
+  wszystkie inne requesty, łącznie z zapisem tablic.
+
+JAK:
+  Osobny ThreadPoolExecutor (bcrypt zwalnia GIL, więc wątki naprawdę
+  liczą równolegle) o rozmiarze settings.password_hash_workers. Liczba
+  zadań w toku (liczone + czekające) jest ograniczona do
+  settings.password_hash_max_pending — ponad to endpoint od razu dostaje
+  503, zamiast ustawiać się w nieskończonej kolejce.
+
+REHASH:
+  verify_password_async() używa pwd_context.verify_and_update — gdy hash
+  ma mniej rund niż settings.bcrypt_rounds, zwraca nowy hash, który
+  login zapisuje przy okazji (podniesienie kosztu bez resetu haseł).
+
+METRYKI:
+  /api/v1/health → `password_hashing` (snapshot() tego workera).
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from core.config import get_settings
+from core.exceptions import AppException
+from core.logging import get_logger
+
+from .utils import pwd_context
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class PasswordPoolMetrics:
+    """Liczniki od startu procesu — /api/v1/health zwraca je pod `password_hashing`."""
+    submitted: int = 0
+    completed: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    last_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    last_run_ms: float = 0.0
+
+
+class PasswordPool:
+    """Ograniczona pula wątków dla operacji bcrypt."""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        settings = get_settings()
+        self.workers = workers or settings.password_hash_workers
+        self.max_pending = max_pending or settings.password_hash_max_pending
+        self.metrics = PasswordPoolMetrics()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            self.metrics.rejected += 1
+            logger.warning(f"Pula bcrypt pełna ({self._pending} zadań) — request odrzucony")
+            raise AppException(
+                "Serwer jest chwilowo przeciążony, spróbuj ponownie za chwilę",
+                code="OVERLOADED", status_code=503,
+            )
+
+        self._pending += 1
+        self.metrics.submitted += 1
+        self._update_depth()
+        submitted_at = time.perf_counter()
+
+        def timed() -> Tuple[T, float, float]:
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted_at, time.perf_counter() - started
+
+        try:
+            result, waited, ran = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+            self._update_depth()
+
+        self.metrics.completed += 1
+        self.metrics.last_wait_ms = round(waited * 1000, 2)
+        self.metrics.max_wait_ms = max(self.metrics.max_wait_ms, self.metrics.last_wait_ms)
+        self.metrics.last_run_ms = round(ran * 1000, 2)
+        return result
+
+    def _update_depth(self) -> None:
+        self.metrics.in_flight = min(self._pending, self.workers)
+        self.metrics.queue_depth = max(0, self._pending - self.workers)
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.metrics.queue_depth)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return asdict(self.metrics)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: PasswordPool | None = None
+
+
+def get_password_pool() -> PasswordPool:
+    """Pula dla tego workera (singleton, tworzona leniwie)."""
+    global _pool
+    if _pool is None:
+        _pool = PasswordPool()
+    return _pool
+
+
+def shutdown_password_pool() -> None:
+    """Zamyka pulę — wołane przy shutdownie (main.py)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+async def hash_password_async(password: str) -> str:
+    return await get_password_pool().run(pwd_context.hash, password)
+
+
+async def verify_password_async(plain: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    (czy hasło pasuje, nowy hash albo None). Nowy hash jest zwracany, gdy
+    stary ma przestarzały koszt — wołający zapisuje go zamiast starego.
+    """
+    if not hashed:
+        return False, None
+    return await get_password_pool().run(pwd_context.verify_and_update, plain, hashed)
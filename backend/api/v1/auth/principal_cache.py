@@ -0,0 +1,146 @@
+"""
+PRINCIPAL CACHE - Cache zalogowanego użytkownika dla get_current_user
+
+Problem:
+    get_current_user robił `SELECT * FROM users WHERE id = ?` przy KAŻDYM
+    requeście z tokenem — także przy każdym zapisie kreski i heartbeacie
+    obecności na tablicy.
+
+Rozwiązanie (dwa poziomy):
+    1. LRU w procesie, klucz = skrót tokena → (user_id, exp tokena, dane
+       usera). Trafienie pomija i dekodowanie JWT, i Redis, i bazę.
+       TTL krótki (settings.principal_cache_local_ttl_seconds), bo inne
+       workery nie widzą naszych unieważnień.
+    2. Redis `auth:principal:{user_id}` — dane usera wspólne dla
+       wszystkich workerów i wszystkich tokenów tego usera
+       (settings.principal_cache_ttl_seconds).
+
+    Z danych get_current_user składa obiekt User przypięty do sesji bez
+    SELECT-a (make_transient_to_detached + db.add) — endpoint może go
+    zmieniać i commitować jak zwykle.
+
+Co NIE trafia do cache:
+    hashed_password (sekret — nie wysyłamy go do Redis) i
+    unread_notifications (zmienia się przy każdym powiadomieniu).
+    Dostęp do nich doładowuje kolumny z bazy.
+
+Unieważnianie:
+    invalidate_principal(user_id) — po commicie zmiany aktywacji, hasła
+    albo profilu (AuthService, PATCH /auth/me/avatar).
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from core.config import get_settings
+from core.logging import get_logger
+from core.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+LOCAL_MAX_ENTRIES = 10_000
+PRINCIPAL_FIELDS = (
+    "id", "username", "email", "full_name", "is_active", "created_at",
+    "google_id", "auth_provider", "profile_picture", "avatar_url",
+)
+
+# skrót tokena → (user_id, exp tokena, wygasa_lokalnie, dane)
+_CacheEntry = Tuple[int, float, float, Dict[str, Any]]
+
+
+def _redis_key(user_id: int) -> str:
+    return f"auth:principal:{user_id}"
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def principal_data(user) -> Dict[str, Any]:
+    return {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+
+
+def _dump(data: Dict[str, Any]) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in data.items()
+    })
+
+
+def _load(raw: str) -> Dict[str, Any]:
+    data = json.loads(raw)
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return data
+
+
+class PrincipalCache:
+    """LRU w procesie + Redis. Błędy Redis = brak trafienia (fallback na bazę)."""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+
+    # ── poziom 1: proces ──────────────────────────────────────────────────
+
+    def get_local(self, digest: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        entry = self._local.get(digest)
+        if entry is None:
+            return None
+        user_id, token_exp, expires_at, data = entry
+        now = time.time()
+        if now >= expires_at or now >= token_exp:
+            del self._local[digest]
+            return None
+        self._local.move_to_end(digest)
+        return user_id, data
+
+    def put_local(self, digest: str, user_id: int, token_exp: float, data: Dict[str, Any]) -> None:
+        ttl = get_settings().principal_cache_local_ttl_seconds
+        self._local[digest] = (user_id, token_exp, time.time() + ttl, data)
+        self._local.move_to_end(digest)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    # ── poziom 2: Redis ───────────────────────────────────────────────────
+
+    async def get_shared(self, user_id: int, redis_client: redis.Redis | None = None) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await (redis_client or get_redis_client()).get(_redis_key(user_id))
+        except RedisError as e:
+            logger.warning(f"Principal cache: odczyt z Redis nieudany: {e}")
+            return None
+        return _load(raw) if raw else None
+
+    async def put_shared(self, user_id: int, data: Dict[str, Any], redis_client: redis.Redis | None = None) -> None:
+        try:
+            await (redis_client or get_redis_client()).setex(
+                _redis_key(user_id), get_settings().principal_cache_ttl_seconds, _dump(data),
+            )
+        except RedisError as e:
+            logger.warning(f"Principal cache: zapis do Redis nieudany: {e}")
+
+    async def invalidate(self, user_id: int, redis_client: redis.Redis | None = None) -> None:
+        for digest in [d for d, entry in self._local.items() if entry[0] == user_id]:
+            del self._local[digest]
+        try:
+            await (redis_client or get_redis_client()).delete(_redis_key(user_id))
+        except RedisError as e:
+            logger.warning(f"Principal cache: unieważnienie w Redis nieudane (user_id={user_id}): {e}")
+
+
+principal_cache = PrincipalCache()
+
+
+async def invalidate_principal(user_id: int, redis_client: redis.Redis | None = None) -> None:
+    """Wołać PO commicie zmiany usera, która ma być od razu widoczna w get_current_user."""
+    await principal_cache.invalidate(user_id, redis_client)
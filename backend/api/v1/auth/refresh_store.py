@@ -0,0 +1,76 @@
+"""
+Refresh tokeny w Redis — wydanie, atomowa rotacja i unieważnienie.
+
+DLACZEGO:
+  refresh_session robił SELECT tokena, UPDATE revoked, COMMIT, SELECT
+  usera, INSERT nowego tokena i drugi COMMIT — dwie transakcje na Neon
+  przy każdym odświeżeniu access tokena (co 15 min w każdej otwartej karcie).
+
+JAK:
+  auth:refresh:{sha256(token)} → user_id, z TTL = ważność refresh tokena
+  (wygaśnięcie robi Redis, nie ma czego sprzątać).
+
+  Rotacja to jeden skrypt Lua (jeden round trip, atomowo): sprawdza stary
+  token, kasuje go, zapisuje nowy z TTL i przy okazji oddaje dane usera
+  z principal cache (auth:principal:{user_id}, principal_cache.py), żeby
+  odpowiedź nie potrzebowała bazy. Dwa równoległe odświeżenia tym samym
+  tokenem — wygrywa dokładnie jedno.
+
+POSTGRES:
+  Tabela refresh_tokens zostaje jako opcjonalny log audytowy
+  (settings.refresh_token_audit) i źródło starych tokenów, wydanych
+  przed przejściem na Redis — patrz AuthService.refresh_session.
+"""
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from core.redis_client import get_redis_client
+
+# KEYS[1] = stary token, KEYS[2] = nowy token
+# ARGV[1] = TTL nowego (ms), ARGV[2] = prefiks kluczy principal cache
+# → false (brak/wygasły/zużyty) albo {user_id, dane usera albo false}
+ROTATE_SCRIPT = """
+local user_id = redis.call('GET', KEYS[1])
+if not user_id then
+  return false
+end
+redis.call('DEL', KEYS[1])
+redis.call('SET', KEYS[2], user_id, 'PX', ARGV[1])
+local principal = redis.call('GET', ARGV[2] .. user_id)
+return {user_id, principal}
+"""
+
+PRINCIPAL_PREFIX = "auth:principal:"
+
+
+def _key(token_hash: str) -> str:
+    return f"auth:refresh:{token_hash}"
+
+
+class RefreshTokenStore:
+    """Operacje na refresh tokenach w Redis. Błędy Redis lecą do wołającego."""
+
+    def __init__(self, redis_client: redis.Redis | None = None):
+        self.redis = redis_client or get_redis_client()
+        self._rotate = self.redis.register_script(ROTATE_SCRIPT)
+
+    async def issue(self, user_id: int, token_hash: str, ttl_seconds: int) -> None:
+        await self.redis.set(_key(token_hash), user_id, ex=ttl_seconds)
+
+    async def rotate(
+        self, old_hash: str, new_hash: str, ttl_seconds: int,
+    ) -> Optional[Tuple[int, Optional[Dict[str, Any]]]]:
+        """(user_id, dane usera z principal cache albo None) albo None, gdy stary token nieważny."""
+        result = await self._rotate(
+            keys=[_key(old_hash), _key(new_hash)],
+            args=[ttl_seconds * 1000, PRINCIPAL_PREFIX],
+        )
+        if not result:
+            return None
+        user_id, principal = result
+        return int(user_id), json.loads(principal) if principal else None
+
+    async def revoke(self, token_hash: str) -> None:
+        await self.redis.delete(_key(token_hash))
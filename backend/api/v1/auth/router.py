@@ -12,6 +12,7 @@ from core.exceptions import AuthenticationError
 from core.logging import get_logger
 from core.rate_limit import rate_limit
 from .dependencies import get_current_user
+from .principal_cache import invalidate_principal
 from .schemas import (
     RegisterUser, RegisterResponse,
     LoginData, AuthResponse,
@@ -204,6 +205,7 @@ async def update_user_profile(
     current_user.avatar_url = update_data.avatar_url
     db.commit()
     db.refresh(current_user)
+    await invalidate_principal(current_user.id)
     return ApiResponse(success=True, data=UserResponse.model_validate(current_user))
 
 # === SESJA / REFRESH / ME / LOGOUT ===
@@ -14,8 +14,6 @@ import hashlib
 import redis.asyncio as redis
 from redis.exceptions import ConnectionError, TimeoutError
 from sqlalchemy.exc import OperationalError, IntegrityError
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 
 from core.models import User, RefreshToken
 from .schemas import (
@@ -25,11 +23,16 @@ from .schemas import (
     MessageResponse, VerifyResetCodeResponse, MeResponse
 )
 from .utils import (
-    hash_password, verify_password, create_access_token, hash_refresh_token,
+    create_access_token, hash_refresh_token,
     generate_verification_code, generate_refresh_token,
 )
-from api.v1.onboarding.service import OnboardingService
-from core.email import send_email
+from .google_jwks import verify_google_id_token
+from .password_pool import hash_password_async, verify_password_async
+from .principal_cache import invalidate_principal
+from .refresh_store import RefreshTokenStore
+from api.v1.onboarding.service import enqueue_onboarding
+from core.outbox import wake_outbox_dispatcher
+from core.email import enqueue_email
 from core.email.templates.auth import verification_email, password_reset_email
 
 logger = get_logger(__name__)
@@ -42,6 +45,7 @@ class AuthService:
         self.db = db
         self.settings = get_settings()
         self.redis = redis_client or get_redis_client()
+        self.refresh_tokens = RefreshTokenStore(self.redis)
 
     def _email_verify_key(self, user_id: int) -> str:
         """Generuje klucz Redis dla kodu weryfikacji emaila"""
@@ -52,14 +56,14 @@ class AuthService:
         return f"auth:password_reset:{user_id}"
 
     async def _send_code_email(self, email: str, subject: str, html: str) -> None:
-        """Wysyła mail, nie wywracając wywołującego flow przy błędzie."""
+        """Dopisuje mail do kolejki (wysyłka w tle), nie wywracając wywołującego flow przy błędzie."""
         if not self.settings.resend_api_key or self.settings.resend_api_key == "SKIP":
             logger.warning("Email nie został wysłany (brak konfiguracji Resend)")
             return
         try:
-            await send_email(email, subject, html, self.settings.resend_api_key, self.settings.from_email)
+            await enqueue_email(email, subject, html, self.redis)
         except Exception:
-            logger.warning(f"Wysyłka emaila nie powiodła się (to={email})")
+            logger.warning(f"Dopisanie emaila do kolejki nie powiodło się (to={email})")
 
     async def _store_verification_code(self, key: str, code: str) -> None:
         """Zapisuje kod w Redis z TTL; przy błędzie połączenia rzuca 503."""
@@ -78,53 +82,78 @@ class AuthService:
             logger.exception(f"Błąd odczytu kodu w Redis (key={key})")
             raise AppException("Serwis weryfikacji chwilowo niedostępny", code="REDIS_ERROR", status_code=503)
 
-    def _create_session(self, user: User) -> tuple[AuthResponse, str]:
-        """
-        Tworzy sesję (access + refresh token) dla użytkownika
-        
-        Returns:
-            tuple[AuthResponse, str]: AuthResponse z access tokenem i plaintext refresh token
-        """
+    def _refresh_ttl_seconds(self) -> int:
+        return self.settings.refresh_token_expire_days * 24 * 3600
+
+    def _auth_response(self, user: User | dict) -> AuthResponse:
+        user_id = user["id"] if isinstance(user, dict) else user.id
         access_token = create_access_token(
-            data={"sub": str(user.id)},
+            data={"sub": str(user_id)},
             secret_key=self.settings.secret_key,
             algorithm=self.settings.algorithm,
             expires_delta=timedelta(minutes=self.settings.access_token_expire_minutes)
         )
-
-        refresh_token_plain = generate_refresh_token()
-        refresh_token_hash = hash_refresh_token(refresh_token_plain)
-        expires_at = datetime.utcnow() + timedelta(days=self.settings.refresh_token_expire_days)
-
-        db_refresh = RefreshToken(
-            user_id=user.id,
-            token_hash=refresh_token_hash,
-            expires_at=expires_at,
-        )
-        self.db.add(db_refresh)
-        self.db.commit()
-
         return AuthResponse(
             access_token=access_token,
             token_type="bearer",
             user=UserResponse.model_validate(user)
-        ), refresh_token_plain
+        )
 
-    async def register_user(self, user_data: RegisterUser) -> RegisterResponse:
-        """Rejestracja nowego użytkownika"""
+    def _audit_refresh_token(self, user_id: int, token_hash: str) -> None:
+        """Wiersz w refresh_tokens (log audytowy) — commit robi wołający."""
+        self.db.add(RefreshToken(
+            user_id=user_id,
+            token_hash=token_hash,
+            expires_at=datetime.utcnow() + timedelta(seconds=self._refresh_ttl_seconds()),
+        ))
+
+    async def _issue_refresh_token(self, user_id: int) -> str:
+        """Nowy refresh token w Redis; przy błędzie połączenia rzuca 503."""
+        refresh_token_plain = generate_refresh_token()
+        refresh_token_hash = hash_refresh_token(refresh_token_plain)
+        try:
+            await self.refresh_tokens.issue(user_id, refresh_token_hash, self._refresh_ttl_seconds())
+        except (ConnectionError, TimeoutError):
+            logger.exception(f"Błąd zapisu refresh tokena w Redis (user_id={user_id})")
+            raise AppException("Serwis sesji chwilowo niedostępny", code="REDIS_ERROR", status_code=503)
+        if self.settings.refresh_token_audit:
+            self._audit_refresh_token(user_id, refresh_token_hash)
+            self.db.commit()
+        return refresh_token_plain
+
+    async def _create_session(self, user: User) -> tuple[AuthResponse, str]:
+        """
+        Tworzy sesję (access + refresh token) dla użytkownika
+        
+        Returns:
+            tuple[AuthResponse, str]: AuthResponse z access tokenem i plaintext refresh token
+        """
+        refresh_token_plain = await self._issue_refresh_token(user.id)
+        return self._auth_response(user), refresh_token_plain
 
+    def _registration_conflict(self, user_data: RegisterUser) -> ConflictError:
+        """Który unikalny klucz zajęty — pytamy dopiero po IntegrityError (rzadkość)."""
         existing_user = self.db.query(User).filter(
             (User.email == user_data.email) | (User.username == user_data.username)
             ).first()
 
-        if existing_user:
-            if existing_user.email == user_data.email:
-                if not existing_user.is_active:
-                    raise ConflictError("Email zajęty", details={"user_id": existing_user.id, "verified": False})
-                raise ConflictError("Email zajęty")
-            raise ConflictError("Nazwa użytkownika zajęta")
+        if existing_user is None:
+            return ConflictError("Email lub nazwa użytkownika zajęta")
+        if existing_user.email == user_data.email:
+            if not existing_user.is_active:
+                return ConflictError("Email zajęty", details={"user_id": existing_user.id, "verified": False})
+            return ConflictError("Email zajęty")
+        return ConflictError("Nazwa użytkownika zajęta")
+
+    async def register_user(self, user_data: RegisterUser) -> RegisterResponse:
+        """Rejestracja nowego użytkownika.
+
+        Szczęśliwa ścieżka to jeden INSERT usera (+ wiersz outboxa w tej samej
+        transakcji) — zajętość emaila/nazwy wychodzi z IntegrityError, a startowy
+        workspace zakłada onboarding w tle (api/v1/onboarding/service.py).
+        """
 
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         verification_code = generate_verification_code()
 
         new_user = User(
@@ -139,29 +168,31 @@ class AuthService:
             self.db.add(new_user)
             self.db.flush()
             logger.info(f"User utworzony (ID: {new_user.id})")
+            # Przed commitem — po nim obiekt jest expired i każdy odczyt to SELECT
+            user_response = UserResponse.model_validate(new_user)
 
-            OnboardingService(self.db).setup_new_user(new_user.id)
-            
+            enqueue_onboarding(self.db, new_user.id)
             self.db.commit()
-            self.db.refresh(new_user)
 
         except (ConflictError, ValidationError):
             self.db.rollback()
             raise
         except IntegrityError:
             self.db.rollback()
-            raise ConflictError("Email lub nazwa użytkownika zajęta")
+            raise self._registration_conflict(user_data)
         except Exception:
             self.db.rollback()
             logger.exception("Błąd zapisu do bazy podczas rejestracji")
             raise AppException("Błąd serwera", status_code=500)
 
-        await self._store_verification_code(self._email_verify_key(new_user.id), verification_code)
-        subject, html = verification_email(new_user.username, verification_code)
-        await self._send_code_email(new_user.email, subject, html)
+        wake_outbox_dispatcher()
+
+        await self._store_verification_code(self._email_verify_key(user_response.id), verification_code)
+        subject, html = verification_email(user_response.username, verification_code)
+        await self._send_code_email(user_response.email, subject, html)
 
         return RegisterResponse(
-            user=UserResponse.model_validate(new_user),
+            user=user_response,
             message="Użytkownik zarejestrowany. Sprawdź email."
         )
 
@@ -187,10 +218,11 @@ class AuthService:
         self.db.refresh(user)
 
         await self.redis.delete(self._email_verify_key(user.id))
+        await invalidate_principal(user.id, self.redis)
 
         logger.info(f"User zweryfikowany (user_id={user.id})")
 
-        return self._create_session(user)
+        return await self._create_session(user)
 
     async def login_user(self, login_data: LoginData) -> AuthResponse:
         """Logowanie"""
@@ -199,7 +231,10 @@ class AuthService:
             (User.username == login_data.login) | (User.email == login_data.login)
         ).first()
 
-        if not user or not verify_password(login_data.password, user.hashed_password):
+        password_ok, new_hash = (
+            await verify_password_async(login_data.password, user.hashed_password) if user else (False, None)
+        )
+        if not password_ok:
             if user:
                 logger.warning(f"Nieudane logowanie (user_id={user.id})")
             else:
@@ -210,9 +245,14 @@ class AuthService:
         if not user.is_active:
             raise AppException("Konto nieaktywne", code="AUTH_ERROR", status_code=403, details={"user_id": user.id})
 
+        if new_hash:
+            # Hash z przestarzałym kosztem — podmieniamy przy okazji logowania
+            user.hashed_password = new_hash
+            self.db.commit()
+
         logger.info(f"User zalogowany (user_id={user.id})")
 
-        return self._create_session(user)
+        return await self._create_session(user)
 
     async def resend_code(self, user_id: int) -> MessageResponse:
         """Ponowne wysłanie kodu"""
@@ -296,10 +336,11 @@ class AuthService:
             logger.warning(f"Zły kod resetu (user_id={user.id})")
             raise ValidationError("Nieprawidłowy kod")
 
-        user.hashed_password = hash_password(reset_data.password)
+        user.hashed_password = await hash_password_async(reset_data.password)
         self.db.commit()
 
         await self.redis.delete(self._password_reset_key(user.id))
+        await invalidate_principal(user.id, self.redis)
 
         logger.info(f"Hasło zresetowane (user_id={user.id})")
 
@@ -308,9 +349,48 @@ class AuthService:
     # === SESJA / REFRESH ===
 
     async def refresh_session(self, refresh_token_plain: str) -> tuple[AuthResponse, str]:
-        """Rotuje refresh token i zwraca nową parę tokenów"""
+        """
+        Rotuje refresh token i zwraca nową parę tokenów.
+
+        Zwykle to jeden skrypt Lua w Redis (refresh_store.py), bez bazy.
+        Tokenu nie ma w Redis → sprawdzamy refresh_tokens w Postgresie
+        (tokeny sprzed przejścia na Redis / po utracie danych Redis).
+        """
         token_hash = hash_refresh_token(refresh_token_plain)
+        new_plain = generate_refresh_token()
+        new_hash = hash_refresh_token(new_plain)
+
+        try:
+            rotated = await self.refresh_tokens.rotate(token_hash, new_hash, self._refresh_ttl_seconds())
+        except (ConnectionError, TimeoutError):
+            logger.exception("Błąd rotacji refresh tokena w Redis")
+            raise AppException("Serwis sesji chwilowo niedostępny", code="REDIS_ERROR", status_code=503)
+
+        if rotated is None:
+            return await self._refresh_legacy_session(token_hash)
+
+        user_id, principal = rotated
+        user: User | dict | None = principal
+        if user is None:
+            # Brak usera w principal cache — jedyny przypadek z zapytaniem do bazy
+            user = self.db.query(User).filter(User.id == user_id).first()
+        is_active = user["is_active"] if isinstance(user, dict) else bool(user and user.is_active)
+        if not is_active:
+            await self.refresh_tokens.revoke(new_hash)
+            raise AuthenticationError("Użytkownik nieaktywny")
+
+        if self.settings.refresh_token_audit:
+            self.db.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).update(
+                {RefreshToken.revoked: True}, synchronize_session=False,
+            )
+            self._audit_refresh_token(user_id, new_hash)
+            self.db.commit()
 
+        logger.info(f"Refresh sesji (user_id={user_id})")
+        return self._auth_response(user), new_plain
+
+    async def _refresh_legacy_session(self, token_hash: str) -> tuple[AuthResponse, str]:
+        """Rotacja tokenu znanego tylko z tabeli refresh_tokens — nowy trafia już do Redis."""
         db_token = self.db.query(RefreshToken).filter(
             RefreshToken.token_hash == token_hash,
             RefreshToken.revoked == False,    
@@ -330,8 +410,8 @@ class AuthService:
         if not user or not user.is_active:
             raise AuthenticationError("Użytkownik nieaktywny")
 
-        logger.info(f"Refresh sesji (user_id={user.id})")
-        return self._create_session(user)
+        logger.info(f"Refresh sesji z tabeli refresh_tokens (user_id={user.id})")
+        return await self._create_session(user)
     
     def get_me(self, user: User) -> MeResponse:
         """Zwraca dane aktualnie zalogowanego użytkownika"""
@@ -340,6 +420,13 @@ class AuthService:
     async def logout_session(self, refresh_token_plain: str) -> None:
         token_hash = hash_refresh_token(refresh_token_plain)
 
+        try:
+            await self.refresh_tokens.revoke(token_hash)
+        except (ConnectionError, TimeoutError):
+            logger.exception("Błąd unieważnienia refresh tokena w Redis")
+            raise AppException("Serwis sesji chwilowo niedostępny", code="REDIS_ERROR", status_code=503)
+
+        # Token mógł być wydany przed przejściem na Redis (albo jest w logu audytowym)
         db_token = self.db.query(RefreshToken).filter(
             RefreshToken.token_hash == token_hash,
             RefreshToken.revoked == False,
@@ -351,10 +438,13 @@ class AuthService:
 
     # === GOOGLE OAUTH ===
 
-    def _verify_google_credential(self, credential: str) -> tuple[str, str, str, str | None]:
-        """Weryfikuje ID token z Google Identity Services (podpis, aud, exp). Zwraca (google_id, email, name, picture)."""
+    async def _verify_google_credential(self, credential: str) -> tuple[str, str, str, str | None]:
+        """
+        Weryfikuje ID token z Google Identity Services (podpis, aud, iss, exp)
+        lokalnie, na kluczach z cache (google_jwks.py). Zwraca (google_id, email, name, picture).
+        """
         try:
-            idinfo = id_token.verify_oauth2_token(credential, google_requests.Request(), self.settings.google_client_id)
+            idinfo = await verify_google_id_token(credential, self.settings.google_client_id)
         except ValueError:
             logger.warning("Nieprawidłowy token Google ID")
             raise AuthenticationError("Nieprawidłowy token logowania Google")
@@ -408,10 +498,10 @@ class AuthService:
             self.db.flush()
             logger.info(f"Nowy użytkownik Google (ID: {user.id})")
 
-            OnboardingService(self.db).setup_new_user(user.id)
+            enqueue_onboarding(self.db, user.id)
             self.db.commit()
-            self.db.refresh(user)
-            logger.info(f"Workspace utworzony (user_id={user.id})")
+            wake_outbox_dispatcher()
+            logger.info(f"Onboarding zlecony (user_id={user.id})")
             return user
         
         except OperationalError:
@@ -425,7 +515,9 @@ class AuthService:
 
     async def google_login(self, credential: str) -> tuple[AuthResponse, str]:
         """Logowanie przez Google (ID token z Google Identity Services)."""
-        google_id, email, name, picture = self._verify_google_credential(credential)
+        google_id, email, name, picture = await self._verify_google_credential(credential)
         user = self._find_or_create_google_user(google_id, email, name, picture)
+        # Konto mogło właśnie zostać podpięte pod Google (aktywacja, zdjęcie)
+        await invalidate_principal(user.id, self.redis)
         logger.info(f"Token wygenerowany (user_id={user.id})")
-        return self._create_session(user)
\ No newline at end of file
+        return await self._create_session(user)
\ No newline at end of file
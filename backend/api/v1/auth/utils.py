@@ -12,9 +12,20 @@ import secrets
 import string
 import hashlib
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from core.config import get_settings
+
+# Hashe z mniejszą liczbą rund niż bcrypt_rounds są "do aktualizacji" —
+# logowanie przepisuje je po cichu (password_pool.verify_password_async)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=get_settings().bcrypt_rounds,
+    bcrypt__min_rounds=get_settings().bcrypt_rounds,
+)
 
 # === HASŁA ===
+# Synchroniczne — ~250 ms CPU. W async handlerach używaj wersji z
+# password_pool.py (hash_password_async / verify_password_async).
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
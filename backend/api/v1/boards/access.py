@@ -0,0 +1,155 @@
+"""
+Dostęp do tablicy — jedno zapytanie, wspólne dla BoardService i WhiteboardService.
+
+DLACZEGO:
+  Każdy zapis, odczyt, kasowanie, heartbeat i upload robił najpierw
+  _get_board_or_404 (SELECT boards), potem _check_access (SELECT
+  workspace_members), a set_online jeszcze SELECT board_users — dwa-trzy
+  round tripy do Neon, zanim zaczęła się właściwa praca.
+
+JAK:
+  resolve_board_access() — tablica + rola usera w jej workspace + jego
+  wiersz board_users jednym zapytaniem z dwoma LEFT JOIN-ami. Wynik jest
+  zapamiętywany w Session.info, więc w obrębie jednego requestu (jedna
+  sesja z get_db) kolejne wywołania nie pytają bazy. Commit/rollback
+  czyści ten cache — po zmianie członkostwa nikt nie widzi starej roli.
+
+  ensure_board_access() (ścieżki async, np. upload obrazu) — dodatkowo
+  krótki cache przyznanego dostępu w Redis
+  (settings.board_access_cache_ttl_seconds, 0 = wyłączony). Zapisywane
+  są tylko zgody — odmowa i 404 zawsze idą do bazy. Zmiana członkostwa
+  kasuje zgody usera (forget_board_access, wołane przez handler
+  unieważnień ACL w workspaces/acl_cache.py), więc TTL jest tylko siatką
+  bezpieczeństwa, a nie czasem, przez który usunięty user ma jeszcze dostęp.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy import and_, event
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.exceptions import AppException, NotFoundError
+from core.logging import get_logger
+from core.models import Board, BoardUsers, WorkspaceMember
+from core.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+_SESSION_KEY = "board_access"
+
+
+@dataclass
+class BoardAccess:
+    """Tablica widziana oczami usera. `board` i `board_user` są przypięte do sesji."""
+    board: Board
+    user_id: int
+    role: Optional[str]  # rola w workspace tablicy; None = nie jest członkiem
+    board_user: Optional[BoardUsers]
+
+    @property
+    def is_owner(self) -> bool:
+        return self.board.created_by == self.user_id
+
+    @property
+    def has_access(self) -> bool:
+        return self.role is not None or self.is_owner
+
+    def require_access(self) -> "BoardAccess":
+        if not self.has_access:
+            raise AppException("Brak dostępu do tej tablicy", status_code=403)
+        return self
+
+
+def _redis_key(board_id: int, user_id: int) -> str:
+    return f"board:access:{board_id}:{user_id}"
+
+
+def _session_cache(db: Session) -> Dict[Tuple[int, int], BoardAccess]:
+    return db.info.setdefault(_SESSION_KEY, {})
+
+
+def resolve_board_access(db: Session, board_id: int, user_id: int) -> BoardAccess:
+    """Tablica + rola + board_users jednym zapytaniem (cache na czas sesji). Brak tablicy → 404."""
+    cache = _session_cache(db)
+    access = cache.get((board_id, user_id))
+    if access is not None:
+        return access
+
+    row = (
+        db.query(Board, WorkspaceMember.role, BoardUsers)
+        .outerjoin(WorkspaceMember, and_(
+            WorkspaceMember.workspace_id == Board.workspace_id,
+            WorkspaceMember.user_id == user_id,
+        ))
+        .outerjoin(BoardUsers, and_(
+            BoardUsers.board_id == Board.id,
+            BoardUsers.user_id == user_id,
+        ))
+        .filter(Board.id == board_id)
+        .first()
+    )
+    if row is None:
+        raise NotFoundError("Tablica nie znaleziona")
+
+    board, role, board_user = row
+    access = cache[(board_id, user_id)] = BoardAccess(board, user_id, role, board_user)
+    return access
+
+
+def require_board_access(db: Session, board_id: int, user_id: int) -> BoardAccess:
+    """resolve_board_access + 403, gdy user nie jest członkiem workspace'a ani właścicielem tablicy."""
+    return resolve_board_access(db, board_id, user_id).require_access()
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_board_access(db: Session) -> None:
+    db.info.pop(_SESSION_KEY, None)
+
+
+async def ensure_board_access(
+    db: Session, board_id: int, user_id: int, redis_client: redis.Redis | None = None,
+) -> None:
+    """
+    Sam test dostępu, bez potrzeby wiersza tablicy: trafienie w Redis nie
+    dotyka bazy. Błędy Redis = brak trafienia.
+    """
+    ttl = get_settings().board_access_cache_ttl_seconds
+    if ttl <= 0:
+        require_board_access(db, board_id, user_id)
+        return
+
+    client = redis_client or get_redis_client()
+    key = _redis_key(board_id, user_id)
+    try:
+        if await client.exists(key):
+            return
+    except RedisError as e:
+        logger.warning(f"Dostęp do tablicy: odczyt z Redis nieudany: {e}")
+
+    require_board_access(db, board_id, user_id)
+    try:
+        await client.set(key, 1, px=int(ttl * 1000))
+    except RedisError as e:
+        logger.warning(f"Dostęp do tablicy: zapis do Redis nieudany: {e}")
+
+
+async def forget_board_access(user_ids: Iterable[Optional[int]], redis_client: redis.Redis | None = None) -> None:
+    """
+    Kasuje zgody z ensure_board_access dla userów, których członkostwo się
+    zmieniło (klucz nie zna workspace'a, więc giną zgody do wszystkich ich
+    tablic — to tylko chybienie cache). None = usunięty cały workspace →
+    wszystkie zgody. Błędy Redis lecą do wołającego (retry outboxa).
+    """
+    if get_settings().board_access_cache_ttl_seconds <= 0:
+        return
+    user_ids = set(user_ids)
+    patterns = ["board:access:*"] if None in user_ids else [f"board:access:*:{user_id}" for user_id in user_ids]
+    client = redis_client or get_redis_client()
+    for pattern in patterns:
+        keys = [key async for key in client.scan_iter(match=pattern, count=500)]
+        if keys:
+            await client.delete(*keys)
@@ -13,12 +13,18 @@ BoardService obsługuje:
   join_board_workspace() — dołącza użytkownika przez link
 """
 from datetime import datetime
+
+import redis.asyncio as redis
 from sqlalchemy.orm import Session, joinedload
 
+from api.v1.whiteboard.presence import PresenceService, load_online_users
+
 from core.exceptions import NotFoundError, AppException
 from core.logging import get_logger
-from core.models import Board, BoardUsers, User, Workspace, WorkspaceMember
+from core.models import Board, BoardElement, BoardUsers, User, Workspace, WorkspaceMember
+from core.outbox import wake_outbox_dispatcher
 
+from .access import require_board_access, resolve_board_access
 from .schemas import (
     CreateBoard, UpdateBoard, ToggleFavourite,
     BoardResponse, BoardListResponse, BoardSettings,
@@ -80,7 +86,6 @@ def create_starter_board(db: Session, workspace_id: int, user_id: int) -> Board:
         board_id=board.id,
         user_id=user_id,
         is_favourite=False,
-        is_online=False,
         last_opened=datetime.utcnow(),
     )
     db.add(board_user)
@@ -89,23 +94,20 @@ def create_starter_board(db: Session, workspace_id: int, user_id: int) -> Board:
 
 class BoardService:
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, redis_client: redis.Redis | None = None):
         self.db = db
-
-    def _get_board_or_404(self, board_id: int) -> Board:
-        board = self.db.query(Board).filter(Board.id == board_id).first()
-        if not board:
-            raise NotFoundError("Tablica nie znaleziona")
-        return board
-
-    def _check_access(self, board: Board, user_id: int) -> None:
-        """Rzuca 403 jeśli user nie ma dostępu do tablicy."""
-        member = self.db.query(WorkspaceMember).filter(
-            WorkspaceMember.workspace_id == board.workspace_id,
-            WorkspaceMember.user_id == user_id,
-        ).first()
-        if not member and board.created_by != user_id:
-            raise AppException("Brak dostępu do tej tablicy", status_code=403)
+        self.presence = PresenceService(redis_client)
+
+    async def _online_users_by_board(self, board_ids: list[int]) -> dict[int, list[OnlineUserInfo]]:
+        """Kto jest online na podanych tablicach — obecność z Redis (whiteboard/presence.py), jeden pipeline."""
+        online = await load_online_users(self.db, self.presence, board_ids)
+        return {
+            board_id: [
+                OnlineUserInfo(user_id=uid, username=uname, avatar_url=av_url)
+                for uid, uname, av_url in users
+            ]
+            for board_id, users in online.items()
+        }
 
     async def create_board(self, board_data: CreateBoard, user_id: int) -> BoardResponse:
         workspace = self.db.query(Workspace).filter(
@@ -131,7 +133,6 @@ class BoardService:
             board_id=board.id,
             user_id=user_id,
             is_favourite=False,
-            is_online=True,
             last_opened=datetime.utcnow(),
         )
         self.db.add(board_user)
@@ -146,24 +147,9 @@ class BoardService:
         return _build_board_response(self.db, board, user_id, online_users)
 
     async def get_board(self, board_id: int, user_id: int) -> BoardResponse:
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
-        
-        from datetime import timedelta
-        active_threshold = datetime.utcnow() - timedelta(minutes=2)
-
-        online_records = (
-            self.db.query(User.id, User.username, User.avatar_url)
-            .join(BoardUsers, User.id == BoardUsers.user_id)
-            .filter(
-                BoardUsers.board_id == board.id, 
-                BoardUsers.is_online == True,
-                BoardUsers.last_opened >= active_threshold
-            )
-            .all()
-        )
-        online_users = [OnlineUserInfo(user_id=uid, username=uname, avatar_url=av_url) for uid, uname, av_url in online_records]
+        board = require_board_access(self.db, board_id, user_id).board
 
+        online_users = (await self._online_users_by_board([board.id]))[board.id]
         return _build_board_response(self.db, board, user_id, online_users)
 
     async def list_boards(
@@ -186,26 +172,8 @@ class BoardService:
             .all()
         )
 
-        # Gather online users for all boards in one query
-        board_ids = [b[0].id for b in boards_data]
-        online_map = {}
-        if board_ids:
-            from datetime import timedelta
-            active_threshold = datetime.utcnow() - timedelta(minutes=2)
-            online_records = (
-                self.db.query(BoardUsers.board_id, User.id, User.username, User.avatar_url)
-                .join(User, User.id == BoardUsers.user_id)
-                .filter(
-                    BoardUsers.board_id.in_(board_ids), 
-                    BoardUsers.is_online == True,
-                    BoardUsers.last_opened >= active_threshold
-                )
-                .all()
-            )
-            for bid, uid, uname, av_url in online_records:
-                if bid not in online_map:
-                    online_map[bid] = []
-                online_map[bid].append(OnlineUserInfo(user_id=uid, username=uname, avatar_url=av_url))
+        # Online users for all boards in one Redis pipeline
+        online_map = await self._online_users_by_board([b[0].id for b in boards_data])
 
         responses = []
         for board, is_favourite, last_opened in boards_data:
@@ -239,8 +207,7 @@ class BoardService:
         )
 
     async def update_board(self, board_id: int, data: UpdateBoard, user_id: int) -> BoardResponse:
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
+        board = require_board_access(self.db, board_id, user_id).board
 
         if data.name is not None:
             board.name = data.name
@@ -253,24 +220,25 @@ class BoardService:
         board.last_modified_by = user_id
         self.db.commit()
         self.db.refresh(board)
-        
-        online_records = (
-            self.db.query(User.id, User.username, User.avatar_url)
-            .join(BoardUsers, User.id == BoardUsers.user_id)
-            .filter(BoardUsers.board_id == board.id, BoardUsers.is_online == True)
-            .all()
-        )
-        online_users = [OnlineUserInfo(user_id=uid, username=uname, avatar_url=av_url) for uid, uname, av_url in online_records]
 
+        online_users = (await self._online_users_by_board([board.id]))[board.id]
 
         logger.info(f"✅ Tablica zaktualizowana: {board_id}")
         return _build_board_response(self.db, board, user_id, online_users)
 
     async def delete_board(self, board_id: int, user_id: int) -> dict:
-        board = self._get_board_or_404(board_id)
+        board = resolve_board_access(self.db, board_id, user_id).board
         if board.created_by != user_id:
             raise AppException("Tylko właściciel może usunąć tablicę", status_code=403)
 
+        image_srcs = [
+            (data or {}).get("src")
+            for (data,) in self.db.query(BoardElement.data).filter(
+                BoardElement.board_id == board_id,
+                BoardElement.type == "image",
+            ).all()
+        ]
+
         self.db.delete(board)
         self.db.commit()
 
@@ -280,7 +248,9 @@ class BoardService:
         # (usunięcie tablicy z bazy jest tym co naprawdę musi się udać;
         # nieudane sprzątnięcie plików to dużo mniejszy problem).
         from api.v1.whiteboard.storage import delete_board_folder
+        from api.v1.whiteboard.service import release_board_images
         await delete_board_folder(board_id)
+        await release_board_images(self.db, [src for src in image_srcs if isinstance(src, str) and src])
 
         logger.info(f"✅ Tablica usunięta: {board_id}")
         return {"success": True, "message": "Tablica została pomyślnie usunięta."}
@@ -288,17 +258,13 @@ class BoardService:
     async def toggle_favourite(
         self, board_id: int, toggle_data: ToggleFavourite, user_id: int
     ) -> ToggleFavouriteResponse:
-        board_user = self.db.query(BoardUsers).filter(
-            BoardUsers.board_id == board_id,
-            BoardUsers.user_id == user_id,
-        ).first()
+        board_user = resolve_board_access(self.db, board_id, user_id).board_user
 
         if not board_user:
-            self._get_board_or_404(board_id)
             board_user = BoardUsers(
                 board_id=board_id, user_id=user_id,
                 is_favourite=toggle_data.is_favourite,
-                is_online=False, last_opened=None,
+                last_opened=None,
             )
             self.db.add(board_user)
         else:
@@ -312,8 +278,7 @@ class BoardService:
         )
 
     async def get_members(self, board_id: int, user_id: int) -> BoardMembersResponse:
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
+        board = require_board_access(self.db, board_id, user_id).board
 
         ws_members = (
             self.db.query(WorkspaceMember, User)
@@ -339,7 +304,7 @@ class BoardService:
     async def update_settings(
         self, board_id: int, body: UpdateBoardSettings, user_id: int
     ) -> dict:
-        board = self._get_board_or_404(board_id)
+        board = resolve_board_access(self.db, board_id, user_id).board
         if board.created_by != user_id:
             raise AppException("Tylko właściciel może zmieniać ustawienia", status_code=403)
 
@@ -359,15 +324,10 @@ class BoardService:
         Jeśli użytkownik jest już członkiem — zwraca current state.
         Jeśli nie jest — dodaje jako 'editor'.
         """
-        board = self._get_board_or_404(board_id)
-        is_owner = board.created_by == user_id
- 
-        existing_member = self.db.query(WorkspaceMember).filter(
-            WorkspaceMember.workspace_id == board.workspace_id,
-            WorkspaceMember.user_id == user_id,
-        ).first()
+        access = resolve_board_access(self.db, board_id, user_id)
+        board, is_owner = access.board, access.is_owner
  
-        if existing_member:
+        if access.role is not None:
             return JoinBoardResponse(
                 success=True,
                 already_member=True,
@@ -375,7 +335,7 @@ class BoardService:
                 board_id=board_id,
                 owner_id=board.created_by,
                 is_owner=is_owner,
-                user_role="owner" if is_owner else existing_member.role,
+                user_role="owner" if is_owner else access.role,
             )
  
         new_member = WorkspaceMember(
@@ -386,7 +346,11 @@ class BoardService:
             joined_at=datetime.utcnow(),
         )
         self.db.add(new_member)
+        # Leniwy import — api.v1.workspaces importuje BoardService
+        from api.v1.workspaces.acl_cache import invalidate_workspace_acl
+        invalidate_workspace_acl(self.db, board.workspace_id, user_id)
         self.db.commit()
+        wake_outbox_dispatcher()
  
         return JoinBoardResponse(
             success=True,
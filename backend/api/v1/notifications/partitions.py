@@ -0,0 +1,206 @@
+"""
+Partycje miesięczne tabeli `notifications` (Postgres) + retencja.
+
+DLACZEGO:
+  Tabela rośnie bez końca, a kasowanie starych powiadomień DELETE-em to
+  miliony wierszy w WAL, blokady i vacuum. Od migracji b6d2f8e4a1c7
+  `notifications` jest partycjonowana po `created_at` (RANGE, miesiąc na
+  partycję): zapytania skrzynki z zakresem dat dotykają tylko świeżych
+  partycji, a usunięcie starego miesiąca to DETACH + DROP — operacja na
+  metadanych, niezależna od liczby wierszy.
+
+PARTYCJE:
+  notifications_y2026m10  — FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')
+  notifications_default   — DEFAULT, łapie wiersze spoza utworzonych
+                            miesięcy (nie powinno się zdarzać, jeśli
+                            utrzymanie działa; zawsze sprawdzaj, czy pusta)
+
+  ensure_partitions() zakłada z wyprzedzeniem bieżący miesiąc + N kolejnych
+  (settings.notification_partitions_ahead). Z wyprzedzeniem, bo partycji
+  nie da się utworzyć dla zakresu, w którym są już wiersze w DEFAULT.
+
+RETENCJA:
+  drop_expired_partitions() usuwa WSZYSTKIE partycje starsze niż
+  settings.notification_retention_months. Nieprzeczytane powiadomienia
+  też przepadają — retencja dotyczy ich tak samo (wcześniej jeden
+  nieprzeczytany wiersz trzymał cały miesiąc w bazie w nieskończoność,
+  bo nieaktywni userzy nigdy nic nie czytają).
+
+  Żeby nie rozjechać licznika users.unread_notifications, w tej samej
+  transakcji co DROP odejmujemy nieprzeczytane z partycji jednym
+  UPDATE ... FROM (SELECT user_id, count(*) ... GROUP BY user_id) —
+  discard_unread(). Kolejność: najpierw DETACH (blokuje partycję), potem
+  liczenie i UPDATE, na końcu DROP + commit. Równoległe „oznacz jako
+  przeczytane" czeka na blokadę, a po commicie nie znajduje już wiersza,
+  więc nie zmniejszy licznika drugi raz.
+
+URUCHAMIANIE:
+  w tle co settings.notification_partition_maintenance_interval_hours
+  (main.py) albo `python manage.py maintain-notification-partitions`.
+  Na bazie bez partycjonowania (SQLite w testach) utrzymanie nic nie robi.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import case, column, func, select, table, text, update
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.database import SessionLocal
+from core.logging import get_logger
+from core.models import User
+
+logger = get_logger(__name__)
+
+PARENT_TABLE = "notifications"
+_NAME_PATTERN = re.compile(r"^notifications_y(\d{4})m(\d{2})$")
+
+
+@dataclass
+class PartitionMaintenanceReport:
+    created: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+    expired_unread: int = 0  # nieprzeczytane powiadomienia w usuniętych partycjach
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"notifications_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Miesiąc partycji z jej nazwy; None dla DEFAULT i obcych tabel."""
+    match = _NAME_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def months_to_create(existing: List[str], today: date, ahead: int) -> List[date]:
+    """Bieżący miesiąc + `ahead` kolejnych, których jeszcze nie ma."""
+    have = {partition_month(name) for name in existing}
+    current = today.replace(day=1)
+    return [month for month in (add_months(current, n) for n in range(ahead + 1)) if month not in have]
+
+
+def expired_partitions(existing: List[str], today: date, retention_months: int) -> List[str]:
+    """Partycje, których CAŁY zakres jest starszy niż `retention_months` pełnych miesięcy."""
+    cutoff = add_months(today.replace(day=1), -retention_months)
+    expired = []
+    for name in existing:
+        month = partition_month(name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"),
+        {"t": PARENT_TABLE},
+    ).scalar())
+
+
+def list_partitions(db: Session) -> List[str]:
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :t"
+    ), {"t": PARENT_TABLE}).scalars().all()
+    return list(rows)
+
+
+def ensure_partitions(db: Session, ahead: int, today: Optional[date] = None) -> List[str]:
+    """Zakłada brakujące partycje miesięczne. Zwraca nazwy utworzonych."""
+    created = []
+    for month in months_to_create(list_partitions(db), today or date.today(), ahead):
+        name = partition_name(month)
+        # Nazwy i granice budujemy sami z dat — nie ma tu danych od usera
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    db.commit()
+    return created
+
+
+def discard_unread(db: Session, table_name: str) -> int:
+    """
+    Odejmuje nieprzeczytane powiadomienia z tabeli `table_name` od
+    users.unread_notifications — jeden grupowany UPDATE dla wszystkich
+    userów naraz. Nie commituje. Zwraca liczbę nieprzeczytanych.
+    """
+    rows = table(table_name, column("user_id"), column("is_read"))
+    unread = db.execute(select(func.count()).select_from(rows).where(~rows.c.is_read)).scalar() or 0
+    if not unread:
+        return 0
+    per_user = (
+        select(rows.c.user_id, func.count().label("n"))
+        .where(~rows.c.is_read)
+        .group_by(rows.c.user_id)
+        .subquery()
+    )
+    # Licznik bywa rozjechany (patrz repair_unread_counters) — nie schodzimy poniżej zera
+    db.execute(
+        update(User)
+        .where(User.id == per_user.c.user_id)
+        .values(unread_notifications=case(
+            (User.unread_notifications > per_user.c.n, User.unread_notifications - per_user.c.n),
+            else_=0,
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    return unread
+
+
+def drop_expired_partitions(
+    db: Session,
+    retention_months: int,
+    today: Optional[date] = None,
+    report: Optional[PartitionMaintenanceReport] = None,
+) -> PartitionMaintenanceReport:
+    """Odpina i usuwa przeterminowane partycje, korygując liczniki nieprzeczytanych."""
+    report = report or PartitionMaintenanceReport()
+    for name in expired_partitions(list_partitions(db), today or date.today(), retention_months):
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        report.expired_unread += discard_unread(db, name)
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        report.dropped.append(name)
+    db.commit()
+    return report
+
+
+def maintain_partitions(db: Session, today: Optional[date] = None) -> PartitionMaintenanceReport:
+    """Pełne utrzymanie: partycje na zapas + retencja (wg ustawień)."""
+    settings = get_settings()
+    report = PartitionMaintenanceReport()
+    if not is_partitioned(db):
+        logger.info("Tabela notifications nie jest partycjonowana — utrzymanie pominięte")
+        return report
+    report.created = ensure_partitions(db, settings.notification_partitions_ahead, today)
+    if settings.notification_retention_months > 0:
+        drop_expired_partitions(db, settings.notification_retention_months, today, report)
+    return report
+
+
+async def run_partition_maintenance() -> None:
+    """Job dla core/periodic.py — własna sesja, jak run_unread_counter_repair."""
+    db = SessionLocal()
+    try:
+        report = maintain_partitions(db)
+    finally:
+        db.close()
+    if report.created or report.dropped:
+        logger.info(
+            f"Partycje powiadomień: utworzone {report.created}, usunięte {report.dropped} "
+            f"(w tym nieprzeczytanych: {report.expired_unread})"
+        )
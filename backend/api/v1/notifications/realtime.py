@@ -1,80 +1,341 @@
 """
 Supabase Broadcast — wysyłanie eventów do frontendu przez WebSocket.
- 
+
 Jak to działa:
   FastAPI robi INSERT do Neon (baza danych)
-  → następnie wywołuje broadcast_notification()
-  → która uderza w Supabase REST API (/realtime/v1/api/broadcast)
+  → w tej samej transakcji dopisuje event do outboxa (enqueue_broadcast,
+    core/outbox.py), a dispatcher w tle woła deliver_broadcasts()
+    — albo, dla eventów "best effort", od razu broadcast_notification()
+  → które wrzucają event do RealtimeBroadcaster
+  → broadcaster co FLUSH_INTERVAL_SECONDS (albo po BATCH_SIZE eventach)
+    wysyła WSZYSTKIE zebrane eventy jednym requestem do Supabase REST API
+    (/realtime/v1/api/broadcast przyjmuje listę `messages`)
   → Supabase pushuje event przez WebSocket do wszystkich subskrybentów kanału
   → frontend (NotificationContext) odbiera event natychmiast
- 
+
 Kanały są per-user: "notifications:{user_id}"
 Dzięki temu każdy user widzi tylko swoje powiadomienia.
+
+DLACZEGO KOLEJKA:
+  Wcześniej każdy event to osobny POST (i osobny AsyncClient, czyli nowe
+  połączenie TLS). Zaproszenie całej klasy = setki requestów naraz. Teraz
+  to kilka requestów po BATCH_SIZE wiadomości, po jednym puli połączeń.
+
+BACK-PRESSURE:
+  Kolejka jest ograniczona (QUEUE_SIZE). Gdy Supabase nie nadąża, wołający
+  czeka do ENQUEUE_TIMEOUT_SECONDS na miejsce w kolejce, a potem event jest
+  odrzucany (broadcast to "best effort" — powiadomienie i tak jest w bazie).
 """
 
-import httpx
-import os
+import asyncio
 import logging
-from typing import Any
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+import httpx
+from sqlalchemy.orm import Session
+
+from core.outbox import add_outbox_event, register_outbox_handler
 
 logger = logging.getLogger(__name__)
 
-async def broadcast_notification(
-        user_id: int,
-        event: str,
-        payload: dict[str, Any],
-) -> bool:
+BATCH_SIZE = 100
+FLUSH_INTERVAL_SECONDS = 0.02
+QUEUE_SIZE = 5000
+ENQUEUE_TIMEOUT_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass
+class BroadcasterMetrics:
+    """Liczniki od startu procesu — /api/v1/health zwraca je pod `realtime_broadcast`."""
+    enqueued: int = 0
+    sent: int = 0
+    dropped: int = 0
+    failed: int = 0
+    requests: int = 0
+    queue_depth: int = 0
+    last_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+
+
+class RealtimeBroadcaster:
     """
-    Wysyła event Broadcast do prywatnego kanału usera.
- 
-    Parametry:
-        user_id: ID zapraszanego usera (subskrybuje kanał "notifications:{user_id}")
-        event:   Nazwa eventu, np. "new_invite", "invite_accepted"
-        payload: Dane eventu — dowolny dict (zostanie przesłany do frontendu)
- 
-    Zwraca True jeśli sukces, False jeśli błąd (nie rzuca wyjątku —
-    broadcast to "best effort", nie blokuje głównej operacji).
+    Kolejka eventów Broadcast + jedno zadanie w tle, które je wysyła
+    paczkami przez współdzielony httpx.AsyncClient.
     """
-    supabase_url = os.getenv("SUPABASE_URL")
-    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-    if not supabase_url or not service_role_key:
-        logger.warning(
-            "Brak SUPABASE_URL lub SUPABASE_SERVICE_ROLE_KEY — "
-            "broadcast pominięty (ustaw zmienne środowiskowe)"
-        )
-        return False
 
-    channel = f"notifications:{user_id}"
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        queue_size: int = QUEUE_SIZE,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.metrics = BroadcasterMetrics()
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._queue: asyncio.Queue | None = None
+        self._flusher: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._retiring: set[asyncio.Task] = set()
 
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(
+    def _ensure_started(self) -> asyncio.Queue:
+        # Kolejka i flusher należą do pętli, w której powstały (w testach
+        # TestClient ma własną pętlę) — w innej pętli zaczynamy od nowa
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._retire_previous()
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._flusher = loop.create_task(self._run(), name="realtime:broadcaster")
+        return self._queue
+
+    def _retire_previous(self) -> None:
+        """
+        Zatrzymuje flusher i zamyka pulę połączeń z poprzedniej pętli —
+        inaczej po każdej zmianie pętli zostawałoby wiszące zadanie i otwarte
+        gniazda. Zadanie i gniazda należą do starej pętli: jeśli ona wciąż
+        działa (inny wątek), sprzątanie zlecamy jej; jeśli stoi albo jest
+        zamknięta, anulujemy flusher (o ile się da) i zamykamy klienta tutaj.
+        Nie wysłane eventy ze starej kolejki przepadają (broadcast to "best effort").
+        """
+        old_loop, flusher, client = self._loop, self._flusher, self._client
+        self._flusher = None
+        self._client = None
+        if old_loop is None:
+            return
+        if old_loop.is_running():
+            if flusher is not None:
+                old_loop.call_soon_threadsafe(flusher.cancel)
+            if client is not None:
+                asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+            return
+        if flusher is not None and not old_loop.is_closed():
+            flusher.cancel()
+        if client is not None:
+            task = asyncio.get_running_loop().create_task(_close_quietly(client))
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                transport=self._transport,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    async def enqueue(self, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Dodaje eventy {"topic", "event", "payload"} do kolejki. Czeka na
+        miejsce (back-pressure); zwraca False, jeśli część z nich odrzucono.
+        """
+        queue = self._ensure_started()
+        for index, message in enumerate(messages):
+            try:
+                await asyncio.wait_for(queue.put(message), ENQUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                dropped = len(messages) - index
+                self.metrics.dropped += dropped
+                logger.warning(f"Broadcast: kolejka pełna — odrzucono {dropped} eventów")
+                return False
+            self.metrics.enqueued += 1
+        self.metrics.queue_depth = queue.qsize()
+        return True
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._send(batch)
+            for _ in batch:
+                queue.task_done()
+            self.metrics.queue_depth = queue.qsize()
+
+    async def _send(self, batch: List[Dict[str, Any]]) -> bool:
+        supabase_url = os.getenv("SUPABASE_URL")
+        service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        started = time.perf_counter()
+        self.metrics.requests += 1
+        try:
+            response = await self._get_client().post(
                 f"{supabase_url}/realtime/v1/api/broadcast",
                 headers={
                     "Content-Type": "application/json",
                     "Authorization": f"Bearer {service_role_key}",
                     "apikey": service_role_key,
                 },
-                json={
-                    "messages": [
-                        {
-                            "topic": channel,
-                            "event": event,
-                            "payload": payload,
-                        }
-                    ]
-                },
+                json={"messages": batch},
             )
             response.raise_for_status()
-            logger.info(f"Broadcast '{event}' → kanał '{channel}' — OK")
+            self.metrics.sent += len(batch)
+            logger.info(f"Broadcast: {len(batch)} eventów jednym requestem — OK")
             return True
-    except httpx.TimeoutException:
-        logger.warning(f"Broadcast '{event}' → timeout (Supabase niedostępny)")
-        return False
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Broadcast '{event}' → HTTP {e.response.status_code}: {e.response.text}")
+        except httpx.TimeoutException:
+            logger.warning(f"Broadcast: timeout przy {len(batch)} eventach (Supabase niedostępny)")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Broadcast: HTTP {e.response.status_code}: {e.response.text}")
+        except Exception as e:
+            logger.error(f"Broadcast: nieoczekiwany błąd: {e}")
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.metrics.last_flush_ms = round(elapsed_ms, 2)
+            self.metrics.max_flush_ms = max(self.metrics.max_flush_ms, self.metrics.last_flush_ms)
+        self.metrics.failed += len(batch)
         return False
+
+    async def send(self, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Wysyła od razu, z pominięciem kolejki (paczkami po batch_size).
+        Dla outboxa, który sam ponawia — False, jeśli któraś paczka nie doszła.
+        """
+        self._ensure_started()
+        delivered = True
+        for start in range(0, len(messages), self.batch_size):
+            delivered = await self._send(messages[start:start + self.batch_size]) and delivered
+        return delivered
+
+    async def flush(self) -> None:
+        """Czeka, aż wszystko z kolejki zostanie wysłane (shutdown, testy)."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._retiring:
+            await asyncio.gather(*self._retiring, return_exceptions=True)
+        self._loop = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self._queue is not None:
+            self.metrics.queue_depth = self._queue.qsize()
+        return asdict(self.metrics)
+
+
+async def _close_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
     except Exception as e:
-        logger.error(f"Broadcast '{event}' → nieoczekiwany błąd: {e}")
+        logger.warning(f"Broadcast: zamknięcie klienta z poprzedniej pętli nieudane: {e}")
+
+
+_broadcaster: RealtimeBroadcaster | None = None
+
+
+def get_broadcaster() -> RealtimeBroadcaster:
+    """Broadcaster dla tego workera (singleton, tworzony leniwie)."""
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = RealtimeBroadcaster()
+    return _broadcaster
+
+
+async def shutdown_broadcaster() -> None:
+    """Wysyła resztę kolejki i zamyka pulę połączeń — wołane przy shutdownie (main.py)."""
+    global _broadcaster
+    if _broadcaster is not None:
+        await _broadcaster.close()
+        _broadcaster = None
+
+
+def _credentials_configured() -> bool:
+    if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+        return True
+    logger.warning(
+        "Brak SUPABASE_URL lub SUPABASE_SERVICE_ROLE_KEY — "
+        "broadcast pominięty (ustaw zmienne środowiskowe)"
+    )
+    return False
+
+
+async def broadcast_notification(
+        user_id: int,
+        event: str,
+        payload: dict[str, Any],
+) -> bool:
+    """
+    Wysyła event Broadcast do prywatnego kanału usera.
+
+    Parametry:
+        user_id: ID zapraszanego usera (subskrybuje kanał "notifications:{user_id}")
+        event:   Nazwa eventu, np. "new_invite", "invite_accepted"
+        payload: Dane eventu — dowolny dict (zostanie przesłany do frontendu)
+
+    Zwraca True, jeśli event trafił do kolejki broadcastera, False jeśli nie
+    (nie rzuca wyjątku — broadcast to "best effort", nie blokuje głównej
+    operacji). Sam request do Supabase idzie w tle, zbiorczo.
+    """
+    return await broadcast_many([(user_id, event, payload)])
+
+
+async def broadcast_many(events: List[tuple[int, str, dict[str, Any]]]) -> bool:
+    """Jak broadcast_notification, ale dla wielu (user_id, event, payload) naraz."""
+    if not events or not _credentials_configured():
         return False
+    return await get_broadcaster().enqueue([
+        _message(user_id, event, payload) for user_id, event, payload in events
+    ])
+
+
+def _message(user_id: int, event: str, payload: dict[str, Any]) -> Dict[str, Any]:
+    return {"topic": f"notifications:{user_id}", "event": event, "payload": payload}
+
+
+def enqueue_broadcast(db: Session, user_id: int, event: str, payload: dict[str, Any]) -> None:
+    """
+    Broadcast przez outbox — zapisany w bieżącej transakcji (bez commitu),
+    wysłany przez dispatcher po commicie, z ponawianiem.
+    """
+    add_outbox_event(db, "broadcast", _message(user_id, event, payload))
+
+
+async def deliver_broadcasts(messages: List[Dict[str, Any]]) -> bool:
+    """Handler outboxa dla kind="broadcast" — cała paczka jednym (lub kilkoma) requestem."""
+    if not _credentials_configured():
+        # Środowisko bez Supabase — nie ma czego ponawiać
+        return True
+    return await get_broadcaster().send(messages)
+
+
+register_outbox_handler("broadcast", deliver_broadcasts)
+
+
+def enqueue_broadcast_batch(db: Session, events: List[tuple[int, str, dict[str, Any]]]) -> None:
+    """
+    Jak enqueue_broadcast, ale cała paczka (fan-out do wielu userów) to
+    JEDEN wiersz outboxa — zamiast setek wierszy po jednej wiadomości.
+    """
+    add_outbox_event(db, "broadcast_batch", {
+        "messages": [_message(user_id, event, payload) for user_id, event, payload in events],
+    })
+
+
+async def deliver_broadcast_batches(batches: List[Dict[str, Any]]) -> bool:
+    """Handler outboxa dla kind="broadcast_batch" — spłaszcza paczki i wysyła jak deliver_broadcasts."""
+    return await deliver_broadcasts([message for batch in batches for message in batch["messages"]])
+
+
+register_outbox_handler("broadcast_batch", deliver_broadcast_batches)
@@ -1,12 +1,20 @@
 """
 Notifications router — /api/v1/notifications/*
 
-GET    /                  — lista powiadomień zalogowanego usera
+GET    /                  — strona powiadomień zalogowanego usera (?limit=&cursor=)
+GET    /unread-count      — sam licznik nieprzeczytanych
+GET    /stream            — strumień SSE: nowe powiadomienia + licznik (stream.py)
 PATCH  /read-all          — oznacz wszystkie jako przeczytane
+POST   /bulk-read         — oznacz zbiorczo (lista id albo wszystko przed kursorem)
+POST   /bulk-delete       — usuń zbiorczo (j.w.)
+POST   /workspace/{id}    — ogłoszenie właściciela do wszystkich członków workspace'a
 PATCH  /{id}/read         — oznacz jedno jako przeczytane
 DELETE /{id}              — usuń powiadomienie
 """
-from fastapi import APIRouter, Depends, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ..auth.dependencies import get_current_user
@@ -15,13 +23,21 @@ from core.exceptions import NotFoundError
 from core.models import User
 from core.responses import ApiResponse
 
-from .schemas import NotificationListResponse, NotificationResponse, ReadAllResponse
+from .schemas import (
+    NotificationListResponse, NotificationResponse, ReadAllResponse, UnreadCountResponse,
+    BulkNotificationsRequest, BulkReadResponse, BulkDeleteResponse,
+    WorkspaceAnnouncementRequest, FanOutResponse,
+)
 from .service import (
     get_user_notifications,
     mark_as_read,
     mark_all_as_read,
     delete_notification,
+    mark_many_as_read,
+    delete_many,
+    notify_workspace_members,
 )
+from .stream import notification_event_stream, parse_last_event_id
 
 router = APIRouter(tags=["Notifications"])
 
@@ -30,16 +46,60 @@ router = APIRouter(tags=["Notifications"])
     "",
     response_model=ApiResponse[NotificationListResponse],
     summary="Get notifications",
-    description="Pobiera powiadomienia zalogowanego usera — najnowsze pierwsze.",
+    description=(
+        "Pobiera stronę powiadomień zalogowanego usera — najnowsze pierwsze. "
+        "Kolejna strona: `?cursor=` z `next_cursor` poprzedniej odpowiedzi."
+    ),
 )
 async def get_notifications(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = get_user_notifications(db=db, user_id=current_user.id)
+    result = get_user_notifications(db=db, user_id=current_user.id, limit=limit, cursor=cursor)
     return ApiResponse(success=True, data=result)
 
 
+@router.get(
+    "/unread-count",
+    response_model=ApiResponse[UnreadCountResponse],
+    summary="Get unread count",
+    description="Licznik nieprzeczytanych powiadomień — bez skanowania tabeli notifications.",
+)
+async def get_unread_count(
+    current_user: User = Depends(get_current_user),
+):
+    # Zdenormalizowana kolumna — user jest już wczytany przez get_current_user
+    return ApiResponse(success=True, data=UnreadCountResponse(unread_count=current_user.unread_notifications))
+
+
+@router.get(
+    "/stream",
+    summary="Notification stream (SSE)",
+    description=(
+        "Server-Sent Events: `notification` (nowe powiadomienie, `id` = id powiadomienia) "
+        "i `unread_count`. Wznawianie przez nagłówek `Last-Event-ID`."
+    ),
+    response_class=StreamingResponse,
+)
+async def stream_notifications(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    user_id = current_user.id
+    # Strumień ma własne krótkie sesje — nie trzymamy połączenia z get_db
+    # przez cały czas jego trwania
+    db.close()
+    return StreamingResponse(
+        notification_event_stream(user_id, parse_last_event_id(last_event_id), request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.patch(
     "/read-all",
     response_model=ApiResponse[ReadAllResponse],
@@ -54,6 +114,58 @@ async def read_all_notifications(
     return ApiResponse(success=True, data=ReadAllResponse(updated=updated))
 
 
+@router.post(
+    "/bulk-read",
+    response_model=ApiResponse[BulkReadResponse],
+    summary="Mark many as read",
+    description="Oznacza jako przeczytane podane `ids` albo wszystko starsze niż kursor `before` — jednym zapytaniem.",
+)
+async def bulk_read_notifications(
+    body: BulkNotificationsRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    updated = mark_many_as_read(db, current_user.id, ids=body.ids, before=body.before)
+    return ApiResponse(success=True, data=BulkReadResponse(updated=updated))
+
+
+@router.post(
+    "/bulk-delete",
+    response_model=ApiResponse[BulkDeleteResponse],
+    summary="Delete many",
+    description="Usuwa podane `ids` albo wszystko starsze niż kursor `before` — jednym zapytaniem.",
+)
+async def bulk_delete_notifications(
+    body: BulkNotificationsRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    deleted = delete_many(db, current_user.id, ids=body.ids, before=body.before)
+    return ApiResponse(success=True, data=BulkDeleteResponse(deleted=deleted))
+
+
+@router.post(
+    "/workspace/{workspace_id}",
+    response_model=ApiResponse[FanOutResponse],
+    status_code=status.HTTP_201_CREATED,
+    summary="Announce to workspace",
+    description=(
+        "Właściciel wysyła powiadomienie do wszystkich członków workspace'a — "
+        "jeden INSERT i jedna paczka broadcastów, niezależnie od liczby członków."
+    ),
+)
+async def announce_to_workspace(
+    workspace_id: int,
+    body: WorkspaceAnnouncementRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    notified = notify_workspace_members(
+        db, workspace_id, current_user.id, body.title, body.message, body.action_url,
+    )
+    return ApiResponse(success=True, data=FanOutResponse(notified=notified))
+
+
 @router.patch(
     "/{notification_id}/read",
     response_model=ApiResponse[NotificationResponse],
@@ -4,10 +4,14 @@ Schematy Pydantic dla systemu powiadomień.
 NotificationResponse      — pojedyncze powiadomienie zwracane przez API
 NotificationListResponse  — lista powiadomień z licznikiem nieprzeczytanych
 ReadAllResponse           — wynik operacji mark-all-as-read
+UnreadCountResponse       — sam licznik nieprzeczytanych
+BulkNotificationsRequest  — lista id albo kursor dla operacji zbiorczych
+BulkReadResponse / BulkDeleteResponse — wyniki operacji zbiorczych
+WorkspaceAnnouncementRequest / FanOutResponse — ogłoszenie do członków workspace'a
 """
 from datetime import datetime
 from typing import Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
 class NotificationResponse(BaseModel):
@@ -34,11 +38,59 @@ class NotificationResponse(BaseModel):
 
 
 class NotificationListResponse(BaseModel):
-    """Lista powiadomień z licznikiem nieprzeczytanych."""
+    """
+    Strona powiadomień z licznikiem nieprzeczytanych.
+    `next_cursor` — przekaż jako `?cursor=` po następną stronę (None = koniec).
+    """
     notifications: list[NotificationResponse]
     unread_count: int
+    next_cursor: Optional[str] = None
 
 
 class ReadAllResponse(BaseModel):
     """Wynik operacji oznaczenia wszystkich jako przeczytane."""
-    updated: int
\ No newline at end of file
+    updated: int
+
+
+class UnreadCountResponse(BaseModel):
+    """Licznik nieprzeczytanych (dzwonek) — bez listy powiadomień."""
+    unread_count: int
+
+
+class BulkNotificationsRequest(BaseModel):
+    """
+    Operacja zbiorcza na powiadomieniach — dokładnie jedno z pól:
+      ids    — konkretne powiadomienia (max 500)
+      before — kursor z listy: wszystko STARSZE niż to miejsce
+               (to, co pokazałyby kolejne strony)
+    """
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=500)
+    before: Optional[str] = None
+
+    @model_validator(mode="after")
+    def exactly_one_selector(self):
+        if (self.ids is None) == (self.before is None):
+            raise ValueError("Podaj dokładnie jedno z pól: ids albo before")
+        return self
+
+
+class BulkReadResponse(BaseModel):
+    """Wynik zbiorczego oznaczenia jako przeczytane."""
+    updated: int
+
+
+class BulkDeleteResponse(BaseModel):
+    """Wynik zbiorczego usuwania."""
+    deleted: int
+
+
+class WorkspaceAnnouncementRequest(BaseModel):
+    """Ogłoszenie właściciela do wszystkich członków workspace'a."""
+    title: str = Field(..., min_length=1, max_length=200)
+    message: str = Field(..., min_length=1, max_length=2000)
+    action_url: Optional[str] = Field(None, max_length=500)
+
+
+class FanOutResponse(BaseModel):
+    """Liczba utworzonych powiadomień."""
+    notified: int
@@ -3,10 +3,40 @@ Service dla systemu powiadomień.
 
 Funkcje:
   create_notification()      — tworzy rekord w bazie (wywoływana wewnętrznie)
-  get_user_notifications()   — pobiera listę powiadomień usera
+  fan_out_notification()     — to samo powiadomienie dla wielu userów naraz
+  notify_workspace_members() — ogłoszenie właściciela do członków workspace'a
+  get_user_notifications()   — pobiera stronę powiadomień usera (kursor)
   mark_as_read()             — oznacza jedno powiadomienie jako przeczytane
   mark_all_as_read()         — oznacza wszystkie powiadomienia usera jako przeczytane
   delete_notification()      — usuwa powiadomienie
+  mark_many_as_read()        — zbiorczo: lista id albo wszystko przed kursorem
+  delete_many()              — j.w., usuwanie
+  get_unread_count()         — licznik nieprzeczytanych (bez skanu tabeli)
+  repair_unread_counters()   — naprawa zdenormalizowanych liczników
+
+Licznik nieprzeczytanych to kolumna `users.unread_notifications`, zmieniana
+atomowo (`SET x = x + n` w SQL, nie read-modify-write w Pythonie) w tej
+samej transakcji co samo powiadomienie. Gdyby coś go jednak rozjechało
+(ręczna zmiana w bazie, kasowanie kaskadowe), naprawia go
+repair_unread_counters — w tle co settings.unread_counter_repair_interval_hours
+albo `python manage.py repair-unread-counters`.
+
+Każda zmiana widoczna dla dzwonka (nowe powiadomienie, zmiana licznika
+nieprzeczytanych) dopisuje w tej samej transakcji event strumienia SSE
+(stream.py) — dispatcher outboxa budzony jest zaraz po commicie.
+
+Fan-out (fan_out_notification):
+  Powiadomienie dla całego workspace'a (np. nauczyciel publikuje tablicę
+  120 uczniom) to jedna transakcja: jeden wielowierszowy INSERT … RETURNING,
+  jeden UPDATE liczników, jeden event strumienia i jeden event
+  "broadcast_batch" w outboxie — zamiast 120 × create_notification.
+
+Paginacja (keyset):
+  Lista jest sortowana po (created_at DESC, id DESC), a kursor to
+  zakodowana para (created_at, id) ostatniego elementu strony. Kolejna
+  strona to `WHERE (created_at, id) < kursor` — indeks
+  ix_notifications_user_created_id, bez OFFSET-u, który przy tysiącach
+  powiadomień czytałby i wyrzucał wszystkie poprzednie strony.
 
 Użycie create_notification() w innych modułach:
     from api.v1.notifications.service import create_notification
@@ -27,13 +57,32 @@ Użycie create_notification() w innych modułach:
         },
     )
 """
+import base64
+import binascii
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
+from sqlalchemy import delete, func, insert, tuple_, update
 from sqlalchemy.orm import Session
 
-from core.models import Notification
+from core.database import SessionLocal
+from core.exceptions import ValidationError
+from core.logging import get_logger
+from core.models import Notification, User, WorkspaceMember
+from core.outbox import wake_outbox_dispatcher
+from api.v1.workspaces.authorization import require_owner
+from .realtime import enqueue_broadcast_batch
 from .schemas import NotificationListResponse, NotificationResponse
+from .stream import enqueue_stream_event, enqueue_stream_events
+
+logger = get_logger(__name__)
+
+
+def _adjust_unread(db: Session, user_id: int, delta: int) -> None:
+    db.query(User).filter(User.id == user_id).update(
+        {User.unread_notifications: User.unread_notifications + delta},
+        synchronize_session=False,
+    )
 
 
 def create_notification(
@@ -41,8 +90,13 @@ def create_notification(
     user_id: int,
     type: str,
     payload: dict[str, Any],
+    commit: bool = True,
 ) -> NotificationResponse:
-    """Tworzy powiadomienie w bazie. Wywoływana wewnętrznie."""
+    """
+    Tworzy powiadomienie w bazie. Wywoływana wewnętrznie.
+    `commit=False` — tylko flush (jest już id), commit robi wołający razem
+    ze swoją zmianą i eventem outboxa (patrz InviteService.create_invite).
+    """
     notification = Notification(
         user_id=user_id,
         type=type,
@@ -51,35 +105,138 @@ def create_notification(
         created_at=datetime.utcnow(),
     )
     db.add(notification)
-    db.commit()
-    db.refresh(notification)
+    _adjust_unread(db, user_id, 1)
+    enqueue_stream_event(db, user_id, "notification")
+    if commit:
+        db.commit()
+        db.refresh(notification)
+        wake_outbox_dispatcher()
+    else:
+        db.flush()
     return NotificationResponse.model_validate(notification)
 
 
+def fan_out_notification(
+    db: Session,
+    user_ids: list[int],
+    type: str,
+    payload: dict[str, Any],
+    event: str = "new_notification",
+) -> int:
+    """
+    Tworzy to samo powiadomienie dla wielu userów w jednej transakcji
+    i oddaje warstwie realtime jedną paczkę broadcastów (event `event`,
+    payload + notification_id). Zwraca liczbę utworzonych powiadomień.
+    """
+    recipients = list(dict.fromkeys(user_ids))
+    if not recipients:
+        return 0
+
+    now = datetime.utcnow()
+    # executemany + RETURNING → SQLAlchemy składa z tego wielowierszowe
+    # INSERT … VALUES (…), (…) RETURNING (insertmanyvalues), nie N INSERT-ów
+    created = db.execute(
+        insert(Notification).returning(Notification.id, Notification.user_id, sort_by_parameter_order=True),
+        [
+            {"user_id": user_id, "type": type, "payload": payload, "is_read": False, "created_at": now}
+            for user_id in recipients
+        ],
+    ).all()
+    db.query(User).filter(User.id.in_(recipients)).update(
+        {User.unread_notifications: User.unread_notifications + 1},
+        synchronize_session=False,
+    )
+    enqueue_stream_events(db, recipients, "notification")
+    enqueue_broadcast_batch(db, [
+        (user_id, event, {**payload, "type": type, "notification_id": notification_id})
+        for notification_id, user_id in created
+    ])
+    db.commit()
+    wake_outbox_dispatcher()
+    logger.info(f"Fan-out '{type}': {len(created)} powiadomień")
+    return len(created)
+
+
+def notify_workspace_members(
+    db: Session,
+    workspace_id: int,
+    sender_id: int,
+    title: str,
+    message: str,
+    action_url: Optional[str] = None,
+) -> int:
+    """
+    Ogłoszenie właściciela workspace'a do wszystkich pozostałych członków
+    (powiadomienie typu 'system'). Zwraca liczbę powiadomionych.
+    """
+    workspace = require_owner(db, workspace_id, sender_id, "Tylko właściciel może wysyłać ogłoszenia")
+    member_ids = [
+        user_id for (user_id,) in db.query(WorkspaceMember.user_id).filter(
+            WorkspaceMember.workspace_id == workspace_id,
+            WorkspaceMember.user_id != sender_id,
+        )
+    ]
+    return fan_out_notification(db, member_ids, "system", {
+        "title": title,
+        "message": message,
+        "action_url": action_url,
+        "workspace_id": workspace.id,
+        "workspace_name": workspace.name,
+    })
+
+
+def encode_cursor(created_at: datetime, notification_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{notification_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, notification_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError("Nieprawidłowy kursor")
+
+
+def _older_than(cursor: str):
+    """Warunek "dalej na liście niż kursor" — porównanie par, zgodne z indeksem."""
+    return tuple_(Notification.created_at, Notification.id) < decode_cursor(cursor)
+
+
 def get_user_notifications(
     db: Session,
     user_id: int,
     limit: int = 50,
+    cursor: Optional[str] = None,
 ) -> NotificationListResponse:
-    """Pobiera powiadomienia usera — najnowsze pierwsze."""
-    notifications = (
-        db.query(Notification)
-        .filter(Notification.user_id == user_id)
-        .order_by(Notification.created_at.desc())
-        .limit(limit)
+    """Pobiera stronę powiadomień usera — najnowsze pierwsze."""
+    query = db.query(Notification).filter(Notification.user_id == user_id)
+    if cursor:
+        query = query.filter(_older_than(cursor))
+    # limit + 1 — jeden wiersz ponad stronę mówi, czy jest następna
+    rows = (
+        query.order_by(Notification.created_at.desc(), Notification.id.desc())
+        .limit(limit + 1)
         .all()
     )
-    unread_count = (
-        db.query(Notification)
-        .filter(Notification.user_id == user_id, Notification.is_read == False)
-        .count()
-    )
+    notifications = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = notifications[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
     return NotificationListResponse(
         notifications=[NotificationResponse.model_validate(n) for n in notifications],
-        unread_count=unread_count,
+        unread_count=get_unread_count(db, user_id),
+        next_cursor=next_cursor,
     )
 
 
+def get_unread_count(db: Session, user_id: int) -> int:
+    """Licznik nieprzeczytanych — odczyt jednej kolumny po kluczu głównym."""
+    return db.query(User.unread_notifications).filter(User.id == user_id).scalar() or 0
+
+
 def mark_as_read(
     db: Session,
     notification_id: int,
@@ -104,8 +261,11 @@ def mark_as_read(
     if not notification.is_read:
         notification.is_read = True
         notification.read_at = datetime.utcnow()
+        _adjust_unread(db, user_id, -1)
+        enqueue_stream_event(db, user_id, "unread_changed")
         db.commit()
         db.refresh(notification)
+        wake_outbox_dispatcher()
 
     return NotificationResponse.model_validate(notification)
 
@@ -132,7 +292,14 @@ def mark_all_as_read(
             synchronize_session=False,
         )
     )
+    if updated:
+        # O tyle, ile faktycznie oznaczyliśmy — nie "= 0", bo równoległe
+        # create_notification mogło już dodać kolejne nieprzeczytane
+        _adjust_unread(db, user_id, -updated)
+        enqueue_stream_event(db, user_id, "unread_changed")
     db.commit()
+    if updated:
+        wake_outbox_dispatcher()
     return updated
 
 
@@ -157,6 +324,102 @@ def delete_notification(
     if not notification:
         return False
 
+    was_unread = not notification.is_read
     db.delete(notification)
+    if was_unread:
+        _adjust_unread(db, user_id, -1)
+        enqueue_stream_event(db, user_id, "unread_changed")
+    db.commit()
+    if was_unread:
+        wake_outbox_dispatcher()
+    return True
+
+
+def _bulk_selector(user_id: int, ids: Optional[list[int]], before: Optional[str]):
+    condition = Notification.user_id == user_id
+    if ids is not None:
+        return condition & Notification.id.in_(ids)
+    return condition & _older_than(before)
+
+
+def mark_many_as_read(
+    db: Session,
+    user_id: int,
+    ids: Optional[list[int]] = None,
+    before: Optional[str] = None,
+) -> int:
+    """
+    Oznacza jako przeczytane podane powiadomienia (`ids`) albo wszystkie
+    starsze niż kursor (`before`) — jednym UPDATE. Zwraca liczbę zmienionych.
+    """
+    updated = db.execute(
+        update(Notification)
+        .where(_bulk_selector(user_id, ids, before), Notification.is_read == False)
+        .values(is_read=True, read_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if updated:
+        _adjust_unread(db, user_id, -updated)
+        enqueue_stream_event(db, user_id, "unread_changed")
     db.commit()
-    return True
\ No newline at end of file
+    if updated:
+        wake_outbox_dispatcher()
+    return updated
+
+
+def delete_many(
+    db: Session,
+    user_id: int,
+    ids: Optional[list[int]] = None,
+    before: Optional[str] = None,
+) -> int:
+    """
+    Usuwa podane powiadomienia (`ids`) albo wszystkie starsze niż kursor
+    (`before`) — jednym DELETE … RETURNING (z is_read, do licznika).
+    Zwraca liczbę usuniętych.
+    """
+    deleted_read_flags = db.execute(
+        delete(Notification)
+        .where(_bulk_selector(user_id, ids, before))
+        .returning(Notification.is_read)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    unread_deleted = sum(1 for is_read in deleted_read_flags if not is_read)
+    if unread_deleted:
+        _adjust_unread(db, user_id, -unread_deleted)
+        enqueue_stream_event(db, user_id, "unread_changed")
+    db.commit()
+    if unread_deleted:
+        wake_outbox_dispatcher()
+    return len(deleted_read_flags)
+
+
+def repair_unread_counters(db: Session) -> int:
+    """
+    Przelicza `users.unread_notifications` z tabeli notifications — jednym
+    UPDATE z podzapytaniem, tylko dla userów z rozjechanym licznikiem.
+    Zwraca liczbę poprawionych userów.
+    """
+    actual = (
+        db.query(func.count(Notification.id))
+        .filter(Notification.user_id == User.id, Notification.is_read == False)
+        .scalar_subquery()
+    )
+    repaired = (
+        db.query(User)
+        .filter(User.unread_notifications != actual)
+        .update({User.unread_notifications: actual}, synchronize_session=False)
+    )
+    db.commit()
+    return repaired
+
+
+async def run_unread_counter_repair() -> None:
+    """Job dla core/periodic.py — własna sesja, jak run_storage_reconciliation."""
+    db = SessionLocal()
+    try:
+        repaired = repair_unread_counters(db)
+    finally:
+        db.close()
+    if repaired:
+        logger.warning(f"Naprawiono liczniki nieprzeczytanych powiadomień: {repaired} userów")
@@ -0,0 +1,200 @@
+"""
+Strumień powiadomień (Server-Sent Events) — GET /api/v1/notifications/stream.
+
+DLACZEGO:
+  Dzwonek powiadomień albo pollował GET /notifications (dwa zapytania na
+  każde wywołanie), albo zależał od Supabase Realtime. SSE z naszego API
+  to zwykły długi GET: działa lokalnie bez Supabase, przechodzi przez
+  proxy jak każdy request, a przeglądarka (EventSource) sama wznawia
+  połączenie z nagłówkiem `Last-Event-ID`.
+
+JAK TO DZIAŁA:
+  create_notification / mark_* / delete_* dopisują w swojej transakcji
+  event outboxa "notification_stream" (core/outbox.py; fan-out do wielu
+  userów to jeden event z listą `user_ids`). Dispatcher
+  publikuje go na kanale Redis `notifications:stream:{user_id}`:
+
+    {"type": "notification"}     — przybyło nowe powiadomienie
+    {"type": "unread_changed"}   — zmienił się licznik nieprzeczytanych
+
+  Strumień usera trzyma subskrypcję tego kanału. Na "notification" czyta
+  z bazy powiadomienia o id > ostatnio wysłanego — ta sama ścieżka co
+  wznowienie po `Last-Event-ID`, więc nic nie ginie między zerwaniem
+  a ponownym połączeniem. Wiadomość pub/sub to tylko "szturchnięcie",
+  źródłem prawdy jest tabela `notifications`.
+
+EVENTY SSE:
+  event: notification   id: <notification.id>   data: NotificationResponse
+  event: unread_count                           data: {"unread_count": n}
+  komentarz ": keepalive" co KEEPALIVE_SECONDS (proxy nie zamkną połączenia)
+
+BAZA:
+  Strumień żyje minutami/godzinami — każde zapytanie idzie na własnej,
+  krótkiej sesji (SessionLocal), żeby nie trzymać połączenia do Neon.
+"""
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from core.logging import get_logger
+from core.models import Notification, User
+from core.outbox import add_outbox_event, register_outbox_handler
+from core.redis_client import get_redis_client
+
+from .schemas import NotificationResponse
+
+logger = get_logger(__name__)
+
+KEEPALIVE_SECONDS = 15
+RETRY_MILLISECONDS = 5000
+# Limit powiadomień wysyłanych przy wznowieniu — starsze i tak są w GET /notifications
+RESUME_LIMIT = 100
+
+
+def _channel(user_id: int) -> str:
+    return f"notifications:stream:{user_id}"
+
+
+# ── Publikacja (przez outbox) ──────────────────────────────────────────────
+
+def enqueue_stream_event(db: Session, user_id: int, type: str) -> None:
+    """Dopisuje "szturchnięcie" strumienia usera do bieżącej transakcji (commit robi wołający)."""
+    add_outbox_event(db, "notification_stream", {"user_id": user_id, "type": type})
+
+
+def enqueue_stream_events(db: Session, user_ids: List[int], type: str) -> None:
+    """Jak enqueue_stream_event, ale dla wielu userów naraz — jeden wiersz outboxa."""
+    add_outbox_event(db, "notification_stream", {"user_ids": list(user_ids), "type": type})
+
+
+async def deliver_stream_events(events: List[Dict[str, Any]], redis_client: redis.Redis | None = None) -> bool:
+    """Handler outboxa: jeden PUBLISH na (user, typ) — kilka zmian licznika naraz to jedno szturchnięcie."""
+    unique = {
+        (user_id, event["type"])
+        for event in events
+        for user_id in event.get("user_ids", [event.get("user_id")])
+    }
+    client = redis_client or get_redis_client()
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for user_id, type in sorted(unique):
+                pipe.publish(_channel(user_id), json.dumps({"type": type}))
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Strumień powiadomień: publikacja nieudana: {e}")
+        return False
+    return True
+
+
+register_outbox_handler("notification_stream", deliver_stream_events)
+
+
+# ── Strumień ───────────────────────────────────────────────────────────────
+
+def _sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class NotificationStream:
+    """Stan jednego połączenia SSE: ostatnio wysłane id + zapytania na krótkich sesjach."""
+
+    def __init__(self, user_id: int, last_event_id: Optional[int]):
+        self.user_id = user_id
+        self.last_id = last_event_id
+
+    def _query(self, db: Session):
+        return db.query(Notification).filter(Notification.user_id == self.user_id)
+
+    def start_frames(self) -> List[str]:
+        """Pierwsze ramki: zaległe powiadomienia (tylko przy wznowieniu) + licznik."""
+        with SessionLocal() as db:
+            if self.last_id is None:
+                # Nowe połączenie — listę i tak pobiera GET /notifications,
+                # strumień wysyła tylko to, co przyjdzie od teraz
+                newest = self._query(db).order_by(Notification.id.desc()).first()
+                self.last_id = newest.id if newest else 0
+                frames = []
+            else:
+                frames = self._new_notification_frames(db)
+            frames.append(self._unread_frame(db))
+        return frames
+
+    def frames_for(self, message_type: str) -> List[str]:
+        with SessionLocal() as db:
+            frames = self._new_notification_frames(db) if message_type == "notification" else []
+            frames.append(self._unread_frame(db))
+        return frames
+
+    def _new_notification_frames(self, db: Session) -> List[str]:
+        notifications = (
+            self._query(db)
+            .filter(Notification.id > self.last_id)
+            .order_by(Notification.id)
+            .limit(RESUME_LIMIT)
+            .all()
+        )
+        frames = []
+        for notification in notifications:
+            data = NotificationResponse.model_validate(notification).model_dump(mode="json")
+            frames.append(_sse("notification", data, event_id=notification.id))
+            self.last_id = notification.id
+        return frames
+
+    def _unread_frame(self, db: Session) -> str:
+        # Zdenormalizowany licznik (users.unread_notifications) — bez COUNT po tabeli
+        unread = db.query(User.unread_notifications).filter(User.id == self.user_id).scalar() or 0
+        return _sse("unread_count", {"unread_count": unread})
+
+
+async def notification_event_stream(
+    user_id: int,
+    last_event_id: Optional[int],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    redis_client: redis.Redis | None = None,
+    keepalive_seconds: float = KEEPALIVE_SECONDS,
+) -> AsyncIterator[str]:
+    """Generator ramek SSE dla StreamingResponse (router.py)."""
+    client = redis_client or get_redis_client()
+    stream = NotificationStream(user_id, last_event_id)
+    pubsub = client.pubsub()
+    # Najpierw subskrypcja, potem odczyt zaległości — powiadomienie dodane
+    # pomiędzy i tak przyjdzie jako szturchnięcie, a id > last_id je złapie
+    await pubsub.subscribe(_channel(user_id))
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        for frame in stream.start_frames():
+            yield frame
+
+        while not await is_disconnected():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive_seconds)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            try:
+                message_type = json.loads(message["data"]).get("type")
+            except (ValueError, AttributeError):
+                continue
+            for frame in stream.frames_for(message_type):
+                yield frame
+    finally:
+        try:
+            await pubsub.unsubscribe(_channel(user_id))
+            await pubsub.aclose()
+        except RedisError:
+            pass
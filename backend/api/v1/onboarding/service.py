@@ -1,20 +1,71 @@
 """
 OnboardingService - konfiguruje startowe zasoby dla 
 nowo zarejestrowanego użytkownika.
+
+Rejestracja nie tworzy ich sama: w tej samej transakcji co INSERT usera
+dopisuje event "onboarding" do outboxa (enqueue_onboarding), a startowy
+workspace i tablicę zakłada dispatcher w tle (provision_new_users).
+Request rejestracji kosztuje więc jeden INSERT, a dashboard do czasu
+przebiegu dispatchera dostaje `onboarding_pending` (GET /workspaces).
+
+Idempotentne: users.onboarded_at + blokada wiersza usera — powtórka
+eventu (retry outboxa, dwa workery) niczego nie duplikuje.
 """
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
 from sqlalchemy.orm import Session
 
-from core.models import Workspace
+from core.database import SessionLocal
+from core.logging import get_logger
+from core.models import User, Workspace
+from core.outbox import add_outbox_event, register_outbox_handler
 from api.v1.workspaces.service import create_starter_workspace
 from api.v1.boards.service import create_starter_board
 
+logger = get_logger(__name__)
+
+ONBOARDING_EVENT = "onboarding"
+
+
+def enqueue_onboarding(db: Session, user_id: int) -> None:
+    """Zleca onboarding w bieżącej transakcji — commit i wake_outbox_dispatcher() robi wołający."""
+    add_outbox_event(db, ONBOARDING_EVENT, {"user_id": user_id})
+
+
 class OnboardingService:
     def __init__(self, db: Session):
         self.db = db
 
-    def setup_new_user(self, user_id: int) -> Workspace:
-        """Tworzy startowy workspace i domyślną tablicę.
-        Nie commituje - wołający zarządza transakcją."""
+    def setup_new_user(self, user_id: int) -> Optional[Workspace]:
+        """Tworzy startowy workspace i domyślną tablicę, o ile user ich jeszcze
+        nie dostał (wtedy zwraca None). Nie commituje - wołający zarządza transakcją."""
+        user = self.db.query(User).filter(User.id == user_id).with_for_update().first()
+        if user is None or user.onboarded_at is not None:
+            return None
         workspace = create_starter_workspace(self.db, user_id)
         create_starter_board(self.db, workspace.id, user_id)
-        return workspace
\ No newline at end of file
+        user.onboarded_at = datetime.utcnow()
+        return workspace
+
+
+async def provision_new_users(events: List[Dict[str, Any]], db: Session | None = None) -> bool:
+    """Handler outboxa: onboarding każdego usera w osobnej transakcji."""
+    session = db or SessionLocal()
+    try:
+        for user_id in sorted({event["user_id"] for event in events}):
+            if OnboardingService(session).setup_new_user(user_id) is not None:
+                logger.info(f"Onboarding zakończony (user_id={user_id})")
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        # Cała paczka wróci — już obsłużeni userzy zostaną pominięci (onboarded_at)
+        logger.error(f"Onboarding nieudany: {e}")
+        return False
+    finally:
+        if db is None:
+            session.close()
+    return True
+
+
+register_outbox_handler(ONBOARDING_EVENT, provision_new_users)
@@ -3,6 +3,8 @@ API v1 router - wszystkie v1 endpointy w jednym miejscu
 """
 from fastapi import APIRouter
 from core.responses import ApiResponse
+from core.rate_limit_fallback import get_rate_limit_breaker
+from core.email.outbox import email_worker_snapshot
 
 from .auth.router import router as auth_router
 from .notifications.router import router as notifications_router
@@ -12,6 +14,9 @@ from .workspaces.invites.router import router as invites_router
 from .boards.router import router as boards_router
 from .whiteboard.router import router as whiteboard_router
 from .assets.router import router as assets_router
+from .notifications.realtime import get_broadcaster
+from .auth.password_pool import get_password_pool
+from .workspaces.acl_cache import acl_cache
 
 def get_v1_router():
     """Funkcja tworząca v1 router"""
@@ -26,8 +31,15 @@ def get_v1_router():
         responses={200: {"description": "API is healthy"}}
     )
     async def health_check():
-        """Sprawdza czy API działa"""
-        return ApiResponse(success=True, data={"status": "ok"})
+        """Sprawdza czy API działa (+ liczniki kolejki Broadcast, puli bcrypt, maili, cache ACL workspace'ów i stan rate limitu tego workera)"""
+        return ApiResponse(success=True, data={
+            "status": "ok",
+            "realtime_broadcast": get_broadcaster().snapshot(),
+            "password_hashing": get_password_pool().snapshot(),
+            "rate_limit": get_rate_limit_breaker().snapshot(),
+            "email": email_worker_snapshot(),
+            "workspace_acl": acl_cache.snapshot(),
+        })
 
     # === INCLUDE FEATURE ROUTERS ===
     router.include_router(auth_router, prefix="/auth")
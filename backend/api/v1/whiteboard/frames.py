@@ -0,0 +1,326 @@
+"""
+Ramki kursorów i podglądu przeciągania — agregacja per tablica w tickach.
+
+DLACZEGO:
+  Każdy ruch myszy każdego usera to osobna wiadomość `cursor-moved`
+  (a przy przeciąganiu jeszcze `elements-batch` z geometryOnly). Przy 30
+  uczniach na tablicy każdy z nich dostaje wiadomości od 29 pozostałych —
+  O(n²) wiadomości i tempo zależne od liczebności klasy.
+
+  Relay (relay.py) nie rozsyła już tych eventów od razu. Zamiast tego
+  FrameAggregator trzyma OSTATNI stan per user / per element, a co tick
+  (settings.relay_tick_hz, domyślnie 20 Hz) wysyła jedną ramkę na tablicę:
+
+    {"type": "board-frame",
+     "cursors": {"<user_id>": {"x": …, "y": …, "username": …}},
+     "drags":   {"<user_id>": [{"id": "<element_id>", "x": …, …}]},
+     "left":    [<user_id>, …],
+     "keyframe": true}              # tylko w ramkach pełnych
+
+  Klient dostaje najwyżej relay_tick_hz ramek na sekundę, niezależnie od
+  liczby osób na tablicy i liczby workerów.
+
+KILKA WORKERÓW:
+  Ramki NIE idą przez Redis — każdy worker buduje je sam i wysyła tylko
+  swoim połączeniom (gdyby każdy z W workerów publikował swoją ramkę do
+  wszystkich, klient dostawałby do W ramek na tick). Między workerami
+  płyną surowe wejścia: co tick worker publikuje na kanał tablicy jedną
+  wiadomość `frame-input` ze zmianami od SWOICH userów (ostatnie pozycje
+  kursorów, przeciągane elementy, kto wyszedł), a pozostałe workery
+  wlewają ją do swojego bufora (merge_remote) tak, jakby przyszła od ich
+  połączeń. Ruch w Redis to najwyżej jedna wiadomość na tablicę na tick
+  na worker, a nie jedna na ruch myszy.
+
+  Co KEYFRAME_EVERY_TICKS ticków `frame-input` zawiera pełny stan kursorów
+  lokalnych userów — worker, który dopiero co zasubskrybował tablicę,
+  pozna nieruchome kursory z innych workerów najpóźniej po tym czasie.
+
+KOMPRESJA DELTA:
+  Ramka zawiera tylko pola, które zmieniły się od poprzedniej ramki
+  (np. samo `x`, gdy kursor jedzie poziomo; `username` tylko przy pierwszym
+  pojawieniu się usera). Klient scala ramki ze swoim stanem.
+  Co KEYFRAME_EVERY_TICKS ticków (i zaraz po dołączeniu nowego połączenia)
+  idzie ramka pełna z wszystkimi znanymi workerowi kursorami — nowy klient
+  nie czeka na ruch każdego kursora.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from core.config import get_settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Pełna ramka mniej więcej co 2 s przy 20 Hz
+KEYFRAME_EVERY_TICKS = 40
+
+# Typ wiadomości z wejściami ramki między workerami (nigdy nie trafia do klienta)
+FRAME_INPUT = "frame-input"
+
+
+@dataclass
+class _BoardFrameState:
+    # Do ramki — wejścia lokalne i z innych workerów
+    pending_cursors: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    pending_drags: Dict[int, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+    left: Set[int] = field(default_factory=set)
+    sent_cursors: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    sent_elements: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    ticks_since_keyframe: int = 0
+    keyframe_requested: bool = False
+    # Do `frame-input` — tylko wejścia lokalnych połączeń
+    local_cursors: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    forward_cursors: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    forward_drags: Dict[int, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+    forward_left: Set[int] = field(default_factory=set)
+    ticks_since_full_forward: int = 0
+    # Ostatnie lokalne połączenie wyszło — stan żyje do wysłania `forward_left`
+    closing: bool = False
+
+
+def _merge_drags(drags: Dict[str, Dict[str, Any]], elements: List[Any]) -> None:
+    for element in elements:
+        element_id = element.get("id") if isinstance(element, dict) else None
+        if element_id is not None:
+            drags[str(element_id)] = {**drags.get(str(element_id), {}), **element}
+
+
+def _delta(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    if previous is None:
+        return dict(current)
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+class FrameAggregator:
+    """
+    Zbiera efemeryczne aktualizacje tablic i co tick oddaje je przez `emit`
+    jako jedną ramkę na tablicę (do połączeń tego workera), a zmiany od
+    lokalnych userów przez `forward` jako `frame-input` dla pozostałych
+    workerów. `emit` / `forward` to zwykle BoardRelayHub._emit_frame /
+    BoardRelayHub._forward_frame_input.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[int, Dict[str, Any]], Awaitable[None]],
+        tick_hz: float | None = None,
+        forward: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
+    ):
+        self.emit = emit
+        self.forward = forward
+        self.tick_seconds = 1.0 / (tick_hz or get_settings().relay_tick_hz)
+        self._boards: Dict[int, _BoardFrameState] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _state(self, board_id: int) -> _BoardFrameState:
+        state = self._boards.get(board_id)
+        if state is None or state.closing:
+            # Ponowne dołączenie przed wysłaniem `left` — zaczynamy od zera,
+            # ale wyjścia i tak muszą trafić do innych workerów
+            forward_left = state.forward_left if state is not None else set()
+            state = self._boards[board_id] = _BoardFrameState(forward_left=forward_left)
+        return state
+
+    # ── Wejście (z relay.py) ───────────────────────────────────────────────
+
+    def add_cursor(self, board_id: int, user_id: int, username: str, x: float, y: float) -> None:
+        state = self._state(board_id)
+        cursor = {"x": x, "y": y, "username": username}
+        self._set_cursor(state, user_id, cursor)
+        state.local_cursors[user_id] = cursor
+        state.forward_cursors[user_id] = cursor
+        state.forward_left.discard(user_id)
+
+    def add_drag(self, board_id: int, user_id: int, elements: List[Dict[str, Any]]) -> None:
+        """Podgląd przeciągania (geometryOnly) — per element wygrywa ostatnia pozycja."""
+        state = self._state(board_id)
+        _merge_drags(state.pending_drags.setdefault(user_id, {}), elements)
+        _merge_drags(state.forward_drags.setdefault(user_id, {}), elements)
+
+    def remove_user(self, board_id: int, user_id: int) -> None:
+        state = self._boards.get(board_id)
+        if state is None:
+            return
+        self._forget_user(state, user_id)
+        state.local_cursors.pop(user_id, None)
+        state.forward_cursors.pop(user_id, None)
+        state.forward_drags.pop(user_id, None)
+        state.forward_left.add(user_id)
+
+    def merge_remote(self, board_id: int, update: Dict[str, Any]) -> None:
+        """`frame-input` z innego workera — trafia do najbliższej ramki, nie jest przekazywany dalej."""
+        state = self._boards.get(board_id)
+        if state is None or state.closing:
+            return
+        for user_id, cursor in (update.get("cursors") or {}).items():
+            if isinstance(cursor, dict):
+                self._set_cursor(state, int(user_id), cursor)
+        for user_id, elements in (update.get("drags") or {}).items():
+            if isinstance(elements, list):
+                _merge_drags(state.pending_drags.setdefault(int(user_id), {}), elements)
+        for user_id in update.get("left") or []:
+            self._forget_user(state, int(user_id))
+
+    def request_keyframe(self, board_id: int) -> None:
+        """Następna ramka tablicy będzie pełna (np. po dołączeniu nowego połączenia)."""
+        self._state(board_id).keyframe_requested = True
+
+    def drop_board(self, board_id: int) -> None:
+        """
+        Ostatnie połączenie tablicy na tym workerze wyszło — nie ma komu
+        wysyłać ramek. Stan zostaje do najbliższego ticku tylko po to, żeby
+        inne workery dostały `left` wychodzących userów.
+        """
+        state = self._boards.get(board_id)
+        if state is None:
+            return
+        if not state.forward_left:
+            del self._boards[board_id]
+            return
+        self._boards[board_id] = _BoardFrameState(forward_left=state.forward_left, closing=True)
+
+    @staticmethod
+    def _set_cursor(state: _BoardFrameState, user_id: int, cursor: Dict[str, Any]) -> None:
+        state.pending_cursors[user_id] = cursor
+        state.left.discard(user_id)
+
+    @staticmethod
+    def _forget_user(state: _BoardFrameState, user_id: int) -> None:
+        state.pending_cursors.pop(user_id, None)
+        state.pending_drags.pop(user_id, None)
+        if state.sent_cursors.pop(user_id, None) is not None:
+            state.left.add(user_id)
+
+    # ── Wejścia dla innych workerów ────────────────────────────────────────
+
+    def take_forward_updates(self) -> Dict[int, Dict[str, Any]]:
+        """`frame-input` per tablica ze zmianami lokalnych userów od poprzedniego ticku (czyści bufor)."""
+        updates = {}
+        for board_id, state in list(self._boards.items()):
+            update = self._take_forward_update(state)
+            if update is not None:
+                updates[board_id] = update
+            if state.closing:
+                del self._boards[board_id]
+        return updates
+
+    def _take_forward_update(self, state: _BoardFrameState) -> Optional[Dict[str, Any]]:
+        state.ticks_since_full_forward += 1
+        cursors = state.forward_cursors
+        if state.ticks_since_full_forward >= KEYFRAME_EVERY_TICKS:
+            state.ticks_since_full_forward = 0
+            cursors = {**state.local_cursors, **cursors}
+
+        update: Dict[str, Any] = {"type": FRAME_INPUT}
+        if cursors:
+            update["cursors"] = {str(user_id): cursor for user_id, cursor in cursors.items()}
+        drags = {str(user_id): list(elements.values()) for user_id, elements in state.forward_drags.items() if elements}
+        if drags:
+            update["drags"] = drags
+        if state.forward_left:
+            update["left"] = sorted(state.forward_left)
+
+        state.forward_cursors = {}
+        state.forward_drags = {}
+        state.forward_left = set()
+        return update if len(update) > 1 else None
+
+    # ── Ramki ──────────────────────────────────────────────────────────────
+
+    def build_frames(self) -> Dict[int, Dict[str, Any]]:
+        """Ramki dla wszystkich tablic ze zmianami od poprzedniego ticku (czyści bufor)."""
+        frames = {}
+        for board_id, state in self._boards.items():
+            if state.closing:
+                continue
+            frame = self._build_frame(state)
+            if frame is not None:
+                frames[board_id] = frame
+        return frames
+
+    def _build_frame(self, state: _BoardFrameState) -> Optional[Dict[str, Any]]:
+        state.ticks_since_keyframe += 1
+        keyframe = state.keyframe_requested or (
+            state.ticks_since_keyframe >= KEYFRAME_EVERY_TICKS and bool(state.sent_cursors)
+        )
+
+        cursors: Dict[str, Dict[str, Any]] = {}
+        for user_id, cursor in state.pending_cursors.items():
+            previous = None if keyframe else state.sent_cursors.get(user_id)
+            delta = _delta(previous, cursor)
+            if delta:
+                cursors[str(user_id)] = delta
+            state.sent_cursors[user_id] = cursor
+        if keyframe:
+            for user_id, cursor in state.sent_cursors.items():
+                cursors.setdefault(str(user_id), dict(cursor))
+
+        drags: Dict[str, List[Dict[str, Any]]] = {}
+        for user_id, elements in state.pending_drags.items():
+            deltas = []
+            for element_id, element in elements.items():
+                sent = state.sent_elements.get(element_id)
+                delta = _delta(sent, element)
+                if delta:
+                    deltas.append({**delta, "id": element_id})
+                state.sent_elements[element_id] = {**(sent or {}), **element}
+            if deltas:
+                drags[str(user_id)] = deltas
+
+        left = sorted(state.left)
+        state.pending_cursors.clear()
+        state.pending_drags.clear()
+        state.left.clear()
+        if keyframe:
+            state.keyframe_requested = False
+            state.ticks_since_keyframe = 0
+            # Pozycje elementów po przeciąganiu i tak utrwala element-updated —
+            # nie trzymamy ich w nieskończoność tylko dla delty
+            state.sent_elements.clear()
+
+        if not (cursors or drags or left):
+            return None
+        frame: Dict[str, Any] = {"type": "board-frame"}
+        if cursors:
+            frame["cursors"] = cursors
+        if drags:
+            frame["drags"] = drags
+        if left:
+            frame["left"] = left
+        if keyframe:
+            frame["keyframe"] = True
+        return frame
+
+    async def tick(self) -> None:
+        frames = self.build_frames()
+        updates = self.take_forward_updates()
+        for board_id, frame in frames.items():
+            try:
+                await self.emit(board_id, frame)
+            except Exception as e:
+                logger.warning(f"Ramka tablicy {board_id} nie wysłana: {e}")
+        if self.forward is None:
+            return
+        for board_id, update in updates.items():
+            try:
+                await self.forward(board_id, update)
+            except Exception as e:
+                logger.warning(f"Wejścia ramki tablicy {board_id} nie przekazane innym workerom: {e}")
+
+    # ── Pętla ticków ───────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="relay:frames")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            await self.tick()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,121 @@
+"""
+Przetwarzanie obrazów tablicy przed zapisem do Storage.
+
+DLACZEGO:
+  Frontend wysyła JPEG/PNG takie, jakie user wkleił (zdjęcie z telefonu,
+  strona PDF w 1600px). Wcześniej lądowały w Storage 1:1 — na szkolnym
+  Wi-Fi przy 30 osobach każdy zbędny megabajt to realny problem.
+
+  Teraz każdy upload jest konwertowany do WebP (ta sama rozdzielczość,
+  zwykle kilka razy mniej bajtów niż JPEG/PNG z telefonu).
+
+  Przeskalowanych wariantów (miniatur wg zoomu) celowo NIE generujemy:
+  renderer elementu-obrazu (loadImage w hooks/use-elements.ts) ładuje
+  zawsze `src`, więc warianty kosztowałyby CPU i miejsce w Storage bez
+  żadnego zysku. Wrócą razem z obsługą po stronie frontendu.
+  Kolumna stored_images.variants zostaje — starsze wiersze mają w niej
+  warianty, które release_stored_image kasuje razem z pełnym obrazem.
+
+DLACZEGO PROCESS POOL:
+  Dekodowanie + skalowanie + enkodowanie WebP 15 MB zdjęcia to setki ms
+  czystego CPU. Na event loopie zablokowałoby to wszystkie inne requesty
+  workera (zapisy elementów, heartbeaty). ThreadPool nie pomoże, bo część
+  pracy Pillow trzyma GIL — stąd osobne procesy (get_image_pool).
+"""
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from core.config import get_settings
+from core.exceptions import AppException
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+WEBP_QUALITY = 82
+
+# Ochrona przed "bombą dekompresyjną" (mały plik PNG, który po zdekodowaniu
+# zajmuje gigabajty RAM). 50 MPix to z zapasem zdjęcie z telefonu/skanu.
+MAX_IMAGE_PIXELS = 50_000_000
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP"}
+
+_image_pool: ProcessPoolExecutor | None = None
+
+
+@dataclass
+class ProcessedImage:
+    """Wynik transkodowania — pełny obraz w WebP i jego wymiary."""
+    width: int
+    height: int
+    full: bytes
+
+
+def _encode_webp(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def transcode_image(file_bytes: bytes) -> ProcessedImage:
+    """
+    Konwertuje obraz do WebP (z obrotem z EXIF), bez zmiany rozdzielczości.
+
+    Czysta funkcja CPU, bez I/O — uruchamiana w procesie z get_image_pool(),
+    więc wszystko co przyjmuje i zwraca musi się dać spicklować.
+    Rzuca ValueError dla plików, które nie są obsługiwanym obrazem.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(file_bytes)) as source:
+            if source.format not in ALLOWED_FORMATS:
+                raise ValueError(f"Nieobsługiwany format obrazu: {source.format}")
+            # Zdjęcia z telefonu mają obrót zapisany w EXIF — bez tego
+            # pionowe zdjęcie ląduje na tablicy obrócone o 90°.
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(str(e)) from e
+
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    width, height = image.size
+    return ProcessedImage(width=width, height=height, full=_encode_webp(image))
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """Pula procesów do transkodowania (singleton, tworzona leniwie przy pierwszym uploadzie)."""
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=get_settings().image_processing_workers)
+    return _image_pool
+
+
+def shutdown_image_pool() -> None:
+    """Zamyka pulę procesów — wołane przy shutdownie aplikacji (main.py)."""
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+
+async def process_image(file_bytes: bytes) -> ProcessedImage:
+    """
+    Transkoduje obraz w puli procesów, nie blokując event loopa.
+    Rzuca AppException (400), jeśli plik nie jest poprawnym obrazem.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_image_pool(), transcode_image, file_bytes)
+    except ValueError as e:
+        logger.warning(f"Nieudane przetwarzanie obrazu: {e}")
+        raise AppException(
+            "Plik nie jest poprawnym obrazem",
+            code="INVALID_IMAGE",
+            status_code=400,
+        )
@@ -0,0 +1,269 @@
+"""
+Lokalny backend Storage — obrazy tablic na dysku serwera zamiast w Supabase.
+
+DLACZEGO:
+  Self-hosting w sieci szkolnej (serwer w pracowni, bez dostępu do
+  Supabase) oraz benchmarki ścieżki obrazów offline, bez sieci i limitów
+  planu Free. Włączany ustawieniem `storage_backend="local"`; pliki leżą
+  w `local_storage_dir` pod tymi samymi ścieżkami co w buckecie
+  (`sha256/ab/…/full.webp`, `incoming/…`, `{board_id}/…`).
+
+SERWOWANIE (serve_local_file → GET /api/v1/whiteboard/files/{path}):
+  - FileResponse streamuje plik z dysku kawałkami (bez wczytywania całego
+    obrazu do RAM). Na produkcji warto postawić przed API nginx, który
+    zrobi z tego prawdziwy sendfile — nagłówki są już gotowe.
+  - ETag + If-None-Match → 304. Pliki adresowane treścią dostają dodatkowo
+    IMMUTABLE_CACHE_CONTROL, więc przeglądarka zwykle w ogóle nie pyta.
+  - Range (jeden zakres) → 206. Starlette 0.27 nie obsługuje Range w
+    FileResponse, więc zakres streamujemy sami (_range_stream).
+
+UPLOAD BEZPOŚREDNI:
+  Odpowiednik podpisanego URL-a Supabase — `PUT` pod URL pliku z
+  krótkotrwałym tokenem JWT (`?token=…`) związanym z jedną ścieżką.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import anyio
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from jose import JWTError, jwt
+
+from core.config import get_settings
+from core.exceptions import AppException, NotFoundError
+from core.logging import get_logger
+
+from .storage import (
+    ALLOWED_CONTENT_TYPES, CONTENT_ADDRESSED_PREFIX, IMMUTABLE_CACHE_CONTROL, LIST_PAGE_SIZE,
+    StorageBackend, StorageObject, ensure_object_size,
+)
+
+logger = get_logger(__name__)
+
+# Ważność tokenu w URL-u uploadu (jak podpisany URL Supabase)
+SIGNED_UPLOAD_URL_TTL_SECONDS = 600
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_MEDIA_TYPES = {ext: content_type for content_type, ext in ALLOWED_CONTENT_TYPES.items()}
+
+
+class LocalStorageBackend(StorageBackend):
+    """Obiekty jako zwykłe pliki w katalogu `root`, publiczne URL-e z `public_prefix`."""
+
+    def __init__(self, root: str | os.PathLike, public_prefix: str):
+        self.root = Path(root).resolve()
+        self._public_prefix = public_prefix
+
+    def public_url_prefix(self) -> str:
+        return self._public_prefix
+
+    def resolve(self, path: str) -> Path:
+        """
+        Ścieżka obiektu → plik na dysku. Rzuca AppException (400) dla ścieżek
+        wychodzących poza `root` (`../`, ścieżki absolutne) — path przychodzi
+        m.in. prosto z URL-a w serve_local_file.
+        """
+        full = (self.root / path).resolve()
+        if full == self.root or self.root not in full.parents:
+            raise AppException("Nieprawidłowa ścieżka pliku", code="INVALID_PATH", status_code=400)
+        return full
+
+    async def upload(self, path: str, file_bytes: bytes, content_type: str) -> None:
+        full = self.resolve(path)
+        try:
+            await asyncio.to_thread(_write_atomic, full, file_bytes)
+        except OSError as e:
+            logger.error(f"Zapis do lokalnego Storage nieudany ({path}): {e}")
+            raise AppException(
+                "Nie udało się zapisać obrazu (Storage error)",
+                code="STORAGE_UPLOAD_FAILED",
+                status_code=502,
+            )
+
+    async def create_signed_upload_url(self, path: str) -> str:
+        self.resolve(path)
+        return f"{self.public_url(path)}?token={sign_local_upload(path)}"
+
+    async def download(self, path: str, max_bytes: int | None = None) -> bytes | None:
+        full = self.resolve(path)
+        try:
+            ensure_object_size((await asyncio.to_thread(os.stat, full)).st_size, max_bytes)
+            return await asyncio.to_thread(full.read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def delete(self, paths: list[str]) -> None:
+        for path in paths:
+            try:
+                await asyncio.to_thread(self.resolve(path).unlink, missing_ok=True)
+            except Exception as e:
+                logger.warning(f"Kasowanie z lokalnego Storage nieudane ({path}): {e}")
+
+    async def list_objects(self, prefix: str, limit: int = LIST_PAGE_SIZE, offset: int = 0) -> list[StorageObject]:
+        directory = self.resolve(prefix) if prefix.strip("/") else self.root
+        return await asyncio.to_thread(self._list_page, directory, limit, offset)
+
+    def _list_page(self, directory: Path, limit: int, offset: int) -> list[StorageObject]:
+        if not directory.is_dir():
+            return []
+        # Pliki tymczasowe z _write_atomic (".nazwa.uuid.tmp") pomijamy
+        entries = sorted(e for e in directory.iterdir() if not e.name.startswith("."))
+        objects = []
+        for entry in entries[offset:offset + limit]:
+            path = entry.relative_to(self.root).as_posix()
+            if entry.is_dir():
+                objects.append(StorageObject(path=f"{path}/", is_folder=True))
+            else:
+                objects.append(StorageObject(
+                    path=path, updated_at=datetime.utcfromtimestamp(entry.stat().st_mtime),
+                ))
+        return objects
+
+
+def _write_atomic(full: Path, file_bytes: bytes) -> None:
+    """Zapis przez plik tymczasowy + os.replace — czytelnik nigdy nie zobaczy połowy pliku."""
+    full.parent.mkdir(parents=True, exist_ok=True)
+    tmp = full.with_name(f".{full.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_bytes(file_bytes)
+        os.replace(tmp, full)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def sign_local_upload(path: str) -> str:
+    """Token do `?token=` w URL-u uploadu — pozwala wgrać JEDEN plik pod `path`."""
+    settings = get_settings()
+    return jwt.encode(
+        {
+            "type": "local_upload",
+            "path": path,
+            "exp": datetime.utcnow() + timedelta(seconds=SIGNED_UPLOAD_URL_TTL_SECONDS),
+        },
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+
+
+def verify_local_upload(token: str, path: str) -> None:
+    """Rzuca AppException (403), jeśli token nie pasuje do ścieżki albo wygasł."""
+    settings = get_settings()
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        claims = {}
+    if claims.get("type") != "local_upload" or claims.get("path") != path:
+        raise AppException("Nieprawidłowy lub wygasły URL uploadu", code="INVALID_UPLOAD_URL", status_code=403)
+
+
+def get_local_backend() -> LocalStorageBackend:
+    """Aktywny backend, o ile jest lokalny — przy Supabase pliki serwuje Supabase, nie my (404)."""
+    from .storage import get_storage_backend
+
+    backend = get_storage_backend()
+    if not isinstance(backend, LocalStorageBackend):
+        raise NotFoundError("Plik nie znaleziony")
+    return backend
+
+
+def _etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Nagłówek `Range: bytes=…` → (start, end) włącznie. None, jeśli nagłówek
+    nie jest pojedynczym zakresem bajtów (wtedy oddajemy cały plik — RFC
+    na to pozwala). Rzuca ValueError dla zakresu spoza pliku (→ 416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not start_s:
+            # bytes=-500 → ostatnie 500 bajtów
+            length = int(end_s)
+            if length <= 0:
+                raise ValueError("pusty zakres")
+            return max(0, size - length), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        raise ValueError(f"Nieprawidłowy zakres: {header}")
+    if start >= size or end < start:
+        raise ValueError(f"Zakres poza plikiem: {header}")
+    return start, min(end, size - 1)
+
+
+async def _range_stream(full: Path, start: int, end: int):
+    async with await anyio.open_file(full, mode="rb") as file:
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def serve_local_file(request: Request, path: str) -> Response:
+    """Odpowiedź na GET/HEAD pliku z lokalnego Storage — ETag/304, Range/206, inaczej FileResponse."""
+    backend = get_local_backend()
+    full = backend.resolve(path)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, full)
+    except FileNotFoundError:
+        raise NotFoundError("Plik nie znaleziony")
+    if not full.is_file():
+        raise NotFoundError("Plik nie znaleziony")
+
+    etag = _etag(stat_result)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": (
+            IMMUTABLE_CACHE_CONTROL if path.startswith(f"{CONTENT_ADDRESSED_PREFIX}/") else "no-cache"
+        ),
+    }
+    media_type = _MEDIA_TYPES.get(full.suffix.lstrip(".").lower(), "application/octet-stream")
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        size = stat_result.st_size
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            })
+            if request.method == "HEAD":
+                return Response(status_code=206, headers=headers, media_type=media_type)
+            return StreamingResponse(
+                _range_stream(full, start, end), status_code=206, headers=headers, media_type=media_type
+            )
+
+    return FileResponse(
+        full, headers=headers, media_type=media_type, stat_result=stat_result, method=request.method
+    )
@@ -0,0 +1,124 @@
+"""
+Obecność na tablicy ("kto jest teraz online") w Redis.
+
+DLACZEGO NIE POSTGRES:
+  Wcześniej każdy heartbeat (POST /whiteboard/{id}/online, co ~30 s od
+  każdej otwartej karty) robił lookup tablicy, sprawdzenie dostępu,
+  SELECT + UPDATE board_users i commit — przy 30 uczniach to ciągły
+  strumień zapisów na primary Neon, tylko po to, żeby przesunąć znacznik
+  czasu. Teraz obecność to jeden sorted set na tablicę:
+
+    presence:board:{board_id}   member = user_id, score = czas heartbeatu (unix)
+
+  Online = score nowszy niż PRESENCE_TTL_SECONDS. Stare wpisy są wycinane
+  przy każdym heartbeacie (ZREMRANGEBYSCORE), a cały klucz wygasa sam
+  (EXPIRE), gdy tablicę zamknie ostatnia osoba.
+
+  Postgres trzyma już tylko `board_users.last_opened` (historia — "ostatnio
+  otwarte"), aktualizowane przy PIERWSZYM heartbeacie sesji, nie przy każdym.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from core.logging import get_logger
+from core.models import User
+from core.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+# Ten sam próg co wcześniej `last_opened >= now - 2 min`
+PRESENCE_TTL_SECONDS = 120
+
+
+def _presence_key(board_id: int) -> str:
+    return f"presence:board:{board_id}"
+
+
+class PresenceService:
+
+    def __init__(self, redis_client: redis.Redis | None = None):
+        self.redis = redis_client or get_redis_client()
+
+    async def heartbeat(self, board_id: int, user_id: int) -> bool:
+        """
+        Odświeża obecność usera, o ile już jest online. Zwraca False, jeśli
+        go nie było (nowa sesja) — wtedy wołający sprawdza dostęp i robi join().
+        Jeden round-trip do Redis, zero zapytań do bazy.
+        """
+        now = time.time()
+        key = _presence_key(board_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, "-inf", now - PRESENCE_TTL_SECONDS)
+            pipe.zadd(key, {str(user_id): now}, xx=True, ch=True)
+            pipe.expire(key, PRESENCE_TTL_SECONDS)
+            _, refreshed, _ = await pipe.execute()
+        return bool(refreshed)
+
+    async def join(self, board_id: int, user_id: int) -> None:
+        """Dodaje usera do obecności tablicy (po sprawdzeniu dostępu przez wołającego)."""
+        key = _presence_key(board_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {str(user_id): time.time()})
+            pipe.expire(key, PRESENCE_TTL_SECONDS)
+            await pipe.execute()
+
+    async def leave(self, board_id: int, user_id: int) -> bool:
+        """Usuwa usera z obecności. False, jeśli i tak nie był online."""
+        return bool(await self.redis.zrem(_presence_key(board_id), str(user_id)))
+
+    async def online_user_ids(self, board_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """
+        {board_id: [user_id, …]} dla wielu tablic naraz — jeden pipeline,
+        jeden round-trip niezależnie od liczby tablic (lista tablic w workspace).
+
+        Best-effort: przy niedostępnym Redis zwraca puste listy (lista
+        "kto jest online" to dodatek — nie powinna wywracać GET tablicy).
+        """
+        unique_ids = sorted(set(board_ids))
+        result: Dict[int, List[int]] = {board_id: [] for board_id in unique_ids}
+        if not unique_ids:
+            return result
+
+        threshold = time.time() - PRESENCE_TTL_SECONDS
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for board_id in unique_ids:
+                    pipe.zrangebyscore(_presence_key(board_id), threshold, "+inf")
+                members = await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Odczyt obecności z Redis nieudany: {e}")
+            return result
+
+        for board_id, user_ids in zip(unique_ids, members):
+            result[board_id] = [int(uid) for uid in user_ids]
+        return result
+
+
+async def load_online_users(
+    db: Session,
+    presence: PresenceService,
+    board_ids: Iterable[int],
+) -> Dict[int, List[Tuple[int, str, Optional[str]]]]:
+    """
+    {board_id: [(user_id, username, avatar_url), …]} — jeden pipeline do
+    Redis + jedno zapytanie o userów dla wszystkich tablic naraz. Wołający
+    (WhiteboardService, BoardService) mapują to na swoje OnlineUserInfo.
+    """
+    ids_by_board = await presence.online_user_ids(board_ids)
+    all_user_ids = {uid for ids in ids_by_board.values() for uid in ids}
+    if not all_user_ids:
+        return {board_id: [] for board_id in ids_by_board}
+
+    users = {
+        uid: (uid, username, avatar_url)
+        for uid, username, avatar_url in db.query(User.id, User.username, User.avatar_url)
+        .filter(User.id.in_(all_user_ids))
+    }
+    return {
+        board_id: [users[uid] for uid in ids if uid in users]
+        for board_id, ids in ids_by_board.items()
+    }
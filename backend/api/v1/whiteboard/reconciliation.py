@@ -0,0 +1,158 @@
+"""
+Reconciliation Storage ↔ baza — kasowanie obiektów, do których nic już nie wskazuje.
+
+DLACZEGO:
+  Sprzątanie przy usuwaniu elementów/tablic/workspace'ów jest best-effort
+  (patrz storage.py) — timeout Storage, restart workera w trakcie
+  _cleanup_image_after_delay albo porzucony upload bezpośredni zostawiają
+  pliki-sieroty. Ten job raz na jakiś czas porównuje listing Storage
+  z tym, do czego naprawdę odwołują się elementy w board_elements,
+  i kasuje resztę dużymi paczkami.
+
+CO JEST SIEROTĄ (i starsze niż `grace`):
+  - `sha256/…/{hash}/…` — hash bez wiersza w stored_images; wiersz jest
+    usuwany, gdy żaden element nie używa jego URL-a, a ostatni upload/dedup
+    (`claimed_at`) jest starszy niż `grace` — tak znikają też obrazy wgrane
+    i nigdy niewstawione na tablicę. Oba warunki są sprawdzane ponownie pod
+    FOR UPDATE: równoległy dedup w _claim_stored_image mógł właśnie odświeżyć
+    claimed_at i oddać URL klientowi, a element mógł zostać zapisany po
+    zebraniu `referenced`
+  - `incoming/…` — surowy upload bezpośredni, którego nikt nie dokończył
+  - `{board_id}/…` (stare pliki sprzed deduplikacji) — ścieżka, której nie
+    ma w `data.src` żadnego elementu-obrazu
+
+`grace` chroni świeże uploady: obiekt ląduje w Storage ZANIM element
+z jego URL-em zostanie zapisany w bazie.
+
+Uruchamiane cyklicznie z main.py (core/periodic.py) albo ręcznie:
+    python manage.py reconcile-storage --dry-run
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Set
+
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.database import SessionLocal
+from core.logging import get_logger
+from core.models import BoardElement, StoredImage
+
+from .service import count_image_refs
+from .storage import (
+    CONTENT_ADDRESSED_PREFIX, INCOMING_PREFIX, StorageObject,
+    delete_board_objects, iter_storage_objects, path_from_public_url, public_url_for,
+)
+
+logger = get_logger(__name__)
+
+ELEMENT_SCAN_BATCH_SIZE = 1000
+
+
+@dataclass
+class ReconcileReport:
+    scanned_objects: int = 0
+    orphaned_objects: int = 0
+    released_images: int = 0  # wiersze stored_images bez elementów, niewydawane od `grace`
+    dry_run: bool = False
+
+
+def _referenced_paths(db: Session) -> Set[str]:
+    """Ścieżki w Storage, do których odwołuje się jakikolwiek element-obraz (data.src)."""
+    paths: Set[str] = set()
+    query = db.query(BoardElement.data).filter(BoardElement.type == "image")
+    for (data,) in query.yield_per(ELEMENT_SCAN_BATCH_SIZE):
+        src = (data or {}).get("src")
+        if isinstance(src, str):
+            path = path_from_public_url(src)
+            if path:
+                paths.add(path)
+    return paths
+
+
+def _release_if_orphan(db: Session, stored_id: int, cutoff: datetime, dry_run: bool) -> bool:
+    """
+    Pod blokadą wiersza: usuwa go, jeśli nadal nikt go nie używa ani
+    świeżo nie wydał. False = ktoś go w międzyczasie przejął.
+    """
+    stored = (
+        db.query(StoredImage)
+        .filter(StoredImage.id == stored_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if stored is None or stored.claimed_at > cutoff:
+        return False
+    if count_image_refs(db, public_url_for(stored.path)):
+        return False
+    if not dry_run:
+        db.delete(stored)
+    return True
+
+
+def _is_orphan(obj: StorageObject, referenced: Set[str], live_digests: Set[str], cutoff: datetime) -> bool:
+    if obj.updated_at is None or obj.updated_at > cutoff:
+        return False
+    parts = obj.path.split("/")
+    if parts[0] == CONTENT_ADDRESSED_PREFIX:
+        return len(parts) < 3 or parts[2] not in live_digests
+    if parts[0] == INCOMING_PREFIX:
+        return True
+    return obj.path not in referenced
+
+
+async def reconcile_storage(db: Session, grace: timedelta, dry_run: bool = False) -> ReconcileReport:
+    """
+    Porównuje Storage z board_elements/stored_images i kasuje sieroty
+    (delete_board_objects, paczki po DELETE_CHUNK_SIZE). `dry_run=True`
+    tylko liczy — nic nie kasuje ani w Storage, ani w bazie.
+    """
+    report = ReconcileReport(dry_run=dry_run)
+    cutoff = datetime.utcnow() - grace
+    referenced = _referenced_paths(db)
+
+    live_digests: Set[str] = set()
+    candidates = []
+    for stored in db.query(StoredImage).all():
+        if stored.path in referenced or stored.claimed_at > cutoff:
+            live_digests.add(stored.content_hash)
+        else:
+            candidates.append((stored.id, stored.content_hash))
+
+    for stored_id, digest in candidates:
+        # Obiekty usuniętego wiersza skasuje pętla niżej (hash nie jest już "żywy")
+        if _release_if_orphan(db, stored_id, cutoff, dry_run):
+            report.released_images += 1
+        else:
+            live_digests.add(digest)
+        if not dry_run:
+            db.commit()  # blokada tylko na czas jednego wiersza
+
+    # Najpierw cały listing, potem kasowanie — paginacja Storage jest po
+    # offsecie, kasowanie w trakcie przesuwałoby kolejne strony.
+    orphans = []
+    async for obj in iter_storage_objects("", recursive=True):
+        report.scanned_objects += 1
+        if _is_orphan(obj, referenced, live_digests, cutoff):
+            orphans.append(obj.path)
+    report.orphaned_objects = len(orphans)
+
+    if orphans and not dry_run:
+        await delete_board_objects(orphans)
+
+    logger.info(
+        f"Reconcile Storage{' (dry run)' if dry_run else ''}: przejrzano {report.scanned_objects} obiektów, "
+        f"sieroty: {report.orphaned_objects}, zwolnione obrazy: {report.released_images}"
+    )
+    return report
+
+
+async def run_storage_reconciliation() -> None:
+    """Wersja dla core/periodic.py — własna sesja bazy, grace z ustawień."""
+    settings = get_settings()
+    db = SessionLocal()
+    try:
+        await reconcile_storage(db, timedelta(hours=settings.storage_reconcile_grace_hours))
+    finally:
+        db.close()
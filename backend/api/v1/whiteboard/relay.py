@@ -0,0 +1,517 @@
+"""
+Relay WebSocket dla współpracy na tablicy — zamiast Supabase Realtime Broadcast.
+
+DLACZEGO (patrz docs/known-issues.md #2 i #3):
+  Broadcast Supabase ma limit 256 KB na wiadomość (plan Free), dodatkowy hop
+  sieciowy i `ack: false` — wiadomości ginęły po drodze bez śladu, nawet
+  małe. Tu klient rozmawia bezpośrednio z naszym API:
+
+    przeglądarka ──WS──▶ worker API ──PUBLISH──▶ Redis ──▶ workery ──WS──▶ inni
+
+  - każda zmiana elementu jest NAJPIERW zapisywana w bazie
+    (WhiteboardService, w wątku — pętla zdarzeń nie czeka na Neon),
+    a dopiero potem rozsyłana — nowo dołączający klient, który pobierze
+    stan przez REST, nie dostanie "starych" danych;
+  - nadawca dostaje `{"type": "ack", "seq": …}` po zapisie i publikacji
+    (albo `{"type": "error", …}`), więc wie, czy zmiana doszła;
+  - rozsyłanie między workerami/hostami idzie przez Redis pub/sub
+    (kanał `board:{board_id}:events`), w obrębie workera — z pamięci.
+
+PROTOKÓŁ (JSON, te same `type` co BoardEvent na froncie):
+  1. klient łączy się z /api/v1/whiteboard/{board_id}/ws i w ciągu
+     AUTH_TIMEOUT_SECONDS wysyła `{"type": "auth", "token": "<access JWT>"}`
+     (token nie w URL-u — URL-e lądują w logach proxy);
+  2. serwer odpowiada `{"type": "ready", "user_id": …}`;
+  3. dalej klient wysyła eventy (`element-created`, `element-updated`,
+     `element-deleted`, `elements-batch`, `cursor-moved`, `typing-*`,
+     `viewport-changed`, `ping`) z opcjonalnym `seq`, a dostaje eventy
+     innych userów z serwerowo ustawionym `userId`/`username`;
+  4. wyjątek: `cursor-moved` i `elements-batch` z geometryOnly (podgląd
+     przeciągania) nie są rozsyłane pojedynczo — przychodzą zbiorczo jako
+     `board-frame` w stałym tempie (frames.py). Ramkę buduje worker, do
+     którego klient jest podpięty; przez Redis idą tylko wejścia ramek
+     (`frame-input`), nigdy gotowe ramki. Podgląd przeciągania NIE
+     jest też zapisywany — przy kilkunastu paczkach na sekundę byłby to
+     UPDATE board_elements na każdą; końcową geometrię zapisuje
+     `element-updated` wysyłany po puszczeniu elementu (oraz autosave
+     REST z markUnsaved).
+
+ODEBRANIE DOSTĘPU:
+  Dostęp do tablicy jest sprawdzany przy każdym połączeniu, ale WebSocket
+  żyje godzinami — usunięty z workspace'a członek dalej dostawałby eventy.
+  Hub subskrybuje więc (obok kanałów tablic) kanał unieważnień ACL
+  `workspace:acl` (workspaces/acl_cache.py): po wiadomości o zmianie
+  członkostwa sprawdza w bazie dostęp połączeń z tego workspace'a (tylko
+  danego usera albo wszystkich, gdy user_id = None) i zamyka te, które go
+  straciły — kodem 4403 (albo 4404, gdy tablicy już nie ma).
+
+BACK-PRESSURE:
+  Każde połączenie ma ograniczoną kolejkę wyjściową (SEND_QUEUE_SIZE).
+  Gdy wolny klient się nie wyrabia: efemeryczne eventy (kursory, viewport)
+  są gubione, a przy zmianie elementu połączenie jest zamykane kodem 1013 —
+  klient łączy się ponownie i dociąga stan przez REST zamiast dostawać
+  dziurawy strumień.
+"""
+import asyncio
+import json
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+from fastapi import BackgroundTasks, WebSocket, WebSocketDisconnect
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from api.v1.auth.dependencies import decode_access_token
+from api.v1.boards.access import require_board_access, resolve_board_access
+from api.v1.workspaces.acl_cache import CHANNEL as ACL_CHANNEL
+from core.database import SessionLocal
+from core.exceptions import AppException, NotFoundError
+from core.logging import get_logger
+from core.models import User
+from core.redis_client import get_redis_client
+
+from .frames import FRAME_INPUT, FrameAggregator
+from .service import WhiteboardService
+
+logger = get_logger(__name__)
+
+AUTH_TIMEOUT_SECONDS = 10
+SEND_QUEUE_SIZE = 256
+MAX_MESSAGE_BYTES = 512 * 1024
+
+# Kody zamknięcia WebSocket (4xxx = aplikacyjne, odpowiedniki HTTP)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+CLOSE_TRY_AGAIN_LATER = 1013
+
+# Eventy bez zapisu do bazy — można je gubić przy back-pressure
+EPHEMERAL_EVENTS = {"cursor-moved", "typing-started", "typing-stopped", "viewport-changed"}
+ELEMENT_EVENTS = {"element-created", "element-updated", "element-deleted", "elements-batch"}
+
+
+def _channel(board_id: int) -> str:
+    return f"board:{board_id}:events"
+
+
+def _to_record(element: Dict[str, Any]) -> Dict[str, Any]:
+    """DrawingElement z frontu → format save_elements (jak toSaveFormat w elements-api.ts)."""
+    if not isinstance(element, dict):
+        raise AppException("Nieprawidłowy element", code="INVALID_MESSAGE", status_code=400)
+    return {"element_id": element.get("id"), "type": element.get("type"), "data": element}
+
+
+class RelayConnection:
+    """
+    Jedno połączenie WebSocket: tożsamość usera + ograniczona kolejka
+    wyjściowa. `workspace_id` — workspace tablicy (None = tablica bez
+    workspace'a), po nim hub dopasowuje unieważnienia ACL.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        board_id: int,
+        user_id: int,
+        username: str,
+        workspace_id: Optional[int] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.board_id = board_id
+        self.user_id = user_id
+        self.username = username
+        self.workspace_id = workspace_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.overloaded = False
+        self.close_code = CLOSE_TRY_AGAIN_LATER
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Wrzuca event do kolejki bez czekania — patrz BACK-PRESSURE w docstringu modułu."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if event.get("type") in EPHEMERAL_EVENTS:
+                return
+            self.overloaded = True
+            self.close(CLOSE_TRY_AGAIN_LATER)
+
+    def close(self, code: int) -> None:
+        """Porzuca nierozesłane eventy i każe writerowi zamknąć połączenie kodem `code`."""
+        self.close_code = code
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        # None budzi writer (także czekający na pustej kolejce), który zamknie połączenie
+        self.queue.put_nowait(None)
+
+    async def writer(self) -> None:
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                await self.websocket.close(code=self.close_code)
+                return
+            await self.websocket.send_json(event)
+
+
+class BoardRelayHub:
+    """
+    Lokalne połączenia per tablica + jedna subskrypcja Redis pub/sub na
+    worker. Kanał tablicy jest subskrybowany, dopóki na tym workerze jest
+    choć jedno jej połączenie; kanał unieważnień ACL — od pierwszego
+    połączenia (patrz ODEBRANIE DOSTĘPU w docstringu modułu).
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis | None = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        self.id = uuid.uuid4().hex  # origin wiadomości `frame-input` z tego workera
+        self.redis = redis_client or get_redis_client()
+        self.session_factory = session_factory or SessionLocal
+        self._connections: Dict[int, Set[RelayConnection]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._revalidations: Set[asyncio.Task] = set()
+        self.frames = FrameAggregator(self._emit_frame, forward=self._forward_frame_input)
+
+    async def join(self, conn: RelayConnection) -> None:
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = self.redis.pubsub()
+                await self._pubsub.subscribe(ACL_CHANNEL)
+            board_connections = self._connections.setdefault(conn.board_id, set())
+            if not board_connections:
+                await self._pubsub.subscribe(_channel(conn.board_id))
+            board_connections.add(conn)
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.create_task(self._listen())
+            self.frames.request_keyframe(conn.board_id)
+            self.frames.start()
+
+    async def leave(self, conn: RelayConnection) -> None:
+        async with self._lock:
+            board_connections = self._connections.get(conn.board_id)
+            if not board_connections:
+                return
+            board_connections.discard(conn)
+            self.frames.remove_user(conn.board_id, conn.user_id)
+            if not board_connections:
+                del self._connections[conn.board_id]
+                self.frames.drop_board(conn.board_id)
+                try:
+                    await self._pubsub.unsubscribe(_channel(conn.board_id))
+                except RedisError as e:
+                    logger.warning(f"Relay: unsubscribe tablicy {conn.board_id} nieudany: {e}")
+
+    async def publish(self, board_id: int, event: Dict[str, Any], origin: str) -> None:
+        """Rozsyła event do wszystkich połączeń tablicy (na wszystkich workerach) poza `origin`."""
+        await self.redis.publish(_channel(board_id), json.dumps({"origin": origin, "event": event}))
+
+    async def _emit_frame(self, board_id: int, frame: Dict[str, Any]) -> None:
+        # Tylko połączenia tego workera — pozostałe workery budują własne
+        # ramki (frames.py, KILKA WORKERÓW). Dostają ją wszyscy, także autorzy
+        # ruchów; klient pomija własny userId
+        for conn in list(self._connections.get(board_id, ())):
+            conn.deliver(frame)
+
+    async def _forward_frame_input(self, board_id: int, update: Dict[str, Any]) -> None:
+        await self.publish(board_id, update, origin=self.id)
+
+    def local_connection_count(self, board_id: int) -> int:
+        return len(self._connections.get(board_id, ()))
+
+    async def _listen(self) -> None:
+        while self._connections:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except RedisError as e:
+                logger.error(f"Relay: błąd odczytu pub/sub: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None:
+                continue
+            self._dispatch(message)
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        if message.get("channel") == ACL_CHANNEL:
+            self._on_acl_change(message.get("data"))
+            return
+        try:
+            board_id = int(message["channel"].split(":")[1])
+            envelope = json.loads(message["data"])
+        except (KeyError, IndexError, ValueError, TypeError):
+            return
+        origin, event = envelope.get("origin"), envelope.get("event")
+        if not isinstance(event, dict):
+            return
+        if event.get("type") == FRAME_INPUT:
+            if origin != self.id:
+                self.frames.merge_remote(board_id, event)
+            return
+        for conn in list(self._connections.get(board_id, ())):
+            if conn.id != origin:
+                conn.deliver(event)
+
+    def _on_acl_change(self, raw: Any) -> None:
+        try:
+            change = json.loads(raw)
+            workspace_id, user_id = int(change["workspace_id"]), change.get("user_id")
+        except (ValueError, TypeError, KeyError):
+            return
+        affected = [
+            conn
+            for board_connections in self._connections.values()
+            for conn in board_connections
+            if conn.workspace_id == workspace_id and (user_id is None or conn.user_id == user_id)
+        ]
+        if affected:
+            task = asyncio.create_task(self._revalidate(affected))
+            self._revalidations.add(task)
+            task.add_done_callback(self._revalidations.discard)
+
+    async def _revalidate(self, connections: List[RelayConnection]) -> None:
+        """Sprawdza w bazie dostęp połączeń i zamyka te, które go straciły."""
+        try:
+            close_codes = await asyncio.to_thread(
+                self._close_codes, {(conn.board_id, conn.user_id) for conn in connections},
+            )
+        except Exception as e:
+            logger.error(f"Relay: sprawdzenie dostępu po zmianie członkostwa nieudane: {e}")
+            return
+        for conn in connections:
+            code = close_codes.get((conn.board_id, conn.user_id))
+            if code is not None:
+                conn.close(code)
+
+    def _close_codes(self, pairs: Set[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+        """(board_id, user_id) → kod zamknięcia dla tych, którzy stracili dostęp. W wątku."""
+        codes = {}
+        with self.session_factory() as db:
+            for board_id, user_id in pairs:
+                try:
+                    if not resolve_board_access(db, board_id, user_id).has_access:
+                        codes[(board_id, user_id)] = CLOSE_FORBIDDEN
+                except NotFoundError:
+                    codes[(board_id, user_id)] = CLOSE_NOT_FOUND
+        return codes
+
+    async def close(self) -> None:
+        await self.frames.stop()
+        for task in list(self._revalidations):
+            task.cancel()
+        await asyncio.gather(*self._revalidations, return_exceptions=True)
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._connections.clear()
+
+
+_relay_hub: BoardRelayHub | None = None
+
+
+def get_relay_hub() -> BoardRelayHub:
+    """Hub relay dla tego workera (singleton, tworzony leniwie)."""
+    global _relay_hub
+    if _relay_hub is None:
+        _relay_hub = BoardRelayHub()
+    return _relay_hub
+
+
+async def shutdown_relay_hub() -> None:
+    """Zamyka subskrypcję pub/sub — wołane przy shutdownie aplikacji (main.py)."""
+    global _relay_hub
+    if _relay_hub is not None:
+        await _relay_hub.close()
+        _relay_hub = None
+
+
+class BoardRelaySession:
+    """
+    Obsługa jednego połączenia: autoryzacja, zapis zmian elementów przez
+    WhiteboardService, publikacja do huba. Każdy zapis dostaje własną,
+    krótką sesję bazy (jak _cleanup_image_after_delay) — połączenie
+    WebSocket żyje godzinami i nie może trzymać połączenia do Neon.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        board_id: int,
+        hub: BoardRelayHub | None = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        redis_client: redis.Redis | None = None,
+    ):
+        self.websocket = websocket
+        self.board_id = board_id
+        self.hub = hub or get_relay_hub()
+        self.session_factory = session_factory or SessionLocal
+        self.redis_client = redis_client
+        self.conn: Optional[RelayConnection] = None
+        self._background: Set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        await self.websocket.accept()
+        try:
+            self.conn = await self._authenticate()
+        except WebSocketDisconnect:
+            return
+        if self.conn is None:
+            return
+
+        await self.hub.join(self.conn)
+        writer = asyncio.create_task(self.conn.writer())
+        try:
+            await self.conn.websocket.send_json({"type": "ready", "user_id": self.conn.user_id})
+            while not writer.done():
+                raw = await self.websocket.receive_text()
+                await self._handle_raw(raw)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            await self.hub.leave(self.conn)
+            await self._set_offline()
+
+    async def _authenticate(self) -> Optional[RelayConnection]:
+        try:
+            message = await asyncio.wait_for(self.websocket.receive_json(), AUTH_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, ValueError):
+            await self.websocket.close(code=CLOSE_UNAUTHORIZED)
+            return None
+
+        if not isinstance(message, dict) or message.get("type") != "auth":
+            await self.websocket.close(code=CLOSE_UNAUTHORIZED)
+            return None
+
+        try:
+            user_id = decode_access_token(str(message.get("token", "")))
+        except AppException:
+            await self.websocket.close(code=CLOSE_UNAUTHORIZED)
+            return None
+
+        with self.session_factory() as db:
+            user = db.query(User).filter(User.id == user_id).first()
+            if user is None or not user.is_active:
+                await self.websocket.close(code=CLOSE_UNAUTHORIZED)
+                return None
+            try:
+                # Dostęp sprawdzamy przy każdym połączeniu — set_online robi to
+                # tylko na początku sesji obecności, a ponowne połączenie może
+                # przyjść, zanim obecność wygaśnie
+                workspace_id = require_board_access(db, self.board_id, user_id).board.workspace_id
+                await WhiteboardService(db, self.redis_client).set_online(self.board_id, user_id)
+            except NotFoundError:
+                await self.websocket.close(code=CLOSE_NOT_FOUND)
+                return None
+            except AppException:
+                await self.websocket.close(code=CLOSE_FORBIDDEN)
+                return None
+            username = user.username
+
+        return RelayConnection(self.websocket, self.board_id, user_id, username, workspace_id)
+
+    async def _set_offline(self) -> None:
+        try:
+            with self.session_factory() as db:
+                await WhiteboardService(db, self.redis_client).set_offline(self.board_id, self.conn.user_id)
+        except Exception as e:
+            logger.warning(f"Relay: zdjęcie obecności usera {self.conn.user_id} nieudane: {e}")
+
+    async def _handle_raw(self, raw: str) -> None:
+        if len(raw) > MAX_MESSAGE_BYTES:
+            self.conn.deliver({"type": "error", "code": "MESSAGE_TOO_LARGE", "message": "Wiadomość za duża"})
+            return
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            self.conn.deliver({"type": "error", "code": "INVALID_MESSAGE", "message": "Nieprawidłowy JSON"})
+            return
+        if not isinstance(message, dict):
+            self.conn.deliver({"type": "error", "code": "INVALID_MESSAGE", "message": "Nieprawidłowa wiadomość"})
+            return
+
+        seq = message.get("seq")
+        try:
+            await self.handle(message)
+        except AppException as e:
+            self.conn.deliver({"type": "error", "seq": seq, "code": e.code, "message": e.message})
+            return
+        except RedisError as e:
+            logger.error(f"Relay: publikacja do Redis nieudana (tablica {self.board_id}): {e}")
+            self.conn.deliver({"type": "error", "seq": seq, "code": "RELAY_UNAVAILABLE", "message": "Relay chwilowo niedostępny"})
+            return
+
+        if seq is not None and message.get("type") != "ping":
+            self.conn.deliver({"type": "ack", "seq": seq})
+
+    async def handle(self, message: Dict[str, Any]) -> None:
+        """Jedna wiadomość od klienta: zapis (dla zmian elementów) → publikacja do innych."""
+        event_type = message.get("type")
+
+        if event_type == "ping":
+            with self.session_factory() as db:
+                await WhiteboardService(db, self.redis_client).set_online(self.board_id, self.conn.user_id)
+            self.conn.deliver({"type": "pong", "seq": message.get("seq")})
+            return
+
+        if event_type not in ELEMENT_EVENTS | EPHEMERAL_EVENTS:
+            raise AppException(f"Nieznany typ wiadomości: {event_type}", code="INVALID_MESSAGE", status_code=400)
+        is_drag_preview = event_type == "elements-batch" and message.get("geometryOnly")
+        if event_type in ELEMENT_EVENTS and not is_drag_preview:
+            background_tasks = await asyncio.to_thread(self._persist, event_type, message)
+            if background_tasks.tasks:
+                self._spawn(background_tasks())
+
+        # Kursory i podgląd przeciągania → zbiorcza ramka w następnym ticku
+        if event_type == "cursor-moved":
+            x, y = message.get("x"), message.get("y")
+            if not all(isinstance(v, (int, float)) for v in (x, y)):
+                raise AppException("Nieprawidłowa pozycja kursora", code="INVALID_MESSAGE", status_code=400)
+            self.hub.frames.add_cursor(self.board_id, self.conn.user_id, self.conn.username, x, y)
+            return
+        if is_drag_preview:
+            self.hub.frames.add_drag(self.board_id, self.conn.user_id, message.get("elements") or [])
+            return
+
+        event = {k: v for k, v in message.items() if k not in ("seq", "token")}
+        # Tożsamość nadawcy ustawia serwer — klient nie może podszyć się pod innego usera
+        event.update(userId=self.conn.user_id, username=self.conn.username)
+        await self.hub.publish(self.board_id, event, origin=self.conn.id)
+
+    def _persist(self, event_type: str, message: Dict[str, Any]) -> BackgroundTasks:
+        """Zapis zmiany elementu — synchroniczny, wołany w wątku (asyncio.to_thread).
+        Zwraca zadania w tle (sprzątanie obrazów) do uruchomienia na pętli."""
+        user_id = self.conn.user_id
+        background_tasks = BackgroundTasks()
+        with self.session_factory() as db:
+            service = WhiteboardService(db, self.redis_client)
+            if event_type == "element-created":
+                service.save_elements(self.board_id, [_to_record(message.get("element") or {})], user_id)
+            elif event_type == "element-updated":
+                service.merge_elements(self.board_id, [_to_record(message.get("element") or {})], user_id)
+            elif event_type == "elements-batch":
+                records: List[Dict[str, Any]] = [_to_record(el) for el in message.get("elements") or []]
+                if records:
+                    service.save_elements(self.board_id, records, user_id)
+            elif event_type == "element-deleted":
+                try:
+                    service.delete_element(self.board_id, str(message.get("elementId")), user_id, background_tasks)
+                except NotFoundError:
+                    # Już usunięty (np. drugi klient był szybszy) — usunięcie
+                    # jest idempotentne, patrz docs/known-issues.md #1 opcja A
+                    pass
+        return background_tasks
+
+    def _spawn(self, coro) -> None:
+        """Sprzątanie w tle (np. _cleanup_image_after_delay) bez blokowania pętli wiadomości."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
@@ -10,16 +10,21 @@ GET    /{id}/last-opened            — ostatnie otwarcie (dla aktualnego usera)
 POST   /{id}/elements/batch         — batch save elementów
 GET    /{id}/elements               — załaduj wszystkie elementy
 DELETE /{id}/elements/{element_id}  — usuń element
+POST   /{id}/upload-image           — upload obrazu przez API
+POST   /{id}/upload-url             — podpisany URL do uploadu bezpośrednio do Storage
+POST   /{id}/upload-complete        — potwierdzenie uploadu bezpośredniego
+GET    /files/{path}                — plik z lokalnego Storage (storage_backend="local")
+PUT    /files/{path}?token=…        — upload bezpośredni do lokalnego Storage
+WS     /{id}/ws                     — relay współpracy na żywo (relay.py)
 """
 from typing import Any, Dict, List
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Request, UploadFile, WebSocket, status
 from sqlalchemy.orm import Session
 
-from ..auth.dependencies import get_current_user
+from ..auth.dependencies import get_current_user_id
 from core.database import get_db
-from core.exceptions import NotFoundError
-from core.models import User
+from core.exceptions import AppException, NotFoundError
 from core.responses import ApiResponse
 
 from .schemas import (
@@ -27,8 +32,12 @@ from .schemas import (
     OnlineUserInfo, OnlineStatusResponse, OnlineUsersBatchRequest, OnlineUsersBatchResponse,
     BoardElementWithAuthor,
     SaveElementsResponse, DeleteElementResponse, UploadImageResponse,
+    SignedUploadRequest, SignedUploadResponse, CompleteUploadRequest,
 )
+from .local_storage import get_local_backend, serve_local_file, verify_local_upload
+from .relay import BoardRelaySession
 from .service import WhiteboardService
+from .storage import MAX_UPLOAD_SIZE_BYTES
 
 router = APIRouter(tags=["Whiteboard"])
 
@@ -39,12 +48,12 @@ router = APIRouter(tags=["Whiteboard"])
 async def mark_online(
     board_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     service = WhiteboardService(db)
-    service.set_online(board_id, current_user.id)
+    await service.set_online(board_id, current_user_id)
     return ApiResponse(success=True, data=OnlineStatusResponse(
-        status="online", board_id=board_id, user_id=current_user.id
+        status="online", board_id=board_id, user_id=current_user_id
     ))
 
 
@@ -52,13 +61,13 @@ async def mark_online(
 async def mark_offline(
     board_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     service = WhiteboardService(db)
-    if not service.set_offline(board_id, current_user.id):
+    if not await service.set_offline(board_id, current_user_id):
         raise NotFoundError("Tablica nie znaleziona lub brak dostępu")
     return ApiResponse(success=True, data=OnlineStatusResponse(
-        status="offline", board_id=board_id, user_id=current_user.id
+        status="offline", board_id=board_id, user_id=current_user_id
     ))
 
 
@@ -70,7 +79,7 @@ async def get_online_users(
     db: Session = Depends(get_db),
 ):
     service = WhiteboardService(db)
-    result = service.get_online_users(board_id, limit, offset)
+    result = await service.get_online_users(board_id, limit, offset)
     return ApiResponse(success=True, data=result)
 
 
@@ -80,7 +89,7 @@ async def get_online_users_batch(
     db: Session = Depends(get_db),
 ):
     service = WhiteboardService(db)
-    result = service.get_online_users_batch(payload.board_ids)
+    result = await service.get_online_users_batch(payload.board_ids)
     return ApiResponse(success=True, data=OnlineUsersBatchResponse(online_users_by_board=result))
 
 
@@ -102,10 +111,10 @@ async def get_last_modified_by(board_id: int, db: Session = Depends(get_db)):
 async def get_last_opened(
     board_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     service = WhiteboardService(db)
-    return ApiResponse(success=True, data=service.get_last_opened(board_id, current_user.id))
+    return ApiResponse(success=True, data=service.get_last_opened(board_id, current_user_id))
 
 
 # ── Elements ───────────────────────────────────────────────────────────────
@@ -119,10 +128,10 @@ async def save_elements_batch(
     board_id: int,
     elements: List[Dict[str, Any]],
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     service = WhiteboardService(db)
-    result = service.save_elements(board_id, elements, current_user.id)
+    result = service.save_elements(board_id, elements, current_user_id)
     return ApiResponse(success=True, data=result)
 
 
@@ -133,10 +142,10 @@ async def save_elements_batch(
 async def load_elements(
     board_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     service = WhiteboardService(db)
-    result = service.load_elements(board_id, current_user.id)
+    result = service.load_elements(board_id, current_user_id)
     return ApiResponse(success=True, data=result)
 
 
@@ -148,7 +157,7 @@ async def upload_image(
     board_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """
     Upload obrazu tablicy do Supabase Storage (nie przez Realtime Broadcast —
@@ -157,10 +166,47 @@ async def upload_image(
     """
     service = WhiteboardService(db)
     file_bytes = await file.read()
-    url = await service.upload_image(
-        board_id, current_user.id, file_bytes, file.content_type or "application/octet-stream"
+    result = await service.upload_image(
+        board_id, current_user_id, file_bytes, file.content_type or "application/octet-stream"
     )
-    return ApiResponse(success=True, data=UploadImageResponse(url=url))
+    return ApiResponse(success=True, data=result)
+
+
+@router.post(
+    "/{board_id}/upload-url",
+    response_model=ApiResponse[SignedUploadResponse],
+)
+async def create_upload_url(
+    board_id: int,
+    payload: SignedUploadRequest,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Upload bezpośrednio do Storage: zwraca podpisany URL do `PUT` pliku
+    i bilet dla /upload-complete. Jeśli plik o tym hashu już istnieje,
+    od razu zwraca gotowy obraz (`upload_required=False`).
+    """
+    service = WhiteboardService(db)
+    result = await service.create_signed_upload(
+        board_id, current_user_id, payload.content_hash, payload.content_type, payload.size_bytes
+    )
+    return ApiResponse(success=True, data=result)
+
+
+@router.post(
+    "/{board_id}/upload-complete",
+    response_model=ApiResponse[UploadImageResponse],
+)
+async def complete_upload(
+    board_id: int,
+    payload: CompleteUploadRequest,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    service = WhiteboardService(db)
+    result = await service.complete_signed_upload(board_id, current_user_id, payload.upload_token)
+    return ApiResponse(success=True, data=result)
 
 
 @router.delete(
@@ -172,8 +218,40 @@ async def delete_element(
     element_id: str,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     service = WhiteboardService(db)
-    result = service.delete_element(board_id, element_id, current_user.id, background_tasks)
-    return ApiResponse(success=True, data=DeleteElementResponse(**result))
\ No newline at end of file
+    result = service.delete_element(board_id, element_id, current_user_id, background_tasks)
+    return ApiResponse(success=True, data=DeleteElementResponse(**result))
+
+
+# ── Relay WebSocket ────────────────────────────────────────────────────────
+
+@router.websocket("/{board_id}/ws")
+async def board_relay(websocket: WebSocket, board_id: int):
+    """Współpraca na żywo — autoryzacja pierwszą wiadomością, protokół w relay.py."""
+    await BoardRelaySession(websocket, board_id).run()
+
+
+# ── Lokalny Storage ────────────────────────────────────────────────────────
+
+@router.api_route("/files/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_file(path: str, request: Request):
+    """Publiczny URL obrazu przy storage_backend="local" (odpowiednik /object/public/ w Supabase)."""
+    return await serve_local_file(request, path)
+
+
+@router.put("/files/{path:path}", include_in_schema=False)
+async def put_file(path: str, token: str, request: Request):
+    """Cel podpisanego URL-a uploadu przy storage_backend="local" (create_signed_upload_url)."""
+    backend = get_local_backend()
+    verify_local_upload(token, path)
+
+    declared_size = int(request.headers.get("content-length") or 0)
+    if declared_size > MAX_UPLOAD_SIZE_BYTES:
+        raise AppException("Plik za duży", code="FILE_TOO_LARGE", status_code=400)
+    file_bytes = await request.body()
+    if len(file_bytes) > MAX_UPLOAD_SIZE_BYTES:
+        raise AppException("Plik za duży", code="FILE_TOO_LARGE", status_code=400)
+    await backend.upload(path, file_bytes, request.headers.get("content-type", "application/octet-stream"))
+    return ApiResponse(success=True, data={"path": path})
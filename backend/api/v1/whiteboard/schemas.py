@@ -1,7 +1,7 @@
 """Schemas dla modułu whiteboard (sesja tablicy)."""
 from datetime import datetime
 from typing import Optional, List, Any, Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class OnlineUserInfo(BaseModel):
@@ -78,5 +78,36 @@ class DeleteElementResponse(BaseModel):
 
 
 class UploadImageResponse(BaseModel):
-    """Zwracana po udanym uploadzie obrazu do Supabase Storage — patrz storage.py"""
-    url: str
\ No newline at end of file
+    """
+    Zwracana po udanym uploadzie obrazu do Supabase Storage — patrz storage.py.
+    `url` wskazuje pełny obraz w WebP (images.py).
+    """
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class SignedUploadRequest(BaseModel):
+    """Metadane pliku, który przeglądarka chce wgrać bezpośrednio do Storage."""
+    content_hash: str = Field(pattern=r"^[0-9a-f]{64}$")  # SHA-256 (hex) liczony po stronie klienta
+    content_type: str
+    size_bytes: int = Field(gt=0)
+
+
+class SignedUploadResponse(BaseModel):
+    """
+    `upload_required=False` — taki plik już jest w Storage (dedup), `image`
+    od razu zawiera gotowe URL-e. W przeciwnym razie klient robi `PUT` bajtów
+    pod `upload_url`, a potem woła /upload-complete z `upload_token`.
+    `public_url` to docelowy URL obrazu po przetworzeniu.
+    """
+    upload_required: bool
+    public_url: str
+    upload_url: Optional[str] = None
+    upload_token: Optional[str] = None
+    expires_in: Optional[int] = None
+    image: Optional[UploadImageResponse] = None
+
+
+class CompleteUploadRequest(BaseModel):
+    upload_token: str
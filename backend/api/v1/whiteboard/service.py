@@ -2,33 +2,50 @@
 Logika biznesowa sesji whiteboard.
 
 WhiteboardService obsługuje:
-  set_online()          — oznacz usera jako online
-  set_offline()         — oznacz usera jako offline
+  set_online()          — heartbeat obecności (Redis, patrz presence.py)
+  set_offline()         — opuszczenie tablicy
   get_online_users()    — lista online
   get_owner_info()      — info o właścicielu
   get_last_modifier()   — info o ostatnim modyfikatorze
   get_last_opened()     — kiedy user ostatnio otworzył
   save_elements()       — batch save elementów
+  merge_elements()      — batch update samej geometrii (relay WebSocket)
   load_elements()       — ładowanie wszystkich elementów
   delete_element()      — usuń jeden element
 """
 import asyncio
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
+import redis.asyncio as redis
 from fastapi import BackgroundTasks
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from core.config import get_settings
 from core.database import SessionLocal
 from core.exceptions import NotFoundError, AppException, ValidationError
 from core.logging import get_logger
-from core.models import Board, BoardElement, BoardUsers, User, WorkspaceMember
+from core.models import Board, BoardElement, BoardUsers, StoredImage, User
+
+from api.v1.boards.access import BoardAccess, ensure_board_access, require_board_access
 
 from .schemas import (
     BoardOwnerInfo, LastModifiedByInfo, LastOpenedInfo,
     OnlineUserInfo, BoardElementWithAuthor, SaveElementsResponse,
+    UploadImageResponse, SignedUploadResponse,
+)
+from .images import process_image
+from .presence import PresenceService, load_online_users
+from .storage import (
+    upload_board_image, delete_board_objects, validate_board_image, validate_upload_metadata,
+    content_hash, content_addressed_path, staging_path, public_url_for, path_from_public_url,
+    create_signed_upload_url, download_object, delete_board_folder, ensure_object_size,
+    MAX_UPLOAD_SIZE_BYTES,
 )
-from .storage import upload_board_image, delete_board_image
 
 logger = get_logger(__name__)
 
@@ -38,37 +55,188 @@ logger = get_logger(__name__)
 # zniknąłby natychmiast, undo pokazywałoby szary/pusty blok zamiast obrazka.
 IMAGE_DELETE_GRACE_PERIOD_SECONDS = 90.0
 
+# Jak długo ważny jest bilet uploadu bezpośrednio do Storage
+# (create_signed_upload → complete_signed_upload).
+SIGNED_UPLOAD_TTL_SECONDS = 600
 
-async def _cleanup_image_after_delay(src: str, delay_seconds: float = IMAGE_DELETE_GRACE_PERIOD_SECONDS) -> None:
+
+async def _cleanup_image_after_delay(src: str, delay_seconds: Optional[float] = None) -> None:
     """
     Wołane w tle (FastAPI BackgroundTasks) po usunięciu elementu-obrazu.
-    Czeka `delay_seconds` (margines na undo), otwiera WŁASNĄ, krótkotrwałą
-    sesję bazy (nie tę z requestu — ta jest już zamknięta/zamyka się zaraz
-    po odpowiedzi, a trzymanie jej otwartej przez 90s tylko po to żeby
-    „poczekać” marnowałoby połączenie do Neon), sprawdza czy w międzyczasie
-    ten sam URL nie wrócił na tablicę (undo), i dopiero wtedy kasuje plik.
+    Czeka IMAGE_DELETE_GRACE_PERIOD_SECONDS (margines na undo), otwiera
+    WŁASNĄ, krótkotrwałą sesję bazy (nie tę z requestu — ta jest już
+    zamknięta/zamyka się zaraz po odpowiedzi, a trzymanie jej otwartej
+    przez 90s tylko po to żeby „poczekać” marnowałoby połączenie do Neon)
+    i próbuje zwolnić obraz (release_stored_image). Jeśli undo przywróciło
+    element, jego `src` znów jest w board_elements i obraz zostaje.
     """
-    await asyncio.sleep(delay_seconds)
+    await asyncio.sleep(IMAGE_DELETE_GRACE_PERIOD_SECONDS if delay_seconds is None else delay_seconds)
 
     db = SessionLocal()
     try:
-        still_used = db.query(BoardElement).filter(
-            BoardElement.data["src"].astext == src
-        ).first()
+        paths = release_stored_image(db, src)
     finally:
         db.close()
 
-    if still_used:
-        logger.info(f"Obraz {src} nadal używany (prawdopodobnie undo) — pomijam kasowanie ze Storage")
+    await delete_board_objects(paths)
+
+
+def count_image_refs(db: Session, src: str) -> int:
+    """Ile elementów-obrazów ma dokładnie ten `src` (indeks ix_board_elements_image_src)."""
+    return db.query(BoardElement.id).filter(
+        BoardElement.type == "image",
+        BoardElement.data["src"].astext == src,
+    ).count()
+
+
+def image_claim_cutoff() -> datetime:
+    """Obraz wydany przez upload/dedup później niż to jest chroniony, nawet bez elementów."""
+    return datetime.utcnow() - timedelta(hours=get_settings().storage_reconcile_grace_hours)
+
+
+def release_stored_image(db: Session, src: str) -> List[str]:
+    """
+    Zwalnia obraz adresowany treścią (stored_images), jeśli nic go już nie
+    trzyma. Zwraca ścieżki obiektów do skasowania ze Storage — pełny obraz
+    razem z wariantami starszych uploadów; sam `src`, jeśli to stary plik sprzed
+    deduplikacji (bez wiersza w tabeli) i nikt go już nie używa; pustą
+    listę, jeśli plik ma zostać.
+
+    Referencje NIE są liczone przy uploadzie — wynikają z elementów
+    (count_image_refs), więc porzucony upload niczego nie "trzyma" na
+    zawsze. Zamiast licznika upload/dedup odświeża `claimed_at`: przez
+    storage_reconcile_grace_hours obraz zostaje, nawet jeśli jeszcze żaden
+    element go nie używa (klient dostał URL, a element zapisze za chwilę).
+    Taki obraz zwolni później reconcile_storage.
+    """
+    path = path_from_public_url(src)
+    if path is None:
+        return []
+
+    stored = db.query(StoredImage).filter(
+        StoredImage.path == path
+    ).with_for_update().first()
+    if not stored:
+        # Stary plik sprzed deduplikacji — decydują elementy
+        return [] if count_image_refs(db, src) else [path]
+
+    if count_image_refs(db, src):
+        db.commit()
+        logger.info(f"Obraz {path} nadal jest na tablicach — zostaje w Storage")
+        return []
+    if stored.claimed_at > image_claim_cutoff():
+        db.commit()
+        logger.info(f"Obraz {path} świeżo wydany przez upload — zwolni go reconcile Storage")
+        return []
+
+    paths = [stored.path, *(stored.variants or {}).values()]
+    db.delete(stored)
+    db.commit()
+    return paths
+
+
+def _build_upload_response(stored: StoredImage) -> UploadImageResponse:
+    """UploadImageResponse z wiersza stored_images (klucze JSONB są stringami — stąd int())."""
+    return UploadImageResponse(
+        url=public_url_for(stored.path),
+        width=stored.width,
+        height=stored.height,
+    )
+
+
+def _issue_upload_ticket(board_id: int, user_id: int, digest: str, path: str) -> str:
+    """
+    Krótkotrwały, podpisany bilet wiążący upload bezpośredni z tablicą,
+    userem i hashem. `jti` pozwala zużyć go tylko raz (_consume_upload_ticket).
+    """
+    settings = get_settings()
+    return jwt.encode(
+        {
+            "type": "image_upload",
+            "jti": uuid.uuid4().hex,
+            "board_id": board_id,
+            "sub": str(user_id),
+            "hash": digest,
+            "path": path,
+            "exp": datetime.utcnow() + timedelta(seconds=SIGNED_UPLOAD_TTL_SECONDS),
+        },
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+
+
+def _read_upload_ticket(token: str, board_id: int, user_id: int) -> tuple[str, str, str]:
+    """Weryfikuje bilet z _issue_upload_ticket. Zwraca (jti, hash, ścieżka tymczasowa) albo rzuca 400."""
+    settings = get_settings()
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        raise ValidationError("Nieprawidłowy lub wygasły bilet uploadu")
+
+    if (
+        claims.get("type") != "image_upload"
+        or claims.get("board_id") != board_id
+        or claims.get("sub") != str(user_id)
+        or not claims.get("jti")
+    ):
+        raise ValidationError("Nieprawidłowy lub wygasły bilet uploadu")
+    return claims["jti"], claims["hash"], claims["path"]
+
+
+async def _consume_upload_ticket(client: redis.Redis, jti: str) -> None:
+    """
+    Bilet jest jednorazowy: SET NX na czas jego ważności. Powtórka (replay)
+    tego samego biletu → 400, zanim dotknie stored_images. Bez Redis nie
+    da się tego sprawdzić — 503 zamiast przepuszczania powtórek.
+    """
+    try:
+        first_use = await client.set(f"upload:ticket:{jti}", 1, nx=True, ex=SIGNED_UPLOAD_TTL_SECONDS)
+    except RedisError as e:
+        logger.error(f"Bilet uploadu: zapis do Redis nieudany: {e}")
+        raise AppException("Upload chwilowo niedostępny", code="REDIS_ERROR", status_code=503)
+    if not first_use:
+        raise ValidationError("Bilet uploadu został już użyty")
+
+
+async def release_board_images(db: Session, srcs: List[str]) -> None:
+    """
+    Wołane po usunięciu CAŁEJ tablicy (BoardService.delete_board) — obrazy
+    adresowane treścią nie leżą w folderze `{board_id}/`, więc
+    delete_board_folder ich nie ruszy. `srcs` to `src` usuniętych
+    elementów-obrazów (powtórzenia nie szkodzą — referencje wynikają
+    z elementów). Best-effort, jak reszta sprzątania Storage.
+    """
+    to_delete: List[str] = []
+    for src in dict.fromkeys(srcs):
+        to_delete.extend(release_stored_image(db, src))
+
+    await delete_board_objects(to_delete)
+
+
+async def purge_boards_storage(board_ids: List[int], srcs: List[str]) -> None:
+    """
+    Sprzątanie Storage po usunięciu wielu tablic naraz (WorkspaceService.delete_workspace).
+    Wołane w tle (BackgroundTasks) z WŁASNĄ sesją bazy, jak _cleanup_image_after_delay —
+    przy workspace z kilkudziesięcioma tablicami to setki requestów do Storage,
+    na które request usuwający nie powinien czekać.
+    """
+    for board_id in board_ids:
+        await delete_board_folder(board_id)
+    if not srcs:
         return
 
-    await delete_board_image(src)
+    db = SessionLocal()
+    try:
+        await release_board_images(db, srcs)
+    finally:
+        db.close()
 
 
 class WhiteboardService:
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, redis_client: redis.Redis | None = None):
         self.db = db
+        self.presence = PresenceService(redis_client)
 
     def _get_board_or_404(self, board_id: int) -> Board:
         board = self.db.query(Board).filter(Board.id == board_id).first()
@@ -76,92 +244,57 @@ class WhiteboardService:
             raise NotFoundError("Tablica nie znaleziona")
         return board
 
-    def _check_access(self, board: Board, user_id: int) -> None:
-        member = self.db.query(WorkspaceMember).filter(
-            WorkspaceMember.workspace_id == board.workspace_id,
-            WorkspaceMember.user_id == user_id,
-        ).first()
-        if not member and board.created_by != user_id:
-            raise AppException("Brak dostępu do tej tablicy", status_code=403)
+    def _require_access(self, board_id: int, user_id: int) -> BoardAccess:
+        """Tablica + rola + board_users jednym zapytaniem (api/v1/boards/access.py); 404/403."""
+        return require_board_access(self.db, board_id, user_id)
 
     # ── Online presence ────────────────────────────────────────────────────
 
-    def set_online(self, board_id: int, user_id: int) -> bool:
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
+    async def set_online(self, board_id: int, user_id: int) -> bool:
+        """
+        Heartbeat obecności (presence.py). Gdy user już jest online — sam
+        Redis, bez bazy. Dopiero na początku sesji sprawdzamy dostęp
+        i zapisujemy `last_opened` w board_users.
+        """
+        if await self.presence.heartbeat(board_id, user_id):
+            return True
 
-        board_user = self.db.query(BoardUsers).filter(
-            BoardUsers.board_id == board_id,
-            BoardUsers.user_id == user_id,
-        ).first()
+        board_user = self._require_access(board_id, user_id).board_user
 
         if board_user:
-            board_user.is_online = True
             board_user.last_opened = datetime.utcnow()
         else:
             self.db.add(BoardUsers(
                 board_id=board_id, user_id=user_id,
-                is_online=True, is_favourite=False,
+                is_favourite=False,
                 last_opened=datetime.utcnow(),
             ))
 
         self.db.commit()
+        await self.presence.join(board_id, user_id)
         return True
 
-    def set_offline(self, board_id: int, user_id: int) -> bool:
-        board_user = self.db.query(BoardUsers).filter(
-            BoardUsers.board_id == board_id,
-            BoardUsers.user_id == user_id,
-        ).first()
-        if not board_user:
-            return False
-        board_user.is_online = False
-        self.db.commit()
-        return True
+    async def set_offline(self, board_id: int, user_id: int) -> bool:
+        return await self.presence.leave(board_id, user_id)
 
-    def get_online_users(
+    async def get_online_users(
         self, board_id: int, limit: int = 50, offset: int = 0
     ) -> List[OnlineUserInfo]:
-        from datetime import timedelta, datetime
-        active_threshold = datetime.utcnow() - timedelta(minutes=2)
-
-        rows = (
-            self.db.query(BoardUsers, User)
-            .join(User, User.id == BoardUsers.user_id)
-            .filter(
-                BoardUsers.board_id == board_id, 
-                BoardUsers.is_online == True,
-                BoardUsers.last_opened >= active_threshold
-            )
-            .offset(offset).limit(limit)
-            .all()
-        )
-        return [OnlineUserInfo(user_id=u.id, username=u.username, avatar_url=u.avatar_url) for _, u in rows]
-
-    def get_online_users_batch(self, board_ids: List[int]) -> Dict[int, List[OnlineUserInfo]]:
-        unique_board_ids = sorted(set(board_ids))
-        if not unique_board_ids:
-            return {}
-
-        from datetime import timedelta, datetime
-        active_threshold = datetime.utcnow() - timedelta(minutes=2)
-
-        rows = (
-            self.db.query(BoardUsers.board_id, User)
-            .join(User, User.id == BoardUsers.user_id)
-            .filter(
-                BoardUsers.board_id.in_(unique_board_ids),
-                BoardUsers.is_online == True,
-                BoardUsers.last_opened >= active_threshold
-            )
-            .all()
-        )
-
-        by_board: Dict[int, List[OnlineUserInfo]] = {board_id: [] for board_id in unique_board_ids}
-        for board_id, user in rows:
-            by_board[board_id].append(OnlineUserInfo(user_id=user.id, username=user.username, avatar_url=user.avatar_url))
-
-        return by_board
+        online = await load_online_users(self.db, self.presence, [board_id])
+        return [
+            OnlineUserInfo(user_id=uid, username=username, avatar_url=avatar_url)
+            for uid, username, avatar_url in online[board_id][offset:offset + limit]
+        ]
+
+    async def get_online_users_batch(self, board_ids: List[int]) -> Dict[int, List[OnlineUserInfo]]:
+        online = await load_online_users(self.db, self.presence, board_ids)
+        return {
+            board_id: [
+                OnlineUserInfo(user_id=uid, username=username, avatar_url=avatar_url)
+                for uid, username, avatar_url in users
+            ]
+            for board_id, users in online.items()
+        }
 
     # ── Board metadata ─────────────────────────────────────────────────────
 
@@ -207,8 +340,7 @@ class WhiteboardService:
         if len(elements) > 100:
             raise ValidationError("Zbyt wiele elementów (maksymalnie 100)")
 
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
+        board = self._require_access(board_id, user_id).board
 
         saved = 0
         for el in elements:
@@ -242,11 +374,45 @@ class WhiteboardService:
 
         return SaveElementsResponse(success=True, saved=saved)
 
+    def merge_elements(
+        self,
+        board_id: int,
+        patches: List[Dict[str, Any]],
+        user_id: int,
+    ) -> SaveElementsResponse:
+        """
+        Jak save_elements, ale `data` z patcha jest SCALANE z zapisanym
+        elementem (płytko), a nie podmieniane — dla update'ów z relay
+        WebSocket, które niosą tylko geometrię (x/y/rotation, bez `src`
+        zdjęcia). Elementy, których jeszcze nie ma w bazie, są pomijane:
+        sama geometria to za mało, żeby je utworzyć.
+        """
+        if len(patches) > 100:
+            raise ValidationError("Zbyt wiele elementów (maksymalnie 100)")
+
+        board = self._require_access(board_id, user_id).board
+
+        by_id = {p["element_id"]: p for p in patches if p.get("element_id")}
+        if not by_id:
+            return SaveElementsResponse(success=True, saved=0)
+
+        existing = self.db.query(BoardElement).filter(
+            BoardElement.board_id == board_id,
+            BoardElement.element_id.in_(by_id),
+        ).all()
+        for element in existing:
+            element.data = {**(element.data or {}), **(by_id[element.element_id].get("data") or {})}
+
+        if existing:
+            board.last_modified = datetime.utcnow()
+            board.last_modified_by = user_id
+        self.db.commit()
+        return SaveElementsResponse(success=True, saved=len(existing))
+
     def load_elements(
         self, board_id: int, user_id: int
     ) -> List[BoardElementWithAuthor]:
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
+        self._require_access(board_id, user_id)
 
         elements = self.db.query(BoardElement).filter(
             BoardElement.board_id == board_id
@@ -277,17 +443,161 @@ class WhiteboardService:
         user_id: int,
         file_bytes: bytes,
         content_type: str,
-    ) -> str:
+    ) -> UploadImageResponse:
         """
         Sprawdza dostęp do tablicy, uploaduje obraz do Supabase Storage
         (storage.py), zwraca publiczny URL do wpisania w element.src.
 
         Patrz docs/known-issues.md #2 — obraz nie jedzie już przez
         Realtime Broadcast, żeby nie łamać limitu 256 KB na wiadomość.
+
+        Deduplikacja: jeśli plik o tym samym SHA-256 już jest w Storage
+        (wiersz w stored_images), tylko odświeżamy claimed_at i zwracamy
+        istniejące URL-e — bez transkodowania i bez wysyłania bajtów do
+        Supabase. Hash liczymy z ORYGINALNYCH bajtów (przed konwersją do
+        WebP), więc ten sam plik zawsze trafia w ten sam wiersz.
         """
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
-        return await upload_board_image(board_id, file_bytes, content_type)
+        await ensure_board_access(self.db, board_id, user_id, self.presence.redis)
+
+        validate_board_image(file_bytes, content_type)
+        digest = content_hash(file_bytes)
+
+        if self._claim_stored_image(digest):
+            stored = self.db.query(StoredImage).filter(StoredImage.content_hash == digest).first()
+            logger.info(f"Obraz tablicy {board_id} zdeduplikowany: {stored.path}")
+            return _build_upload_response(stored)
+
+        return await self._store_processed_image(digest, file_bytes)
+
+    async def create_signed_upload(
+        self,
+        board_id: int,
+        user_id: int,
+        digest: str,
+        content_type: str,
+        size_bytes: int,
+    ) -> SignedUploadResponse:
+        """
+        Pierwszy krok uploadu bezpośrednio z przeglądarki do Storage — bajty
+        nie przechodzą przez proces API, więc duże zdjęcie nie trzyma workera.
+
+        Jeśli plik o tym hashu już jest (dedup) — od razu zwracamy gotowe
+        URL-e i klient w ogóle nic nie wysyła. W przeciwnym razie zwracamy
+        podpisany URL do `PUT` (ścieżka tymczasowa, staging_path) oraz
+        krótkotrwały bilet, który klient odsyła do complete_signed_upload.
+        """
+        await ensure_board_access(self.db, board_id, user_id, self.presence.redis)
+        ext = validate_upload_metadata(size_bytes, content_type)
+
+        if self._claim_stored_image(digest):
+            stored = self.db.query(StoredImage).filter(StoredImage.content_hash == digest).first()
+            image = _build_upload_response(stored)
+            return SignedUploadResponse(upload_required=False, public_url=image.url, image=image)
+
+        path = staging_path(digest, ext)
+        upload_url = await create_signed_upload_url(path)
+        return SignedUploadResponse(
+            upload_required=True,
+            public_url=public_url_for(content_addressed_path(digest)),
+            upload_url=upload_url,
+            upload_token=_issue_upload_ticket(board_id, user_id, digest, path),
+            expires_in=SIGNED_UPLOAD_TTL_SECONDS,
+        )
+
+    async def complete_signed_upload(
+        self,
+        board_id: int,
+        user_id: int,
+        upload_token: str,
+    ) -> UploadImageResponse:
+        """
+        Drugi krok uploadu bezpośredniego: klient zgłasza, że wgrał plik.
+
+        NIE ufamy zadeklarowanemu hashowi — plik trafia pod klucz adresowany
+        treścią i jest współdzielony między tablicami, więc podmieniony plik
+        "zatrułby" deduplikację innym użytkownikom. Pobieramy go ze Storage
+        (serwer ↔ Storage, szybko i bez udziału przeglądarki), liczymy
+        SHA-256, transkodujemy jak przy zwykłym uploadzie i kasujemy surowy
+        plik z katalogu tymczasowego. Bilet działa raz — powtórne zgłoszenie
+        tego samego uploadu dostaje 400. Rozmiar zadeklarowany przy
+        create_signed_upload nie wiąże klienta — plik ponad
+        MAX_UPLOAD_SIZE_BYTES kasujemy bez wczytywania całości i zwracamy 413.
+        """
+        await ensure_board_access(self.db, board_id, user_id, self.presence.redis)
+        jti, digest, path = _read_upload_ticket(upload_token, board_id, user_id)
+        await _consume_upload_ticket(self.presence.redis, jti)
+
+        if self._claim_stored_image(digest):
+            # Ktoś inny zdążył w międzyczasie wgrać ten sam plik
+            await delete_board_objects([path])
+            stored = self.db.query(StoredImage).filter(StoredImage.content_hash == digest).first()
+            return _build_upload_response(stored)
+
+        try:
+            file_bytes = await download_object(path, max_bytes=MAX_UPLOAD_SIZE_BYTES)
+            if file_bytes is not None:
+                ensure_object_size(len(file_bytes), MAX_UPLOAD_SIZE_BYTES)
+        except AppException as e:
+            if e.code == "FILE_TOO_LARGE":
+                await delete_board_objects([path])
+            raise
+        if file_bytes is None:
+            raise NotFoundError("Plik nie został wgrany do Storage")
+
+        if content_hash(file_bytes) != digest:
+            await delete_board_objects([path])
+            raise AppException(
+                "Zawartość pliku nie zgadza się z zadeklarowanym hashem",
+                code="UPLOAD_HASH_MISMATCH",
+                status_code=400,
+            )
+
+        try:
+            return await self._store_processed_image(digest, file_bytes)
+        finally:
+            await delete_board_objects([path])
+
+    async def _store_processed_image(self, digest: str, file_bytes: bytes) -> UploadImageResponse:
+        """Transkoduje obraz (images.py), wgrywa WebP pod kluczem z hasha i zapisuje wiersz stored_images."""
+        processed = await process_image(file_bytes)
+
+        path = content_addressed_path(digest)
+        await upload_board_image(path, processed.full, "image/webp")
+
+        stored = StoredImage(
+            content_hash=digest,
+            path=path,
+            content_type="image/webp",
+            size_bytes=len(processed.full),
+            width=processed.width,
+            height=processed.height,
+            created_at=datetime.utcnow(),
+            claimed_at=datetime.utcnow(),
+        )
+        try:
+            self.db.add(stored)
+            self.db.commit()
+        except IntegrityError:
+            # Równoległy upload tych samych bajtów zdążył wstawić wiersz
+            # pierwszy — obiekty w Storage są te same, odświeżamy claimed_at.
+            self.db.rollback()
+            self._claim_stored_image(digest)
+        return _build_upload_response(stored)
+
+    def _claim_stored_image(self, digest: str) -> bool:
+        """
+        Atomowo odświeża claimed_at obrazu o danym hashu (chroni go przed
+        zwolnieniem, zanim klient zapisze element). False jeśli takiego
+        jeszcze nie ma — albo reconcile właśnie go usunął.
+        """
+        updated = self.db.query(StoredImage).filter(
+            StoredImage.content_hash == digest
+        ).update(
+            {StoredImage.claimed_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+        self.db.commit()
+        return updated > 0
 
     def delete_element(
         self,
@@ -296,8 +606,7 @@ class WhiteboardService:
         user_id: int,
         background_tasks: Optional[BackgroundTasks] = None,
     ) -> dict:
-        board = self._get_board_or_404(board_id)
-        self._check_access(board, user_id)
+        self._require_access(board_id, user_id)
 
         element = self.db.query(BoardElement).filter(
             BoardElement.board_id == board_id,
@@ -315,8 +624,8 @@ class WhiteboardService:
         # (_cleanup_image_after_delay), bo natychmiastowe kasowanie psuło
         # undo (patrz Aktualizacja 9): Ctrl+Z przywraca element z tym samym
         # URL-em, a jeśli plik już zniknął, obrazek wraca jako szary/pusty
-        # blok. Background task sam sprawdzi tuż przed kasowaniem, czy URL
-        # nie wrócił na tablicę w międzyczasie.
+        # blok. Background task sam sprawdzi tuż przed zwolnieniem, czy
+        # jakiś element (np. przywrócony) nadal używa tego obrazu.
         if element.type == "image" and background_tasks is not None:
             src = (element.data or {}).get("src")
             if isinstance(src, str) and src:
@@ -19,13 +19,42 @@ DLACZEGO TEN PLIK ISTNIEJE (patrz: docs/known-issues.md #2):
     4. Ten URL (kilkadziesiąt bajtów) jedzie przez broadcast zamiast base64
     5. Druga osoba po prostu ładuje obrazek z URL jak każdy zwykły <img src=...>
        — przeglądarka to cache'uje, nie ma znaczenia czy zdjęcie waży 50 KB czy 5 MB
+
+DEDUPLIKACJA (adresowanie treścią):
+  Ta sama karta pracy / strona PDF bywa wklejana na wiele tablic. Zamiast
+  losowej nazwy (uuid4) pliki lądują pod `sha256/{ab}/{hash}/full.webp`
+  (pełny obraz w WebP — patrz images.py).
+  WhiteboardService.upload_image najpierw sprawdza tabelę `stored_images`
+  — jeśli hash już tam jest, zwraca istniejący URL i w ogóle nie wysyła
+  bajtów do Storage. Współdzielony plik kasujemy dopiero, gdy nie używa
+  go żaden element, a ostatni upload/dedup (`stored_images.claimed_at`)
+  był dawniej niż grace reconcile (patrz release_stored_image).
+
+UPLOAD BEZPOŚREDNI (create_signed_upload_url):
+  Duże pliki nie muszą przechodzić przez proces API — przeglądarka robi
+  `PUT` pod podpisany URL do katalogu `incoming/`, a przy /upload-complete
+  serwer pobiera plik, sprawdza hash i transkoduje go jak zwykły upload.
+
+BACKENDY (StorageBackend):
+  Funkcje modułu (upload_board_image, download_object, delete_board_objects…)
+  nie rozmawiają ze Storage same — delegują do backendu z get_storage_backend(),
+  wybieranego ustawieniem `storage_backend`:
+    - "supabase" (domyślnie) — SupabaseStorageBackend, REST API Supabase Storage
+    - "local" — LocalStorageBackend (local_storage.py), pliki na dysku serwera
+      serwowane przez /api/v1/whiteboard/files/* — self-hosting w sieci
+      szkolnej bez Supabase i benchmarki ścieżki obrazów offline
 """
+import hashlib
 import logging
 import os
-import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator
 
 import httpx
 
+from core.config import get_settings
 from core.exceptions import AppException
 
 logger = logging.getLogger(__name__)
@@ -44,19 +73,38 @@ ALLOWED_CONTENT_TYPES = {
     "image/webp": "webp",
 }
 
+# Pliki są adresowane treścią (SHA-256) — pod danym kluczem NIGDY nie
+# pojawi się inna zawartość, więc przeglądarka/CDN może je trzymać w cache
+# bez rewalidacji. Supabase zapisuje ten nagłówek jako metadane obiektu
+# i odsyła go przy każdym GET z publicznego URL-a.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-async def upload_board_image(
-    board_id: int,
-    file_bytes: bytes,
-    content_type: str,
-) -> str:
-    """
-    Uploaduje obraz do Supabase Storage i zwraca publiczny URL.
+# Prefiks kluczy adresowanych treścią. Stare pliki (sprzed deduplikacji)
+# leżą pod `{board_id}/{uuid4}.{ext}` — delete_board_folder nadal je sprząta.
+CONTENT_ADDRESSED_PREFIX = "sha256"
 
-    Rzuca AppException (400/500) jeśli coś pójdzie nie tak — upload
-    obrazu NIE jest "best effort" jak broadcast notyfikacji: jeśli się
-    nie uda, frontend musi o tym wiedzieć (inaczej element trafiłby na
-    tablicę bez działającego obrazka).
+# Prefiks surowych plików wgranych przez podpisany URL, czekających na
+# weryfikację i transkodowanie (complete_signed_upload).
+INCOMING_PREFIX = "incoming"
+
+# Rozmiar strony listowania. Supabase domyślnie zwraca tylko 100 pozycji —
+# bez jawnego limit/offset wszystko powyżej zostawało w Storage jako sieroty.
+LIST_PAGE_SIZE = 1000
+
+# Maksymalna liczba ścieżek w jednym bulk DELETE (limit Supabase Storage).
+DELETE_CHUNK_SIZE = 1000
+
+
+def validate_board_image(file_bytes: bytes, content_type: str) -> str:
+    """Sprawdza typ i rozmiar uploadu. Zwraca rozszerzenie pliku albo rzuca AppException (400)."""
+    return validate_upload_metadata(len(file_bytes), content_type)
+
+
+def validate_upload_metadata(size_bytes: int, content_type: str) -> str:
+    """
+    Jak validate_board_image, ale bez bajtów — dla uploadu bezpośrednio do
+    Storage (podpisany URL), gdzie przed uploadem znamy tylko deklarowany
+    typ i rozmiar.
     """
     if content_type not in ALLOWED_CONTENT_TYPES:
         raise AppException(
@@ -65,151 +113,440 @@ async def upload_board_image(
             status_code=400,
         )
 
-    if len(file_bytes) > MAX_UPLOAD_SIZE_BYTES:
+    if size_bytes > MAX_UPLOAD_SIZE_BYTES:
         raise AppException(
-            f"Plik za duży ({len(file_bytes) / 1024 / 1024:.1f} MB, max {MAX_UPLOAD_SIZE_BYTES / 1024 / 1024:.0f} MB)",
+            f"Plik za duży ({size_bytes / 1024 / 1024:.1f} MB, max {MAX_UPLOAD_SIZE_BYTES / 1024 / 1024:.0f} MB)",
             code="FILE_TOO_LARGE",
             status_code=400,
         )
 
-    supabase_url = os.getenv("SUPABASE_URL")
-    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    return ALLOWED_CONTENT_TYPES[content_type]
 
-    if not supabase_url or not service_role_key:
+
+def ensure_object_size(size_bytes: int, max_bytes: int | None) -> None:
+    """
+    413, gdy obiekt w Storage przekracza `max_bytes` (None = bez limitu).
+    Deklarowany rozmiar z validate_upload_metadata niczego nie gwarantuje —
+    przez podpisany URL klient może wgrać dowolnie duży plik.
+    """
+    if max_bytes is not None and size_bytes > max_bytes:
         raise AppException(
-            "Brak konfiguracji SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY na serwerze",
-            code="STORAGE_NOT_CONFIGURED",
-            status_code=500,
+            f"Plik za duży (max {max_bytes / 1024 / 1024:.0f} MB)",
+            code="FILE_TOO_LARGE",
+            status_code=413,
         )
 
-    ext = ALLOWED_CONTENT_TYPES[content_type]
-    # Losowa nazwa pliku (uuid4) — nie chcemy kolizji ani zgadywalnych URL-i
-    path = f"{board_id}/{uuid.uuid4().hex}.{ext}"
 
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                f"{supabase_url}/storage/v1/object/{BUCKET_NAME}/{path}",
-                headers={
-                    "Authorization": f"Bearer {service_role_key}",
-                    "apikey": service_role_key,
-                    "Content-Type": content_type,
-                },
-                content=file_bytes,
-            )
-            response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Upload do Supabase Storage nieudany: HTTP {e.response.status_code}: {e.response.text}")
-        raise AppException(
-            "Nie udało się zapisać obrazu (Storage error)",
-            code="STORAGE_UPLOAD_FAILED",
-            status_code=502,
-        )
-    except httpx.TimeoutException:
-        logger.error("Upload do Supabase Storage — timeout")
-        raise AppException(
-            "Zapis obrazu przekroczył limit czasu",
-            code="STORAGE_TIMEOUT",
-            status_code=504,
-        )
+def content_hash(file_bytes: bytes) -> str:
+    """SHA-256 zawartości pliku (hex) — klucz deduplikacji w tabeli stored_images."""
+    return hashlib.sha256(file_bytes).hexdigest()
 
-    public_url = f"{supabase_url}/storage/v1/object/public/{BUCKET_NAME}/{path}"
-    logger.info(f"Obraz tablicy {board_id} zapisany: {public_url}")
-    return public_url
 
+def content_addressed_path(digest: str, variant: str = "full") -> str:
+    """
+    Ścieżka obiektu w buckecie dla danego hasha i wariantu, np.
+    `sha256/ab/abcdef…/full.webp` albo `sha256/ab/abcdef…/w256.webp`.
+    Dwuznakowy podfolder, żeby listowanie jednego folderu w Storage nie
+    zwracało setek tysięcy pozycji naraz.
+    """
+    return f"{CONTENT_ADDRESSED_PREFIX}/{digest[:2]}/{digest}/{variant}.webp"
 
-def _public_url_prefix(supabase_url: str) -> str:
-    return f"{supabase_url}/storage/v1/object/public/{BUCKET_NAME}/"
 
+def staging_path(digest: str, ext: str) -> str:
+    """
+    Tymczasowa ścieżka dla uploadu bezpośrednio z przeglądarki (podpisany
+    URL). Surowy plik leży tu tylko do czasu complete_signed_upload — potem
+    jest zastępowany obrazem WebP pod content_addressed_path i kasowany.
+    """
+    return f"{INCOMING_PREFIX}/{digest}.{ext}"
+
+
+@dataclass
+class StorageObject:
+    """Pozycja z listowania Storage. Foldery mają `path` zakończone `/`."""
+    path: str
+    is_folder: bool = False
+    updated_at: datetime | None = None  # naive UTC, jak reszta dat w projekcie
+
+
+class StorageBackend(ABC):
+    """
+    Interfejs magazynu obiektów dla obrazów tablic. Ścieżki są zawsze
+    względne (`sha256/ab/…/full.webp`, `incoming/….png`, `{board_id}/….jpg`),
+    a backend odpowiada za to, gdzie fizycznie leżą i pod jakim URL-em
+    widzi je przeglądarka.
+    """
+
+    @abstractmethod
+    def public_url_prefix(self) -> str:
+        """Wspólny początek publicznych URL-i wszystkich obiektów (z końcowym `/`)."""
+
+    def public_url(self, path: str) -> str:
+        return self.public_url_prefix() + path
 
-async def delete_board_image(url: str) -> None:
+    def path_from_public_url(self, url: str) -> str | None:
+        prefix = self.public_url_prefix()
+        if not url.startswith(prefix):
+            return None
+        return url[len(prefix):]
+
+    @abstractmethod
+    async def upload(self, path: str, file_bytes: bytes, content_type: str) -> None:
+        """Zapisuje obiekt. Rzuca AppException — upload nie jest best-effort."""
+
+    @abstractmethod
+    async def create_signed_upload_url(self, path: str) -> str:
+        """URL, pod który przeglądarka może zrobić `PUT` bez naszych kluczy."""
+
+    @abstractmethod
+    async def download(self, path: str, max_bytes: int | None = None) -> bytes | None:
+        """
+        Zawartość obiektu albo None, jeśli go nie ma. Obiekt większy niż
+        `max_bytes` → AppException 413 (ensure_object_size), zanim całość
+        trafi do pamięci.
+        """
+
+    @abstractmethod
+    async def delete(self, paths: list[str]) -> None:
+        """Kasuje obiekty. Best-effort — błędy tylko logujemy."""
+
+    @abstractmethod
+    async def list_objects(self, prefix: str, limit: int = LIST_PAGE_SIZE, offset: int = 0) -> list[StorageObject]:
+        """
+        Jedna strona pozycji bezpośrednio pod `prefix` (`""` = korzeń,
+        `"{board_id}/"` = folder tablicy), posortowana po nazwie. Do
+        przejścia wszystkich stron służy iter_storage_objects.
+        """
+
+
+class SupabaseStorageBackend(StorageBackend):
     """
-    Kasuje JEDEN plik ze Storage po jego publicznym URL — wołane przy
-    usunięciu pojedynczego elementu-obrazu z tablicy (WhiteboardService.delete_element).
+    Bucket board-images w Supabase Storage, przez REST API kluczem
+    service_role (ten sam klucz co w realtime.py — omija RLS, bo
+    autoryzację i tak już sprawdziliśmy przez nasz JWT/current_user).
 
-    BEZ TEGO: Storage rósłby w nieskończoność, bo raz wgrany plik zostawałby
-    tam na zawsze nawet po usunięciu elementu z tablicy — dokładnie ten
-    scenariusz "zapchania się", o który zapytał user. Best-effort: nie
-    rzuca wyjątku (błąd kasowania nie powinien blokować usunięcia elementu
-    z tablicy — plik-sierota w Storage to dużo mniejszy problem niż
-    zablokowany UI).
+    Konfiguracja czytana przy każdym wywołaniu z SUPABASE_URL /
+    SUPABASE_SERVICE_ROLE_KEY, jak wcześniej w funkcjach modułu.
     """
-    supabase_url = os.getenv("SUPABASE_URL")
-    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    if not supabase_url or not service_role_key:
-        return
 
-    prefix = _public_url_prefix(supabase_url)
-    if not url.startswith(prefix):
-        # Nie nasz plik (np. stary base64 sprzed tej zmiany, albo zewnętrzny URL) — nic do skasowania
-        return
-    path = url[len(prefix):]
+    def public_url_prefix(self) -> str:
+        return _public_url_prefix(os.getenv("SUPABASE_URL", ""))
+
+    async def upload(self, path: str, file_bytes: bytes, content_type: str) -> None:
+        supabase_url, service_role_key = _storage_credentials()
+
+        try:
+            async with httpx.AsyncClient(timeout=15.0) as client:
+                response = await client.post(
+                    f"{supabase_url}/storage/v1/object/{BUCKET_NAME}/{path}",
+                    headers={
+                        "Authorization": f"Bearer {service_role_key}",
+                        "apikey": service_role_key,
+                        "Content-Type": content_type,
+                        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                    },
+                    content=file_bytes,
+                )
+                # 409 Duplicate = ktoś równolegle wgrał dokładnie te same bajty
+                # (ten sam hash → ta sama ścieżka). Dla klucza adresowanego
+                # treścią to nie błąd, tylko gotowy wynik.
+                if response.status_code != 409:
+                    response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Upload do Supabase Storage nieudany: HTTP {e.response.status_code}: {e.response.text}")
+            raise AppException(
+                "Nie udało się zapisać obrazu (Storage error)",
+                code="STORAGE_UPLOAD_FAILED",
+                status_code=502,
+            )
+        except httpx.TimeoutException:
+            logger.error("Upload do Supabase Storage — timeout")
+            raise AppException(
+                "Zapis obrazu przekroczył limit czasu",
+                code="STORAGE_TIMEOUT",
+                status_code=504,
+            )
+
+    async def create_signed_upload_url(self, path: str) -> str:
+        supabase_url, service_role_key = _storage_credentials()
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.post(
+                    f"{supabase_url}/storage/v1/object/upload/sign/{BUCKET_NAME}/{path}",
+                    headers={
+                        "Authorization": f"Bearer {service_role_key}",
+                        "apikey": service_role_key,
+                        "x-upsert": "true",
+                    },
+                )
+                response.raise_for_status()
+                signed_path = response.json()["url"]
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logger.error(f"Nie udało się wygenerować podpisanego URL-a uploadu ({path}): {e}")
+            raise AppException(
+                "Nie udało się przygotować uploadu (Storage error)",
+                code="STORAGE_UPLOAD_FAILED",
+                status_code=502,
+            )
+        return f"{supabase_url}/storage/v1{signed_path}"
+
+    async def download(self, path: str, max_bytes: int | None = None) -> bytes | None:
+        supabase_url, service_role_key = _storage_credentials()
+        try:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                async with client.stream(
+                    "GET",
+                    f"{supabase_url}/storage/v1/object/authenticated/{BUCKET_NAME}/{path}",
+                    headers={
+                        "Authorization": f"Bearer {service_role_key}",
+                        "apikey": service_role_key,
+                    },
+                ) as response:
+                    if response.status_code in (400, 404):
+                        return None
+                    response.raise_for_status()
+                    # Content-Length odrzuca za duży plik bez pobierania; przy
+                    # jego braku (chunked) przerywamy strumień po przekroczeniu
+                    declared = response.headers.get("content-length")
+                    if declared is not None and declared.isdigit():
+                        ensure_object_size(int(declared), max_bytes)
+                    content = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        content += chunk
+                        ensure_object_size(len(content), max_bytes)
+                    return bytes(content)
+        except httpx.HTTPError as e:
+            logger.error(f"Pobranie obiektu ze Storage nieudane ({path}): {e}")
+            raise AppException(
+                "Nie udało się odczytać obrazu (Storage error)",
+                code="STORAGE_DOWNLOAD_FAILED",
+                status_code=502,
+            )
+
+    async def delete(self, paths: list[str]) -> None:
+        supabase_url = os.getenv("SUPABASE_URL")
+        service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not supabase_url or not service_role_key or not paths:
+            return
+
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.request(
+                    "DELETE",
+                    f"{supabase_url}/storage/v1/object/{BUCKET_NAME}",
+                    headers={
+                        "Authorization": f"Bearer {service_role_key}",
+                        "apikey": service_role_key,
+                        "Content-Type": "application/json",
+                    },
+                    json={"prefixes": paths},
+                )
+                if response.status_code >= 400:
+                    logger.warning(f"Kasowanie obrazów ze Storage nieudane ({paths}): HTTP {response.status_code}: {response.text}")
+        except Exception as e:
+            logger.warning(f"Kasowanie obrazów ze Storage nieudane ({paths}): {e}")
+
+    async def list_objects(self, prefix: str, limit: int = LIST_PAGE_SIZE, offset: int = 0) -> list[StorageObject]:
+        supabase_url = os.getenv("SUPABASE_URL")
+        service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not supabase_url or not service_role_key:
+            return []
 
-    try:
         async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.request(
-                "DELETE",
-                f"{supabase_url}/storage/v1/object/{BUCKET_NAME}",
+            # Storage nie ma "usuń cały folder" — trzeba najpierw wiedzieć co w nim jest
+            response = await client.post(
+                f"{supabase_url}/storage/v1/object/list/{BUCKET_NAME}",
                 headers={
                     "Authorization": f"Bearer {service_role_key}",
                     "apikey": service_role_key,
                     "Content-Type": "application/json",
                 },
-                json={"prefixes": [path]},
+                json={
+                    "prefix": prefix,
+                    "limit": limit,
+                    "offset": offset,
+                    "sortBy": {"column": "name", "order": "asc"},
+                },
             )
             if response.status_code >= 400:
-                logger.warning(f"Kasowanie obrazu ze Storage nieudane ({path}): HTTP {response.status_code}: {response.text}")
-    except Exception as e:
-        logger.warning(f"Kasowanie obrazu ze Storage nieudane ({path}): {e}")
+                logger.warning(f"Listowanie Storage ({prefix}) nieudane: HTTP {response.status_code}")
+                return []
+            entries = response.json() or []
+
+        objects = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("name"):
+                continue
+            # Supabase zwraca "wirtualne" foldery jako pozycje bez id
+            if entry.get("id") is None:
+                objects.append(StorageObject(path=f"{prefix}{entry['name']}/", is_folder=True))
+            else:
+                objects.append(StorageObject(
+                    path=f"{prefix}{entry['name']}",
+                    updated_at=_parse_timestamp(entry.get("updated_at") or entry.get("created_at")),
+                ))
+        return objects
 
 
-async def delete_board_folder(board_id: int) -> None:
+def _parse_timestamp(value: str | None) -> datetime | None:
+    """Data ISO 8601 z API Storage → naive UTC (None, jeśli brak/nieczytelna)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+_storage_backend: StorageBackend | None = None
+
+
+def get_storage_backend() -> StorageBackend:
+    """Backend Storage wg ustawienia `storage_backend` (singleton, tworzony leniwie)."""
+    global _storage_backend
+    if _storage_backend is None:
+        settings = get_settings()
+        if settings.storage_backend == "local":
+            from .local_storage import LocalStorageBackend
+            _storage_backend = LocalStorageBackend(
+                settings.local_storage_dir,
+                f"{settings.storage_public_base_url.rstrip('/')}/api/v1/whiteboard/files/",
+            )
+        elif settings.storage_backend == "supabase":
+            _storage_backend = SupabaseStorageBackend()
+        else:
+            raise AppException(
+                f"Nieznany storage_backend: {settings.storage_backend}",
+                code="STORAGE_NOT_CONFIGURED",
+                status_code=500,
+            )
+    return _storage_backend
+
+
+def public_url_for(path: str) -> str:
+    """Publiczny URL obiektu (w buckecie board-images albo w lokalnym Storage)."""
+    return get_storage_backend().public_url(path)
+
+
+def path_from_public_url(url: str) -> str | None:
+    """Odwrotność public_url_for — None jeśli URL nie wskazuje na nasz Storage."""
+    return get_storage_backend().path_from_public_url(url)
+
+
+async def upload_board_image(
+    path: str,
+    file_bytes: bytes,
+    content_type: str,
+) -> str:
     """
-    Kasuje WSZYSTKIE obrazy danej tablicy ze Storage naraz (cały folder
-    `{board_id}/`) — wołane przy usunięciu całej tablicy
-    (boards/service.py → delete_board). Best-effort, jak wyżej.
+    Uploaduje obraz do Storage pod podaną ścieżką (zwykle z
+    content_addressed_path) i zwraca publiczny URL.
+
+    Rzuca AppException (400/500) jeśli coś pójdzie nie tak — upload
+    obrazu NIE jest "best effort" jak broadcast notyfikacji: jeśli się
+    nie uda, frontend musi o tym wiedzieć (inaczej element trafiłby na
+    tablicę bez działającego obrazka).
     """
+    validate_board_image(file_bytes, content_type)
+    backend = get_storage_backend()
+    await backend.upload(path, file_bytes, content_type)
+
+    public_url = backend.public_url(path)
+    logger.info(f"Obraz zapisany w Storage: {public_url}")
+    return public_url
+
+
+def _storage_credentials() -> tuple[str, str]:
+    """(SUPABASE_URL, SERVICE_ROLE_KEY) albo AppException 500, jeśli Storage nie jest skonfigurowany."""
     supabase_url = os.getenv("SUPABASE_URL")
     service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     if not supabase_url or not service_role_key:
-        return
+        raise AppException(
+            "Brak konfiguracji SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY na serwerze",
+            code="STORAGE_NOT_CONFIGURED",
+            status_code=500,
+        )
+    return supabase_url, service_role_key
 
-    headers = {
-        "Authorization": f"Bearer {service_role_key}",
-        "apikey": service_role_key,
-        "Content-Type": "application/json",
-    }
 
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # 1. Wylistuj wszystkie pliki w folderze tablicy (Storage nie ma
-            #    "usuń cały folder" — trzeba najpierw wiedzieć co w nim jest)
-            list_response = await client.post(
-                f"{supabase_url}/storage/v1/object/list/{BUCKET_NAME}",
-                headers=headers,
-                json={"prefix": f"{board_id}/"},
-            )
-            if list_response.status_code >= 400:
-                logger.warning(f"Listowanie obrazów tablicy {board_id} nieudane: HTTP {list_response.status_code}")
-                return
-
-            files = list_response.json()
-            if not files:
-                return
-            paths = [f"{board_id}/{f['name']}" for f in files if isinstance(f, dict) and f.get("name")]
-            if not paths:
-                return
-
-            # 2. Skasuj je wszystkie jednym requestem
-            delete_response = await client.request(
-                "DELETE",
-                f"{supabase_url}/storage/v1/object/{BUCKET_NAME}",
-                headers=headers,
-                json={"prefixes": paths},
-            )
-            if delete_response.status_code >= 400:
-                logger.warning(f"Kasowanie obrazów tablicy {board_id} nieudane: HTTP {delete_response.status_code}")
+async def create_signed_upload_url(path: str) -> str:
+    """
+    Podpisany URL, pod który PRZEGLĄDARKA może zrobić `PUT` z bajtami
+    pliku bez naszych kluczy. Dzięki temu duże zdjęcia nie przechodzą
+    przez proces API (klient → Storage bezpośrednio). Zwraca pełny URL
+    uploadu (z tokenem w query stringu).
+    """
+    return await get_storage_backend().create_signed_upload_url(path)
+
+
+async def download_object(path: str, max_bytes: int | None = None) -> bytes | None:
+    """
+    Pobiera obiekt ze Storage (serwer ↔ Storage, bez udziału przeglądarki).
+    None jeśli obiektu nie ma — np. klient zgłosił zakończenie uploadu,
+    którego nie zrobił. Obiekt większy niż `max_bytes` → AppException 413.
+    """
+    return await get_storage_backend().download(path, max_bytes)
+
+
+def _public_url_prefix(supabase_url: str) -> str:
+    return f"{supabase_url}/storage/v1/object/public/{BUCKET_NAME}/"
+
+
+async def delete_board_objects(paths: list[str]) -> None:
+    """
+    Kasuje podane obiekty (ścieżki w Storage) bulk requestami po
+    DELETE_CHUNK_SIZE — wołane gdy zwalniamy obraz adresowany treścią
+    razem ze wszystkimi jego wariantami, przy purge folderu tablicy i w
+    reconcile_storage. Best-effort: backend tylko loguje błędy kasowania
+    (błąd Storage nie może blokować usunięcia elementu/tablicy), a
+    pozostawione sieroty zbierze reconcile_storage.
+    """
+    backend = get_storage_backend()
+    for start in range(0, len(paths), DELETE_CHUNK_SIZE):
+        await backend.delete(paths[start:start + DELETE_CHUNK_SIZE])
+
+
+async def iter_storage_objects(prefix: str = "", recursive: bool = False) -> AsyncIterator[StorageObject]:
+    """
+    Wszystkie pliki pod `prefix`, strona po stronie (LIST_PAGE_SIZE).
+    `recursive=True` schodzi też do podfolderów. Uwaga: paginacja jest po
+    offsecie, więc NIE kasuj w trakcie iteracji — najpierw zbierz ścieżki.
+    """
+    backend = get_storage_backend()
+    folders: list[str] = []
+    offset = 0
+    while True:
+        page = await backend.list_objects(prefix, limit=LIST_PAGE_SIZE, offset=offset)
+        for obj in page:
+            if obj.is_folder:
+                folders.append(obj.path)
             else:
-                logger.info(f"Skasowano {len(paths)} obraz(ów) tablicy {board_id} ze Storage")
+                yield obj
+        if len(page) < LIST_PAGE_SIZE:
+            break
+        offset += len(page)
+
+    if recursive:
+        for folder in folders:
+            async for obj in iter_storage_objects(folder, recursive=True):
+                yield obj
+
+
+async def delete_board_folder(board_id: int) -> None:
+    """
+    Kasuje WSZYSTKIE obrazy danej tablicy ze Storage (cały folder
+    `{board_id}/`, wszystkie strony listowania, kasowanie w paczkach) —
+    wołane przy usunięciu tablicy (BoardService.delete_board) i całego
+    workspace'a (purge_boards_storage). Best-effort, jak wyżej.
+    """
+    try:
+        paths = [obj.path async for obj in iter_storage_objects(f"{board_id}/", recursive=True)]
+        if not paths:
+            return
+        await delete_board_objects(paths)
+        logger.info(f"Skasowano {len(paths)} obraz(ów) tablicy {board_id} ze Storage")
     except Exception as e:
         logger.warning(f"Kasowanie folderu tablicy {board_id} ze Storage nieudane: {e}")
@@ -0,0 +1,207 @@
+"""
+WORKSPACE ACL CACHE - członkostwo i rola w pamięci workera
+
+Problem:
+    require_membership / require_owner (authorization.py) robiły SELECT
+    workspaces + SELECT workspace_members przy każdym wywołaniu endpointów
+    workspace'ów, członków i zaproszeń — choć członkostwo zmienia się
+    rzadko, a sprawdzane jest ciągle.
+
+Rozwiązanie:
+    LRU w procesie, klucz (workspace_id, user_id) → WorkspaceAcl: kto jest
+    właścicielem workspace'a i jaka jest rola usera (None = nie jest
+    członkiem). Z wpisu authorization.py składa obiekty Workspace /
+    WorkspaceMember przypięte do sesji bez SELECT-a — pozostałe kolumny
+    (name, is_favourite, ...) doładują się dopiero, gdy ktoś je przeczyta.
+
+Unieważnianie (kilka workerów):
+    Serwis zmieniający członkostwo (dołączenie, opuszczenie, usunięcie
+    członka, zmiana roli, przyjęcie zaproszenia, usunięcie workspace'a)
+    woła invalidate_workspace_acl() PRZED commitem: wpis znika lokalnie,
+    a do outboxa trafia event w tej samej transakcji. Handler outboxa robi
+    PUBLISH na kanał `workspace:acl`, a listener w każdym workerze
+    (start_workspace_acl_listener, main.py) usuwa swoje wpisy. Ten sam
+    handler kasuje zgody na tablice zapamiętane w Redis
+    (boards/access.py, forget_board_access).
+
+    Cache działa tylko, gdy listener jest zasubskrybowany — bez subskrypcji
+    worker nie dowiedziałby się o zmianach, więc pyta bazę. Po zerwaniu
+    połączenia cache jest czyszczony (wiadomości mogły przepaść), a TTL
+    (settings.workspace_acl_cache_ttl_seconds) ogranicza szkody, gdyby
+    jakaś mimo to nie doszła.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from api.v1.boards.access import forget_board_access
+from core.config import get_settings
+from core.logging import get_logger
+from core.outbox import add_outbox_event, register_outbox_handler
+from core.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+CHANNEL = "workspace:acl"
+ACL_EVENT = "workspace_acl"
+LOCAL_MAX_ENTRIES = 10_000
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class WorkspaceAcl:
+    created_by: int
+    member_id: Optional[int]  # WorkspaceMember.id; None = nie jest członkiem
+    role: Optional[str]
+
+
+# (workspace_id, user_id) → (wygasa, acl)
+_CacheEntry = Tuple[float, WorkspaceAcl]
+
+
+class WorkspaceAclCache:
+    """LRU w procesie. `enabled` = listener zasubskrybowany i TTL > 0."""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.subscribed = False
+        self.hits = 0
+        self.misses = 0
+        self._local: "OrderedDict[Tuple[int, int], _CacheEntry]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.subscribed and get_settings().workspace_acl_cache_ttl_seconds > 0
+
+    def get(self, workspace_id: int, user_id: int) -> Optional[WorkspaceAcl]:
+        if not self.enabled:
+            return None
+        entry = self._local.get((workspace_id, user_id))
+        if entry is None or time.monotonic() >= entry[0]:
+            self._local.pop((workspace_id, user_id), None)
+            self.misses += 1
+            return None
+        self._local.move_to_end((workspace_id, user_id))
+        self.hits += 1
+        return entry[1]
+
+    def put(self, workspace_id: int, user_id: int, acl: WorkspaceAcl) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + get_settings().workspace_acl_cache_ttl_seconds
+        self._local[(workspace_id, user_id)] = (expires_at, acl)
+        self._local.move_to_end((workspace_id, user_id))
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def drop(self, workspace_id: int, user_id: Optional[int] = None) -> None:
+        """user_id=None — wszystkie wpisy workspace'a (usunięcie)."""
+        if user_id is not None:
+            self._local.pop((workspace_id, user_id), None)
+            return
+        for key in [key for key in self._local if key[0] == workspace_id]:
+            del self._local[key]
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "entries": len(self._local), "hits": self.hits, "misses": self.misses}
+
+
+acl_cache = WorkspaceAclCache()
+
+
+# ── Unieważnianie (przez outbox → pub/sub) ─────────────────────────────────
+
+def invalidate_workspace_acl(db: Session, workspace_id: int, user_id: Optional[int] = None) -> None:
+    """
+    Wołać PRZED commitem zmiany członkostwa (commit i wake_outbox_dispatcher
+    robi wołający). user_id=None — cały workspace.
+    """
+    acl_cache.drop(workspace_id, user_id)
+    add_outbox_event(db, ACL_EVENT, {"workspace_id": workspace_id, "user_id": user_id})
+
+
+async def publish_acl_invalidations(events: List[Dict[str, Any]], redis_client: redis.Redis | None = None) -> bool:
+    """Handler outboxa: jeden PUBLISH na (workspace, user) + skasowanie zgód na tablice."""
+    unique = {(event["workspace_id"], event.get("user_id")) for event in events}
+    client = redis_client or get_redis_client()
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for workspace_id, user_id in unique:
+                pipe.publish(CHANNEL, json.dumps({"workspace_id": workspace_id, "user_id": user_id}))
+            await pipe.execute()
+        await forget_board_access((user_id for _, user_id in unique), client)
+    except RedisError as e:
+        logger.warning(f"Workspace ACL: publikacja unieważnień nieudana: {e}")
+        return False
+    return True
+
+
+register_outbox_handler(ACL_EVENT, publish_acl_invalidations)
+
+
+def _apply(raw: Any) -> None:
+    try:
+        message = json.loads(raw)
+        acl_cache.drop(int(message["workspace_id"]), message.get("user_id"))
+    except (ValueError, TypeError, KeyError):
+        logger.warning(f"Workspace ACL: nieczytelna wiadomość {raw!r}")
+
+
+# ── Listener ───────────────────────────────────────────────────────────────
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+async def _listen(redis_client: redis.Redis | None = None) -> None:
+    while True:
+        pubsub = (redis_client or get_redis_client()).pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            acl_cache.subscribed = True
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    _apply(message["data"])
+        except (RedisError, OSError) as e:
+            logger.warning(f"Workspace ACL: subskrypcja zerwana, cache wyłączony do ponownego połączenia: {e}")
+        finally:
+            # Wiadomości z czasu bez subskrypcji przepadły — wpisy mogą być nieaktualne
+            acl_cache.subscribed = False
+            acl_cache.clear()
+            try:
+                await pubsub.aclose()
+            except RedisError:
+                pass
+        await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+
+def start_workspace_acl_listener(redis_client: redis.Redis | None = None) -> None:
+    """Startuje listener unieważnień w tle (main.py, startup)."""
+    global _listener_task
+    if get_settings().workspace_acl_cache_ttl_seconds <= 0 or _listener_task is not None:
+        return
+    _listener_task = asyncio.create_task(_listen(redis_client), name="workspace-acl:listener")
+
+
+async def stop_workspace_acl_listener() -> None:
+    """Zatrzymuje listener (main.py, shutdown) — cache wyłącza się razem z nim."""
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        await asyncio.gather(_listener_task, return_exceptions=True)
+    _listener_task = None
+    acl_cache.subscribed = False
+    acl_cache.clear()
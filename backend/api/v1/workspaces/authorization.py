@@ -1,11 +1,20 @@
 """
 Wspólna logika autoryzacji dla modułu workspaces - membership/ownership checks.
 Używane przez WorkspaceService, InviteService i MemeberService.
+
+Członkostwo i rola są cache'owane w pamięci workera (acl_cache.py) —
+trafienie nie robi żadnego zapytania, chybienie robi jedno
+(workspace + membership LEFT JOIN-em).
 """
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 
 from core.exceptions import NotFoundError, AppException
 from core.models import Workspace, WorkspaceMember
+from .acl_cache import WorkspaceAcl, acl_cache
 
 
 def get_workspace_or_404(db: Session, workspace_id: int) -> Workspace:
@@ -15,26 +24,62 @@ def get_workspace_or_404(db: Session, workspace_id: int) -> Workspace:
         raise NotFoundError("Workspace nie został znaleziony")
     return workspace
 
+def _attach(db: Session, model, **columns):
+    """Obiekt z cache przypięty do sesji bez SELECT-a; pozostałe kolumny doładują się przy dostępie."""
+    existing = db.identity_map.get(identity_key(model, columns["id"]))
+    if existing is not None:
+        return existing
+    instance = model(**columns)
+    make_transient_to_detached(instance)
+    db.add(instance)
+    return instance
+
+def _resolve(db: Session, workspace_id: int, user_id: int) -> tuple[Workspace, Optional[WorkspaceMember]]:
+    """(workspace, membership albo None) — z cache ACL albo jednym zapytaniem. Brak workspace'a → 404."""
+    acl = acl_cache.get(workspace_id, user_id)
+    if acl is not None:
+        workspace = _attach(db, Workspace, id=workspace_id, created_by=acl.created_by)
+        membership = None if acl.member_id is None else _attach(
+            db, WorkspaceMember, id=acl.member_id, workspace_id=workspace_id, user_id=user_id, role=acl.role,
+        )
+        return workspace, membership
+
+    row = (
+        db.query(Workspace, WorkspaceMember)
+        .outerjoin(WorkspaceMember, and_(
+            WorkspaceMember.workspace_id == Workspace.id,
+            WorkspaceMember.user_id == user_id,
+        ))
+        .filter(Workspace.id == workspace_id)
+        .first()
+    )
+    if row is None:
+        raise NotFoundError("Workspace nie został znaleziony")
+
+    workspace, membership = row
+    acl_cache.put(workspace_id, user_id, WorkspaceAcl(
+        created_by=workspace.created_by,
+        member_id=membership.id if membership else None,
+        role=membership.role if membership else None,
+    ))
+    return workspace, membership
+
 def require_membership(db: Session, workspace_id: int, user_id: int) -> tuple[Workspace, WorkspaceMember]:
     """Sprawdza czy workspace istnieje i user jest jego członkiem. Zwraca (workspace, membership) albo rzuca NotFoundError."""
-    workspace = get_workspace_or_404(db, workspace_id)
-    membership = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == workspace_id,
-        WorkspaceMember.user_id == user_id
-    ).first()
+    workspace, membership = _resolve(db, workspace_id, user_id)
     if not membership:
         raise NotFoundError("Nie masz dostępu do tego workspace'a")
     return workspace, membership
 
 def require_owner(
-    db: Session, 
-    workspace_id: int, 
-    user_id: int, 
+    db: Session,
+    workspace_id: int,
+    user_id: int,
     message: str = "Tylko właściciel może wykonać tę operację"
 ) -> Workspace:
-    """Sprawdza czy workspace istnieje i user jest jego właścicielem. 
+    """Sprawdza czy workspace istnieje i user jest jego właścicielem.
     Zwraca Workspace albo rzuca NotFoundError/AppException."""
-    workspace = get_workspace_or_404(db, workspace_id)
+    workspace, _ = _resolve(db, workspace_id, user_id)
     if workspace.created_by != user_id:
         raise AppException(message, status_code=403)
-    return workspace
\ No newline at end of file
+    return workspace
@@ -1,7 +1,6 @@
 """
 Invites service — zaproszenia do workspace'ów.
 """
-import asyncio
 import secrets
 from datetime import datetime, timedelta
 from typing import List
@@ -13,7 +12,9 @@ from core.exceptions import NotFoundError, ConflictError, AppException
 from core.models import User, WorkspaceInvite, WorkspaceMember
 from core.logging import get_logger
 from api.v1.notifications.service import create_notification
-from api.v1.notifications.realtime import broadcast_notification
+from api.v1.notifications.realtime import enqueue_broadcast
+from core.outbox import wake_outbox_dispatcher
+from ..acl_cache import invalidate_workspace_acl
 from ..authorization import get_workspace_or_404, require_membership
 from .utils import send_workspace_invite_email
 from .schemas import (
@@ -22,13 +23,6 @@ from .schemas import (
 
 logger = get_logger(__name__)
 
-def _log_invite_email_failure(task: asyncio.Task) -> None:
-    """Loguje błąd wysyłki maila zaproszenia z fire-and-forget taska."""
-    exc = task.exception()
-    if exc:
-        logger.error(f"Błąd wysyłania emaila zaproszenia: {exc}", exc_info=exc)
-
-
 class InviteService:
     def __init__(self, db: Session):
         self.db = db
@@ -78,9 +72,11 @@ class InviteService:
                 is_used=False,
                 created_at=datetime.utcnow(),
             )
+            # Zaproszenie, powiadomienie i event Broadcast w JEDNEJ transakcji —
+            # wysyłka do Supabase idzie z outboxa w tle (core/outbox.py),
+            # odpowiedź HTTP na nią nie czeka
             db.add(new_invite)
-            db.commit()
-            db.refresh(new_invite)
+            db.flush()
 
             notification = create_notification(
                 db=db,
@@ -96,36 +92,38 @@ class InviteService:
                     "expires_at": expires_at.isoformat(),
                     "created_at": new_invite.created_at.isoformat(),
                 },
+                commit=False,
             )
-
-            try:
-                await broadcast_notification(
-                    user_id=invited_user_id,
-                    event="new_invite",
-                    payload={
-                        "workspace_id": workspace.id,
-                        "workspace_name": workspace.name,
-                        "inviter_name": inviter_name,
-                        "invite_token": invite_token,
-                        "notification_id": notification.id,
-                    },
-                )
-            except Exception:
-                pass
+            enqueue_broadcast(
+                db,
+                user_id=invited_user_id,
+                event="new_invite",
+                payload={
+                    "workspace_id": workspace.id,
+                    "workspace_name": workspace.name,
+                    "inviter_name": inviter_name,
+                    "invite_token": invite_token,
+                    "notification_id": notification.id,
+                },
+            )
+            db.commit()
+            db.refresh(new_invite)
+            wake_outbox_dispatcher()
 
             settings = get_settings()
             if send_email and settings.resend_api_key and settings.resend_api_key != "SKIP":
-                task = asyncio.create_task(send_workspace_invite_email(
+                # Tylko dopisanie do kolejki maili (core/email/outbox.py) — wysyłka w tle
+                try:
+                    await send_workspace_invite_email(
                         invited_email=invited_user.email,
                         invited_name=invited_user.username,
                         inviter_name=inviter_name,
                         workspace_name=workspace.name,
                         invite_token=invite_token,
-                        resend_api_key=settings.resend_api_key,
-                        from_email=settings.from_email,
                         frontend_url="https://easylesson.app",
-                    ))
-                task.add_done_callback(_log_invite_email_failure)
+                    )
+                except Exception as e:
+                    logger.error(f"Błąd dopisania emaila zaproszenia do kolejki: {e}", exc_info=e)
 
             return InviteResponse(
                 id=new_invite.id,
@@ -236,7 +234,9 @@ class InviteService:
                 joined_at=datetime.utcnow(),
             ))
             db.delete(invite)
+            invalidate_workspace_acl(db, invite.workspace_id, user_id)
             db.commit()
+            wake_outbox_dispatcher()
             return AcceptInviteResponse(
                 message=f"Pomyślnie dołączono do workspace'a '{workspace.name}'",
                 workspace_id=workspace.id,
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session, joinedload
 
 from core.models import WorkspaceMember
 from core.exceptions import NotFoundError, AppException
+from core.outbox import wake_outbox_dispatcher
+from ..acl_cache import invalidate_workspace_acl
 from ..authorization import require_membership, require_owner
 from .schemas import (
     WorkspaceMemberResponse, WorkspaceMembersListResponse,
@@ -69,7 +71,9 @@ class MemberService:
             raise NotFoundError("Użytkownik nie jest członkiem tego workspace'a")
 
         db.delete(membership)
+        invalidate_workspace_acl(db, workspace_id, member_user_id)
         db.commit()
+        wake_outbox_dispatcher()
         
         return RemoveMemberResponse(
             message=f"Użytkownik id:{member_user_id} został usunięty z workspace'a"
@@ -97,7 +101,9 @@ class MemberService:
             raise NotFoundError("Użytkownik nie jest członkiem tego workspace'a")
 
         membership.role = new_role
+        invalidate_workspace_acl(db, workspace_id, member_user_id)
         db.commit()
+        wake_outbox_dispatcher()
         
         return {
             "message": f"Zmieniono rolę użytkownika id:{member_user_id} na '{new_role}'",
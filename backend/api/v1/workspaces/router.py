@@ -1,7 +1,7 @@
 """
 Workspace CRUD router — /api/v1/workspaces/*
 """
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, status
 
 from ..auth.dependencies import get_current_user
 from core.database import get_db
@@ -20,7 +20,11 @@ router = APIRouter(tags=["Workspaces"])
 async def get_workspaces(db=Depends(get_db), current_user=Depends(get_current_user)):
     service = WorkspaceService(db)
     workspaces = service.get_user_workspaces(current_user.id)
-    return ApiResponse(success=True, data=WorkspaceListResponse(workspaces=workspaces, total=len(workspaces)))
+    # Pusta lista tuż po rejestracji to nie "brak workspace'ów" — onboarding jeszcze w kolejce
+    pending = not workspaces and service.is_onboarding_pending(current_user.id)
+    return ApiResponse(success=True, data=WorkspaceListResponse(
+        workspaces=workspaces, total=len(workspaces), onboarding_pending=pending,
+    ))
 
 @router.get("/{workspace_id}", response_model=ApiResponse[WorkspaceWithBoardsResponse])
 async def get_workspace(
@@ -46,9 +50,14 @@ async def update_existing_workspace(workspace_id: int, workspace_data: Workspace
     return ApiResponse(success=True, data=service.update_workspace(workspace_id, workspace_data, current_user.id))
 
 @router.delete("/{workspace_id}", response_model=ApiResponse[MessageResponse])
-async def delete_existing_workspace(workspace_id: int, db=Depends(get_db), current_user=Depends(get_current_user)):
+async def delete_existing_workspace(
+    workspace_id: int,
+    background_tasks: BackgroundTasks,
+    db=Depends(get_db),
+    current_user=Depends(get_current_user),
+):
     service = WorkspaceService(db)
-    result = service.delete_workspace(workspace_id, current_user.id)
+    result = service.delete_workspace(workspace_id, current_user.id, background_tasks)
     return ApiResponse(success=True, data=MessageResponse(**result))
 
 @router.delete("/{workspace_id}/leave", response_model=ApiResponse[MessageResponse])
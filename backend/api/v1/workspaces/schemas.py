@@ -35,6 +35,8 @@ class WorkspaceWithBoardsResponse(WorkspaceResponse):
 class WorkspaceListResponse(BaseModel):
     workspaces: List[WorkspaceResponse]
     total: int
+    # Świeże konto, startowy workspace jeszcze się tworzy (onboarding w tle) — frontend odpytuje ponownie
+    onboarding_pending: bool = False
 
 
 class ToggleFavouriteRequest(BaseModel):
@@ -2,13 +2,16 @@
 Workspace service — CRUD workspace'ów.
 """
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
+from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
 from api.v1.boards.service import BoardService
 
 from core.exceptions import AppException
-from core.models import Workspace, WorkspaceMember
+from core.models import Board, BoardElement, OutboxEvent, User, Workspace, WorkspaceMember
+from core.outbox import wake_outbox_dispatcher
+from .acl_cache import invalidate_workspace_acl
 from .authorization import require_membership, require_owner
 from .schemas import (
     WorkspaceCreate, WorkspaceUpdate, 
@@ -80,6 +83,26 @@ class WorkspaceService:
 
         return workspaces_data
 
+    def is_onboarding_pending(self, user_id: int) -> bool:
+        """
+        Startowy workspace jeszcze nie założony, a event onboardingu wciąż
+        czeka w outboxie (api/v1/onboarding/service.py). Event porzucony
+        po OUTBOX_MAX_ATTEMPTS ("failed") albo brak eventu → False, żeby
+        dashboard nie czekał w nieskończoność na coś, co nie nastąpi.
+        """
+        from api.v1.onboarding.service import ONBOARDING_EVENT
+
+        if self.db.query(User.onboarded_at).filter(User.id == user_id).scalar() is not None:
+            return False
+        # Czekających eventów onboardingu jest garstka — payload (JSONB)
+        # sprawdzamy w Pythonie
+        payloads = (
+            self.db.query(OutboxEvent.payload)
+            .filter(OutboxEvent.kind == ONBOARDING_EVENT, OutboxEvent.status == "pending")
+            .all()
+        )
+        return any(payload.get("user_id") == user_id for (payload,) in payloads)
+
     async def get_workspace_with_boards(self, workspace_id: int, user_id: int, boards_limit: int = 50, boards_offset: int = 0) -> WorkspaceWithBoardsResponse:
         """Pobiera workspace wraz z listą boardów. Sprawdza, czy użytkownik jest członkiem workspace'a."""
         db = self.db
@@ -155,13 +178,41 @@ class WorkspaceService:
             is_favourite=membership.is_favourite,
         )
 
-    def delete_workspace(self, workspace_id: int, user_id: int) -> dict:
-        """Usuwa workspace — tylko owner."""
+    def delete_workspace(
+        self,
+        workspace_id: int,
+        user_id: int,
+        background_tasks: Optional[BackgroundTasks] = None,
+    ) -> dict:
+        """
+        Usuwa workspace — tylko owner. Tablice znikają kaskadowo z bazy, a ich
+        obrazy ze Storage sprząta w tle purge_boards_storage (jak delete_board,
+        tylko dla wszystkich tablic naraz).
+        """
         db = self.db
         workspace = require_owner(db, workspace_id, user_id, "Tylko właściciel może usunąć workspace")
 
+        board_ids = [board_id for (board_id,) in db.query(Board.id).filter(Board.workspace_id == workspace_id)]
+        image_srcs = [
+            (data or {}).get("src")
+            for (data,) in db.query(BoardElement.data).join(Board, Board.id == BoardElement.board_id).filter(
+                Board.workspace_id == workspace_id,
+                BoardElement.type == "image",
+            )
+        ]
+
         db.delete(workspace)
+        invalidate_workspace_acl(db, workspace_id)
         db.commit()
+        wake_outbox_dispatcher()
+
+        if background_tasks is not None and board_ids:
+            from api.v1.whiteboard.service import purge_boards_storage
+            background_tasks.add_task(
+                purge_boards_storage,
+                board_ids,
+                [src for src in image_srcs if isinstance(src, str) and src],
+            )
         return {"message": "Workspace został usunięty"}
 
     def toggle_workspace_favourite(
@@ -187,5 +238,7 @@ class WorkspaceService:
             )
 
         db.delete(membership)
+        invalidate_workspace_acl(db, workspace_id, user_id)
         db.commit()
+        wake_outbox_dispatcher()
         return {"message": "Opuściłeś workspace"}
\ No newline at end of file
@@ -26,9 +26,15 @@ class Settings(BaseSettings):
 
     access_token_expire_minutes: int = 15   # Krótki czas życia - refresh token odnawia sesję
     refresh_token_expire_days: int = 7  # Dłuższy czas życia - użytkownik nie musi się logować przez tydzień
+    refresh_token_audit: bool = False  # refresh tokeny żyją w Redis; True = dodatkowo log w tabeli refresh_tokens
     cookie_secure: bool = False  # Ustaw na True w produkcji (HTTPS)
     cookie_samesite: str = "lax"  # "strict" | "lax" | "none"
     cookie_domain: str = ""  # np. ".easylesson.app" w produkcji (pusta = brak domain attr)
+    principal_cache_ttl_seconds: int = 60  # dane zalogowanego usera w Redis (api/v1/auth/principal_cache.py)
+    principal_cache_local_ttl_seconds: float = 5  # to samo w pamięci procesu — inne workery nie widzą unieważnień
+    bcrypt_rounds: int = 12  # koszt bcrypt; starsze hashe z mniejszym kosztem są przepisywane przy logowaniu
+    password_hash_workers: int = 4  # wątki puli bcrypt (api/v1/auth/password_pool.py)
+    password_hash_max_pending: int = 64  # ile operacji bcrypt może czekać, ponad to 503
 
     # === EMAIL (RESEND) ===
     resend_api_key: str  # WYMAGANE - klucz API z resend.com
@@ -37,6 +43,8 @@ class Settings(BaseSettings):
     from_email: str  # WYMAGANE - adres nadawcy emaili
     # Development: onboarding@resend.dev (testowy, działa od razu)
     # Production: noreply@twoja-domena.com (wymaga weryfikacji domeny w Resend)
+    email_transport: str = "resend"  # "resend" | "fake" (maile tylko w logach — lokalnie, bez sieci)
+    email_worker_poll_interval_seconds: float = 2  # co ile worker kolejki maili sprawdza Redis (0 = wyłączony)
 
     # === GOOGLE OAUTH ===
     google_client_id: str  # WYMAGANE - Client ID z Google Cloud Console
@@ -45,6 +53,34 @@ class Settings(BaseSettings):
         # === REDIS (kody weryfikacyjne) ===
     redis_url: str  # WYMAGANE - connection string do Redis (np. redis://localhost:6379/0)
     verification_code_expire_minutes: int = 15  # czas ważności kodu weryfikacji/resetu hasła
+    rate_limit_redis_timeout_seconds: float = 0.5  # dłużej = Redis uznany za niedostępny, limit liczony lokalnie
+    rate_limit_breaker_failure_threshold: int = 3  # tyle błędów Redis z rzędu otwiera breaker (core/rate_limit_fallback.py)
+    rate_limit_breaker_probe_interval_seconds: float = 5  # co ile PING do Redis, gdy breaker otwarty
+    rate_limit_local_max_keys: int = 10_000  # max kluczy lokalnych token bucketów per worker (LRU)
+
+    # === OBRAZY TABLIC ===
+    image_processing_workers: int = 2  # procesy do transkodowania WebP (api/v1/whiteboard/images.py)
+    storage_backend: str = "supabase"  # "supabase" | "local" (pliki na dysku serwera, bez Supabase)
+    local_storage_dir: str = "storage"  # katalog plików dla storage_backend="local"
+    storage_public_base_url: str = "http://localhost:8000"  # adres API widziany przez przeglądarkę (URL-e plików lokalnych)
+    storage_reconcile_interval_hours: float = 24  # co ile reconcile Storage w tle (0 = wyłączone, zostaje manage.py)
+    storage_reconcile_grace_hours: float = 24  # obiektów młodszych niż to reconcile nie rusza (świeże uploady)
+    board_access_cache_ttl_seconds: float = 0  # ile sekund Redis pamięta przyznany dostęp do tablicy przy uploadach; kasowany przy zmianie członkostwa (0 = wyłączone, api/v1/boards/access.py)
+
+    # === RELAY TABLIC (WebSocket) ===
+    relay_tick_hz: float = 20  # ile ramek kursorów/przeciągania na sekundę dostaje klient (api/v1/whiteboard/frames.py)
+
+    # === WORKSPACE'Y ===
+    workspace_acl_cache_ttl_seconds: float = 300  # członkostwo/rola w pamięci workera, unieważniane przez pub/sub (0 = wyłączone, api/v1/workspaces/acl_cache.py)
+
+    # === OUTBOX (core/outbox.py) ===
+    outbox_poll_interval_seconds: float = 1.0  # co ile dispatcher sprawdza outbox (0 = wyłączony)
+
+    # === POWIADOMIENIA ===
+    unread_counter_repair_interval_hours: float = 24  # co ile naprawa users.unread_notifications (0 = wyłączona, zostaje manage.py)
+    notification_partitions_ahead: int = 3  # ile przyszłych miesięcy partycji notifications zakładać z wyprzedzeniem
+    notification_retention_months: int = 6  # po ilu miesiącach usuwać partycje powiadomień, także nieprzeczytanych (0 = bez retencji)
+    notification_partition_maintenance_interval_hours: float = 24  # co ile utrzymanie partycji (0 = wyłączone, zostaje manage.py)
 
     port: int = 8000
     
@@ -1,4 +1,4 @@
-"""Centralny moduł wysyłki maili - transport (Resend) + szablony."""
-from .client import send_email
+"""Centralny moduł wysyłki maili - kolejka (outbox w Redis), transport (Resend) + szablony."""
+from .outbox import enqueue_email, start_email_worker, stop_email_worker
 
-__all__=["send_email"]
\ No newline at end of file
+__all__ = ["enqueue_email", "start_email_worker", "stop_email_worker"]
@@ -1,26 +1,120 @@
 """
-Wspólny transport mailowy. 
+Wspólny transport mailowy.
 Jedno miejsce, które zna szczegóły providera (Resend).
+
+Wysyłka idzie przez REST API Resend na współdzielonym, asynchronicznym
+kliencie httpx (pula połączeń per worker) — wcześniej synchroniczne
+resend.Emails.send blokowało event loop na cały request do Resend.
+Kilka maili naraz = jeden POST na /emails/batch.
+
+Nikt poza workerem outboxa (core/email/outbox.py) nie woła transportu —
+endpointy tylko dopisują mail do kolejki (enqueue_email).
 """
-import resend
+import hashlib
+from typing import Any, Dict, List, Optional, Protocol
+
+import httpx
+
+from core.config import get_settings
 from core.logging import get_logger
 
 logger = get_logger(__name__)
 
-async def send_email(to: str, subject: str, html: str, resend_api_key: str, from_email: str) -> bool:
+RESEND_API_URL = "https://api.resend.com"
+REQUEST_TIMEOUT_SECONDS = 10.0
+MAX_CONNECTIONS = 10
+
+# {"id", "to", "subject", "html", "attempts"} — wiadomość z kolejki
+EmailMessage = Dict[str, Any]
+
+
+class EmailDeliveryError(Exception):
+    """Wysyłka nieudana. retryable=False — provider odrzucił treść (ponowienie nic nie da)."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class EmailTransport(Protocol):
+    async def send(self, messages: List[EmailMessage]) -> None:
+        """Wysyła wszystkie albo żadnej (rzuca EmailDeliveryError)."""
+
+
+class ResendTransport:
+    """Resend przez REST — pojedynczo /emails, paczką /emails/batch (do 100 maili)."""
+
+    def __init__(self, api_key: str, from_email: str, client: httpx.AsyncClient):
+        self.api_key = api_key
+        self.from_email = from_email
+        self.client = client
+
+    async def send(self, messages: List[EmailMessage]) -> None:
+        body = [
+            {"from": self.from_email, "to": [m["to"]], "subject": m["subject"], "html": m["html"]}
+            for m in messages
+        ]
+        path, payload = ("/emails", body[0]) if len(body) == 1 else ("/emails/batch", body)
+        # Ponowienie tej samej paczki (np. po timeoucie) nie wyśle maili drugi raz
+        idempotency_key = hashlib.sha256("|".join(m["id"] for m in messages).encode()).hexdigest()
+
+        try:
+            response = await self.client.post(
+                f"{RESEND_API_URL}{path}",
+                json=payload,
+                headers={"Authorization": f"Bearer {self.api_key}", "Idempotency-Key": idempotency_key},
+            )
+        except httpx.HTTPError as e:
+            raise EmailDeliveryError(f"Resend niedostępny: {e!r}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise EmailDeliveryError(f"Resend {response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise EmailDeliveryError(f"Resend {response.status_code}: {response.text[:200]}", retryable=False)
+        logger.info(f"Email: wysłano {len(messages)} (to={', '.join(m['to'] for m in messages)})")
+
+
+class FakeEmailTransport:
     """
-    Wysyła pojedynczy mail przez Resend.
+    Transport bez sieci — lokalnie (EMAIL_TRANSPORT=fake) i w testach.
+    Wysłane paczki zostają w `sent`; `fail_times` pierwszych wywołań rzuca błąd.
     """
-    resend.api_key = resend_api_key
-    try:
-        resend.Emails.send({
-            "from": from_email,
-            "to": [to],
-            "subject": subject,
-            "html": html
-        })
-        logger.info(f"Email wysłany (to={to})")
-        return True
-    except Exception:
-        logger.exception(f"Błąd wysyłania emaila (to={to})")
-        raise
+
+    def __init__(self, fail_times: int = 0, retryable: bool = True):
+        self.sent: List[List[EmailMessage]] = []
+        self.fail_times = fail_times
+        self.retryable = retryable
+        self.calls = 0
+
+    async def send(self, messages: List[EmailMessage]) -> None:
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise EmailDeliveryError("Fake transport: błąd na życzenie", retryable=self.retryable)
+        self.sent.append(list(messages))
+        for m in messages:
+            logger.info(f"Email (fake): to={m['to']} subject={m['subject']!r}")
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_email_transport() -> EmailTransport:
+    """Transport wg settings.email_transport; klient HTTP współdzielony w obrębie workera."""
+    global _http_client
+    settings = get_settings()
+    if settings.email_transport == "fake":
+        return FakeEmailTransport()
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+    return ResendTransport(settings.resend_api_key, settings.from_email, _http_client)
+
+
+async def shutdown_email_transport() -> None:
+    """Zamyka pulę połączeń do Resend (main.py, shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -0,0 +1,223 @@
+"""
+EMAIL OUTBOX - kolejka maili w Redis + worker wysyłający w tle
+
+Problem:
+    Rejestracja, resend-code i reset hasła czekały inline na wysyłkę
+    (synchroniczne resend.Emails.send w async handlerze). Czas odpowiedzi
+    API = czas odpowiedzi Resend, a wolny Resend blokował cały worker.
+
+Rozwiązanie:
+    enqueue_email() tylko dopisuje mail do listy w Redis (jeden LPUSH)
+    i budzi worker. Worker (pętla w tle, startowana w main.py) bierze
+    paczki do EMAIL_BATCH_SIZE maili i wysyła je jednym requestem
+    (Resend /emails/batch) przez transport z core/email/client.py.
+
+Klucze:
+    email:queue      lista wiadomości (JSON) gotowych do wysłania
+    email:scheduled  sorted set wiadomości poza kolejką, score = kiedy
+                     wracają do kolejki:
+                       - ponowienia po błędzie (teraz + backoff)
+                       - paczki w trakcie wysyłki (teraz + VISIBILITY_TIMEOUT)
+                         — jeśli worker padnie w trakcie, mail wróci sam
+    email:dead       ostatnie DEAD_LETTER_KEEP maili porzuconych po
+                     MAX_ATTEMPTS próbach albo odrzuconych przez providera
+
+    Pobranie paczki to jeden skrypt Lua (przeniesienie zaległych ze
+    scheduled do kolejki + RPOP + oznaczenie jako w trakcie) — dwa workery
+    nie wezmą tego samego maila.
+
+Testy:
+    deliver_email_batch(redis_client, FakeEmailTransport()) — bez sieci.
+"""
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from core.config import get_settings
+from core.logging import get_logger
+from core.redis_client import get_redis_client
+
+from .client import EmailDeliveryError, EmailMessage, EmailTransport, get_email_transport
+
+logger = get_logger(__name__)
+
+QUEUE_KEY = "email:queue"
+SCHEDULED_KEY = "email:scheduled"
+DEAD_KEY = "email:dead"
+
+EMAIL_BATCH_SIZE = 100  # limit Resend /emails/batch
+MAX_ATTEMPTS = 6
+MAX_BACKOFF_SECONDS = 600
+VISIBILITY_TIMEOUT_SECONDS = 120
+DEAD_LETTER_KEEP = 1000
+
+# KEYS[1] = kolejka, KEYS[2] = scheduled; ARGV[1] = teraz, ARGV[2] = termin
+# zwrotu paczki w trakcie wysyłki, ARGV[3] = rozmiar paczki → lista wiadomości
+CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 1000)
+for _, message in ipairs(due) do
+  redis.call('ZREM', KEYS[2], message)
+  redis.call('RPUSH', KEYS[1], message)
+end
+local batch = redis.call('RPOP', KEYS[1], ARGV[3])
+if not batch then
+  return {}
+end
+for _, message in ipairs(batch) do
+  redis.call('ZADD', KEYS[2], ARGV[2], message)
+end
+return batch
+"""
+
+
+@dataclass
+class EmailWorkerMetrics:
+    """Liczniki od startu procesu — /api/v1/health zwraca je pod `email`."""
+    sent: int = 0
+    batches: int = 0
+    retried: int = 0
+    dead: int = 0
+    last_batch_ms: float = 0.0
+
+
+metrics = EmailWorkerMetrics()
+
+_worker_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _dump(message: EmailMessage) -> str:
+    return json.dumps(message, sort_keys=True)
+
+
+def _backoff(attempts: int) -> int:
+    return min(2 ** attempts * 5, MAX_BACKOFF_SECONDS)
+
+
+async def enqueue_email(to: str, subject: str, html: str, redis_client: redis.Redis | None = None) -> str:
+    """Dopisuje mail do kolejki (wysyłka w tle). Błędy Redis lecą do wołającego."""
+    message = {"id": uuid.uuid4().hex, "to": to, "subject": subject, "html": html, "attempts": 0}
+    await (redis_client or get_redis_client()).lpush(QUEUE_KEY, _dump(message))
+    if _wakeup is not None:
+        _wakeup.set()
+    return message["id"]
+
+
+async def _finish(redis_client: redis.Redis, raw: str) -> None:
+    await redis_client.zrem(SCHEDULED_KEY, raw)
+
+
+async def _retry(redis_client: redis.Redis, raw: str, message: EmailMessage, error: EmailDeliveryError) -> None:
+    attempts = message["attempts"] + 1
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zrem(SCHEDULED_KEY, raw)
+    if error.retryable and attempts < MAX_ATTEMPTS:
+        pipe.zadd(SCHEDULED_KEY, {_dump({**message, "attempts": attempts}): time.time() + _backoff(attempts)})
+        metrics.retried += 1
+    else:
+        pipe.lpush(DEAD_KEY, _dump({**message, "attempts": attempts, "error": str(error)}))
+        pipe.ltrim(DEAD_KEY, 0, DEAD_LETTER_KEEP - 1)
+        metrics.dead += 1
+        logger.error(f"Email {message['id']} (to={message['to']}) porzucony po {attempts} próbach: {error}")
+    await pipe.execute()
+
+
+async def _send_one_by_one(redis_client: redis.Redis, transport: EmailTransport, raws: List[str]) -> int:
+    """Paczka odrzucona w całości — pojedynczo, żeby jeden zły adres nie blokował reszty."""
+    sent = 0
+    for raw in raws:
+        message = json.loads(raw)
+        try:
+            await transport.send([message])
+        except EmailDeliveryError as e:
+            await _retry(redis_client, raw, message, e)
+            continue
+        await _finish(redis_client, raw)
+        sent += 1
+    return sent
+
+
+async def deliver_email_batch(
+    redis_client: redis.Redis | None = None,
+    transport: EmailTransport | None = None,
+    batch_size: int = EMAIL_BATCH_SIZE,
+) -> int:
+    """Jeden przebieg workera: bierze paczkę, wysyła, rozlicza. Zwraca liczbę wysłanych."""
+    redis_client = redis_client or get_redis_client()
+    transport = transport or get_email_transport()
+    now = time.time()
+    claim = redis_client.register_script(CLAIM_SCRIPT)
+    raws: List[str] = await claim(
+        keys=[QUEUE_KEY, SCHEDULED_KEY],
+        args=[now, now + VISIBILITY_TIMEOUT_SECONDS, batch_size],
+    )
+    if not raws:
+        return 0
+
+    messages = [json.loads(raw) for raw in raws]
+    started = time.perf_counter()
+    try:
+        await transport.send(messages)
+    except EmailDeliveryError as e:
+        if not e.retryable and len(raws) > 1:
+            sent = await _send_one_by_one(redis_client, transport, raws)
+        else:
+            logger.warning(f"Email: paczka {len(raws)} maili niewysłana: {e}")
+            for raw, message in zip(raws, messages):
+                await _retry(redis_client, raw, message, e)
+            sent = 0
+    else:
+        await redis_client.zrem(SCHEDULED_KEY, *raws)
+        sent = len(raws)
+
+    metrics.batches += 1
+    metrics.sent += sent
+    metrics.last_batch_ms = round((time.perf_counter() - started) * 1000, 2)
+    return sent
+
+
+def email_worker_snapshot() -> Dict[str, Any]:
+    return asdict(metrics)
+
+
+async def _run_worker(interval_seconds: float) -> None:
+    transport = get_email_transport()
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            # Pełna paczka = pewnie jest więcej, nie czekamy na kolejny tick
+            while await deliver_email_batch(transport=transport) >= EMAIL_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Email: przebieg workera nieudany: {e}")
+
+
+def start_email_worker() -> None:
+    """Startuje worker w tle (main.py, startup)."""
+    global _worker_task, _wakeup
+    interval = get_settings().email_worker_poll_interval_seconds
+    if interval <= 0 or _worker_task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _worker_task = asyncio.create_task(_run_worker(interval), name="email:worker")
+
+
+async def stop_email_worker() -> None:
+    """Zatrzymuje worker (main.py, shutdown). Niewysłane maile czekają w Redis."""
+    global _worker_task, _wakeup
+    if _worker_task is not None:
+        _worker_task.cancel()
+        await asyncio.gather(_worker_task, return_exceptions=True)
+    _worker_task = None
+    _wakeup = None
@@ -4,11 +4,19 @@ Custom exception hierarchy dla aplikacji
 
 class AppException(Exception):
     """Base application exception"""
-    def __init__(self, message: str, code: str = "APP_ERROR", status_code: int = 400, details: dict | None = None):
+    def __init__(
+        self,
+        message: str,
+        code: str = "APP_ERROR",
+        status_code: int = 400,
+        details: dict | None = None,
+        headers: dict[str, str] | None = None,
+    ):
         self.message = message
         self.code = code
         self.status_code = status_code
         self.details = details
+        self.headers = headers  # np. Retry-After przy 429
         super().__init__(self.message)
 
 class ValidationError(AppException):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
@@ -21,6 +21,11 @@ class User(Base):
     auth_provider = Column(String(20), default="email", nullable=False)  # "email" lub "google"
     profile_picture = Column(String, nullable=True)  # URL do zdjęcia profilowego
     avatar_url = Column(String, nullable=True)  # Otwarty adres awatara
+    # Licznik nieprzeczytanych powiadomień (zdenormalizowany — utrzymuje go
+    # api/v1/notifications/service.py, naprawia repair_unread_counters)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    # Kiedy powstał startowy workspace (api/v1/onboarding/service.py) — NULL = jeszcze w kolejce
+    onboarded_at = Column(DateTime, nullable=True)
   
     # Relationships
     created_workspaces = relationship("Workspace", back_populates="creator", foreign_keys="[Workspace.created_by]")
@@ -96,9 +101,8 @@ class BoardUsers(Base):
     id = Column(Integer, primary_key=True, index=True)
     board_id = Column(Integer, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    is_online = Column(Boolean, default=False, index=True)
     is_favourite = Column(Boolean, default=False)
-    last_opened = Column(DateTime, nullable=True)
+    last_opened = Column(DateTime, nullable=True)  # obecność "teraz online" jest w Redis (whiteboard/presence.py)
     
     # Relationships
     board = relationship("Board", back_populates="users")
@@ -154,6 +158,12 @@ class BoardElement(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     is_deleted = Column(Boolean, default=False, index=True)
 
+    __table_args__ = (
+        # Elementy-obrazy po URL-u pliku — zwalnianie obrazów w Storage
+        # (release_stored_image) liczy, ile elementów wciąż go używa
+        Index("ix_board_elements_image_src", data["src"].astext, postgresql_where=type == "image"),
+    )
+
 class Notification(Base):
     """
     Powiadomienia użytkownika.
@@ -168,6 +178,11 @@ class Notification(Base):
       - type='invite':  { workspace_id, workspace_name, workspace_icon,
                           workspace_bg_color, inviter_name, invite_token,
                           expires_at, created_at }
+
+    Na Postgresie tabela jest partycjonowana miesięcznie po `created_at`
+    (migracja b6d2f8e4a1c7, utrzymanie: api/v1/notifications/partitions.py),
+    więc PK w bazie to (id, created_at). ORM identyfikuje wiersz po samym
+    `id` — unikalność zapewnia sekwencja.
     """
     __tablename__ = "notifications"
 
@@ -180,6 +195,12 @@ class Notification(Base):
     read_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        # Keyset pagination skrzynki: WHERE user_id = ? AND (created_at, id) < (?, ?)
+        # ORDER BY created_at DESC, id DESC — patrz notifications/service.py
+        Index("ix_notifications_user_created_id", "user_id", "created_at", "id"),
+    )
     
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
@@ -208,3 +229,59 @@ class SavedAsset(Base):
 
 
     user = relationship("User", back_populates="saved_assets")
+
+
+class StoredImage(Base):
+    """
+    Obrazy tablic w Supabase Storage adresowane treścią (SHA-256).
+
+    Ten sam plik wklejony na wielu tablicach leży w Storage RAZ, pod
+    ścieżką wyliczoną z hasha (patrz api/v1/whiteboard/storage.py).
+    Referencje wynikają z elementów (board_elements.data->>'src'), nie
+    z licznika. `claimed_at` — ostatni upload/dedup tego pliku; obiekt
+    w Storage kasujemy, gdy żaden element go nie używa, a claimed_at jest
+    starszy niż grace reconcile (release_stored_image, reconcile_storage).
+
+    `path` to pełny obraz (WebP). `variants` (JSONB) to mapa
+    {szerokość: ścieżka} przeskalowanych wersji — nowe uploady ich nie
+    generują (patrz whiteboard/images.py), ale starsze wiersze je mają
+    i są kasowane razem z pełnym obrazem.
+    """
+    __tablename__ = "stored_images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False, unique=True, index=True)
+    path = Column(String(255), nullable=False, unique=True)
+    content_type = Column(String(50), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    variants = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox — efekty uboczne (np. Broadcast do Supabase)
+    zapisane w TEJ SAMEJ transakcji co zmiana biznesowa (core/outbox.py).
+
+    Request tylko dopisuje wiersz i commituje; wysyłką zajmuje się
+    dispatcher w tle (retry z backoffem, paczki). Wysłane wiersze są
+    kasowane, po OUTBOX_MAX_ATTEMPTS nieudanych próbach zostają ze
+    statusem "failed" i `last_error` do wglądu.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_events_status_available_at", "status", "available_at"),
+    )
@@ -0,0 +1,167 @@
+"""
+OUTBOX - Transactional outbox dla efektów ubocznych
+
+Problem:
+    create_invite commitował zaproszenie, potem osobno powiadomienie, a na
+    końcu czekał (do 5 s) na POST do Supabase. Wolny Supabase = wolna
+    odpowiedź HTTP, a błąd wysyłki = event po cichu zgubiony.
+
+Rozwiązanie:
+    Serwis dopisuje wiersz OutboxEvent w TEJ SAMEJ transakcji co zmianę
+    biznesową (add_outbox_event, bez commitu). Albo jest i zaproszenie,
+    i event do wysłania, albo nie ma niczego.
+
+    Dispatcher (pętla w tle, startowana w main.py) co
+    settings.outbox_poll_interval_seconds — albo od razu po
+    wake_outbox_dispatcher() — bierze paczkę gotowych wierszy, grupuje je
+    po `kind` i oddaje zarejestrowanemu handlerowi. Sukces = wiersze
+    skasowane, błąd = kolejna próba z wykładniczym backoffem.
+
+Kilka workerów:
+    Na Postgresie wiersze są brane z FOR UPDATE SKIP LOCKED, więc dwa
+    workery nie wyślą tego samego eventu równolegle.
+
+Użycie:
+    register_outbox_handler("broadcast", deliver_broadcasts)
+    ...
+    add_outbox_event(db, "broadcast", {...})
+    db.commit()
+    wake_outbox_dispatcher()
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.database import SessionLocal
+from core.logging import get_logger
+from core.models import OutboxEvent
+
+logger = get_logger(__name__)
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 300
+
+# kind → handler(payloads) zwracający True, gdy CAŁA paczka dostarczona
+OutboxHandler = Callable[[List[Dict[str, Any]]], Awaitable[bool]]
+_handlers: Dict[str, OutboxHandler] = {}
+
+_dispatcher_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def register_outbox_handler(kind: str, handler: OutboxHandler) -> None:
+    _handlers[kind] = handler
+
+
+def add_outbox_event(db: Session, kind: str, payload: Dict[str, Any]) -> OutboxEvent:
+    """Dopisuje event do outboxa w bieżącej transakcji — commit robi wołający."""
+    event = OutboxEvent(kind=kind, payload=payload, status="pending", attempts=0,
+                        available_at=datetime.utcnow(), created_at=datetime.utcnow())
+    db.add(event)
+    return event
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2 ** attempts, MAX_BACKOFF_SECONDS))
+
+
+async def dispatch_outbox(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Jeden przebieg dispatchera. Zwraca liczbę dostarczonych eventów."""
+    now = datetime.utcnow()
+    events = (
+        db.query(OutboxEvent)
+        .filter(OutboxEvent.status == "pending", OutboxEvent.available_at <= now)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not events:
+        db.commit()
+        return 0
+
+    by_kind: Dict[str, List[OutboxEvent]] = defaultdict(list)
+    for event in events:
+        by_kind[event.kind].append(event)
+
+    delivered = 0
+    for kind, group in by_kind.items():
+        handler = _handlers.get(kind)
+        error: Optional[str] = None
+        if handler is None:
+            error = f"Brak handlera dla '{kind}'"
+        else:
+            try:
+                if await handler([event.payload for event in group]):
+                    for event in group:
+                        db.delete(event)
+                    delivered += len(group)
+                    continue
+                error = "Handler zgłosił niepowodzenie"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+
+        for event in group:
+            event.attempts += 1
+            event.last_error = error
+            if event.attempts >= MAX_ATTEMPTS:
+                event.status = "failed"
+                logger.error(f"Outbox: event {event.id} ({kind}) porzucony po {event.attempts} próbach: {error}")
+            else:
+                event.available_at = now + _backoff(event.attempts)
+        logger.warning(f"Outbox: {len(group)} eventów '{kind}' niedostarczonych: {error}")
+
+    db.commit()
+    return delivered
+
+
+def wake_outbox_dispatcher() -> None:
+    """Budzi dispatcher od razu po commicie (zamiast czekać na kolejny poll)."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _run_dispatcher(interval_seconds: float) -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            db = SessionLocal()
+            try:
+                # Pełna paczka = pewnie jest więcej, nie czekamy na kolejny tick
+                while await dispatch_outbox(db) >= BATCH_SIZE:
+                    pass
+            finally:
+                db.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Outbox: przebieg dispatchera nieudany: {e}")
+
+
+def start_outbox_dispatcher() -> None:
+    """Startuje dispatcher w tle (main.py, startup)."""
+    global _dispatcher_task, _wakeup
+    interval = get_settings().outbox_poll_interval_seconds
+    if interval <= 0 or _dispatcher_task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _dispatcher_task = asyncio.create_task(_run_dispatcher(interval), name="outbox:dispatcher")
+
+
+async def stop_outbox_dispatcher() -> None:
+    """Zatrzymuje dispatcher (main.py, shutdown). Niewysłane wiersze czekają w bazie."""
+    global _dispatcher_task, _wakeup
+    if _dispatcher_task is not None:
+        _dispatcher_task.cancel()
+        await asyncio.gather(_dispatcher_task, return_exceptions=True)
+    _dispatcher_task = None
+    _wakeup = None
@@ -0,0 +1,73 @@
+"""
+PERIODIC TASKS - Zadania cykliczne w procesie API
+
+Cel:
+    Proste zadania "co N godzin" (np. reconcile Storage) bez osobnego
+    schedulera/crona. Startowane w main.py (startup), anulowane przy
+    shutdownie.
+
+Kilka workerów:
+    Każdy worker uvicorna startuje własną pętlę, więc przed odpaleniem joba
+    bierzemy lock w Redis (SET NX EX) — w danym interwale job wykona się
+    raz, a nie raz na worker.
+
+Użycie:
+    start_periodic_task("storage-reconcile", 24 * 3600, run_storage_reconciliation)
+    ...
+    await stop_periodic_tasks()
+"""
+import asyncio
+from typing import Awaitable, Callable, List
+
+import redis.asyncio as redis
+
+from core.logging import get_logger
+from core.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+
+def start_periodic_task(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable[None]],
+    redis_client: redis.Redis | None = None,
+) -> None:
+    """Uruchamia `job` co `interval_seconds` (pierwszy raz PO pierwszym interwale, nie przy starcie)."""
+    task = asyncio.create_task(
+        _run_periodically(name, interval_seconds, job, redis_client),
+        name=f"periodic:{name}",
+    )
+    _tasks.append(task)
+
+
+async def _run_periodically(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable[None]],
+    redis_client: redis.Redis | None,
+) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            client = redis_client or get_redis_client()
+            # TTL trochę krótszy niż interwał, żeby lock z poprzedniego
+            # przebiegu na pewno wygasł przed kolejnym
+            lock_ttl = max(1, int(interval_seconds * 0.9))
+            if not await client.set(f"periodic:{name}:lock", "1", nx=True, ex=lock_ttl):
+                continue
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Zadanie cykliczne {name} nieudane: {e}")
+
+
+async def stop_periodic_tasks() -> None:
+    """Anuluje wszystkie zadania cykliczne — wołane przy shutdownie aplikacji (main.py)."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
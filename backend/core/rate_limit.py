@@ -1,46 +1,165 @@
-from fastapi import Request
+"""
+Rate limiting endpointów (auth) — okno przesuwne w Redis, jeden round trip.
 
+DLACZEGO:
+  Stara wersja robiła INCR + EXPIRE osobno dla każdego klucza (do 4 round
+  tripów na request), a śmierć procesu między nimi zostawiała klucz bez
+  TTL — licznik, który nigdy się nie zeruje. Okno stałe przepuszczało
+  też 2x limit na styku dwóch okien.
+
+JAK:
+  Każdy klucz (per IP i per identyfikator z body) to sorted set znaczników
+  czasu requestów. Jeden skrypt Lua dla wszystkich kluczy naraz: wycina
+  wpisy starsze niż okno, sprawdza limit i — tylko gdy WSZYSTKIE klucze
+  mają miejsce — dopisuje request i ustawia PEXPIRE. Atomowo, bez
+  kluczy bez TTL, odrzucone requesty nie zjadają limitu.
+
+NAGŁÓWKI:
+  Każda odpowiedź endpointu z limitem dostaje X-RateLimit-Limit,
+  X-RateLimit-Remaining i X-RateLimit-Reset (sekundy do zwolnienia
+  miejsca); 429 dodatkowo Retry-After.
+
+AWARIA REDIS:
+  Błąd albo timeout (settings.rate_limit_redis_timeout_seconds) nie kończy
+  się 503 — request liczy lokalny token bucket, a po kilku błędach z rzędu
+  circuit breaker odcina Redis do czasu udanej sondy
+  (core/rate_limit_fallback.py).
+"""
+import asyncio
+import math
+import secrets
+import time
+from typing import Dict, List, Tuple
+
+from fastapi import Request, Response
+
+from core.config import get_settings
 from core.exceptions import AppException
 from redis.exceptions import ConnectionError, TimeoutError
+from core.rate_limit_fallback import get_local_buckets, get_rate_limit_breaker
 from core.redis_client import get_redis_client
 
 from core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# KEYS = klucze limitu; ARGV[1] = teraz (ms), ARGV[2] = okno (ms),
+# ARGV[3] = limit, ARGV[4] = unikalny identyfikator requestu
+# → {dozwolony 0/1, pozostało, ms do zwolnienia miejsca}
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local remaining = limit
+local reset = 0
+local retry_after = 0
+
+for _, key in ipairs(KEYS) do
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  local count = redis.call('ZCARD', key)
+  if count >= limit then
+    -- miejsce zwolni się, gdy z okna wypadnie wpis nr (count - limit)
+    local entry = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+    retry_after = math.max(retry_after, tonumber(entry[2]) + window - now)
+  elseif count > 0 then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    reset = math.max(reset, tonumber(oldest[2]) + window - now)
+  end
+  remaining = math.min(remaining, limit - count)
+end
+
+if retry_after > 0 then
+  return {0, 0, retry_after}
+end
+
+for _, key in ipairs(KEYS) do
+  redis.call('ZADD', key, now, ARGV[4])
+  redis.call('PEXPIRE', key, window)
+end
+if reset == 0 then
+  reset = window
+end
+return {1, remaining - 1, reset}
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+async def _identifier(request: Request, field: str) -> str | None:
+    """
+    Wartość pola z JSON body. FastAPI parsuje body przed dependencies
+    i Starlette trzyma wynik na obiekcie requestu — request.json() tutaj
+    zwraca ten sam, już sparsowany słownik (bez ponownego json.loads).
+    """
+    body = await request.json()
+    value = body.get(field) if isinstance(body, dict) else None
+    return str(value).lower() if value else None
+
+
+def _headers(limit: int, remaining: int, reset_ms: int) -> Dict[str, str]:
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(max(0, remaining)),
+        "X-RateLimit-Reset": str(math.ceil(reset_ms / 1000)),
+    }
+
+
+async def _check(keys: List[str], limit: int, window_seconds: int) -> Tuple[bool, int, int]:
+    """(dozwolony, pozostało, ms do zwolnienia miejsca) — jeden EVALSHA dla wszystkich kluczy."""
+    script = get_redis_client().register_script(SLIDING_WINDOW_SCRIPT)
+    now = _now_ms()
+    allowed, remaining, reset_ms = await script(
+        keys=keys,
+        args=[now, window_seconds * 1000, limit, f"{now}:{secrets.token_hex(4)}"],
+    )
+    return bool(allowed), int(remaining), int(reset_ms)
+
+
+async def _decide(scope: str, keys: List[str], limit: int, window_seconds: int) -> Tuple[bool, int, int]:
+    """Redis, a gdy nie odpowiada (albo breaker jest otwarty) — lokalne token buckety."""
+    breaker = get_rate_limit_breaker()
+    if not breaker.is_open:
+        try:
+            decision = await asyncio.wait_for(
+                _check(keys, limit, window_seconds),
+                timeout=get_settings().rate_limit_redis_timeout_seconds,
+            )
+        except (ConnectionError, TimeoutError, asyncio.TimeoutError) as e:
+            logger.warning(f"Błąd Redis przy rate limitingu (scope={scope}): {e!r} — limit lokalny")
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+            return decision
+
+    breaker.local_decisions += 1
+    return get_local_buckets().check(keys, limit, window_seconds)
+
+
 def rate_limit(scope: str, limit: int, window_seconds: int, identifier_field: str | None = None):
     """
     Zwraca FastAPI Depends() wymuszający limit `limit` requestów / `window_seconds`
-    dla danego `scope`, liczony osobno per IP i (opcjonalnie) per pole `identifier_field`
-    z JSON body requestu.
+    (okno przesuwne) dla danego `scope`, liczony osobno per IP i (opcjonalnie)
+    per pole `identifier_field` z JSON body requestu.
     """
-    async def dependency(request: Request):
-        redis_client = get_redis_client()
+    async def dependency(request: Request, response: Response):
         ip = request.client.host if request.client else "unknown"
         keys = [f"ratelimit:{scope}:ip:{ip}"]
 
         if identifier_field:
-            body = await request.json()
-            value = body.get(identifier_field)
+            value = await _identifier(request, identifier_field)
             if value:
-                keys.append(f"ratelimit:{scope}:id:{str(value).lower()}")
+                keys.append(f"ratelimit:{scope}:id:{value}")
 
-        try:
-            for key in keys:
-                current = await redis_client.incr(key)
-                if current == 1:
-                    await redis_client.expire(key, window_seconds)
-                if current > limit:
-                    raise AppException(
-                        "Zbyt wiele prób, spróbuj ponownie później.",
-                        code="RATE_LIMITED",
-                        status_code=429,
-                    )
-        except (ConnectionError, TimeoutError):
-            logger.exception(f"Błąd Redis przy rate limitingu (scope={scope})")
+        allowed, remaining, reset_ms = await _decide(scope, keys, limit, window_seconds)
+        headers = _headers(limit, remaining, reset_ms)
+        if not allowed:
             raise AppException(
-                "Serwis chwilowo niedostępny",
-                code="REDIS_ERROR",
-                status_code=503,
+                "Zbyt wiele prób, spróbuj ponownie później.",
+                code="RATE_LIMITED",
+                status_code=429,
+                headers={**headers, "Retry-After": headers["X-RateLimit-Reset"]},
             )
-    return dependency
\ No newline at end of file
+        response.headers.update(headers)
+    return dependency
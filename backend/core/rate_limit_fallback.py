@@ -0,0 +1,180 @@
+"""
+Tryb awaryjny rate limitingu — gdy Redis nie odpowiada.
+
+DLACZEGO:
+  rate_limit() zamieniał każdy błąd Redis w 503 REDIS_ERROR, więc
+  chwilowa czkawka Redis wyłączała logowanie wszystkim.
+
+JAK:
+  LocalTokenBuckets — token bucket per klucz w pamięci workera
+  (pojemność = limit, uzupełnianie limit/okno na sekundę). Liczba kluczy
+  ograniczona (LRU, settings.rate_limit_local_max_keys), więc zalew
+  requestów z losowych IP nie zje pamięci. Limit liczy się per worker —
+  przy N workerach przepuszczamy do N× więcej, świadomie: lepsze to niż
+  brak logowania.
+
+  RedisCircuitBreaker — po settings.rate_limit_breaker_failure_threshold
+  błędach z rzędu przestaje w ogóle pytać Redis (requesty nie czekają na
+  timeouty martwego serwera) i w tle, co
+  settings.rate_limit_breaker_probe_interval_seconds, robi PING. Pierwszy
+  udany PING wraca do Redis.
+
+METRYKI:
+  /api/v1/health → `rate_limit` (snapshot() breakera tego workera).
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from core.config import get_settings
+from core.logging import get_logger
+from core.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+# klucz → (tokeny, ostatnie uzupełnienie — time.monotonic())
+_Bucket = Tuple[float, float]
+
+
+class LocalTokenBuckets:
+    """Token buckety w pamięci procesu, z limitem liczby kluczy (LRU)."""
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = max_keys or get_settings().rate_limit_local_max_keys
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+
+    def _tokens(self, key: str, capacity: int, rate: float, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - updated) * rate)
+
+    def check(self, keys: List[str], limit: int, window_seconds: int) -> Tuple[bool, int, int]:
+        """
+        (dozwolony, pozostało, ms do kolejnego tokena) — ten sam kontrakt co
+        wersja w Redis. Token jest zabierany ze wszystkich kluczy albo z żadnego.
+        """
+        now = time.monotonic()
+        rate = limit / window_seconds
+        tokens = {key: self._tokens(key, limit, rate, now) for key in keys}
+        lowest = min(tokens.values())
+
+        if lowest < 1:
+            return False, 0, math.ceil((1 - lowest) / rate * 1000)
+
+        for key, value in tokens.items():
+            self._buckets[key] = (value - 1, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        remaining = lowest - 1
+        return True, int(remaining), math.ceil((limit - remaining) / rate * 1000)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class RedisCircuitBreaker:
+    """
+    closed — requesty idą do Redis; open — idą do LocalTokenBuckets, a w tle
+    chodzi PING. Stan jest per worker.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, probe_interval: Optional[float] = None):
+        settings = get_settings()
+        self.failure_threshold = failure_threshold or settings.rate_limit_breaker_failure_threshold
+        self.probe_interval = probe_interval or settings.rate_limit_breaker_probe_interval_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.local_decisions = 0
+        self._probe: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if not self.is_open and self.failures >= self.failure_threshold:
+            self.opened_at = time.time()
+            self.times_opened += 1
+            logger.error(f"Rate limit: Redis niedostępny ({self.failures} błędów) — limity lokalne per worker")
+            self._probe = asyncio.create_task(self._probe_loop(), name="rate-limit:redis-probe")
+
+    def close(self) -> None:
+        logger.info("Rate limit: Redis znowu odpowiada — wracamy do limitów w Redis")
+        self.failures = 0
+        self.opened_at = None
+
+    async def _probe_loop(self) -> None:
+        while self.is_open:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await get_redis_client().ping()
+            except (RedisError, OSError) as e:
+                logger.warning(f"Rate limit: PING Redis nieudany: {e}")
+                continue
+            self.close()
+
+    async def shutdown(self) -> None:
+        if self._probe is not None and not self._probe.done():
+            self._probe.cancel()
+            try:
+                await self._probe
+            except asyncio.CancelledError:
+                pass
+        self._probe = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": "local" if self.is_open else "redis",
+            "consecutive_failures": self.failures,
+            "opened_at": self.opened_at,
+            "times_opened": self.times_opened,
+            "local_decisions": self.local_decisions,
+        }
+
+
+_buckets: LocalTokenBuckets | None = None
+_breaker: RedisCircuitBreaker | None = None
+
+
+def get_local_buckets() -> LocalTokenBuckets:
+    global _buckets
+    if _buckets is None:
+        _buckets = LocalTokenBuckets()
+    return _buckets
+
+
+def get_rate_limit_breaker() -> RedisCircuitBreaker:
+    """Breaker tego workera (singleton, tworzony leniwie)."""
+    global _breaker
+    if _breaker is None:
+        _breaker = RedisCircuitBreaker()
+    return _breaker
+
+
+def reset_rate_limit_fallback() -> None:
+    """Czyści stan (buckety, breaker) bez czekania na sondę — testy."""
+    global _buckets, _breaker
+    if _breaker is not None and _breaker._probe is not None:
+        _breaker._probe.cancel()
+    _buckets = None
+    _breaker = None
+
+
+async def shutdown_rate_limit_fallback() -> None:
+    """Zatrzymuje sondę Redis — wołane przy shutdownie (main.py)."""
+    if _breaker is not None:
+        await _breaker.shutdown()
+    reset_rate_limit_fallback()
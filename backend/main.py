@@ -15,6 +15,19 @@ from core.exceptions import AppException, ValidationError, AuthenticationError,
 from core.responses import ApiResponse
 
 from api.v1.router import get_v1_router
+from api.v1.whiteboard.images import shutdown_image_pool
+from api.v1.whiteboard.relay import shutdown_relay_hub
+from api.v1.notifications.realtime import shutdown_broadcaster
+from api.v1.auth.password_pool import shutdown_password_pool
+from api.v1.whiteboard.reconciliation import run_storage_reconciliation
+from api.v1.notifications.partitions import run_partition_maintenance
+from api.v1.notifications.service import run_unread_counter_repair
+from core.periodic import start_periodic_task, stop_periodic_tasks
+from core.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
+from core.rate_limit_fallback import shutdown_rate_limit_fallback
+from core.email import start_email_worker, stop_email_worker
+from core.email.client import shutdown_email_transport
+from api.v1.workspaces.acl_cache import start_workspace_acl_listener, stop_workspace_acl_listener
 
 # Logging setup
 log_level = "DEBUG" if os.getenv("ENV", "production") == "development" else "INFO"
@@ -50,15 +63,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Frontend czyta limity z odpowiedzi (core/rate_limit.py)
+    expose_headers=["Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset"],
 )
 
 # Events
 @app.on_event("startup")
 async def startup_event():
+    if settings.storage_reconcile_interval_hours > 0:
+        start_periodic_task(
+            "storage-reconcile",
+            settings.storage_reconcile_interval_hours * 3600,
+            run_storage_reconciliation,
+        )
+    if settings.unread_counter_repair_interval_hours > 0:
+        start_periodic_task(
+            "unread-counter-repair",
+            settings.unread_counter_repair_interval_hours * 3600,
+            run_unread_counter_repair,
+        )
+    if settings.notification_partition_maintenance_interval_hours > 0:
+        start_periodic_task(
+            "notification-partitions",
+            settings.notification_partition_maintenance_interval_hours * 3600,
+            run_partition_maintenance,
+        )
+    start_outbox_dispatcher()
+    start_email_worker()
+    start_workspace_acl_listener()
     logger.info("Education Platform API started ...")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await stop_periodic_tasks()
+    await stop_outbox_dispatcher()
+    await stop_email_worker()
+    await stop_workspace_acl_listener()
+    await shutdown_email_transport()
+    await shutdown_relay_hub()
+    await shutdown_broadcaster()
+    await shutdown_rate_limit_fallback()
+    shutdown_password_pool()
+    shutdown_image_pool()
     logger.info("... Education Platform API stopped")
 
 # Exception handlers
@@ -124,7 +170,8 @@ async def app_exception_handler(request, exc: AppException):
             error=exc.message,
             code=exc.code,
             data=exc.details
-        ).model_dump(mode='json')
+        ).model_dump(mode='json'),
+        headers=exc.headers,
     )
 
 @app.exception_handler(Exception)
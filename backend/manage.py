@@ -0,0 +1,112 @@
+"""
+MANAGE.PY - Komendy administracyjne
+
+Uruchamiać z folderu /backend (jak uvicorn), z tym samym .env:
+    python manage.py reconcile-storage [--dry-run] [--grace-hours 24]
+    python manage.py repair-unread-counters
+    python manage.py maintain-notification-partitions [--ahead 3] [--retention-months 6]
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+
+from core.config import get_settings
+from core.database import SessionLocal
+from core.logging import setup_logging
+
+
+def _reconcile_storage(args: argparse.Namespace) -> int:
+    from api.v1.whiteboard.reconciliation import reconcile_storage
+
+    db = SessionLocal()
+    try:
+        report = asyncio.run(reconcile_storage(db, timedelta(hours=args.grace_hours), dry_run=args.dry_run))
+    finally:
+        db.close()
+    print(
+        f"Przejrzane obiekty: {report.scanned_objects}\n"
+        f"Sieroty{' (do skasowania)' if report.dry_run else ' skasowane'}: {report.orphaned_objects}\n"
+        f"Zwolnione obrazy (stored_images): {report.released_images}"
+    )
+    return 0
+
+
+def _repair_unread_counters(args: argparse.Namespace) -> int:
+    from api.v1.notifications.service import repair_unread_counters
+
+    db = SessionLocal()
+    try:
+        repaired = repair_unread_counters(db)
+    finally:
+        db.close()
+    print(f"Poprawione liczniki nieprzeczytanych: {repaired}")
+    return 0
+
+
+def _maintain_notification_partitions(args: argparse.Namespace) -> int:
+    from api.v1.notifications.partitions import drop_expired_partitions, ensure_partitions, is_partitioned
+
+    db = SessionLocal()
+    try:
+        if not is_partitioned(db):
+            print("Tabela notifications nie jest partycjonowana (uruchom migracje)")
+            return 1
+        created = ensure_partitions(db, args.ahead)
+        report = drop_expired_partitions(db, args.retention_months) if args.retention_months > 0 else None
+    finally:
+        db.close()
+    print(f"Utworzone partycje: {', '.join(created) or '-'}")
+    if report is not None:
+        print(
+            f"Usunięte partycje: {', '.join(report.dropped) or '-'}\n"
+            f"Usunięte nieprzeczytane powiadomienia: {report.expired_unread}"
+        )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="manage.py", description="Komendy administracyjne backendu")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser(
+        "reconcile-storage",
+        help="Kasuje ze Storage obrazy, do których nie odwołuje się żaden element tablicy",
+    )
+    reconcile.add_argument("--dry-run", action="store_true", help="Tylko policz sieroty, nic nie kasuj")
+    reconcile.add_argument(
+        "--grace-hours", type=float, default=get_settings().storage_reconcile_grace_hours,
+        help="Nie ruszaj obiektów młodszych niż tyle godzin",
+    )
+    reconcile.set_defaults(handler=_reconcile_storage)
+
+    repair_unread = commands.add_parser(
+        "repair-unread-counters",
+        help="Przelicza users.unread_notifications z tabeli notifications",
+    )
+    repair_unread.set_defaults(handler=_repair_unread_counters)
+
+    partitions = commands.add_parser(
+        "maintain-notification-partitions",
+        help="Zakłada partycje notifications na kolejne miesiące i usuwa przeterminowane",
+    )
+    partitions.add_argument(
+        "--ahead", type=int, default=get_settings().notification_partitions_ahead,
+        help="Ile przyszłych miesięcy przygotować",
+    )
+    partitions.add_argument(
+        "--retention-months", type=int, default=get_settings().notification_retention_months,
+        help="Usuń partycje (z samymi przeczytanymi) starsze niż tyle miesięcy; 0 = nic nie usuwaj",
+    )
+    partitions.set_defaults(handler=_maintain_notification_partitions)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    setup_logging(log_level="INFO")
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
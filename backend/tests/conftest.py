@@ -14,9 +14,11 @@ from sqlalchemy import TypeDecorator, Text
 from sqlalchemy.dialects import postgresql
 
 
-# Monkey-patch JSONB → SQLite-compatible TEXT
+# Monkey-patch JSONB → SQLite-compatible TEXT. impl zostaje JSONB, żeby
+# działały operatory JSON (`data["src"].astext` → `data ->> 'src'`, który
+# SQLite >= 3.38 rozumie natywnie)
 class JSONBCompatible(TypeDecorator):
-    impl = Text
+    impl = postgresql.JSONB
     cache_ok = True
 
     def load_dialect_impl(self, dialect):
@@ -44,6 +46,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
 from core.models import Base, User, Workspace, WorkspaceMember, Board, BoardUsers
+from core import redis_client as redis_client_module
 from api.v1.auth.utils import hash_password
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -87,6 +90,72 @@ def redis_client(fake_redis_server):
     return fakeredis.aioredis.FakeRedis(server=fake_redis_server, decode_responses=True)
 
 
+@pytest.fixture(autouse=True)
+def global_redis_client(fake_redis_server, monkeypatch):
+    """
+    Globalny singleton get_redis_client() → fake na tym samym serwerze co
+    `redis_client`. Serwisy bez wstrzykniętego klienta (np. obecność na
+    tablicy w BoardService wołanym z routera) nie łączą się z prawdziwym Redisem.
+    """
+    client = fakeredis.aioredis.FakeRedis(server=fake_redis_server, decode_responses=True)
+    monkeypatch.setattr(redis_client_module, "_redis_client", client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def no_outbox_dispatcher(monkeypatch):
+    """
+    Dispatcher outboxa (core/outbox.py) startowany przez TestClient łączyłby
+    się z prawdziwą bazą przez SessionLocal — testy wołają dispatch_outbox() same.
+    """
+    from core.config import get_settings
+    monkeypatch.setattr(get_settings(), "outbox_poll_interval_seconds", 0)
+    # To samo z workerem maili (core/email/outbox.py) — testy wołają deliver_email_batch()
+    monkeypatch.setattr(get_settings(), "email_worker_poll_interval_seconds", 0)
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    """
+    Każdy test ma świeżą bazę, więc user o id=1 to za każdym razem ktoś
+    inny — cache get_current_user w procesie nie może przechodzić między testami.
+    """
+    from api.v1.auth.principal_cache import principal_cache
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_workspace_acl_cache():
+    """Cache członkostwa (api/v1/workspaces/acl_cache.py) — z tego samego powodu co principal cache."""
+    from api.v1.workspaces.acl_cache import acl_cache
+    acl_cache.clear()
+    yield
+    acl_cache.clear()
+
+
+@pytest.fixture
+def run_onboarding(db_session):
+    """Onboarding idzie przez outbox (api/v1/onboarding/service.py) — tu handler wołany od ręki."""
+    from api.v1.onboarding.service import ONBOARDING_EVENT, provision_new_users
+    from core.models import OutboxEvent
+
+    async def run():
+        events = db_session.query(OutboxEvent).filter(OutboxEvent.kind == ONBOARDING_EVENT).all()
+        return await provision_new_users([event.payload for event in events], db_session)
+    return run
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limit_fallback():
+    """Breaker i lokalne limity (core/rate_limit_fallback.py) są per proces — świeże per test."""
+    from core.rate_limit_fallback import reset_rate_limit_fallback
+    reset_rate_limit_fallback()
+    yield
+    reset_rate_limit_fallback()
+
+
 @pytest.fixture
 def sync_redis_client(fake_redis_server):
     """Sync klient Redis (fake) — do seedowania danych w fixture'ach bez async (np. unverified_user)."""
@@ -279,7 +348,7 @@ def test_board(db_session: Session, test_user, test_workspace):
 
     db_session.add(BoardUsers(
         board_id=board.id, user_id=test_user.id,
-        is_favourite=False, is_online=True,
+        is_favourite=False,
         last_opened=datetime.utcnow(),
     ))
     db_session.commit()
@@ -305,7 +374,7 @@ def multiple_boards(db_session: Session, test_user, test_workspace):
         db_session.flush()
         db_session.add(BoardUsers(
             board_id=board.id, user_id=test_user.id,
-            is_favourite=(i % 3 == 0), is_online=(i % 2 == 0),
+            is_favourite=(i % 3 == 0),
             last_opened=datetime.utcnow(),
         ))
         boards.append(board)
@@ -1,8 +1,13 @@
 """Testy modułu core.email - szablony i transporty."""
-from unittest.mock import patch, MagicMock
+import json
+
+import httpx
 import pytest
 
-from core.email import send_email
+import core.email.outbox as outbox
+from core.email import enqueue_email
+from core.email.client import EmailDeliveryError, FakeEmailTransport, ResendTransport
+from core.email.outbox import DEAD_KEY, QUEUE_KEY, SCHEDULED_KEY, deliver_email_batch
 from core.email.templates.auth import verification_email, password_reset_email
 from core.email.templates.workspace import workspace_invite_email
 
@@ -27,21 +32,152 @@ class TestWorkspaceTemplates:
         assert "Zespół X" in html
         assert "https://app/invite/abc" in html
 
-class TestSendEmail:
+def resend_transport(handler) -> ResendTransport:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return ResendTransport("key", "from@test.com", client)
+
+
+def message(i: int = 0) -> dict:
+    return {"id": f"m{i}", "to": f"to{i}@test.com", "subject": "Subject", "html": "<p>Hi</p>", "attempts": 0}
+
+
+class TestResendTransport:
+    @pytest.mark.asyncio
+    async def test_single_message_goes_to_emails_endpoint(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"id": "test"})
+
+        await resend_transport(handler).send([message()])
+
+        assert requests[0].url.path == "/emails"
+        assert requests[0].headers["Authorization"] == "Bearer key"
+        body = json.loads(requests[0].content)
+        assert body["to"] == ["to0@test.com"]
+        assert body["from"] == "from@test.com"
+
+    @pytest.mark.asyncio
+    async def test_many_messages_go_to_batch_endpoint(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"data": []})
+
+        await resend_transport(handler).send([message(i) for i in range(3)])
+
+        assert len(requests) == 1
+        assert requests[0].url.path == "/emails/batch"
+        assert [m["to"][0] for m in json.loads(requests[0].content)] == ["to0@test.com", "to1@test.com", "to2@test.com"]
+        assert requests[0].headers["Idempotency-Key"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status,retryable", [(429, True), (503, True), (422, False)])
+    async def test_error_statuses(self, status, retryable):
+        transport = resend_transport(lambda request: httpx.Response(status, json={}))
+
+        with pytest.raises(EmailDeliveryError) as exc:
+            await transport.send([message()])
+        assert exc.value.retryable is retryable
+
+    @pytest.mark.asyncio
+    async def test_network_error_is_retryable(self):
+        def handler(request):
+            raise httpx.ConnectError("down")
+
+        with pytest.raises(EmailDeliveryError) as exc:
+            await resend_transport(handler).send([message()])
+        assert exc.value.retryable is True
+
+
+class TestEmailOutbox:
+    @pytest.mark.asyncio
+    async def test_enqueue_only_writes_to_redis(self, redis_client):
+        await enqueue_email("to@test.com", "Subject", "<p>Hi</p>", redis_client)
+
+        [raw] = await redis_client.lrange(QUEUE_KEY, 0, -1)
+        assert json.loads(raw)["to"] == "to@test.com"
+
     @pytest.mark.asyncio
-    async def test_calls_resend_with_correct_params(self):
-        with patch("core.email.client.resend") as mock_resend:
-            mock_resend.Emails.send = MagicMock(return_value={"id": "test"})
-            result = await send_email("to@test.com", "Subject", "<p>Hi</p>", "key", "from@test.com")
-        assert result is True
-        mock_resend.Emails.send.assert_called_once()
-        params = mock_resend.Emails.send.call_args[0][0]
-        assert params["to"] == ["to@test.com"]
-        assert params["subject"] == "Subject"
+    async def test_delivers_queue_in_one_batch(self, redis_client):
+        for i in range(5):
+            await enqueue_email(f"to{i}@test.com", "Subject", "<p>Hi</p>", redis_client)
+        transport = FakeEmailTransport()
+
+        sent = await deliver_email_batch(redis_client, transport)
+
+        assert sent == 5
+        assert len(transport.sent) == 1
+        assert [m["to"] for m in transport.sent[0]] == [f"to{i}@test.com" for i in range(5)]
+        assert await redis_client.llen(QUEUE_KEY) == 0
+        assert await redis_client.zcard(SCHEDULED_KEY) == 0
 
     @pytest.mark.asyncio
-    async def test_reraises_on_provider_error(self):
-        with patch("core.email.client.resend") as mock_resend:
-            mock_resend.Emails.send.side_effect = Exception("Resend down")
-            with pytest.raises(Exception, match="Resend down"):
-                await send_email("to@test.com", "Subject", "<p>Hi</p>", "key", "from@test.com")
+    async def test_failure_schedules_retry_with_backoff(self, redis_client, monkeypatch):
+        await enqueue_email("to@test.com", "Subject", "<p>Hi</p>", redis_client)
+        transport = FakeEmailTransport(fail_times=1)
+
+        assert await deliver_email_batch(redis_client, transport) == 0
+        [(raw, due)] = await redis_client.zrange(SCHEDULED_KEY, 0, -1, withscores=True)
+        assert json.loads(raw)["attempts"] == 1
+        # Przed terminem ponowienia nic się nie dzieje
+        assert await deliver_email_batch(redis_client, transport) == 0
+
+        monkeypatch.setattr(outbox.time, "time", lambda: due + 1)
+        assert await deliver_email_batch(redis_client, transport) == 1
+        assert transport.sent[0][0]["to"] == "to@test.com"
+        assert await redis_client.zcard(SCHEDULED_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, redis_client, monkeypatch):
+        await enqueue_email("to@test.com", "Subject", "<p>Hi</p>", redis_client)
+        transport = FakeEmailTransport(fail_times=100)
+        now = [1_000_000.0]
+        monkeypatch.setattr(outbox.time, "time", lambda: now[0])
+
+        for _ in range(outbox.MAX_ATTEMPTS):
+            await deliver_email_batch(redis_client, transport)
+            now[0] += outbox.MAX_BACKOFF_SECONDS + 1
+
+        assert transport.calls == outbox.MAX_ATTEMPTS
+        assert await redis_client.zcard(SCHEDULED_KEY) == 0
+        [dead] = await redis_client.lrange(DEAD_KEY, 0, -1)
+        assert json.loads(dead)["attempts"] == outbox.MAX_ATTEMPTS
+
+    @pytest.mark.asyncio
+    async def test_rejected_batch_is_split(self, redis_client):
+        """Provider odrzuca paczkę z jednym złym adresem — reszta i tak wychodzi"""
+        for to in ("ok1@test.com", "bad@test.com", "ok2@test.com"):
+            await enqueue_email(to, "Subject", "<p>Hi</p>", redis_client)
+
+        class PickyTransport(FakeEmailTransport):
+            async def send(self, messages):
+                if any(m["to"] == "bad@test.com" for m in messages):
+                    raise EmailDeliveryError("invalid address", retryable=False)
+                await super().send(messages)
+
+        transport = PickyTransport()
+        assert await deliver_email_batch(redis_client, transport) == 2
+        assert sorted(m["to"] for batch in transport.sent for m in batch) == ["ok1@test.com", "ok2@test.com"]
+        [dead] = await redis_client.lrange(DEAD_KEY, 0, -1)
+        assert json.loads(dead)["to"] == "bad@test.com"
+
+    @pytest.mark.asyncio
+    async def test_batch_of_crashed_worker_comes_back(self, redis_client, monkeypatch):
+        """Paczka wzięta przez worker, który padł przed rozliczeniem, wraca po VISIBILITY_TIMEOUT"""
+        await enqueue_email("to@test.com", "Subject", "<p>Hi</p>", redis_client)
+
+        class CrashingTransport(FakeEmailTransport):
+            async def send(self, messages):
+                raise RuntimeError("worker killed")
+
+        with pytest.raises(RuntimeError):
+            await deliver_email_batch(redis_client, CrashingTransport())
+
+        transport = FakeEmailTransport()
+        assert await deliver_email_batch(redis_client, transport) == 0
+        later = outbox.time.time() + outbox.VISIBILITY_TIMEOUT_SECONDS + 1
+        monkeypatch.setattr(outbox.time, "time", lambda: later)
+        assert await deliver_email_batch(redis_client, transport) == 1
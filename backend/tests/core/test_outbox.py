@@ -0,0 +1,150 @@
+"""
+Testy transactional outbox
+core/outbox.py (+ handler "broadcast" z api/v1/notifications/realtime.py)
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import outbox
+from core.models import OutboxEvent
+from core.outbox import MAX_ATTEMPTS, add_outbox_event, dispatch_outbox, register_outbox_handler
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """Handler "test" zapamiętujący paczki; `result` steruje sukcesem."""
+    monkeypatch.setattr(outbox, "_handlers", {})
+    calls = []
+
+    async def deliver(payloads):
+        calls.append(payloads)
+        if isinstance(deliver.result, Exception):
+            raise deliver.result
+        return deliver.result
+
+    deliver.result = True
+    deliver.calls = calls
+    register_outbox_handler("test", deliver)
+    return deliver
+
+
+class TestDispatchOutbox:
+
+    @pytest.mark.asyncio
+    async def test_delivers_pending_events_in_one_batch(self, db_session, handler):
+        for n in range(3):
+            add_outbox_event(db_session, "test", {"n": n})
+        db_session.commit()
+
+        assert await dispatch_outbox(db_session) == 3
+        assert handler.calls == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+        assert db_session.query(OutboxEvent).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_uncommitted_event_is_not_delivered(self, db_session, handler):
+        add_outbox_event(db_session, "test", {"n": 1})
+        db_session.rollback()
+
+        assert await dispatch_outbox(db_session) == 0
+        assert handler.calls == []
+
+    @pytest.mark.asyncio
+    async def test_failure_schedules_retry_with_backoff(self, db_session, handler):
+        handler.result = RuntimeError("Supabase 503")
+        add_outbox_event(db_session, "test", {"n": 1})
+        db_session.commit()
+
+        assert await dispatch_outbox(db_session) == 0
+        event = db_session.query(OutboxEvent).one()
+        assert event.attempts == 1
+        assert event.status == "pending"
+        assert event.last_error == "Supabase 503"
+        assert event.available_at > datetime.utcnow()
+
+        # Przed upływem backoffu nie ma ponownej próby
+        assert await dispatch_outbox(db_session) == 0
+        assert len(handler.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, db_session, handler):
+        handler.result = False
+        event = add_outbox_event(db_session, "test", {"n": 1})
+        event.attempts = MAX_ATTEMPTS - 1
+        db_session.commit()
+
+        await dispatch_outbox(db_session)
+        db_session.refresh(event)
+        assert event.status == "failed"
+
+    @pytest.mark.asyncio
+    async def test_unknown_kind_is_retried_not_lost(self, db_session, handler):
+        add_outbox_event(db_session, "nieznany", {})
+        db_session.commit()
+
+        await dispatch_outbox(db_session)
+        event = db_session.query(OutboxEvent).one()
+        assert event.attempts == 1
+        assert "nieznany" in event.last_error
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self, db_session, handler):
+        for n in range(5):
+            add_outbox_event(db_session, "test", {"n": n})
+        db_session.commit()
+
+        assert await dispatch_outbox(db_session, batch_size=2) == 2
+        assert db_session.query(OutboxEvent).count() == 3
+
+    @pytest.mark.asyncio
+    async def test_not_yet_available_is_skipped(self, db_session, handler):
+        event = add_outbox_event(db_session, "test", {})
+        event.available_at = datetime.utcnow() + timedelta(minutes=5)
+        db_session.commit()
+
+        assert await dispatch_outbox(db_session) == 0
+
+
+class TestBroadcastHandler:
+
+    @pytest.mark.asyncio
+    async def test_broadcast_rows_are_sent_through_broadcaster(self, db_session, monkeypatch):
+        from api.v1.notifications import realtime
+
+        sent = []
+
+        class FakeBroadcaster:
+            async def send(self, messages):
+                sent.append(messages)
+                return True
+
+        monkeypatch.setattr(realtime, "_broadcaster", FakeBroadcaster())
+        realtime.enqueue_broadcast(db_session, 5, "new_invite", {"a": 1})
+        realtime.enqueue_broadcast(db_session, 6, "new_invite", {"a": 2})
+        db_session.commit()
+
+        assert await dispatch_outbox(db_session) == 2
+        assert sent == [[
+            {"topic": "notifications:5", "event": "new_invite", "payload": {"a": 1}},
+            {"topic": "notifications:6", "event": "new_invite", "payload": {"a": 2}},
+        ]]
+
+    @pytest.mark.asyncio
+    async def test_broadcast_batch_is_flattened(self, db_session, monkeypatch):
+        from api.v1.notifications import realtime
+
+        sent = []
+
+        class FakeBroadcaster:
+            async def send(self, messages):
+                sent.append(messages)
+                return True
+
+        monkeypatch.setattr(realtime, "_broadcaster", FakeBroadcaster())
+        monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+        monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "key")
+        realtime.enqueue_broadcast_batch(db_session, [(1, "e", {}), (2, "e", {})])
+        db_session.commit()
+
+        assert await dispatch_outbox(db_session) == 1
+        assert [m["topic"] for m in sent[0]] == ["notifications:1", "notifications:2"]
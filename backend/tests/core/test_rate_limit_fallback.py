@@ -0,0 +1,112 @@
+"""
+Testy trybu awaryjnego rate limitingu (core/rate_limit_fallback.py)
+"""
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import core.rate_limit_fallback as fallback
+from core.rate_limit_fallback import LocalTokenBuckets, RedisCircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(fallback.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestLocalTokenBuckets:
+
+    def test_blocks_after_capacity(self, clock):
+        buckets = LocalTokenBuckets(max_keys=100)
+
+        results = [buckets.check(["k"], limit=3, window_seconds=60) for _ in range(4)]
+
+        assert [allowed for allowed, _, _ in results] == [True, True, True, False]
+        assert [remaining for _, remaining, _ in results[:3]] == [2, 1, 0]
+        # 3 tokeny / 60 s → kolejny za 20 s
+        assert results[3][2] == 20_000
+
+    def test_refills_over_time(self, clock):
+        buckets = LocalTokenBuckets(max_keys=100)
+        for _ in range(3):
+            buckets.check(["k"], limit=3, window_seconds=60)
+
+        clock[0] += 20
+        assert buckets.check(["k"], limit=3, window_seconds=60)[0] is True
+        assert buckets.check(["k"], limit=3, window_seconds=60)[0] is False
+
+    def test_takes_token_from_all_keys_or_none(self, clock):
+        buckets = LocalTokenBuckets(max_keys=100)
+        buckets.check(["ip", "id:a"], limit=1, window_seconds=60)
+
+        # "ip" pusty → request odrzucony, "id:b" nie traci tokena
+        assert buckets.check(["ip", "id:b"], limit=1, window_seconds=60)[0] is False
+        assert buckets.check(["other-ip", "id:b"], limit=1, window_seconds=60)[0] is True
+
+    def test_memory_is_bounded(self, clock):
+        buckets = LocalTokenBuckets(max_keys=10)
+
+        for i in range(100):
+            buckets.check([f"ip:{i}"], limit=5, window_seconds=60)
+
+        assert len(buckets) == 10
+
+
+class TestRedisCircuitBreaker:
+
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold(self):
+        breaker = RedisCircuitBreaker(failure_threshold=3, probe_interval=3600)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        assert not breaker.is_open
+        breaker.record_failure()
+
+        assert breaker.is_open
+        assert breaker.snapshot()["mode"] == "local"
+        await breaker.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_success_resets_failure_count(self):
+        breaker = RedisCircuitBreaker(failure_threshold=2, probe_interval=3600)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert not breaker.is_open
+
+    @pytest.mark.asyncio
+    async def test_probe_closes_breaker_when_redis_answers(self, redis_client, monkeypatch):
+        monkeypatch.setattr(fallback, "get_redis_client", lambda: redis_client)
+        breaker = RedisCircuitBreaker(failure_threshold=1, probe_interval=0.01)
+
+        breaker.record_failure()
+        assert breaker.is_open
+        await asyncio.wait_for(breaker._probe, timeout=1)
+
+        assert not breaker.is_open
+        assert breaker.snapshot()["times_opened"] == 1
+
+    @pytest.mark.asyncio
+    async def test_probe_keeps_breaker_open_while_redis_is_down(self, monkeypatch):
+        pings = []
+
+        class DeadRedis:
+            async def ping(self):
+                pings.append(1)
+                raise RedisConnectionError("connection refused")
+
+        monkeypatch.setattr(fallback, "get_redis_client", lambda: DeadRedis())
+        breaker = RedisCircuitBreaker(failure_threshold=1, probe_interval=0.01)
+
+        breaker.record_failure()
+        await asyncio.sleep(0.1)
+
+        assert breaker.is_open
+        assert len(pings) >= 2
+        await breaker.shutdown()
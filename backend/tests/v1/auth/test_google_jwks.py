@@ -0,0 +1,135 @@
+"""
+Testy lokalnej weryfikacji Google ID tokenów
+api/v1/auth/google_jwks.py — klucze generowane w teście, bez sieci
+"""
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from api.v1.auth import google_jwks
+from api.v1.auth.google_jwks import GoogleKeySet, verify_google_id_token
+
+AUDIENCE = "client-id.apps.googleusercontent.com"
+
+
+def make_key(kid: str):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+def make_token(pem, kid, **claims):
+    now = int(time.time())
+    body = {
+        "iss": "https://accounts.google.com", "aud": AUDIENCE, "sub": "google-123",
+        "email": "g@example.com", "iat": now, "exp": now + 600, **claims,
+    }
+    return jwt.encode(body, pem, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(scope="module")
+def key_a():
+    return make_key("a")
+
+
+@pytest.fixture(scope="module")
+def key_b():
+    return make_key("b")
+
+
+class JwksTransport(httpx.AsyncBaseTransport):
+    def __init__(self, keys, max_age=3600):
+        self.keys = keys
+        self.max_age = max_age
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        return httpx.Response(
+            200, json={"keys": self.keys},
+            headers={"Cache-Control": f"public, max-age={self.max_age}, must-revalidate"},
+        )
+
+
+class TestVerifyGoogleIdToken:
+
+    @pytest.mark.asyncio
+    async def test_valid_token_returns_claims(self, key_a):
+        pem, public = key_a
+        claims = await verify_google_id_token(make_token(pem, "a"), AUDIENCE, GoogleKeySet(keys=[public]))
+        assert claims["sub"] == "google-123"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("claims", [
+        {"aud": "someone-else"},
+        {"iss": "https://evil.example.com"},
+        {"exp": int(time.time()) - 3600},
+    ])
+    async def test_rejects_bad_claims(self, key_a, claims):
+        pem, public = key_a
+        with pytest.raises(ValueError):
+            await verify_google_id_token(make_token(pem, "a", **claims), AUDIENCE, GoogleKeySet(keys=[public]))
+
+    @pytest.mark.asyncio
+    async def test_rejects_wrong_signature(self, key_a, key_b):
+        pem_b, _ = key_b
+        _, public_a = key_a
+        # Podpisany kluczem B, ale z kid klucza A
+        with pytest.raises(ValueError):
+            await verify_google_id_token(make_token(pem_b, "a"), AUDIENCE, GoogleKeySet(keys=[public_a]))
+
+    @pytest.mark.asyncio
+    async def test_rejects_garbage(self):
+        with pytest.raises(ValueError):
+            await verify_google_id_token("nie-jwt", AUDIENCE, GoogleKeySet(keys=[]))
+
+
+class TestGoogleKeySet:
+
+    @pytest.mark.asyncio
+    async def test_keys_are_fetched_once_while_fresh(self, key_a):
+        pem, public = key_a
+        transport = JwksTransport([public])
+        key_set = GoogleKeySet(transport=transport)
+
+        for _ in range(3):
+            await verify_google_id_token(make_token(pem, "a"), AUDIENCE, key_set)
+
+        assert transport.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_triggers_refresh(self, key_a, key_b):
+        transport = JwksTransport([key_a[1]])
+        key_set = GoogleKeySet(transport=transport)
+        await key_set.refresh()
+
+        transport.keys = [key_a[1], key_b[1]]
+        key_set._last_fetch -= google_jwks.MIN_REFRESH_INTERVAL_SECONDS
+
+        claims = await verify_google_id_token(make_token(key_b[0], "b"), AUDIENCE, key_set)
+        assert claims["sub"] == "google-123"
+        assert transport.requests == 2
+
+    @pytest.mark.asyncio
+    async def test_expiring_keys_refresh_in_background(self, key_a):
+        transport = JwksTransport([key_a[1]], max_age=60)
+        key_set = GoogleKeySet(transport=transport)
+        await key_set.refresh()
+
+        # max-age 60 s < REFRESH_AHEAD_SECONDS → klucz z cache + odświeżenie w tle
+        assert await key_set.get_key("a") is not None
+        await key_set._refreshing
+        assert transport.requests == 2
+
+    @pytest.mark.asyncio
+    async def test_fetch_error_keeps_previous_keys(self, key_a):
+        key_set = GoogleKeySet(keys=[key_a[1]], transport=httpx.MockTransport(lambda r: httpx.Response(503)))
+        await key_set.refresh()
+        assert await key_set.get_key("a") is not None
@@ -19,7 +19,7 @@ GOOGLE_IDINFO = {
     "email_verified": True,
 }
 
-VERIFY_PATH = "api.v1.auth.service.id_token.verify_oauth2_token"
+VERIFY_PATH = "api.v1.auth.service.verify_google_id_token"
 
 
 class TestGoogleLoginNewUser:
@@ -45,9 +45,10 @@ class TestGoogleLoginNewUser:
         assert len(refresh_token) == 64
 
     @pytest.mark.asyncio
-    async def test_creates_starter_workspace(self, db_session):
+    async def test_creates_starter_workspace(self, db_session, run_onboarding):
         with patch(VERIFY_PATH, return_value=GOOGLE_IDINFO):
             await AuthService(db_session).google_login("fake-credential")
+        await run_onboarding()
 
         user = db_session.query(User).filter(User.email == "google@example.com").first()
         workspace = db_session.query(Workspace).filter(Workspace.created_by == user.id).first()
@@ -9,7 +9,7 @@ from api.v1.auth.service import AuthService
 from api.v1.auth.schemas import RegisterUser, LoginData, VerifyEmail, ResetPassword, RequestPasswordReset
 from core.models import User, Workspace, WorkspaceMember
 
-MOCK_EMAIL = "api.v1.auth.service.send_email"
+MOCK_EMAIL = "api.v1.auth.service.enqueue_email"
 
 class TestRegistrationToLoginFlow:
 
@@ -50,8 +50,8 @@ class TestRegistrationToLoginFlow:
         assert login_result.access_token
 
     @pytest.mark.asyncio
-    async def test_register_creates_complete_workspace_setup(self, db_session, redis_client):
-        """Rejestracja tworzy user + workspace + membership + active_workspace"""
+    async def test_register_creates_complete_workspace_setup(self, db_session, redis_client, run_onboarding):
+        """Rejestracja + onboarding w tle tworzą user + workspace + membership + active_workspace"""
         service = AuthService(db_session, redis_client)
 
         with patch(MOCK_EMAIL, new_callable=AsyncMock):
@@ -61,6 +61,7 @@ class TestRegistrationToLoginFlow:
                 password="SecurePass1",
                 password_confirm="SecurePass1",
             ))
+        await run_onboarding()
 
         db_user = db_session.query(User).filter(User.id == result.user.id).first()
 
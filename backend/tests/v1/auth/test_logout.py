@@ -11,11 +11,18 @@ from core.exceptions import AuthenticationError
 from core.models import RefreshToken
 
 
+@pytest.fixture
+def audit_log(monkeypatch):
+    """Log audytowy refresh tokenów w Postgresie (domyślnie wyłączony)."""
+    from core.config import get_settings
+    monkeypatch.setattr(get_settings(), "refresh_token_audit", True)
+
+
 class TestLogoutSuccess:
 
     @pytest.mark.asyncio
-    async def test_logout_revokes_refresh_token(self, db_session, test_user):
-        """Wylogowanie unieważnia refresh token"""
+    async def test_logout_revokes_refresh_token(self, db_session, test_user, audit_log):
+        """Wylogowanie unieważnia refresh token (także w logu audytowym)"""
         _, refresh_token = await AuthService(db_session).login_user(
             LoginData(login=test_user.username, password="testpassword")
         )
@@ -0,0 +1,81 @@
+"""
+Testy puli bcrypt
+api/v1/auth/password_pool.py (+ rehash przy logowaniu w AuthService.login_user)
+"""
+import asyncio
+import time
+
+import pytest
+from passlib.hash import bcrypt
+
+from api.v1.auth.password_pool import PasswordPool, hash_password_async, verify_password_async
+from api.v1.auth.schemas import LoginData
+from api.v1.auth.service import AuthService
+from api.v1.auth.utils import verify_password
+from core.exceptions import AppException
+
+
+class TestPasswordHelpers:
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_round_trip(self):
+        hashed = await hash_password_async("Haslo123")
+
+        assert await verify_password_async("Haslo123", hashed) == (True, None)
+        assert (await verify_password_async("zle", hashed))[0] is False
+
+    @pytest.mark.asyncio
+    async def test_missing_hash_never_matches(self):
+        assert await verify_password_async("cokolwiek", None) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_low_cost_hash_is_upgraded(self):
+        weak = bcrypt.using(rounds=4).hash("Haslo123")
+
+        ok, new_hash = await verify_password_async("Haslo123", weak)
+
+        assert ok is True
+        assert new_hash is not None and new_hash != weak
+        assert verify_password("Haslo123", new_hash)
+
+
+class TestPasswordPool:
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_full(self):
+        pool = PasswordPool(workers=1, max_pending=1)
+        slow = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AppException) as exc:
+            await pool.run(time.sleep, 0)
+        assert exc.value.status_code == 503
+
+        await slow
+        assert pool.metrics.rejected == 1
+        assert pool.metrics.completed == 1
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_queue_metrics(self):
+        pool = PasswordPool(workers=1, max_pending=10)
+        await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(3)))
+
+        metrics = pool.snapshot()
+        assert metrics["submitted"] == metrics["completed"] == 3
+        assert metrics["max_queue_depth"] == 2
+        assert metrics["queue_depth"] == 0
+        assert metrics["max_wait_ms"] >= 50
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_rewrites_outdated_hash(db_session, test_user):
+    test_user.hashed_password = bcrypt.using(rounds=4).hash("testpassword")
+    db_session.commit()
+
+    await AuthService(db_session).login_user(LoginData(login=test_user.username, password="testpassword"))
+
+    db_session.refresh(test_user)
+    assert not test_user.hashed_password.startswith("$2b$04$")
+    assert verify_password("testpassword", test_user.hashed_password)
@@ -0,0 +1,129 @@
+"""
+Testy cache zalogowanego usera
+api/v1/auth/principal_cache.py + get_current_user / get_current_user_id
+"""
+import time
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from main import app
+from api.v1.auth.dependencies import get_current_user_id
+from api.v1.auth.principal_cache import invalidate_principal, principal_cache, token_digest
+from api.v1.auth.utils import create_access_token
+from core.config import get_settings
+from core.database import get_db
+from core.exceptions import AuthenticationError
+
+settings = get_settings()
+
+
+def make_token(user_id: int) -> str:
+    return create_access_token({"sub": str(user_id)}, settings.secret_key, settings.algorithm)
+
+
+@pytest.fixture
+def client(db_session):
+    app.dependency_overrides[get_db] = lambda: db_session
+    with TestClient(app, raise_server_exceptions=False) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def user_selects(db_session):
+    """Lista zapytań SELECT … FROM users wykonanych w trakcie testu."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+class TestGetCurrentUserCache:
+
+    def test_second_request_skips_users_table(self, client, test_user, user_selects):
+        headers = {"Authorization": f"Bearer {make_token(test_user.id)}"}
+
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+        first = len(user_selects)
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+        assert first >= 1
+        assert len(user_selects) == first
+
+    @pytest.mark.asyncio
+    async def test_shared_entry_serves_other_tokens(self, client, test_user, user_selects, redis_client):
+        client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {make_token(test_user.id)}"})
+        assert await redis_client.get(f"auth:principal:{test_user.id}") is not None
+        principal_cache.clear()
+        before = len(user_selects)
+
+        time.sleep(1)  # inny `exp` → inny token, ten sam user
+        r = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {make_token(test_user.id)}"})
+
+        assert r.json()["data"]["user"]["id"] == test_user.id
+        assert len(user_selects) == before
+
+    def test_avatar_change_is_visible_immediately(self, client, test_user):
+        headers = {"Authorization": f"Bearer {make_token(test_user.id)}"}
+        client.get("/api/v1/auth/me", headers=headers)
+
+        client.put("/api/v1/auth/users/me", json={"avatar_url": "https://x/a.png"}, headers=headers)
+
+        assert client.get("/api/v1/auth/me", headers=headers).json()["data"]["user"]["avatar_url"] == "https://x/a.png"
+
+    def test_unread_counter_is_not_cached(self, client, db_session, test_user):
+        headers = {"Authorization": f"Bearer {make_token(test_user.id)}"}
+        client.get("/api/v1/notifications/unread-count", headers=headers)
+
+        test_user.unread_notifications = 7
+        db_session.commit()
+        db_session.expunge_all()
+
+        r = client.get("/api/v1/notifications/unread-count", headers=headers)
+        assert r.json()["data"] == {"unread_count": 7}
+
+
+class TestPrincipalCache:
+
+    @pytest.mark.asyncio
+    async def test_invalidate_clears_both_levels(self, redis_client):
+        principal_cache.put_local("digest", 5, time.time() + 60, {"id": 5})
+        await principal_cache.put_shared(5, {"id": 5, "created_at": None}, redis_client)
+
+        await invalidate_principal(5, redis_client)
+
+        assert principal_cache.get_local("digest") is None
+        assert await principal_cache.get_shared(5, redis_client) is None
+
+    def test_local_entry_dies_with_token(self):
+        principal_cache.put_local("digest", 5, time.time() - 1, {"id": 5})
+        assert principal_cache.get_local("digest") is None
+
+    def test_lru_evicts_oldest(self, monkeypatch):
+        monkeypatch.setattr(principal_cache, "max_entries", 2)
+        for n in range(3):
+            principal_cache.put_local(token_digest(str(n)), n, time.time() + 60, {"id": n})
+        assert principal_cache.get_local(token_digest("0")) is None
+        assert principal_cache.get_local(token_digest("2")) == (2, {"id": 2})
+
+
+class TestGetCurrentUserId:
+
+    def test_returns_id_without_db(self):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token(42))
+        assert get_current_user_id(credentials) == 42
+
+    def test_rejects_missing_and_invalid_token(self):
+        with pytest.raises(AuthenticationError):
+            get_current_user_id(None)
+        with pytest.raises(AuthenticationError):
+            get_current_user_id(HTTPAuthorizationCredentials(scheme="Bearer", credentials="nie-jwt"))
@@ -3,6 +3,7 @@ Testy rate limitingu na endpointach auth
 """
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
+from fastapi import Response
 from fastapi.testclient import TestClient
 from redis.exceptions import ConnectionError as RedisConnectionError
 
@@ -12,7 +13,7 @@ from core.exceptions import AppException
 from main import app
 from core.database import get_db
 
-MOCK_EMAIL = "api.v1.auth.service.send_email"
+MOCK_EMAIL = "api.v1.auth.service.enqueue_email"
 
 
 def make_request(client_host: str, body: dict):
@@ -37,7 +38,7 @@ class TestRateLimitDependencyUnit:
         fn = rate_limit("test_scope", limit=3, window_seconds=60, identifier_field="email")
 
         for _ in range(3):
-            await fn(make_request("1.1.1.1", {"email": "a@a.com"}))
+            await fn(make_request("1.1.1.1", {"email": "a@a.com"}), Response())
         # brak wyjątku = OK, 3 requesty mieszczą się w limicie 3
 
     @pytest.mark.asyncio
@@ -47,10 +48,10 @@ class TestRateLimitDependencyUnit:
         fn = rate_limit("test_scope", limit=3, window_seconds=60, identifier_field="email")
 
         for _ in range(3):
-            await fn(make_request("1.1.1.1", {"email": "a@a.com"}))
+            await fn(make_request("1.1.1.1", {"email": "a@a.com"}), Response())
 
         with pytest.raises(AppException) as exc:
-            await fn(make_request("2.2.2.2", {"email": "a@a.com"}))
+            await fn(make_request("2.2.2.2", {"email": "a@a.com"}), Response())
 
         assert exc.value.status_code == 429
         assert exc.value.code == "RATE_LIMITED"
@@ -62,10 +63,10 @@ class TestRateLimitDependencyUnit:
         fn = rate_limit("test_scope", limit=3, window_seconds=60, identifier_field="email")
 
         for i in range(3):
-            await fn(make_request("1.1.1.1", {"email": f"user{i}@a.com"}))
+            await fn(make_request("1.1.1.1", {"email": f"user{i}@a.com"}), Response())
 
         with pytest.raises(AppException) as exc:
-            await fn(make_request("1.1.1.1", {"email": "inny@a.com"}))
+            await fn(make_request("1.1.1.1", {"email": "inny@a.com"}), Response())
 
         assert exc.value.status_code == 429
         assert exc.value.code == "RATE_LIMITED"
@@ -76,8 +77,8 @@ class TestRateLimitDependencyUnit:
         monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
         fn = rate_limit("test_scope", limit=1, window_seconds=60, identifier_field="email")
 
-        await fn(make_request("1.1.1.1", {"email": "a@a.com"}))
-        await fn(make_request("2.2.2.2", {"email": "b@b.com"}))  # nie powinno rzucić
+        await fn(make_request("1.1.1.1", {"email": "a@a.com"}), Response())
+        await fn(make_request("2.2.2.2", {"email": "b@b.com"}), Response())  # nie powinno rzucić
 
     @pytest.mark.asyncio
     async def test_missing_identifier_field_falls_back_to_ip_only(self, redis_client, monkeypatch):
@@ -85,30 +86,133 @@ class TestRateLimitDependencyUnit:
         monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
         fn = rate_limit("test_scope", limit=2, window_seconds=60, identifier_field="email")
 
-        await fn(make_request("1.1.1.1", {}))
-        await fn(make_request("1.1.1.1", {}))
+        await fn(make_request("1.1.1.1", {}), Response())
+        await fn(make_request("1.1.1.1", {}), Response())
 
         with pytest.raises(AppException) as exc:
-            await fn(make_request("1.1.1.1", {}))
+            await fn(make_request("1.1.1.1", {}), Response())
 
         assert exc.value.status_code == 429
 
     @pytest.mark.asyncio
-    async def test_redis_connection_error_raises_503(self, monkeypatch):
-        """Awaria połączenia z Redis -> fail-closed, 503 REDIS_ERROR"""
+    async def test_redis_connection_error_falls_back_to_local_limit(self, monkeypatch):
+        """Awaria połączenia z Redis -> limit liczony lokalnie (bez 503), nadal egzekwowany"""
 
         class BrokenRedis:
-            async def incr(self, key):
-                raise RedisConnectionError("connection refused")
+            def register_script(self, script):
+                async def call(keys, args):
+                    raise RedisConnectionError("connection refused")
+                return call
 
         monkeypatch.setattr(rl, "get_redis_client", lambda: BrokenRedis())
-        fn = rate_limit("test_scope", limit=5, window_seconds=60)
+        fn = rate_limit("test_scope", limit=2, window_seconds=60)
 
+        response = Response()
+        await fn(make_request("1.1.1.1", {}), response)
+        await fn(make_request("1.1.1.1", {}), Response())
         with pytest.raises(AppException) as exc:
-            await fn(make_request("1.1.1.1", {}))
+            await fn(make_request("1.1.1.1", {}), Response())
 
-        assert exc.value.status_code == 503
-        assert exc.value.code == "REDIS_ERROR"
+        assert response.headers["X-RateLimit-Remaining"] == "1"
+        assert exc.value.status_code == 429
+        assert exc.value.code == "RATE_LIMITED"
+        assert int(exc.value.headers["Retry-After"]) > 0
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_skips_redis(self, monkeypatch):
+        """Po progu błędów Redis nie jest już pytany — requesty nie czekają na martwy serwer"""
+        from core.config import get_settings
+        from core.rate_limit_fallback import get_rate_limit_breaker
+
+        calls = []
+
+        class BrokenRedis:
+            def register_script(self, script):
+                async def call(keys, args):
+                    calls.append(keys)
+                    raise RedisConnectionError("connection refused")
+                return call
+
+        monkeypatch.setattr(rl, "get_redis_client", lambda: BrokenRedis())
+        monkeypatch.setattr(get_settings(), "rate_limit_breaker_probe_interval_seconds", 3600)
+        fn = rate_limit("test_scope", limit=100, window_seconds=60)
+
+        for _ in range(10):
+            await fn(make_request("1.1.1.1", {}), Response())
+
+        breaker = get_rate_limit_breaker()
+        assert breaker.is_open
+        assert len(calls) == get_settings().rate_limit_breaker_failure_threshold
+        assert breaker.local_decisions == 10
+
+    @pytest.mark.asyncio
+    async def test_sets_rate_limit_headers(self, redis_client, monkeypatch):
+        monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
+        fn = rate_limit("test_scope", limit=3, window_seconds=60, identifier_field="email")
+
+        response = Response()
+        await fn(make_request("1.1.1.1", {"email": "a@a.com"}), response)
+        await fn(make_request("1.1.1.1", {"email": "a@a.com"}), response)
+
+        assert response.headers["X-RateLimit-Limit"] == "3"
+        assert response.headers["X-RateLimit-Remaining"] == "1"
+        assert 0 < int(response.headers["X-RateLimit-Reset"]) <= 60
+
+    @pytest.mark.asyncio
+    async def test_429_carries_retry_after(self, redis_client, monkeypatch):
+        monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
+        fn = rate_limit("test_scope", limit=1, window_seconds=60)
+
+        await fn(make_request("1.1.1.1", {}), Response())
+        with pytest.raises(AppException) as exc:
+            await fn(make_request("1.1.1.1", {}), Response())
+
+        assert 0 < int(exc.value.headers["Retry-After"]) <= 60
+        assert exc.value.headers["X-RateLimit-Remaining"] == "0"
+
+    @pytest.mark.asyncio
+    async def test_every_key_has_ttl(self, redis_client, monkeypatch):
+        """Klucz nigdy nie zostaje bez TTL (stary INCR + EXPIRE mógł go tak zostawić)"""
+        monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
+        fn = rate_limit("test_scope", limit=3, window_seconds=60, identifier_field="email")
+
+        await fn(make_request("1.1.1.1", {"email": "a@a.com"}), Response())
+
+        keys = await redis_client.keys("ratelimit:test_scope:*")
+        assert len(keys) == 2
+        for key in keys:
+            assert 0 < await redis_client.pttl(key) <= 60_000
+
+    @pytest.mark.asyncio
+    async def test_window_slides(self, redis_client, monkeypatch):
+        """Po upływie okna najstarsze requesty przestają się liczyć"""
+        now = [1_000_000]
+        monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
+        monkeypatch.setattr(rl, "_now_ms", lambda: now[0])
+        fn = rate_limit("test_scope", limit=2, window_seconds=60)
+
+        await fn(make_request("1.1.1.1", {}), Response())
+        now[0] += 30_000
+        await fn(make_request("1.1.1.1", {}), Response())
+        with pytest.raises(AppException) as exc:
+            await fn(make_request("1.1.1.1", {}), Response())
+        assert exc.value.headers["Retry-After"] == "30"
+
+        now[0] += 30_001
+        await fn(make_request("1.1.1.1", {}), Response())
+
+    @pytest.mark.asyncio
+    async def test_rejected_requests_do_not_consume_limit(self, redis_client, monkeypatch):
+        """Odrzucony request (np. przez limit per-IP) nie jest dopisywany do żadnego klucza"""
+        monkeypatch.setattr(rl, "get_redis_client", lambda: redis_client)
+        fn = rate_limit("test_scope", limit=1, window_seconds=60, identifier_field="email")
+
+        await fn(make_request("1.1.1.1", {"email": "a@a.com"}), Response())
+        with pytest.raises(AppException):
+            await fn(make_request("1.1.1.1", {"email": "b@b.com"}), Response())
+
+        # b@b.com nie zostało policzone — z innego IP przechodzi
+        await fn(make_request("2.2.2.2", {"email": "b@b.com"}), Response())
 
 
 # ─── Testy end-to-end przez TestClient (potwierdzenie wpięcia w router) ────
@@ -155,6 +259,17 @@ class TestLoginRateLimitIntegration:
         body = last.json()
         assert body["success"] is False
         assert body["code"] == "RATE_LIMITED"
+        assert int(last.headers["Retry-After"]) > 0
+
+    def test_successful_response_has_rate_limit_headers(self, client, test_user):
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"login": test_user.username, "password": "testpassword"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Limit"] == "10"
+        assert response.headers["X-RateLimit-Remaining"] == "9"
 
 
 class TestResendCodeRateLimitIntegration:
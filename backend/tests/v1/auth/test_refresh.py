@@ -12,6 +12,13 @@ from core.exceptions import AuthenticationError
 from core.models import RefreshToken
 
 
+@pytest.fixture
+def audit_log(monkeypatch):
+    """Log audytowy refresh tokenów w Postgresie (domyślnie wyłączony)."""
+    from core.config import get_settings
+    monkeypatch.setattr(get_settings(), "refresh_token_audit", True)
+
+
 class TestRefreshSuccess:
 
     @pytest.mark.asyncio
@@ -39,8 +46,8 @@ class TestRefreshSuccess:
         assert len(new_refresh_token) == 64
 
     @pytest.mark.asyncio
-    async def test_old_refresh_token_revoked_after_use(self, db_session, test_user):
-        """Po użyciu stary refresh token jest unieważniony"""
+    async def test_old_refresh_token_revoked_after_use(self, db_session, test_user, audit_log):
+        """Po użyciu stary refresh token jest unieważniony (także w logu audytowym)"""
         _, refresh_token = await AuthService(db_session).login_user(
             LoginData(login=test_user.username, password="testpassword")
         )
@@ -55,8 +62,8 @@ class TestRefreshSuccess:
         assert db_token.revoked is True
 
     @pytest.mark.asyncio
-    async def test_new_refresh_token_saved_to_db(self, db_session, test_user):
-        """Nowy refresh token jest zapisany w bazie"""
+    async def test_new_refresh_token_saved_to_db(self, db_session, test_user, audit_log):
+        """Nowy refresh token jest zapisany w logu audytowym"""
         _, refresh_token = await AuthService(db_session).login_user(
             LoginData(login=test_user.username, password="testpassword")
         )
@@ -114,3 +121,61 @@ class TestRefreshErrors:
             await AuthService(db_session).refresh_session(plain_token)
 
         assert "wygasł" in exc.value.message.lower()
+
+
+class TestRedisRefreshStore:
+
+    @pytest.mark.asyncio
+    async def test_refresh_without_database_writes(self, db_session, test_user, redis_client):
+        """Domyślnie refresh tokeny są tylko w Redis, z TTL"""
+        _, refresh_token = await AuthService(db_session, redis_client).login_user(
+            LoginData(login=test_user.username, password="testpassword")
+        )
+        _, new_token = await AuthService(db_session, redis_client).refresh_session(refresh_token)
+
+        assert db_session.query(RefreshToken).count() == 0
+        assert await redis_client.get(f"auth:refresh:{hash_refresh_token(refresh_token)}") is None
+        new_key = f"auth:refresh:{hash_refresh_token(new_token)}"
+        assert await redis_client.get(new_key) == str(test_user.id)
+        assert 0 < await redis_client.ttl(new_key) <= 7 * 24 * 3600
+
+    @pytest.mark.asyncio
+    async def test_user_comes_from_principal_cache(self, db_session, test_user, redis_client):
+        from api.v1.auth.principal_cache import principal_cache, principal_data
+
+        _, refresh_token = await AuthService(db_session, redis_client).login_user(
+            LoginData(login=test_user.username, password="testpassword")
+        )
+        data = {**principal_data(test_user), "username": "z-cache"}
+        await principal_cache.put_shared(test_user.id, data, redis_client)
+
+        result, _ = await AuthService(db_session, redis_client).refresh_session(refresh_token)
+        assert result.user.username == "z-cache"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refresh_single_winner(self, db_session, test_user, redis_client):
+        import asyncio
+
+        _, refresh_token = await AuthService(db_session, redis_client).login_user(
+            LoginData(login=test_user.username, password="testpassword")
+        )
+        results = await asyncio.gather(
+            *(AuthService(db_session, redis_client).refresh_session(refresh_token) for _ in range(2)),
+            return_exceptions=True,
+        )
+        assert sum(isinstance(r, AuthenticationError) for r in results) == 1
+
+    @pytest.mark.asyncio
+    async def test_legacy_database_token_moves_to_redis(self, db_session, test_user, redis_client):
+        """Token wydany przed przejściem na Redis (tylko w tabeli) nadal odświeża sesję"""
+        plain_token = generate_refresh_token()
+        db_session.add(RefreshToken(
+            user_id=test_user.id, token_hash=hash_refresh_token(plain_token),
+            expires_at=datetime.utcnow() + timedelta(days=1), revoked=False,
+        ))
+        db_session.commit()
+
+        _, new_token = await AuthService(db_session, redis_client).refresh_session(plain_token)
+
+        assert db_session.query(RefreshToken).one().revoked is True
+        assert await redis_client.get(f"auth:refresh:{hash_refresh_token(new_token)}") == str(test_user.id)
@@ -11,7 +11,7 @@ from api.v1.auth.utils import verify_password
 from core.exceptions import ConflictError
 from core.models import User, Workspace, WorkspaceMember
 
-MOCK_EMAIL = "api.v1.auth.service.send_email"
+MOCK_EMAIL = "api.v1.auth.service.enqueue_email"
 
 VALID_DATA = dict(
     username="newuser",
@@ -71,10 +71,11 @@ class TestRegisterSuccess:
         assert ttl > 0
 
     @pytest.mark.asyncio
-    async def test_creates_starter_workspace(self, db_session, redis_client):
-        """Tworzy starter workspace."""
+    async def test_creates_starter_workspace(self, db_session, redis_client, run_onboarding):
+        """Tworzy starter workspace (onboarding w tle, po commicie)."""
         with patch(MOCK_EMAIL, new_callable=AsyncMock):
             result = await AuthService(db_session, redis_client).register_user(make_user_data())
+        await run_onboarding()
 
         db_user = db_session.query(User).filter(User.id == result.user.id).first()
 
@@ -85,10 +86,11 @@ class TestRegisterSuccess:
         assert workspace.name == "Moja przestrzeń"
 
     @pytest.mark.asyncio
-    async def test_creates_owner_membership(self, db_session, redis_client):
+    async def test_creates_owner_membership(self, db_session, redis_client, run_onboarding):
         """Tworzy membership z rolą owner i is_favourite=True"""
         with patch(MOCK_EMAIL, new_callable=AsyncMock):
             result = await AuthService(db_session, redis_client).register_user(make_user_data())
+        await run_onboarding()
 
         workspace = db_session.query(Workspace).filter(
             Workspace.created_by == result.user.id
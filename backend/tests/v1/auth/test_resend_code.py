@@ -9,7 +9,7 @@ from api.v1.auth.service import AuthService
 from api.v1.auth.schemas import MessageResponse
 from core.exceptions import NotFoundError, ValidationError
 
-MOCK_EMAIL = "api.v1.auth.service.send_email"
+MOCK_EMAIL = "api.v1.auth.service.enqueue_email"
 
 
 class TestResendCodeSuccess:
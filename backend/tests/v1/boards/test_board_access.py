@@ -0,0 +1,161 @@
+"""
+Testy api/v1/boards/access.py — dostęp do tablicy jednym zapytaniem
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from api.v1.boards.access import ensure_board_access, require_board_access, resolve_board_access
+from api.v1.workspaces.acl_cache import publish_acl_invalidations
+from api.v1.whiteboard.service import WhiteboardService
+from core.config import get_settings
+from core.exceptions import AppException, NotFoundError
+from core.models import Board, WorkspaceMember
+
+
+@pytest.fixture
+def selects(db_session):
+    """Lista zapytań SELECT wykonanych w trakcie testu."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def board_access_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "board_access_cache_ttl_seconds", 5)
+
+
+class TestResolveBoardAccess:
+
+    def test_single_query(self, db_session, test_user, test_board, selects):
+        board_id, user_id = test_board.id, test_user.id
+        selects.clear()
+
+        access = resolve_board_access(db_session, board_id, user_id)
+
+        assert len(selects) == 1
+        assert access.board.id == board_id
+        assert access.role == "owner"
+        assert access.board_user is not None
+        assert access.is_owner
+
+    def test_cached_within_session(self, db_session, test_user, test_board, selects):
+        board_id, user_id = test_board.id, test_user.id
+        selects.clear()
+
+        first = resolve_board_access(db_session, board_id, user_id)
+        second = resolve_board_access(db_session, board_id, user_id)
+
+        assert second is first
+        assert len(selects) == 1
+
+    def test_commit_drops_cache(self, db_session, test_user2, test_board, test_workspace):
+        assert resolve_board_access(db_session, test_board.id, test_user2.id).role is None
+
+        db_session.add(WorkspaceMember(
+            workspace_id=test_workspace.id, user_id=test_user2.id,
+            role="editor", is_favourite=False, joined_at=datetime.utcnow(),
+        ))
+        db_session.commit()
+
+        assert resolve_board_access(db_session, test_board.id, test_user2.id).role == "editor"
+
+    def test_missing_board_raises_404(self, db_session, test_user):
+        with pytest.raises(NotFoundError):
+            resolve_board_access(db_session, 99999, test_user.id)
+
+    def test_stranger_gets_403(self, db_session, test_user2, test_board):
+        with pytest.raises(AppException) as exc:
+            require_board_access(db_session, test_board.id, test_user2.id)
+        assert exc.value.status_code == 403
+
+    def test_board_creator_outside_workspace_has_access(self, db_session, test_user2, test_workspace):
+        board = Board(
+            name="Cudza", workspace_id=test_workspace.id, created_by=test_user2.id,
+            created_at=datetime.utcnow(), last_modified=datetime.utcnow(),
+        )
+        db_session.add(board)
+        db_session.commit()
+
+        access = require_board_access(db_session, board.id, test_user2.id)
+        assert access.role is None
+        assert access.board_user is None
+
+
+class TestWhiteboardServiceQueries:
+
+    def test_load_elements_checks_access_with_one_query(self, db_session, test_user, test_board, selects):
+        board_id, user_id = test_board.id, test_user.id
+        selects.clear()
+
+        WhiteboardService(db_session).load_elements(board_id, user_id)
+
+        access_selects = [s for s in selects if "FROM boards" in s]
+        assert len(access_selects) == 1
+        assert not any("FROM workspace_members" in s and "FROM boards" not in s for s in selects)
+
+
+class TestEnsureBoardAccess:
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default_always_asks_database(self, db_session, test_user, test_board, redis_client):
+        await ensure_board_access(db_session, test_board.id, test_user.id, redis_client)
+
+        assert await redis_client.keys("board:access:*") == []
+
+    @pytest.mark.asyncio
+    async def test_grant_cached_in_redis(
+        self, db_session, test_user, test_board, redis_client, board_access_cache, selects,
+    ):
+        board_id, user_id = test_board.id, test_user.id
+        await ensure_board_access(db_session, board_id, user_id, redis_client)
+        db_session.commit()  # nowy request → pusty cache sesji
+        selects.clear()
+
+        await ensure_board_access(db_session, board_id, user_id, redis_client)
+
+        assert selects == []
+        assert 0 < await redis_client.pttl(f"board:access:{board_id}:{user_id}") <= 5000
+
+    @pytest.mark.asyncio
+    async def test_denial_not_cached(self, db_session, test_user2, test_board, redis_client, board_access_cache):
+        with pytest.raises(AppException):
+            await ensure_board_access(db_session, test_board.id, test_user2.id, redis_client)
+
+        assert await redis_client.keys("board:access:*") == []
+
+    @pytest.mark.asyncio
+    async def test_membership_change_drops_users_grants(
+        self, db_session, test_user, test_board, redis_client, board_access_cache,
+    ):
+        board_id, user_id = test_board.id, test_user.id
+        await ensure_board_access(db_session, board_id, user_id, redis_client)
+        await redis_client.set(f"board:access:{board_id}:{user_id + 1}", 1)
+
+        assert await publish_acl_invalidations(
+            [{"workspace_id": test_board.workspace_id, "user_id": user_id}], redis_client,
+        )
+
+        assert await redis_client.keys("board:access:*") == [f"board:access:{board_id}:{user_id + 1}"]
+
+    @pytest.mark.asyncio
+    async def test_workspace_delete_drops_all_grants(
+        self, db_session, test_user, test_board, redis_client, board_access_cache,
+    ):
+        await ensure_board_access(db_session, test_board.id, test_user.id, redis_client)
+        await redis_client.set(f"board:access:{test_board.id}:{test_user.id + 1}", 1)
+
+        assert await publish_acl_invalidations(
+            [{"workspace_id": test_board.workspace_id, "user_id": None}], redis_client,
+        )
+
+        assert await redis_client.keys("board:access:*") == []
@@ -5,6 +5,7 @@ api/v1/boards/service.py
 import pytest
 
 from api.v1.boards.service import BoardService
+from api.v1.whiteboard.presence import PresenceService
 from api.v1.boards.schemas import (
     CreateBoard, UpdateBoard, ToggleFavourite,
     BoardResponse, BoardListResponse, ToggleFavouriteResponse,
@@ -80,6 +81,15 @@ class TestGetBoard:
         with pytest.raises(NotFoundError):
             await service.get_board(99999, test_user.id)
 
+    @pytest.mark.asyncio
+    async def test_online_users_from_presence(self, db_session, test_user, test_board, redis_client):
+        await PresenceService(redis_client).join(test_board.id, test_user.id)
+
+        service = BoardService(db_session, redis_client)
+        result = await service.get_board(test_board.id, test_user.id)
+
+        assert [u.user_id for u in result.online_users] == [test_user.id]
+
     @pytest.mark.asyncio
     async def test_no_access_raises_403(self, db_session, test_board, test_user2):
         service = BoardService(db_session)
@@ -96,6 +106,17 @@ class TestListBoards:
         result = await service.list_boards(test_workspace.id, test_user.id)
         assert isinstance(result, BoardListResponse)
 
+    @pytest.mark.asyncio
+    async def test_online_users_per_board(self, db_session, test_user, multiple_boards, redis_client):
+        await PresenceService(redis_client).join(multiple_boards[0].id, test_user.id)
+
+        service = BoardService(db_session, redis_client)
+        result = await service.list_boards(multiple_boards[0].workspace_id, test_user.id, limit=20)
+
+        online = {b.id: [u.user_id for u in b.online_users] for b in result.boards}
+        assert online.pop(multiple_boards[0].id) == [test_user.id]
+        assert all(users == [] for users in online.values())
+
     @pytest.mark.asyncio
     async def test_empty_workspace(self, db_session, test_user, test_workspace):
         service = BoardService(db_session)
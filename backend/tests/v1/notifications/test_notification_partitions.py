@@ -0,0 +1,92 @@
+"""
+Testy planowania partycji powiadomień
+api/v1/notifications/partitions.py (same decyzje — DDL działa tylko na Postgresie)
+"""
+from datetime import date
+
+from api.v1.notifications.partitions import (
+    add_months,
+    discard_unread,
+    expired_partitions,
+    maintain_partitions,
+    months_to_create,
+    partition_month,
+    partition_name,
+)
+from core.models import Notification
+
+
+class TestPartitionNames:
+
+    def test_round_trip(self):
+        assert partition_name(date(2026, 3, 1)) == "notifications_y2026m03"
+        assert partition_month("notifications_y2026m03") == date(2026, 3, 1)
+
+    def test_default_partition_has_no_month(self):
+        assert partition_month("notifications_default") is None
+
+    def test_add_months_crosses_years(self):
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+class TestPlanning:
+
+    def test_creates_current_and_ahead_missing_only(self):
+        existing = ["notifications_default", "notifications_y2026m10", "notifications_y2026m11"]
+        assert months_to_create(existing, date(2026, 10, 19), ahead=3) == [date(2026, 12, 1), date(2027, 1, 1)]
+
+    def test_expired_are_whole_months_past_retention(self):
+        existing = [
+            "notifications_default",
+            "notifications_y2026m03",
+            "notifications_y2026m04",
+            "notifications_y2026m05",
+        ]
+        # Retencja 6 miesięcy liczona od 2026-10-01 → granica 2026-04-01
+        assert expired_partitions(existing, date(2026, 10, 19), retention_months=6) == ["notifications_y2026m03"]
+
+
+class TestDiscardUnread:
+    # Na Postgresie woła się to na odpiętej partycji; na SQLite liczymy
+    # po całej tabeli notifications — SQL jest ten sam.
+
+    def _add(self, db, user, is_read):
+        db.add(Notification(user_id=user.id, type="system", payload={}, is_read=is_read))
+
+    def test_subtracts_unread_per_user(self, db_session, test_user, test_user2):
+        for is_read in (False, False, True):
+            self._add(db_session, test_user, is_read)
+        self._add(db_session, test_user2, False)
+        test_user.unread_notifications = 5
+        test_user2.unread_notifications = 1
+        db_session.commit()
+
+        assert discard_unread(db_session, "notifications") == 3
+        db_session.commit()
+        db_session.expire_all()
+
+        assert test_user.unread_notifications == 3
+        assert test_user2.unread_notifications == 0
+
+    def test_never_goes_below_zero(self, db_session, test_user):
+        self._add(db_session, test_user, False)
+        self._add(db_session, test_user, False)
+        test_user.unread_notifications = 1
+        db_session.commit()
+
+        discard_unread(db_session, "notifications")
+        db_session.commit()
+        db_session.expire_all()
+
+        assert test_user.unread_notifications == 0
+
+    def test_nothing_unread_is_a_no_op(self, db_session, test_user):
+        self._add(db_session, test_user, True)
+        db_session.commit()
+        assert discard_unread(db_session, "notifications") == 0
+
+
+def test_maintenance_skips_unpartitioned_database(db_session):
+    report = maintain_partitions(db_session, today=date(2026, 10, 19))
+    assert report.created == [] and report.dropped == []
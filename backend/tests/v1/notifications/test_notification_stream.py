@@ -0,0 +1,158 @@
+"""
+Testy strumienia SSE powiadomień
+api/v1/notifications/stream.py + GET /api/v1/notifications/stream
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from api.v1.notifications import stream as stream_module
+from api.v1.notifications.service import create_notification, mark_all_as_read, mark_as_read
+from api.v1.notifications.stream import deliver_stream_events, notification_event_stream, parse_last_event_id
+from core.database import get_db
+from core.models import Notification, OutboxEvent, User
+from core.outbox import dispatch_outbox
+
+
+async def never_disconnected():
+    return False
+
+
+@pytest.fixture(autouse=True)
+def stream_sessions(db_session, monkeypatch):
+    monkeypatch.setattr(stream_module, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+
+
+def add_notification(db, user, is_read=False):
+    notification = Notification(
+        user_id=user.id, type="system", payload={"title": "x"},
+        is_read=is_read, created_at=datetime.utcnow(),
+    )
+    db.add(notification)
+    if not is_read:
+        db.query(User).filter(User.id == user.id).update(
+            {User.unread_notifications: User.unread_notifications + 1}
+        )
+    db.commit()
+    return notification
+
+
+async def next_event(gen, skip_keepalive=True):
+    frame = await gen.__anext__()
+    while skip_keepalive and frame.startswith(": keepalive"):
+        frame = await gen.__anext__()
+    return frame
+
+
+class TestNotificationEventStream:
+
+    @pytest.mark.asyncio
+    async def test_new_notification_is_pushed(self, db_session, test_user, redis_client):
+        gen = notification_event_stream(test_user.id, None, never_disconnected, redis_client, keepalive_seconds=0.05)
+        assert (await next_event(gen)).startswith("retry:")
+        assert '"unread_count": 0' in await next_event(gen)
+
+        notification = create_notification(db_session, test_user.id, "system", {"title": "Hej"})
+        await dispatch_outbox(db_session)
+
+        frame = await next_event(gen)
+        assert frame.startswith(f"id: {notification.id}\nevent: notification\n")
+        assert '"title": "Hej"' in frame
+        assert '"unread_count": 1' in await next_event(gen)
+        await gen.aclose()
+
+    @pytest.mark.asyncio
+    async def test_resume_from_last_event_id(self, db_session, test_user, redis_client):
+        first, second, third = (add_notification(db_session, test_user) for _ in range(3))
+
+        gen = notification_event_stream(test_user.id, first.id, never_disconnected, redis_client)
+        await next_event(gen)
+        assert (await next_event(gen)).startswith(f"id: {second.id}\n")
+        assert (await next_event(gen)).startswith(f"id: {third.id}\n")
+        assert '"unread_count": 3' in await next_event(gen)
+        await gen.aclose()
+
+    @pytest.mark.asyncio
+    async def test_fresh_connection_skips_backlog(self, db_session, test_user, redis_client):
+        add_notification(db_session, test_user)
+
+        gen = notification_event_stream(test_user.id, None, never_disconnected, redis_client)
+        await next_event(gen)
+        assert (await next_event(gen)).startswith("event: unread_count")
+        await gen.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unread_change_pushes_count(self, db_session, test_user, redis_client):
+        notification = add_notification(db_session, test_user)
+        gen = notification_event_stream(test_user.id, None, never_disconnected, redis_client, keepalive_seconds=0.05)
+        await next_event(gen)
+        assert '"unread_count": 1' in await next_event(gen)
+
+        mark_as_read(db_session, notification.id, test_user.id)
+        await dispatch_outbox(db_session)
+
+        assert '"unread_count": 0' in await next_event(gen)
+        await gen.aclose()
+
+    @pytest.mark.asyncio
+    async def test_keepalive_when_idle(self, test_user, redis_client):
+        gen = notification_event_stream(test_user.id, None, never_disconnected, redis_client, keepalive_seconds=0.01)
+        await next_event(gen)
+        await next_event(gen)
+        assert await next_event(gen, skip_keepalive=False) == ": keepalive\n\n"
+        await gen.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stops_when_client_disconnects(self, test_user, redis_client):
+        async def disconnected():
+            return True
+
+        frames = [frame async for frame in notification_event_stream(test_user.id, None, disconnected, redis_client)]
+        assert len(frames) == 2
+
+
+class TestStreamOutboxEvents:
+
+    def test_mark_all_as_read_enqueues_single_event(self, db_session, test_user):
+        for _ in range(3):
+            add_notification(db_session, test_user)
+
+        mark_all_as_read(db_session, test_user.id)
+
+        events = db_session.query(OutboxEvent).filter_by(kind="notification_stream").all()
+        assert [e.payload for e in events] == [{"user_id": test_user.id, "type": "unread_changed"}]
+
+    def test_mark_all_as_read_without_changes_enqueues_nothing(self, db_session, test_user):
+        mark_all_as_read(db_session, test_user.id)
+        assert db_session.query(OutboxEvent).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_fan_out_event_publishes_per_user(self, redis_client):
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe("notifications:stream:7", "notifications:stream:8")
+
+        assert await deliver_stream_events([{"user_ids": [7, 8], "type": "notification"}], redis_client)
+
+        # Potwierdzenia subskrypcji też zużywają get_message (zwraca wtedy None)
+        messages = [await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.05) for _ in range(6)]
+        channels = {m["channel"] for m in messages if m}
+        assert {c.decode() if isinstance(c, bytes) else c for c in channels} == {
+            "notifications:stream:7", "notifications:stream:8",
+        }
+        await pubsub.aclose()
+
+    def test_parse_last_event_id(self):
+        assert parse_last_event_id("42") == 42
+        assert parse_last_event_id("abc") is None
+        assert parse_last_event_id(None) is None
+
+
+def test_stream_requires_auth(db_session):
+    app.dependency_overrides[get_db] = lambda: db_session
+    with TestClient(app, raise_server_exceptions=False) as client:
+        response = client.get("/api/v1/notifications/stream")
+    app.dependency_overrides.clear()
+    assert response.status_code in (401, 403)
@@ -176,3 +176,84 @@ class TestDeleteNotification:
             headers=make_auth_headers(test_user.id),
         )
         assert r.status_code == 404
+
+
+
+# ── GET /notifications/unread-count ───────────────────────────────────────
+
+class TestUnreadCount:
+
+    def test_returns_counter(self, client, db_session, test_user):
+        test_user.unread_notifications = 4
+        db_session.commit()
+
+        response = client.get("/api/v1/notifications/unread-count", headers=make_auth_headers(test_user.id))
+        assert response.status_code == 200
+        assert response.json()["data"] == {"unread_count": 4}
+
+    def test_requires_auth(self, client):
+        response = client.get("/api/v1/notifications/unread-count")
+        assert response.status_code in (401, 403)
+
+
+# ── Paginacja i operacje zbiorcze ─────────────────────────────────────────
+
+class TestPaginationAndBulk:
+
+    def test_cursor_pagination(self, client, test_user, three_notifications):
+        headers = make_auth_headers(test_user.id)
+        first = client.get("/api/v1/notifications?limit=2", headers=headers).json()["data"]
+        assert len(first["notifications"]) == 2
+        assert first["next_cursor"]
+
+        second = client.get(
+            "/api/v1/notifications", params={"limit": 2, "cursor": first["next_cursor"]}, headers=headers,
+        ).json()["data"]
+        assert len(second["notifications"]) == 1
+        assert second["next_cursor"] is None
+
+    def test_invalid_cursor_is_400(self, client, test_user):
+        r = client.get("/api/v1/notifications?cursor=%%%", headers=make_auth_headers(test_user.id))
+        assert r.status_code == 400
+
+    def test_bulk_read(self, client, test_user, three_notifications):
+        ids = [n.id for n in three_notifications[:2]]
+        r = client.post("/api/v1/notifications/bulk-read", json={"ids": ids}, headers=make_auth_headers(test_user.id))
+        assert r.status_code == 200
+        assert r.json()["data"] == {"updated": 2}
+
+    def test_bulk_delete(self, client, db_session, test_user, three_notifications):
+        ids = [n.id for n in three_notifications]
+        r = client.post("/api/v1/notifications/bulk-delete", json={"ids": ids}, headers=make_auth_headers(test_user.id))
+        assert r.status_code == 200
+        assert r.json()["data"] == {"deleted": 3}
+        assert db_session.query(Notification).count() == 0
+
+    def test_bulk_requires_exactly_one_selector(self, client, test_user):
+        headers = make_auth_headers(test_user.id)
+        assert client.post("/api/v1/notifications/bulk-read", json={}, headers=headers).status_code == 422
+        r = client.post("/api/v1/notifications/bulk-read", json={"ids": [1], "before": "x"}, headers=headers)
+        assert r.status_code == 422
+
+
+# ── POST /notifications/workspace/{id} ────────────────────────────────────
+
+class TestWorkspaceAnnouncement:
+
+    def test_owner_notifies_members(self, client, db_session, test_user, test_user2, shared_workspace):
+        r = client.post(
+            f"/api/v1/notifications/workspace/{shared_workspace.id}",
+            json={"title": "Nowa tablica", "message": "Zajrzyjcie"},
+            headers=make_auth_headers(test_user.id),
+        )
+        assert r.status_code == 201
+        assert r.json()["data"] == {"notified": 1}
+        assert db_session.query(Notification).filter(Notification.user_id == test_user2.id).count() == 1
+
+    def test_member_cannot_announce(self, client, test_user2, shared_workspace):
+        r = client.post(
+            f"/api/v1/notifications/workspace/{shared_workspace.id}",
+            json={"title": "x", "message": "y"},
+            headers=make_auth_headers(test_user2.id),
+        )
+        assert r.status_code == 403
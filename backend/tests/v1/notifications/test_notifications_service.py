@@ -4,18 +4,28 @@ api/v1/notifications/service.py
 """
 from datetime import datetime, timedelta
 
+import pytest
+
 from api.v1.notifications.service import (
     create_notification,
     get_user_notifications,
     mark_as_read,
     mark_all_as_read,
     delete_notification,
+    get_unread_count,
+    repair_unread_counters,
+    mark_many_as_read,
+    delete_many,
+    encode_cursor,
+    fan_out_notification,
+    notify_workspace_members,
 )
 from api.v1.notifications.schemas import (
     NotificationResponse,
     NotificationListResponse,
 )
-from core.models import Notification
+from core.exceptions import AppException, ValidationError
+from core.models import Notification, OutboxEvent, User
 
 INVITE_PAYLOAD = {
     "workspace_id": 1,
@@ -40,6 +50,11 @@ def add_notification(db, user_id, *, is_read=False, type="invite", payload=None)
         created_at=datetime.utcnow(),
     )
     db.add(n)
+    if not is_read:
+        # Wiersz dodany z pominięciem serwisu — licznik podbijamy ręcznie
+        db.query(User).filter(User.id == user_id).update(
+            {User.unread_notifications: User.unread_notifications + 1}
+        )
     db.commit()
     db.refresh(n)
     return n
@@ -254,4 +269,168 @@ class TestDeleteNotification:
         second = delete_notification(db_session, n.id, test_user.id)
 
         assert first is True
-        assert second is False
\ No newline at end of file
+        assert second is False
+
+# ── licznik nieprzeczytanych ───────────────────────────────────────────────
+
+class TestUnreadCounter:
+
+    def test_create_increments(self, db_session, test_user):
+        create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        assert get_unread_count(db_session, test_user.id) == 2
+
+    def test_mark_as_read_decrements_once(self, db_session, test_user):
+        n = create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        mark_as_read(db_session, n.id, test_user.id)
+        mark_as_read(db_session, n.id, test_user.id)
+        assert get_unread_count(db_session, test_user.id) == 0
+
+    def test_mark_all_as_read_resets(self, db_session, test_user):
+        for _ in range(3):
+            create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        mark_all_as_read(db_session, test_user.id)
+        assert get_unread_count(db_session, test_user.id) == 0
+
+    def test_delete_unread_decrements(self, db_session, test_user):
+        unread = create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        read = create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        mark_as_read(db_session, read.id, test_user.id)
+
+        delete_notification(db_session, read.id, test_user.id)
+        assert get_unread_count(db_session, test_user.id) == 1
+        delete_notification(db_session, unread.id, test_user.id)
+        assert get_unread_count(db_session, test_user.id) == 0
+
+    def test_repair_fixes_drifted_counters(self, db_session, test_user, test_user2):
+        create_notification(db_session, test_user.id, "invite", INVITE_PAYLOAD)
+        create_notification(db_session, test_user2.id, "invite", INVITE_PAYLOAD)
+        db_session.query(User).filter(User.id == test_user.id).update({User.unread_notifications: 42})
+        db_session.commit()
+
+        assert repair_unread_counters(db_session) == 1
+        assert get_unread_count(db_session, test_user.id) == 1
+        assert get_unread_count(db_session, test_user2.id) == 1
+        assert repair_unread_counters(db_session) == 0
+
+
+class TestKeysetPagination:
+
+    def test_pages_cover_all_without_duplicates(self, db_session, test_user):
+        ids = {add_notification(db_session, test_user.id).id for _ in range(5)}
+
+        seen, cursor = [], None
+        while True:
+            page = get_user_notifications(db_session, test_user.id, limit=2, cursor=cursor)
+            seen.extend(n.id for n in page.notifications)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert len(seen) == 5
+        assert set(seen) == ids
+        assert seen == sorted(seen, reverse=True)
+
+    def test_last_page_has_no_cursor(self, db_session, test_user):
+        add_notification(db_session, test_user.id)
+        assert get_user_notifications(db_session, test_user.id, limit=1).next_cursor is None
+
+    def test_invalid_cursor_raises(self, db_session, test_user):
+        with pytest.raises(ValidationError):
+            get_user_notifications(db_session, test_user.id, cursor="nie-kursor")
+
+
+class TestBulkOperations:
+
+    def test_mark_many_by_ids(self, db_session, test_user, test_user2):
+        a = add_notification(db_session, test_user.id)
+        b = add_notification(db_session, test_user.id)
+        foreign = add_notification(db_session, test_user2.id)
+
+        assert mark_many_as_read(db_session, test_user.id, ids=[a.id, foreign.id]) == 1
+        db_session.refresh(b)
+        db_session.refresh(foreign)
+        assert b.is_read is False
+        assert foreign.is_read is False
+        assert get_unread_count(db_session, test_user.id) == 1
+
+    def test_mark_many_before_cursor(self, db_session, test_user):
+        older = add_notification(db_session, test_user.id)
+        newer = add_notification(db_session, test_user.id)
+
+        before = encode_cursor(newer.created_at, newer.id)
+        assert mark_many_as_read(db_session, test_user.id, before=before) == 1
+        db_session.refresh(older)
+        db_session.refresh(newer)
+        assert older.is_read is True
+        assert newer.is_read is False
+
+    def test_mark_many_skips_already_read(self, db_session, test_user):
+        n = add_notification(db_session, test_user.id, is_read=True)
+        assert mark_many_as_read(db_session, test_user.id, ids=[n.id]) == 0
+        assert get_unread_count(db_session, test_user.id) == 0
+
+    def test_delete_many_adjusts_counter_for_unread_only(self, db_session, test_user):
+        unread = add_notification(db_session, test_user.id)
+        read = add_notification(db_session, test_user.id, is_read=True)
+        kept = add_notification(db_session, test_user.id)
+
+        assert delete_many(db_session, test_user.id, ids=[unread.id, read.id]) == 2
+        remaining = db_session.query(Notification).filter(Notification.user_id == test_user.id).all()
+        assert [n.id for n in remaining] == [kept.id]
+        assert get_unread_count(db_session, test_user.id) == 1
+
+    def test_delete_many_before_cursor(self, db_session, test_user, test_user2):
+        for _ in range(3):
+            add_notification(db_session, test_user.id)
+        newest = add_notification(db_session, test_user.id)
+        add_notification(db_session, test_user2.id)
+
+        assert delete_many(db_session, test_user.id, before=encode_cursor(newest.created_at, newest.id)) == 3
+        assert db_session.query(Notification).count() == 2
+
+
+class TestFanOut:
+
+    def test_creates_one_notification_per_user(self, db_session, test_user, test_user2, test_user3):
+        count = fan_out_notification(db_session, [test_user.id, test_user2.id, test_user3.id], "system", {"title": "T"})
+
+        assert count == 3
+        rows = db_session.query(Notification).order_by(Notification.user_id).all()
+        assert [n.user_id for n in rows] == sorted([test_user.id, test_user2.id, test_user3.id])
+        assert all(n.payload == {"title": "T"} and not n.is_read for n in rows)
+        assert get_unread_count(db_session, test_user2.id) == 1
+
+    def test_duplicates_and_empty_list(self, db_session, test_user):
+        assert fan_out_notification(db_session, [], "system", {}) == 0
+        assert fan_out_notification(db_session, [test_user.id, test_user.id], "system", {}) == 1
+        assert get_unread_count(db_session, test_user.id) == 1
+
+    def test_single_batched_broadcast_and_stream_event(self, db_session, test_user, test_user2):
+        fan_out_notification(db_session, [test_user.id, test_user2.id], "system", {"title": "T"})
+
+        events = {e.kind: e.payload for e in db_session.query(OutboxEvent).all()}
+        assert db_session.query(OutboxEvent).count() == 2
+        assert events["notification_stream"] == {"user_ids": [test_user.id, test_user2.id], "type": "notification"}
+
+        ids = {n.user_id: n.id for n in db_session.query(Notification).all()}
+        assert events["broadcast_batch"]["messages"] == [
+            {
+                "topic": f"notifications:{user_id}",
+                "event": "new_notification",
+                "payload": {"title": "T", "type": "system", "notification_id": ids[user_id]},
+            }
+            for user_id in (test_user.id, test_user2.id)
+        ]
+
+    def test_workspace_announcement_skips_sender(self, db_session, test_user, test_user2, shared_workspace):
+        assert notify_workspace_members(db_session, shared_workspace.id, test_user.id, "Nowa tablica", "Zajrzyj") == 1
+
+        notification = db_session.query(Notification).one()
+        assert notification.user_id == test_user2.id
+        assert notification.payload["workspace_id"] == shared_workspace.id
+
+    def test_workspace_announcement_owner_only(self, db_session, test_user2, shared_workspace):
+        with pytest.raises(AppException) as exc:
+            notify_workspace_members(db_session, shared_workspace.id, test_user2.id, "x", "y")
+        assert exc.value.status_code == 403
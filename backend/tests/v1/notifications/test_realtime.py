@@ -0,0 +1,137 @@
+"""
+Testy kolejki Broadcast do Supabase
+api/v1/notifications/realtime.py
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from api.v1.notifications import realtime
+from api.v1.notifications.realtime import RealtimeBroadcaster, broadcast_many, broadcast_notification
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Transport httpx bez sieci — zapamiętuje wysłane paczki `messages`."""
+
+    def __init__(self, status_code=200, delay=0.0):
+        self.status_code = status_code
+        self.delay = delay
+        self.batches = []
+
+    async def handle_async_request(self, request):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.batches.append(json.loads(request.content)["messages"])
+        return httpx.Response(self.status_code, json={}, request=request)
+
+
+@pytest.fixture
+def transport():
+    return RecordingTransport()
+
+
+@pytest.fixture
+def broadcaster(transport, monkeypatch):
+    instance = RealtimeBroadcaster(transport=transport)
+    monkeypatch.setattr(realtime, "_broadcaster", instance)
+    return instance
+
+
+class TestRealtimeBroadcaster:
+
+    @pytest.mark.asyncio
+    async def test_burst_is_sent_in_few_requests(self, broadcaster, transport):
+        for user_id in range(250):
+            assert await broadcast_notification(user_id, "new_invite", {"n": user_id})
+        await broadcaster.flush()
+
+        assert len(transport.batches) == 3
+        assert sum(len(batch) for batch in transport.batches) == 250
+        assert transport.batches[0][0] == {
+            "topic": "notifications:0", "event": "new_invite", "payload": {"n": 0},
+        }
+        await broadcaster.close()
+
+    @pytest.mark.asyncio
+    async def test_broadcast_many_mixes_topics_and_events(self, broadcaster, transport):
+        await broadcast_many([(1, "new_invite", {}), (2, "invite_accepted", {"x": 1})])
+        await broadcaster.flush()
+
+        assert transport.batches == [[
+            {"topic": "notifications:1", "event": "new_invite", "payload": {}},
+            {"topic": "notifications:2", "event": "invite_accepted", "payload": {"x": 1}},
+        ]]
+        await broadcaster.close()
+
+    @pytest.mark.asyncio
+    async def test_metrics(self, broadcaster):
+        await broadcast_many([(1, "a", {}), (2, "b", {})])
+        await broadcaster.flush()
+
+        metrics = broadcaster.snapshot()
+        assert metrics["enqueued"] == 2
+        assert metrics["sent"] == 2
+        assert metrics["requests"] == 1
+        assert metrics["queue_depth"] == 0
+        assert metrics["last_flush_ms"] >= 0
+        await broadcaster.close()
+
+    @pytest.mark.asyncio
+    async def test_http_error_counts_as_failed(self, monkeypatch):
+        instance = RealtimeBroadcaster(transport=RecordingTransport(status_code=500))
+        monkeypatch.setattr(realtime, "_broadcaster", instance)
+
+        assert await broadcast_notification(1, "new_invite", {})
+        await instance.flush()
+
+        assert instance.metrics.failed == 1
+        assert instance.metrics.sent == 0
+        await instance.close()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_after_timeout(self, monkeypatch):
+        monkeypatch.setattr(realtime, "ENQUEUE_TIMEOUT_SECONDS", 0.05)
+        instance = RealtimeBroadcaster(batch_size=1, queue_size=1, transport=RecordingTransport(delay=0.5))
+
+        accepted = await instance.enqueue([{"topic": "t", "event": "e", "payload": {}} for _ in range(4)])
+
+        assert accepted is False
+        assert instance.metrics.dropped >= 1
+        await instance.close()
+
+    @pytest.mark.parametrize("close_first_loop", [False, True])
+    def test_loop_change_retires_previous_client_and_flusher(self, transport, close_first_loop):
+        instance = RealtimeBroadcaster(transport=transport)
+        message = {"topic": "t", "event": "e", "payload": {}}
+        first_loop = asyncio.new_event_loop()
+        try:
+            first_loop.run_until_complete(instance.send([message]))
+            old_client, old_flusher = instance._client, instance._flusher
+            if close_first_loop:
+                # Jak po asyncio.run: zadania pętli anulowane, gniazda puli zostały
+                old_flusher.cancel()
+                first_loop.run_until_complete(asyncio.gather(old_flusher, return_exceptions=True))
+                first_loop.close()
+
+            async def in_second_loop():
+                await instance.send([message])
+                assert instance._client is not old_client
+                await instance.close()
+
+            asyncio.run(in_second_loop())
+
+            assert old_client.is_closed
+            if not close_first_loop:
+                first_loop.run_until_complete(asyncio.sleep(0))
+            assert old_flusher.cancelled()
+        finally:
+            first_loop.close()
+
+    @pytest.mark.asyncio
+    async def test_missing_credentials_skips(self, broadcaster, transport, monkeypatch):
+        monkeypatch.delenv("SUPABASE_URL", raising=False)
+
+        assert await broadcast_notification(1, "new_invite", {}) is False
+        assert broadcaster.metrics.enqueued == 0
@@ -0,0 +1,127 @@
+"""
+Testy onboardingu w tle (api/v1/onboarding/service.py)
+"""
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+
+from main import app
+from core.database import get_db
+from core.models import Board, OutboxEvent, User, Workspace
+from api.v1.auth.service import AuthService
+from api.v1.auth.schemas import RegisterUser
+from api.v1.auth.utils import create_access_token
+from api.v1.onboarding.service import OnboardingService, enqueue_onboarding, provision_new_users
+from core.config import get_settings
+
+MOCK_EMAIL = "api.v1.auth.service.enqueue_email"
+
+
+def make_auth_headers(user_id: int) -> dict:
+    settings = get_settings()
+    token = create_access_token({"sub": str(user_id)}, settings.secret_key, settings.algorithm)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app, raise_server_exceptions=False) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+class TestRegistrationDefersOnboarding:
+
+    @pytest.mark.asyncio
+    async def test_register_only_enqueues(self, db_session, redis_client):
+        """Rejestracja nie tworzy workspace'a — tylko event w outboxie, w tej samej transakcji"""
+        with patch(MOCK_EMAIL, new_callable=AsyncMock):
+            result = await AuthService(db_session, redis_client).register_user(RegisterUser(
+                username="fresh", email="fresh@example.com",
+                password="SecurePass123", password_confirm="SecurePass123",
+            ))
+
+        assert db_session.query(Workspace).count() == 0
+        event = db_session.query(OutboxEvent).filter(OutboxEvent.kind == "onboarding").one()
+        assert event.payload == {"user_id": result.user.id}
+
+    @pytest.mark.asyncio
+    async def test_job_provisions_workspace_and_board(self, db_session, redis_client, run_onboarding):
+        with patch(MOCK_EMAIL, new_callable=AsyncMock):
+            result = await AuthService(db_session, redis_client).register_user(RegisterUser(
+                username="fresh", email="fresh@example.com",
+                password="SecurePass123", password_confirm="SecurePass123",
+            ))
+
+        assert await run_onboarding() is True
+
+        workspace = db_session.query(Workspace).filter(Workspace.created_by == result.user.id).one()
+        assert db_session.query(Board).filter(Board.workspace_id == workspace.id).count() == 1
+        assert db_session.get(User, result.user.id).onboarded_at is not None
+
+
+class TestIdempotency:
+
+    def test_setup_twice_creates_one_workspace(self, db_session, test_user):
+        assert OnboardingService(db_session).setup_new_user(test_user.id) is not None
+        db_session.commit()
+        assert OnboardingService(db_session).setup_new_user(test_user.id) is None
+        db_session.commit()
+
+        assert db_session.query(Workspace).filter(Workspace.created_by == test_user.id).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_repeated_events_are_harmless(self, db_session, test_user):
+        """Retry outboxa / zdublowany event — nadal jeden workspace"""
+        await provision_new_users([{"user_id": test_user.id}, {"user_id": test_user.id}], db_session)
+        await provision_new_users([{"user_id": test_user.id}], db_session)
+
+        assert db_session.query(Workspace).filter(Workspace.created_by == test_user.id).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_deleted_user_is_skipped(self, db_session):
+        assert await provision_new_users([{"user_id": 99999}], db_session) is True
+
+
+class TestDashboardBeforeOnboarding:
+
+    def test_workspaces_report_pending(self, client, db_session, test_user):
+        """Konto bez onboardingu: pusta lista + onboarding_pending, nie błąd"""
+        enqueue_onboarding(db_session, test_user.id)
+        db_session.commit()
+
+        r = client.get("/api/v1/workspaces", headers=make_auth_headers(test_user.id))
+
+        assert r.status_code == 200
+        assert r.json()["data"] == {"workspaces": [], "total": 0, "onboarding_pending": True}
+
+    def test_failed_onboarding_event_is_not_pending(self, client, db_session, test_user, test_user2):
+        """Event porzucony przez dispatcher — dashboard nie czeka w nieskończoność"""
+        enqueue_onboarding(db_session, test_user.id)
+        enqueue_onboarding(db_session, test_user2.id)  # cudzy event nie ma znaczenia
+        db_session.flush()
+        event = next(e for e in db_session.query(OutboxEvent).all() if e.payload["user_id"] == test_user.id)
+        event.status = "failed"
+        db_session.commit()
+
+        r = client.get("/api/v1/workspaces", headers=make_auth_headers(test_user.id))
+
+        assert r.status_code == 200
+        assert r.json()["data"]["onboarding_pending"] is False
+
+    def test_workspaces_after_onboarding(self, client, db_session, test_user):
+        OnboardingService(db_session).setup_new_user(test_user.id)
+        db_session.commit()
+
+        r = client.get("/api/v1/workspaces", headers=make_auth_headers(test_user.id))
+
+        data = r.json()["data"]
+        assert data["total"] == 1
+        assert data["onboarding_pending"] is False
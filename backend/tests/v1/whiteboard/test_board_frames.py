@@ -0,0 +1,158 @@
+"""
+Testy agregacji ramek kursorów / przeciągania
+api/v1/whiteboard/frames.py
+"""
+import pytest
+
+from api.v1.whiteboard.frames import FRAME_INPUT, KEYFRAME_EVERY_TICKS, FrameAggregator
+
+
+async def _noop_emit(board_id, frame):
+    pass
+
+
+@pytest.fixture
+def frames():
+    return FrameAggregator(_noop_emit, tick_hz=20)
+
+
+class TestFrameAggregator:
+
+    def test_coalesces_moves_into_latest_position(self, frames):
+        for x in range(10):
+            frames.add_cursor(1, 7, "ala", x, 0)
+
+        assert frames.build_frames() == {
+            1: {"type": "board-frame", "cursors": {"7": {"x": 9, "y": 0, "username": "ala"}}},
+        }
+
+    def test_one_frame_per_board(self, frames):
+        for user_id in range(30):
+            frames.add_cursor(1, user_id, f"u{user_id}", user_id, user_id)
+        frames.add_cursor(2, 1, "u1", 0, 0)
+
+        built = frames.build_frames()
+        assert set(built) == {1, 2}
+        assert len(built[1]["cursors"]) == 30
+
+    def test_delta_contains_only_changed_fields(self, frames):
+        frames.add_cursor(1, 7, "ala", 10, 20)
+        frames.build_frames()
+
+        frames.add_cursor(1, 7, "ala", 15, 20)
+        assert frames.build_frames()[1]["cursors"] == {"7": {"x": 15}}
+
+    def test_unchanged_cursor_emits_nothing(self, frames):
+        frames.add_cursor(1, 7, "ala", 10, 20)
+        frames.build_frames()
+
+        frames.add_cursor(1, 7, "ala", 10, 20)
+        assert frames.build_frames() == {}
+
+    def test_drag_delta_per_element(self, frames):
+        frames.add_drag(1, 7, [{"id": "a", "x": 0, "y": 0}, {"id": "b", "x": 5, "y": 5}])
+        frames.build_frames()
+
+        frames.add_drag(1, 7, [{"id": "a", "x": 3, "y": 0}, {"id": "b", "x": 5, "y": 5}])
+        assert frames.build_frames()[1]["drags"] == {"7": [{"x": 3, "id": "a"}]}
+
+    def test_removed_user_is_reported_once(self, frames):
+        frames.add_cursor(1, 7, "ala", 0, 0)
+        frames.build_frames()
+
+        frames.remove_user(1, 7)
+        assert frames.build_frames()[1]["left"] == [7]
+        assert frames.build_frames() == {}
+
+    def test_requested_keyframe_contains_full_state(self, frames):
+        frames.add_cursor(1, 7, "ala", 1, 2)
+        frames.add_cursor(1, 8, "ola", 3, 4)
+        frames.build_frames()
+
+        frames.request_keyframe(1)
+        frames.add_cursor(1, 7, "ala", 5, 2)
+        frame = frames.build_frames()[1]
+
+        assert frame["keyframe"] is True
+        assert frame["cursors"] == {
+            "7": {"x": 5, "y": 2, "username": "ala"},
+            "8": {"x": 3, "y": 4, "username": "ola"},
+        }
+
+    def test_periodic_keyframe(self, frames):
+        frames.add_cursor(1, 7, "ala", 1, 2)
+        frames.build_frames()
+
+        for _ in range(KEYFRAME_EVERY_TICKS - 2):
+            assert frames.build_frames() == {}
+        assert frames.build_frames()[1]["keyframe"] is True
+
+    @pytest.mark.asyncio
+    async def test_tick_emits_built_frames(self):
+        emitted = []
+
+        async def emit(board_id, frame):
+            emitted.append((board_id, frame))
+
+        frames = FrameAggregator(emit, tick_hz=20)
+        frames.add_cursor(3, 7, "ala", 1, 1)
+        await frames.tick()
+        await frames.tick()
+
+        assert [board_id for board_id, _ in emitted] == [3]
+
+
+class TestForwardToOtherWorkers:
+    # `frame-input` — wejścia od lokalnych userów dla pozostałych workerów
+
+    def test_forwards_latest_local_input(self, frames):
+        frames.add_cursor(1, 7, "ala", 1, 1)
+        frames.add_cursor(1, 7, "ala", 4, 1)
+        frames.add_drag(1, 7, [{"id": "a", "x": 9}])
+
+        assert frames.take_forward_updates() == {1: {
+            "type": FRAME_INPUT,
+            "cursors": {"7": {"x": 4, "y": 1, "username": "ala"}},
+            "drags": {"7": [{"id": "a", "x": 9}]},
+        }}
+        assert frames.take_forward_updates() == {}
+
+    def test_remote_input_goes_to_frame_but_is_not_forwarded(self, frames):
+        frames.request_keyframe(1)
+        frames.build_frames()
+
+        frames.merge_remote(1, {"type": FRAME_INPUT, "cursors": {"8": {"x": 2, "y": 3, "username": "ola"}}})
+
+        assert frames.build_frames()[1]["cursors"] == {"8": {"x": 2, "y": 3, "username": "ola"}}
+        assert frames.take_forward_updates() == {}
+
+    def test_remote_input_for_board_without_local_connections_is_ignored(self, frames):
+        frames.merge_remote(2, {"type": FRAME_INPUT, "cursors": {"8": {"x": 2, "y": 3}}})
+        assert frames.build_frames() == {}
+
+    def test_remote_left_removes_cursor(self, frames):
+        frames.request_keyframe(1)
+        frames.merge_remote(1, {"type": FRAME_INPUT, "cursors": {"8": {"x": 2, "y": 3}}})
+        frames.build_frames()
+
+        frames.merge_remote(1, {"type": FRAME_INPUT, "left": [8]})
+        assert frames.build_frames()[1]["left"] == [8]
+
+    def test_last_local_leave_is_still_forwarded(self, frames):
+        frames.add_cursor(1, 7, "ala", 0, 0)
+        frames.take_forward_updates()
+
+        frames.remove_user(1, 7)
+        frames.drop_board(1)
+
+        assert frames.build_frames() == {}
+        assert frames.take_forward_updates() == {1: {"type": FRAME_INPUT, "left": [7]}}
+        assert frames.take_forward_updates() == {}
+
+    def test_periodic_full_forward_repeats_idle_cursors(self, frames):
+        frames.add_cursor(1, 7, "ala", 1, 2)
+        frames.take_forward_updates()
+
+        for _ in range(KEYFRAME_EVERY_TICKS - 2):
+            assert frames.take_forward_updates() == {}
+        assert frames.take_forward_updates()[1]["cursors"] == {"7": {"x": 1, "y": 2, "username": "ala"}}
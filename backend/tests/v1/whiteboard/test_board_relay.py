@@ -0,0 +1,298 @@
+"""
+Testy relay WebSocket tablicy
+api/v1/whiteboard/relay.py + WS /api/v1/whiteboard/{board_id}/ws
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from main import app
+from api.v1.auth.utils import create_access_token
+from api.v1.whiteboard import relay
+from api.v1.whiteboard.relay import (
+    CLOSE_FORBIDDEN, CLOSE_UNAUTHORIZED, BoardRelayHub, RelayConnection, SEND_QUEUE_SIZE,
+)
+from core.config import get_settings
+from api.v1.workspaces.acl_cache import CHANNEL as ACL_CHANNEL
+from core.models import BoardElement, WorkspaceMember
+
+
+def make_token(user) -> str:
+    settings = get_settings()
+    return create_access_token({"sub": str(user.id)}, settings.secret_key, settings.algorithm)
+
+
+@pytest.fixture
+def client(db_session, monkeypatch):
+    # Relay otwiera własne sesje per wiadomość — podpinamy je pod testową bazę
+    monkeypatch.setattr(relay, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(relay, "_relay_hub", None)
+    with TestClient(app) as c:
+        yield c
+
+
+def connect(client, board, user):
+    ws = client.websocket_connect(f"/api/v1/whiteboard/{board.id}/ws")
+    session = ws.__enter__()
+    session.send_json({"type": "auth", "token": make_token(user)})
+    return ws, session
+
+
+def element(element_id="el-1", **data):
+    return {"id": element_id, "type": "rectangle", "x": 0, "y": 0, **data}
+
+
+class TestRelayAuth:
+
+    def test_ready_after_auth(self, client, test_user, test_board):
+        ws, session = connect(client, test_board, test_user)
+        assert session.receive_json() == {"type": "ready", "user_id": test_user.id}
+        ws.__exit__(None, None, None)
+
+    def test_invalid_token_closes_4401(self, client, test_board):
+        with client.websocket_connect(f"/api/v1/whiteboard/{test_board.id}/ws") as session:
+            session.send_json({"type": "auth", "token": "nie-jwt"})
+            with pytest.raises(WebSocketDisconnect) as exc:
+                session.receive_json()
+        assert exc.value.code == CLOSE_UNAUTHORIZED
+
+    def test_first_message_must_be_auth(self, client, test_board):
+        with client.websocket_connect(f"/api/v1/whiteboard/{test_board.id}/ws") as session:
+            session.send_json({"type": "cursor-moved", "x": 1, "y": 2})
+            with pytest.raises(WebSocketDisconnect) as exc:
+                session.receive_json()
+        assert exc.value.code == CLOSE_UNAUTHORIZED
+
+    def test_no_board_access_closes_4403(self, client, test_user2, test_board):
+        ws, session = connect(client, test_board, test_user2)
+        with pytest.raises(WebSocketDisconnect) as exc:
+            session.receive_json()
+        assert exc.value.code == CLOSE_FORBIDDEN
+        ws.__exit__(None, None, None)
+
+
+class TestRelayFanOut:
+
+    @pytest.fixture
+    def pair(self, client, test_user, test_user2, test_board, shared_workspace, db_session):
+        test_board.workspace_id = shared_workspace.id
+        db_session.commit()
+        first_ws, first = connect(client, test_board, test_user)
+        second_ws, second = connect(client, test_board, test_user2)
+        first.receive_json()
+        second.receive_json()
+        yield first, second
+        second_ws.__exit__(None, None, None)
+        first_ws.__exit__(None, None, None)
+
+    def test_element_created_is_persisted_acked_and_relayed(self, pair, test_user, test_board, db_session):
+        first, second = pair
+        first.send_json({"type": "element-created", "seq": 1, "element": element()})
+
+        assert first.receive_json() == {"type": "ack", "seq": 1}
+        relayed = second.receive_json()
+        assert relayed["type"] == "element-created"
+        assert relayed["userId"] == test_user.id
+        assert relayed["username"] == test_user.username
+        assert "seq" not in relayed
+
+        db_session.expire_all()
+        stored = db_session.query(BoardElement).filter_by(board_id=test_board.id, element_id="el-1").one()
+        assert stored.created_by == test_user.id
+
+    def test_sender_cannot_spoof_user(self, pair, test_user):
+        first, second = pair
+        first.send_json({"type": "typing-started", "elementId": "el-1", "userId": 999})
+        relayed = second.receive_json()
+        assert relayed["userId"] == test_user.id
+        assert relayed["elementId"] == "el-1"
+
+    def test_cursor_moves_arrive_as_one_frame(self, pair, test_user):
+        first, second = pair
+        for x in range(5):
+            first.send_json({"type": "cursor-moved", "x": x, "y": 6})
+
+        frame = second.receive_json()
+        while frame["cursors"][str(test_user.id)]["x"] != 4:
+            frame = second.receive_json()
+        assert frame["type"] == "board-frame"
+
+    def test_element_updated_merges_data(self, pair, test_board, db_session):
+        first, second = pair
+        first.send_json({"type": "element-created", "seq": 1, "element": element(fill="red")})
+        first.receive_json()
+        second.receive_json()
+
+        first.send_json({"type": "element-updated", "seq": 2, "element": {"id": "el-1", "x": 40}})
+        assert first.receive_json() == {"type": "ack", "seq": 2}
+        assert second.receive_json()["type"] == "element-updated"
+
+        db_session.expire_all()
+        stored = db_session.query(BoardElement).filter_by(board_id=test_board.id, element_id="el-1").one()
+        assert stored.data["x"] == 40
+        assert stored.data["fill"] == "red"
+
+    def test_drag_preview_goes_to_frame_without_touching_database(
+        self, pair, test_user, test_board, db_session, monkeypatch,
+    ):
+        first, second = pair
+        first.send_json({"type": "element-created", "seq": 1, "element": element()})
+        first.receive_json()
+        second.receive_json()
+        persisted = []
+        monkeypatch.setattr(relay.BoardRelaySession, "_persist", lambda self, *args: persisted.append(args))
+
+        first.send_json({
+            "type": "elements-batch", "seq": 2, "geometryOnly": True,
+            "elements": [{"id": "el-1", "type": "rectangle", "x": 90}],
+        })
+
+        assert first.receive_json() == {"type": "ack", "seq": 2}
+        frame = second.receive_json()
+        assert frame["type"] == "board-frame"
+        assert frame["drags"][str(test_user.id)][0]["x"] == 90
+        assert persisted == []
+        db_session.expire_all()
+        stored = db_session.query(BoardElement).filter_by(board_id=test_board.id, element_id="el-1").one()
+        assert stored.data["x"] == 0
+
+    def test_delete_is_idempotent(self, pair):
+        first, second = pair
+        first.send_json({"type": "element-deleted", "seq": 7, "elementId": "nie-ma"})
+        assert first.receive_json() == {"type": "ack", "seq": 7}
+        assert second.receive_json()["elementId"] == "nie-ma"
+
+    def test_unknown_type_returns_error(self, pair):
+        first, _ = pair
+        first.send_json({"type": "drop-table", "seq": 3})
+        reply = first.receive_json()
+        assert reply["type"] == "error"
+        assert reply["seq"] == 3
+        assert reply["code"] == "INVALID_MESSAGE"
+
+    def test_ping_answers_pong(self, pair):
+        first, _ = pair
+        first.send_json({"type": "ping", "seq": 9})
+        assert first.receive_json() == {"type": "pong", "seq": 9}
+
+    def test_removed_member_is_disconnected(
+        self, pair, shared_workspace, test_user2, db_session, sync_redis_client,
+    ):
+        first, second = pair
+        db_session.query(WorkspaceMember).filter_by(
+            workspace_id=shared_workspace.id, user_id=test_user2.id,
+        ).delete()
+        db_session.commit()
+
+        # To samo publikuje handler outboxa po zmianie członkostwa (acl_cache.py)
+        sync_redis_client.publish(ACL_CHANNEL, json.dumps({"workspace_id": shared_workspace.id, "user_id": None}))
+
+        with pytest.raises(WebSocketDisconnect) as exc:
+            second.receive_json()
+        assert exc.value.code == CLOSE_FORBIDDEN
+        first.send_json({"type": "ping", "seq": 1})
+        assert first.receive_json() == {"type": "pong", "seq": 1}
+
+
+class TestBoardRelayHub:
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_other_hub_but_not_origin(self, redis_client, fake_redis_server):
+        import fakeredis.aioredis
+
+        other_client = fakeredis.aioredis.FakeRedis(server=fake_redis_server, decode_responses=True)
+        hub_a, hub_b = BoardRelayHub(redis_client), BoardRelayHub(other_client)
+        sender = RelayConnection(None, 1, 10, "a")
+        receiver = RelayConnection(None, 1, 20, "b")
+        await hub_a.join(sender)
+        await hub_b.join(receiver)
+
+        await hub_a.publish(1, {"type": "cursor-moved", "x": 1}, origin=sender.id)
+        event = await asyncio.wait_for(receiver.queue.get(), timeout=2)
+
+        assert event == {"type": "cursor-moved", "x": 1}
+        assert sender.queue.empty()
+        await hub_a.close()
+        await hub_b.close()
+
+    @pytest.mark.asyncio
+    async def test_frames_are_built_per_worker(self, redis_client, fake_redis_server):
+        import fakeredis.aioredis
+
+        other_client = fakeredis.aioredis.FakeRedis(server=fake_redis_server, decode_responses=True)
+        hub_a, hub_b = BoardRelayHub(redis_client), BoardRelayHub(other_client)
+        on_a = RelayConnection(None, 1, 10, "a")
+        on_b = RelayConnection(None, 1, 20, "b")
+        await hub_a.join(on_a)
+        await hub_b.join(on_b)
+        # Ticki sterujemy ręcznie
+        await hub_a.frames.stop()
+        await hub_b.frames.stop()
+        for hub in (hub_a, hub_b):
+            hub.frames.build_frames()
+            hub.frames.take_forward_updates()
+
+        hub_a.frames.add_cursor(1, 10, "a", 5, 5)
+        hub_b.frames.add_cursor(1, 20, "b", 7, 7)
+        await hub_a.frames.tick()
+        await hub_b.frames.tick()
+        for _ in range(100):
+            if 20 in hub_a.frames._boards[1].pending_cursors and 10 in hub_b.frames._boards[1].pending_cursors:
+                break
+            await asyncio.sleep(0.02)
+        await hub_a.frames.tick()
+        await hub_b.frames.tick()
+
+        # Jedna ramka na tick, tylko od własnego workera; frame-input nie dociera do klienta
+        received = [on_b.queue.get_nowait() for _ in range(on_b.queue.qsize())]
+        assert [event["type"] for event in received] == ["board-frame", "board-frame"]
+        assert received[1]["cursors"] == {"10": {"x": 5, "y": 5, "username": "a"}}
+        assert [event["type"] for event in [on_a.queue.get_nowait() for _ in range(on_a.queue.qsize())]] == [
+            "board-frame", "board-frame",
+        ]
+        await hub_a.close()
+        await hub_b.close()
+
+    @pytest.mark.asyncio
+    async def test_leave_last_connection_unsubscribes(self, redis_client):
+        hub = BoardRelayHub(redis_client)
+        conn = RelayConnection(None, 5, 10, "a")
+        await hub.join(conn)
+        assert hub.local_connection_count(5) == 1
+
+        await hub.leave(conn)
+        assert hub.local_connection_count(5) == 0
+        assert await redis_client.pubsub_numsub("board:5:events") == [("board:5:events", 0)]
+        await hub.close()
+
+
+class TestBackPressure:
+
+    def test_full_queue_drops_ephemeral_events(self):
+        conn = RelayConnection(None, 1, 10, "a")
+        for i in range(SEND_QUEUE_SIZE):
+            conn.deliver({"type": "cursor-moved", "x": i})
+        conn.deliver({"type": "cursor-moved", "x": -1})
+        assert not conn.overloaded
+        assert conn.queue.qsize() == SEND_QUEUE_SIZE
+
+    def test_full_queue_with_element_event_marks_overloaded(self):
+        conn = RelayConnection(None, 1, 10, "a")
+        for i in range(SEND_QUEUE_SIZE):
+            conn.deliver({"type": "cursor-moved", "x": i})
+        conn.deliver({"type": "element-updated", "element": {"id": "x"}})
+        assert conn.overloaded
+        assert conn.queue.get_nowait() is None
+
+    @pytest.mark.asyncio
+    async def test_message_size_limit(self, monkeypatch):
+        monkeypatch.setattr(relay, "MAX_MESSAGE_BYTES", 10)
+        conn = RelayConnection(None, 1, 10, "a")
+        session = relay.BoardRelaySession(None, 1, hub=object())
+        session.conn = conn
+        await session._handle_raw(json.dumps({"type": "cursor-moved", "x": 1}))
+        assert conn.queue.get_nowait()["code"] == "MESSAGE_TOO_LARGE"
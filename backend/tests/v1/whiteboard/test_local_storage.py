@@ -0,0 +1,178 @@
+"""
+Testy lokalnego backendu Storage
+api/v1/whiteboard/local_storage.py + GET/PUT /api/v1/whiteboard/files/*
+"""
+from urllib.parse import urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from api.v1.whiteboard import storage
+from api.v1.whiteboard.local_storage import LocalStorageBackend, parse_range
+from api.v1.whiteboard.storage import (
+    IMMUTABLE_CACHE_CONTROL, content_addressed_path, download_object,
+    upload_board_image, delete_board_folder,
+)
+from core.exceptions import AppException
+
+
+PREFIX = "http://testserver/api/v1/whiteboard/files/"
+DATA = bytes(range(256)) * 40  # 10 240 B
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch):
+    backend = LocalStorageBackend(tmp_path, PREFIX)
+    monkeypatch.setattr(storage, "_storage_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def client(local_backend):
+    with TestClient(app, raise_server_exceptions=False) as c:
+        yield c
+
+
+def url_path(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class TestLocalStorageBackend:
+
+    @pytest.mark.asyncio
+    async def test_upload_download_roundtrip(self, local_backend):
+        path = content_addressed_path("ab" * 32)
+        url = await upload_board_image(path, DATA, "image/webp")
+
+        assert url == PREFIX + path
+        assert await download_object(path) == DATA
+        assert storage.path_from_public_url(url) == path
+
+    @pytest.mark.asyncio
+    async def test_download_missing_returns_none(self, local_backend):
+        assert await download_object("incoming/nope.png") is None
+
+    @pytest.mark.asyncio
+    async def test_download_over_limit_raises_413(self, local_backend):
+        path = "incoming/big.png"
+        await local_backend.upload(path, DATA, "image/png")
+
+        with pytest.raises(AppException) as exc:
+            await download_object(path, max_bytes=len(DATA) - 1)
+        assert exc.value.status_code == 413
+        assert await download_object(path, max_bytes=len(DATA)) == DATA
+
+    @pytest.mark.asyncio
+    async def test_path_traversal_rejected(self, local_backend):
+        with pytest.raises(AppException) as exc:
+            await local_backend.upload("../evil.webp", DATA, "image/webp")
+        assert exc.value.code == "INVALID_PATH"
+
+    @pytest.mark.asyncio
+    async def test_delete_board_folder(self, local_backend):
+        await local_backend.upload("7/a.jpg", DATA, "image/jpeg")
+        await local_backend.upload("7/b.jpg", DATA, "image/jpeg")
+        await local_backend.upload("8/c.jpg", DATA, "image/jpeg")
+
+        await delete_board_folder(7)
+
+        assert await local_backend.list_objects("7/") == []
+        assert [obj.path for obj in await local_backend.list_objects("8/")] == ["8/c.jpg"]
+
+    @pytest.mark.asyncio
+    async def test_delete_board_folder_walks_all_pages(self, local_backend, monkeypatch):
+        monkeypatch.setattr(storage, "LIST_PAGE_SIZE", 2)
+        monkeypatch.setattr(storage, "DELETE_CHUNK_SIZE", 2)
+        for i in range(5):
+            await local_backend.upload(f"7/{i}.jpg", DATA, "image/jpeg")
+
+        await delete_board_folder(7)
+
+        assert await local_backend.list_objects("7/") == []
+
+
+class TestParseRange:
+
+    def test_closed_range(self):
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+
+    def test_open_and_suffix_ranges(self):
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=500-5000", 1000) == (500, 999)
+
+    def test_multiple_ranges_ignored(self):
+        assert parse_range("bytes=0-1,5-6", 1000) is None
+
+    def test_unsatisfiable_raises(self):
+        with pytest.raises(ValueError):
+            parse_range("bytes=1000-", 1000)
+
+
+class TestServeLocalFile:
+
+    @pytest.fixture
+    def image_path(self, local_backend):
+        path = content_addressed_path("cd" * 32)
+        local_backend.resolve(path).parent.mkdir(parents=True)
+        local_backend.resolve(path).write_bytes(DATA)
+        return path
+
+    def test_full_response_with_cache_headers(self, client, image_path):
+        response = client.get(f"/api/v1/whiteboard/files/{image_path}")
+
+        assert response.status_code == 200
+        assert response.content == DATA
+        assert response.headers["content-type"] == "image/webp"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["etag"]
+
+    def test_if_none_match_returns_304(self, client, image_path):
+        etag = client.get(f"/api/v1/whiteboard/files/{image_path}").headers["etag"]
+
+        response = client.get(f"/api/v1/whiteboard/files/{image_path}", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_range_returns_206(self, client, image_path):
+        response = client.get(f"/api/v1/whiteboard/files/{image_path}", headers={"Range": "bytes=100-199"})
+
+        assert response.status_code == 206
+        assert response.content == DATA[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+
+    def test_unsatisfiable_range_returns_416(self, client, image_path):
+        response = client.get(f"/api/v1/whiteboard/files/{image_path}", headers={"Range": "bytes=99999-"})
+        assert response.status_code == 416
+
+    def test_missing_file_returns_404(self, client, local_backend):
+        assert client.get("/api/v1/whiteboard/files/sha256/00/none/full.webp").status_code == 404
+
+    def test_not_served_with_supabase_backend(self, client, image_path, monkeypatch):
+        monkeypatch.setattr(storage, "_storage_backend", storage.SupabaseStorageBackend())
+        assert client.get(f"/api/v1/whiteboard/files/{image_path}").status_code == 404
+
+
+class TestSignedLocalUpload:
+
+    @pytest.mark.asyncio
+    async def test_put_with_signed_url_stores_file(self, client, local_backend):
+        signed = await storage.create_signed_upload_url("incoming/abc.png")
+
+        response = client.put(url_path(signed), content=DATA, headers={"Content-Type": "image/png"})
+
+        assert response.status_code == 200
+        assert local_backend.resolve("incoming/abc.png").read_bytes() == DATA
+
+    @pytest.mark.asyncio
+    async def test_token_bound_to_path(self, client, local_backend):
+        signed = await storage.create_signed_upload_url("incoming/abc.png")
+        token = urlsplit(signed).query
+
+        response = client.put(f"/api/v1/whiteboard/files/incoming/other.png?{token}", content=DATA)
+
+        assert response.status_code == 403
+        assert not local_backend.resolve("incoming/other.png").exists()
@@ -0,0 +1,157 @@
+"""
+Testy reconcile Storage ↔ baza
+api/v1/whiteboard/reconciliation.py (na lokalnym backendzie Storage)
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.v1.whiteboard import storage
+from api.v1.whiteboard.local_storage import LocalStorageBackend
+from api.v1.whiteboard.reconciliation import _release_if_orphan, reconcile_storage
+from api.v1.whiteboard.storage import content_addressed_path, public_url_for
+from core.models import BoardElement, StoredImage
+
+
+PREFIX = "http://testserver/api/v1/whiteboard/files/"
+HOUR = timedelta(hours=1)
+LIVE = "aa" * 32
+LEAKED = "bb" * 32
+UNKNOWN = "cc" * 32
+HELD = "dd" * 32
+
+
+def an_hour_ago():
+    return datetime.utcnow() - HOUR
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch):
+    backend = LocalStorageBackend(tmp_path, PREFIX)
+    monkeypatch.setattr(storage, "_storage_backend", backend)
+    return backend
+
+
+def put_file(backend, path, age=timedelta(hours=2)):
+    full = backend.resolve(path)
+    full.parent.mkdir(parents=True, exist_ok=True)
+    full.write_bytes(b"x")
+    mtime = time.time() - age.total_seconds()
+    os.utime(full, (mtime, mtime))
+
+
+def stored_image(digest, created_at, claimed_at=None):
+    return StoredImage(
+        content_hash=digest, path=content_addressed_path(digest), content_type="image/webp",
+        size_bytes=1, variants={"256": content_addressed_path(digest, "w256")},
+        created_at=created_at, claimed_at=claimed_at or created_at,
+    )
+
+
+def image_element(board, user, path, element_id):
+    return BoardElement(
+        board_id=board.id, element_id=element_id, type="image",
+        data={"src": public_url_for(path)}, created_by=user.id,
+    )
+
+
+@pytest.fixture
+def seeded(db_session, local_backend, test_user, test_board):
+    old = datetime.utcnow() - timedelta(hours=2)
+    db_session.add_all([
+        stored_image(LIVE, old),
+        # Wgrany i nigdy niewstawiony na tablicę
+        stored_image(LEAKED, old),
+        # Stary plik, ale świeży dedup — element jeszcze niezapisany
+        stored_image(HELD, old, claimed_at=datetime.utcnow()),
+        image_element(test_board, test_user, content_addressed_path(LIVE), "img-live"),
+        image_element(test_board, test_user, f"{test_board.id}/legacy-used.jpg", "img-legacy"),
+    ])
+    db_session.commit()
+
+    for digest in (LIVE, LEAKED, UNKNOWN, HELD):
+        put_file(local_backend, content_addressed_path(digest))
+        put_file(local_backend, content_addressed_path(digest, "w256"))
+    put_file(local_backend, f"{test_board.id}/legacy-used.jpg")
+    put_file(local_backend, f"{test_board.id}/legacy-orphan.jpg")
+    put_file(local_backend, "incoming/abandoned.png")
+    put_file(local_backend, "incoming/fresh.png", age=timedelta(minutes=1))
+    return test_board.id
+
+
+async def remaining(backend):
+    return {obj.path async for obj in storage.iter_storage_objects("", recursive=True)}
+
+
+class TestReconcileStorage:
+
+    @pytest.mark.asyncio
+    async def test_deletes_orphans_and_keeps_referenced(self, db_session, local_backend, seeded):
+        report = await reconcile_storage(db_session, HOUR)
+
+        assert await remaining(local_backend) == {
+            content_addressed_path(LIVE),
+            content_addressed_path(LIVE, "w256"),
+            content_addressed_path(HELD),
+            content_addressed_path(HELD, "w256"),
+            f"{seeded}/legacy-used.jpg",
+            "incoming/fresh.png",
+        }
+        assert report.orphaned_objects == 6
+        assert report.released_images == 1
+        assert {s.content_hash for s in db_session.query(StoredImage).all()} == {LIVE, HELD}
+
+    @pytest.mark.asyncio
+    async def test_dry_run_changes_nothing(self, db_session, local_backend, seeded):
+        before = await remaining(local_backend)
+
+        report = await reconcile_storage(db_session, HOUR, dry_run=True)
+
+        assert await remaining(local_backend) == before
+        assert report.orphaned_objects == 6
+        assert db_session.query(StoredImage).count() == 3
+
+    @pytest.mark.asyncio
+    async def test_grace_protects_recent_objects(self, db_session, local_backend, seeded):
+        report = await reconcile_storage(db_session, timedelta(hours=3))
+
+        assert report.orphaned_objects == 0
+        assert report.released_images == 0
+
+
+class TestReleaseIfOrphan:
+
+    def test_concurrent_claim_keeps_row(self, db_session):
+        stored = stored_image(LEAKED, datetime.utcnow() - timedelta(hours=2))
+        db_session.add(stored)
+        db_session.commit()
+        stored_id = stored.id
+
+        # Dedup w innym requeście zdążył odświeżyć claimed_at po listingu wierszy
+        db_session.query(StoredImage).filter(StoredImage.id == stored_id).update(
+            {StoredImage.claimed_at: datetime.utcnow()}, synchronize_session=False,
+        )
+
+        assert _release_if_orphan(db_session, stored_id, an_hour_ago(), dry_run=False) is False
+        db_session.commit()
+        assert db_session.query(StoredImage).count() == 1
+
+    def test_element_saved_after_scan_keeps_row(self, db_session, test_user, test_board):
+        stored = stored_image(LEAKED, datetime.utcnow() - timedelta(hours=2))
+        db_session.add(stored)
+        db_session.commit()
+        db_session.add(image_element(test_board, test_user, stored.path, "img-late"))
+        db_session.commit()
+
+        assert _release_if_orphan(db_session, stored.id, an_hour_ago(), dry_run=False) is False
+
+    def test_unclaimed_row_is_deleted(self, db_session):
+        stored = stored_image(LEAKED, datetime.utcnow() - timedelta(hours=2))
+        db_session.add(stored)
+        db_session.commit()
+
+        assert _release_if_orphan(db_session, stored.id, an_hour_ago(), dry_run=False) is True
+        db_session.commit()
+        assert db_session.query(StoredImage).count() == 0
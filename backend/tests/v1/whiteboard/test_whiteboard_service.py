@@ -2,80 +2,145 @@
 Testy serwisu whiteboard (sesja tablicy)
 api/v1/whiteboard/service.py
 """
-import pytest
+import io
+import time
+from datetime import datetime, timedelta
 
-from api.v1.whiteboard.service import WhiteboardService
+import pytest
+from fastapi import BackgroundTasks
+from unittest.mock import AsyncMock, patch
+from PIL import Image
+
+import api.v1.whiteboard.service as service_module
+import api.v1.whiteboard.storage as storage_module
+from api.v1.whiteboard.images import transcode_image
+from api.v1.whiteboard.presence import PRESENCE_TTL_SECONDS
+from api.v1.whiteboard.service import WhiteboardService, release_board_images, release_stored_image
+from api.v1.whiteboard.storage import (
+    MAX_UPLOAD_SIZE_BYTES, content_hash, content_addressed_path, public_url_for, staging_path,
+)
 from api.v1.whiteboard.schemas import (
     BoardOwnerInfo, LastModifiedByInfo,
     SaveElementsResponse, BoardElementWithAuthor,
 )
+from core.config import get_settings
 from core.exceptions import NotFoundError, AppException, ValidationError
-from core.models import BoardUsers, BoardElement
+from core.models import BoardUsers, BoardElement, StoredImage, WorkspaceMember
 
 
 ELEMENT = {"element_id": "uuid-1", "type": "path", "data": {"color": "#000"}}
 
 
+def make_png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color=(200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+PNG_BYTES = make_png(1200, 600)
+
+MOCK_UPLOAD = "api.v1.whiteboard.service.upload_board_image"
+MOCK_SIGN = "api.v1.whiteboard.service.create_signed_upload_url"
+MOCK_DOWNLOAD = "api.v1.whiteboard.service.download_object"
+MOCK_DELETE_OBJECTS = "api.v1.whiteboard.service.delete_board_objects"
+
+
 class TestOnlinePresence:
+    # Obecność jest w Redis (fake z conftest: global_redis_client / redis_client)
 
-    def test_set_online_marks_user(self, db_session, test_user, test_board):
-        service = WhiteboardService(db_session)
-        service.set_online(test_board.id, test_user.id)
+    @pytest.mark.asyncio
+    async def test_set_online_marks_user(self, db_session, test_user, test_board, redis_client):
+        service = WhiteboardService(db_session, redis_client)
+        await service.set_online(test_board.id, test_user.id)
 
+        assert await redis_client.zscore(f"presence:board:{test_board.id}", str(test_user.id)) is not None
+
+    @pytest.mark.asyncio
+    async def test_set_online_updates_last_opened(self, db_session, test_user, test_board, redis_client):
         bu = db_session.query(BoardUsers).filter(
             BoardUsers.board_id == test_board.id,
             BoardUsers.user_id == test_user.id,
         ).first()
-        assert bu.is_online is True
+        bu.last_opened = None
+        db_session.commit()
 
-    def test_set_online_updates_last_opened(self, db_session, test_user, test_board):
-        service = WhiteboardService(db_session)
-        service.set_online(test_board.id, test_user.id)
+        service = WhiteboardService(db_session, redis_client)
+        await service.set_online(test_board.id, test_user.id)
 
-        bu = db_session.query(BoardUsers).filter(
-            BoardUsers.board_id == test_board.id,
-            BoardUsers.user_id == test_user.id,
-        ).first()
+        db_session.refresh(bu)
         assert bu.last_opened is not None
 
-    def test_set_online_no_access_raises_403(self, db_session, test_board, test_user2):
-        service = WhiteboardService(db_session)
+    @pytest.mark.asyncio
+    async def test_repeated_heartbeat_skips_database(self, db_session, test_user, test_board, redis_client):
+        service = WhiteboardService(db_session, redis_client)
+        await service.set_online(test_board.id, test_user.id)
+
+        with patch.object(service, "_require_access") as mock_lookup:
+            await service.set_online(test_board.id, test_user.id)
+        mock_lookup.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_set_online_no_access_raises_403(self, db_session, test_board, test_user2, redis_client):
+        service = WhiteboardService(db_session, redis_client)
         with pytest.raises(AppException) as exc:
-            service.set_online(test_board.id, test_user2.id)
+            await service.set_online(test_board.id, test_user2.id)
         assert exc.value.status_code == 403
 
-    def test_set_offline_marks_user(self, db_session, test_user, test_board):
-        service = WhiteboardService(db_session)
-        service.set_online(test_board.id, test_user.id)
-        result = service.set_offline(test_board.id, test_user.id)
+    @pytest.mark.asyncio
+    async def test_set_offline_marks_user(self, db_session, test_user, test_board, redis_client):
+        service = WhiteboardService(db_session, redis_client)
+        await service.set_online(test_board.id, test_user.id)
+        result = await service.set_offline(test_board.id, test_user.id)
         assert result is True
+        assert await service.get_online_users(test_board.id) == []
 
-        bu = db_session.query(BoardUsers).filter(
-            BoardUsers.board_id == test_board.id,
-            BoardUsers.user_id == test_user.id,
-        ).first()
-        assert bu.is_online is False
-
-    def test_set_offline_nonexistent_returns_false(self, db_session, test_user2, test_board):
-        service = WhiteboardService(db_session)
-        result = service.set_offline(test_board.id, test_user2.id)
+    @pytest.mark.asyncio
+    async def test_set_offline_nonexistent_returns_false(self, db_session, test_user2, test_board, redis_client):
+        service = WhiteboardService(db_session, redis_client)
+        result = await service.set_offline(test_board.id, test_user2.id)
         assert result is False
 
-    def test_get_online_users(self, db_session, test_user, test_board):
-        service = WhiteboardService(db_session)
-        service.set_online(test_board.id, test_user.id)
-        result = service.get_online_users(test_board.id)
-        assert any(u.user_id == test_user.id for u in result)
+    @pytest.mark.asyncio
+    async def test_get_online_users(self, db_session, test_user, test_board, redis_client):
+        service = WhiteboardService(db_session, redis_client)
+        await service.set_online(test_board.id, test_user.id)
+        result = await service.get_online_users(test_board.id)
+        assert [u.user_id for u in result] == [test_user.id]
+        assert result[0].username == test_user.username
+
+    @pytest.mark.asyncio
+    async def test_get_online_users_empty(self, db_session, test_board, redis_client):
+        service = WhiteboardService(db_session, redis_client)
+        result = await service.get_online_users(test_board.id)
+        assert result == []
 
-    def test_get_online_users_empty(self, db_session, test_board):
-        # Ustaw wszystkich offline
-        for bu in db_session.query(BoardUsers).filter(BoardUsers.board_id == test_board.id):
-            bu.is_online = False
+    @pytest.mark.asyncio
+    async def test_stale_heartbeat_not_online(self, db_session, test_user, test_board, redis_client):
+        await redis_client.zadd(
+            f"presence:board:{test_board.id}",
+            {str(test_user.id): time.time() - PRESENCE_TTL_SECONDS - 1},
+        )
+        service = WhiteboardService(db_session, redis_client)
+        assert await service.get_online_users(test_board.id) == []
+
+    @pytest.mark.asyncio
+    async def test_get_online_users_batch(self, db_session, test_user, test_user2, multiple_boards, redis_client):
+        db_session.add(WorkspaceMember(
+            workspace_id=multiple_boards[0].workspace_id, user_id=test_user2.id, role="member",
+        ))
         db_session.commit()
+        service = WhiteboardService(db_session, redis_client)
+        await service.set_online(multiple_boards[0].id, test_user.id)
+        await service.set_online(multiple_boards[0].id, test_user2.id)
+        await service.set_online(multiple_boards[1].id, test_user2.id)
 
-        service = WhiteboardService(db_session)
-        result = service.get_online_users(test_board.id)
-        assert result == []
+        result = await service.get_online_users_batch(
+            [multiple_boards[0].id, multiple_boards[1].id, multiple_boards[2].id]
+        )
+
+        assert sorted(u.user_id for u in result[multiple_boards[0].id]) == sorted([test_user.id, test_user2.id])
+        assert [u.user_id for u in result[multiple_boards[1].id]] == [test_user2.id]
+        assert result[multiple_boards[2].id] == []
 
 
 class TestBoardMetadata:
@@ -98,9 +163,10 @@ class TestBoardMetadata:
         assert isinstance(result, LastModifiedByInfo)
         assert result.user_id == test_user.id
 
-    def test_get_last_opened(self, db_session, test_user, test_board):
+    @pytest.mark.asyncio
+    async def test_get_last_opened(self, db_session, test_user, test_board):
         service = WhiteboardService(db_session)
-        service.set_online(test_board.id, test_user.id)
+        await service.set_online(test_board.id, test_user.id)
         result = service.get_last_opened(test_board.id, test_user.id)
         assert result.user_id == test_user.id
         assert result.last_opened is not None
@@ -230,4 +296,333 @@ class TestDeleteElement:
         service.save_elements(test_board.id, [ELEMENT], test_user.id)
         with pytest.raises(AppException) as exc:
             service.delete_element(test_board.id, "uuid-1", test_user2.id)
-        assert exc.value.status_code == 403
\ No newline at end of file
+        assert exc.value.status_code == 403
+
+class TestTranscodeImage:
+
+    def test_converts_to_webp(self):
+        result = transcode_image(PNG_BYTES)
+        with Image.open(io.BytesIO(result.full)) as img:
+            assert img.format == "WEBP"
+            assert img.size == (1200, 600)
+
+    def test_generates_no_scaled_variants(self):
+        assert not hasattr(transcode_image(PNG_BYTES), "variants")
+
+    def test_rejects_non_image(self):
+        with pytest.raises(ValueError):
+            transcode_image(b"not an image")
+
+
+class TestUploadImage:
+    # Upload do Storage jest mockowany — testujemy deduplikację po hashu
+    # (tabela stored_images) i transkodowanie, nie samego klienta Supabase.
+
+    @pytest.mark.asyncio
+    async def test_first_upload_stores_webp(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        with patch(MOCK_UPLOAD, new_callable=AsyncMock) as mock_upload:
+            result = await service.upload_image(test_board.id, test_user.id, PNG_BYTES, "image/png")
+
+        digest = content_hash(PNG_BYTES)
+        mock_upload.assert_awaited_once()
+        assert mock_upload.await_args.args[0] == content_addressed_path(digest)
+        assert mock_upload.await_args.args[2] == "image/webp"
+
+        assert result.url == public_url_for(content_addressed_path(digest))
+        assert (result.width, result.height) == (1200, 600)
+
+        stored = db_session.query(StoredImage).first()
+        assert stored.claimed_at is not None
+
+    @pytest.mark.asyncio
+    async def test_duplicate_upload_skips_storage(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        with patch(MOCK_UPLOAD, new_callable=AsyncMock) as mock_upload:
+            first = await service.upload_image(test_board.id, test_user.id, PNG_BYTES, "image/png")
+            calls_after_first = mock_upload.await_count
+            stored = db_session.query(StoredImage).first()
+            stored.claimed_at = datetime.utcnow() - timedelta(days=3)
+            db_session.commit()
+            second = await service.upload_image(test_board.id, test_user.id, PNG_BYTES, "image/png")
+
+        assert first == second
+        assert mock_upload.await_count == calls_after_first
+        db_session.refresh(stored)
+        assert stored.claimed_at > datetime.utcnow() - timedelta(minutes=1)
+
+    @pytest.mark.asyncio
+    async def test_invalid_type_raises_400(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        with pytest.raises(AppException) as exc:
+            await service.upload_image(test_board.id, test_user.id, b"%PDF", "application/pdf")
+        assert exc.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_corrupt_image_raises_400(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        with patch(MOCK_UPLOAD, new_callable=AsyncMock) as mock_upload:
+            with pytest.raises(AppException) as exc:
+                await service.upload_image(test_board.id, test_user.id, b"garbage", "image/png")
+        assert exc.value.code == "INVALID_IMAGE"
+        mock_upload.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_no_access_raises_403(self, db_session, test_board, test_user2):
+        service = WhiteboardService(db_session)
+        with pytest.raises(AppException) as exc:
+            await service.upload_image(test_board.id, test_user2.id, PNG_BYTES, "image/png")
+        assert exc.value.status_code == 403
+
+
+class TestSignedUpload:
+    # Upload bezpośredni: Storage mockowany, testujemy bilet, weryfikację
+    # hasha po stronie serwera i deduplikację.
+
+    async def _start(self, service, board_id, user_id, data=PNG_BYTES):
+        with patch(MOCK_SIGN, new_callable=AsyncMock, return_value="https://signed.example/put"):
+            return await service.create_signed_upload(
+                board_id, user_id, content_hash(data), "image/png", len(data)
+            )
+
+    @pytest.mark.asyncio
+    async def test_new_file_returns_signed_url_and_token(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        result = await self._start(service, test_board.id, test_user.id)
+
+        assert result.upload_required is True
+        assert result.upload_url == "https://signed.example/put"
+        assert result.upload_token
+        assert result.public_url == public_url_for(content_addressed_path(content_hash(PNG_BYTES)))
+
+    @pytest.mark.asyncio
+    async def test_known_hash_skips_upload(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        with patch(MOCK_UPLOAD, new_callable=AsyncMock):
+            await service.upload_image(test_board.id, test_user.id, PNG_BYTES, "image/png")
+
+        with patch(MOCK_SIGN, new_callable=AsyncMock) as mock_sign:
+            result = await service.create_signed_upload(
+                test_board.id, test_user.id, content_hash(PNG_BYTES), "image/png", len(PNG_BYTES)
+            )
+
+        assert result.upload_required is False
+        assert result.image.url == result.public_url
+        mock_sign.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_complete_verifies_and_stores(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        started = await self._start(service, test_board.id, test_user.id)
+
+        with patch(MOCK_DOWNLOAD, new_callable=AsyncMock, return_value=PNG_BYTES), \
+                patch(MOCK_UPLOAD, new_callable=AsyncMock), \
+                patch(MOCK_DELETE_OBJECTS, new_callable=AsyncMock) as mock_delete:
+            result = await service.complete_signed_upload(
+                test_board.id, test_user.id, started.upload_token
+            )
+
+        assert result.url == started.public_url
+        assert db_session.query(StoredImage).count() == 1
+        mock_delete.assert_awaited_once()  # surowy plik z incoming/ sprzątnięty
+
+    @pytest.mark.asyncio
+    async def test_complete_ticket_is_single_use(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        started = await self._start(service, test_board.id, test_user.id)
+
+        with patch(MOCK_DOWNLOAD, new_callable=AsyncMock, return_value=PNG_BYTES) as mock_download, \
+                patch(MOCK_UPLOAD, new_callable=AsyncMock), \
+                patch(MOCK_DELETE_OBJECTS, new_callable=AsyncMock):
+            await service.complete_signed_upload(test_board.id, test_user.id, started.upload_token)
+            with pytest.raises(ValidationError):
+                await service.complete_signed_upload(test_board.id, test_user.id, started.upload_token)
+
+        mock_download.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_complete_hash_mismatch_raises_400(self, db_session, test_user, test_board):
+        service = WhiteboardService(db_session)
+        started = await self._start(service, test_board.id, test_user.id)
+
+        with patch(MOCK_DOWNLOAD, new_callable=AsyncMock, return_value=make_png(10, 10)), \
+                patch(MOCK_DELETE_OBJECTS, new_callable=AsyncMock):
+            with pytest.raises(AppException) as exc:
+                await service.complete_signed_upload(test_board.id, test_user.id, started.upload_token)
+
+        assert exc.value.code == "UPLOAD_HASH_MISMATCH"
+        assert db_session.query(StoredImage).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_complete_oversized_object_deleted_with_413(
+        self, db_session, test_user, test_board, monkeypatch,
+    ):
+        class OversizedBackend:
+            """Storage, w którym klient wgrał więcej, niż zadeklarował."""
+            deleted = []
+
+            async def download(self, path, max_bytes=None):
+                return b"\0" * (MAX_UPLOAD_SIZE_BYTES + 1)
+
+            async def delete(self, paths):
+                self.deleted.extend(paths)
+
+        service = WhiteboardService(db_session)
+        started = await self._start(service, test_board.id, test_user.id)
+        backend = OversizedBackend()
+        monkeypatch.setattr(storage_module, "_storage_backend", backend)
+
+        with pytest.raises(AppException) as exc:
+            await service.complete_signed_upload(test_board.id, test_user.id, started.upload_token)
+
+        assert exc.value.status_code == 413
+        assert backend.deleted == [staging_path(content_hash(PNG_BYTES), "png")]
+        assert db_session.query(StoredImage).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_complete_token_for_other_user_rejected(
+        self, db_session, test_user, test_user2, test_board
+    ):
+        db_session.add(WorkspaceMember(
+            workspace_id=test_board.workspace_id, user_id=test_user2.id, role="member",
+        ))
+        db_session.commit()
+        service = WhiteboardService(db_session)
+        started = await self._start(service, test_board.id, test_user.id)
+
+        with pytest.raises(ValidationError):
+            await service.complete_signed_upload(test_board.id, test_user2.id, started.upload_token)
+
+    @pytest.mark.asyncio
+    async def test_no_access_raises_403(self, db_session, test_board, test_user2):
+        service = WhiteboardService(db_session)
+        with pytest.raises(AppException) as exc:
+            await self._start(service, test_board.id, test_user2.id)
+        assert exc.value.status_code == 403
+
+
+class TestReleaseStoredImage:
+
+    def _add_stored(self, db_session, claimed_ago=timedelta(days=3)):
+        digest = "a" * 64
+        stored = StoredImage(
+            content_hash=digest, path=content_addressed_path(digest),
+            content_type="image/webp", size_bytes=10,
+            variants={"256": content_addressed_path(digest, "w256")},
+            claimed_at=datetime.utcnow() - claimed_ago,
+        )
+        db_session.add(stored)
+        db_session.commit()
+        return stored
+
+    def test_freshly_claimed_image_is_kept(self, db_session):
+        # Upload/dedup przed chwilą — klient jeszcze nie zapisał elementu
+        stored = self._add_stored(db_session, claimed_ago=timedelta(0))
+        assert release_stored_image(db_session, public_url_for(stored.path)) == []
+        assert db_session.query(StoredImage).count() == 1
+
+    def test_last_reference_deletes_all_variants(self, db_session):
+        stored = self._add_stored(db_session)
+        paths = release_stored_image(db_session, public_url_for(stored.path))
+        assert set(paths) == {stored.path, content_addressed_path("a" * 64, "w256")}
+        assert db_session.query(StoredImage).count() == 0
+
+    def test_legacy_image_without_row_is_deleted(self, db_session):
+        assert release_stored_image(db_session, public_url_for("12/abc.png")) == ["12/abc.png"]
+
+    def test_foreign_url_is_ignored(self, db_session):
+        assert release_stored_image(db_session, "https://example.com/x.png") == []
+
+    def test_copied_element_keeps_image(self, db_session, test_user, test_board):
+        stored = self._add_stored(db_session)
+        src = public_url_for(stored.path)
+        # Kopia na kliencie — ten sam src bez własnego uploadu
+        db_session.add(BoardElement(
+            board_id=test_board.id, element_id="copy", type="image",
+            data={"src": src}, created_by=test_user.id,
+        ))
+        db_session.commit()
+
+        assert release_stored_image(db_session, src) == []
+        assert db_session.query(StoredImage).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_board_delete_releases_every_element(self, db_session):
+        stored = self._add_stored(db_session)
+        src = public_url_for(stored.path)
+
+        with patch(MOCK_DELETE_OBJECTS, new_callable=AsyncMock) as mock_delete:
+            await release_board_images(db_session, [src, src])
+
+        assert db_session.query(StoredImage).count() == 0
+        assert set(mock_delete.await_args.args[0]) == {stored.path, content_addressed_path("a" * 64, "w256")}
+
+
+class TestImageReferenceLifecycle:
+
+    @pytest.fixture(autouse=True)
+    def immediate_cleanup(self, db_session, monkeypatch):
+        monkeypatch.setattr(service_module, "IMAGE_DELETE_GRACE_PERIOD_SECONDS", 0)
+        monkeypatch.setattr(service_module, "SessionLocal", lambda: db_session)
+        monkeypatch.setattr(get_settings(), "storage_reconcile_grace_hours", 0)
+
+    async def _place_twice(self, service, board_id, user_id):
+        """Ten sam plik wgrany dwa razy (drugi raz = dedup) i wstawiony jako dwa elementy."""
+        with patch(MOCK_UPLOAD, new_callable=AsyncMock):
+            first = await service.upload_image(board_id, user_id, PNG_BYTES, "image/png")
+            second = await service.upload_image(board_id, user_id, PNG_BYTES, "image/png")
+        service.save_elements(board_id, [
+            {"element_id": "img-1", "type": "image", "data": {"src": first.url}},
+            {"element_id": "img-2", "type": "image", "data": {"src": second.url}},
+        ], user_id)
+        return first.url
+
+    async def _delete(self, service, board_id, element_id, user_id):
+        tasks = BackgroundTasks()
+        service.delete_element(board_id, element_id, user_id, tasks)
+        with patch(MOCK_DELETE_OBJECTS, new_callable=AsyncMock) as mock_delete:
+            await tasks()
+        return mock_delete.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_deleting_all_elements_deletes_image(self, db_session, test_user, test_board):
+        board_id, user_id = test_board.id, test_user.id
+        service = WhiteboardService(db_session)
+        await self._place_twice(service, board_id, user_id)
+
+        assert await self._delete(service, board_id, "img-1", user_id) == []
+        deleted = await self._delete(service, board_id, "img-2", user_id)
+
+        digest = content_hash(PNG_BYTES)
+        assert db_session.query(StoredImage).count() == 0
+        assert deleted == [content_addressed_path(digest)]
+
+    @pytest.mark.asyncio
+    async def test_undo_within_grace_keeps_reference(self, db_session, test_user, test_board):
+        board_id, user_id = test_board.id, test_user.id
+        service = WhiteboardService(db_session)
+        src = await self._place_twice(service, board_id, user_id)
+
+        tasks = BackgroundTasks()
+        service.delete_element(board_id, "img-1", user_id, tasks)
+        # Ctrl+Z przed upływem grace — element wraca z tym samym src
+        service.save_elements(board_id, [{"element_id": "img-1", "type": "image", "data": {"src": src}}], user_id)
+        with patch(MOCK_DELETE_OBJECTS, new_callable=AsyncMock):
+            await tasks()
+
+        assert db_session.query(StoredImage).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_uploads_never_placed_hold_nothing(self, db_session, test_user, test_board):
+        board_id, user_id = test_board.id, test_user.id
+        service = WhiteboardService(db_session)
+        src = await self._place_twice(service, board_id, user_id)
+        # Ten sam plik wgrany jeszcze raz i porzucony — nie dokłada referencji
+        with patch(MOCK_UPLOAD, new_callable=AsyncMock):
+            await service.upload_image(board_id, user_id, PNG_BYTES, "image/png")
+
+        await self._delete(service, board_id, "img-1", user_id)
+        await self._delete(service, board_id, "img-2", user_id)
+
+        assert db_session.query(StoredImage).count() == 0
+        assert service_module.count_image_refs(db_session, src) == 0
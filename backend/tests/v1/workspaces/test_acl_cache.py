@@ -0,0 +1,178 @@
+"""
+Testy cache członkostwa w workspace'ach
+api/v1/workspaces/acl_cache.py + authorization.py
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from api.v1.workspaces import acl_cache as acl_module
+from api.v1.workspaces.acl_cache import (
+    ACL_EVENT, acl_cache, publish_acl_invalidations,
+    start_workspace_acl_listener, stop_workspace_acl_listener,
+)
+from api.v1.workspaces.authorization import require_membership, require_owner
+from api.v1.workspaces.members.service import MemberService
+from api.v1.workspaces.service import WorkspaceService
+from core.exceptions import NotFoundError
+from core.models import OutboxEvent, WorkspaceMember
+
+
+@pytest.fixture
+def selects(db_session):
+    """Lista zapytań SELECT wykonanych w trakcie testu."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def acl_enabled(monkeypatch):
+    """Jak gdyby listener był zasubskrybowany."""
+    monkeypatch.setattr(acl_cache, "subscribed", True)
+
+
+def new_request(db):
+    """Kolejny request = pusta mapa tożsamości (jak nowa sesja z get_db)."""
+    db.expunge_all()
+
+
+def add_member(db, workspace_id, user_id, role="editor"):
+    db.add(WorkspaceMember(
+        workspace_id=workspace_id, user_id=user_id,
+        role=role, is_favourite=False, joined_at=datetime.utcnow(),
+    ))
+    db.commit()
+
+
+class TestAuthorizationCache:
+
+    def test_second_check_is_memory_lookup(self, db_session, test_user, test_workspace, acl_enabled, selects):
+        workspace_id, user_id = test_workspace.id, test_user.id
+        require_membership(db_session, workspace_id, user_id)
+        new_request(db_session)
+        selects.clear()
+
+        workspace, membership = require_membership(db_session, workspace_id, user_id)
+        require_owner(db_session, workspace_id, user_id)
+
+        assert selects == []
+        assert workspace.created_by == user_id
+        assert membership.role == "owner"
+
+    def test_miss_is_single_query(self, db_session, test_user, test_workspace, selects):
+        workspace_id, user_id = test_workspace.id, test_user.id
+        new_request(db_session)
+        selects.clear()
+
+        require_membership(db_session, workspace_id, user_id)
+
+        assert len(selects) == 1
+
+    def test_cached_objects_load_other_columns_lazily(self, db_session, test_user, test_workspace, acl_enabled):
+        workspace_id, user_id = test_workspace.id, test_user.id
+        require_membership(db_session, workspace_id, user_id)
+        new_request(db_session)
+
+        workspace, membership = require_membership(db_session, workspace_id, user_id)
+
+        assert workspace.name == "Test Workspace"
+        assert membership.is_favourite is False
+
+    def test_non_member_cached_but_still_rejected(self, db_session, test_user2, test_workspace, acl_enabled):
+        for _ in range(2):
+            with pytest.raises(NotFoundError):
+                require_membership(db_session, test_workspace.id, test_user2.id)
+        assert len(acl_cache) == 1
+
+    def test_missing_workspace_not_cached(self, db_session, test_user, acl_enabled):
+        with pytest.raises(NotFoundError):
+            require_owner(db_session, 99999, test_user.id)
+        assert len(acl_cache) == 0
+
+    def test_disabled_without_listener(self, db_session, test_user, test_workspace):
+        require_membership(db_session, test_workspace.id, test_user.id)
+        assert len(acl_cache) == 0
+
+
+class TestInvalidation:
+
+    def test_role_change_visible_immediately(self, db_session, test_user, test_user2, test_workspace, acl_enabled):
+        workspace_id, owner_id, member_id = test_workspace.id, test_user.id, test_user2.id
+        add_member(db_session, workspace_id, member_id)
+        service = MemberService(db_session)
+        assert service.get_user_role(workspace_id, member_id).role == "editor"
+
+        service.update_member_role(workspace_id, member_id, "viewer", owner_id)
+        new_request(db_session)
+
+        assert service.get_user_role(workspace_id, member_id).role == "viewer"
+
+    def test_removed_member_loses_access(self, db_session, test_user, test_user2, test_workspace, acl_enabled):
+        workspace_id, owner_id, member_id = test_workspace.id, test_user.id, test_user2.id
+        add_member(db_session, workspace_id, member_id)
+        require_membership(db_session, workspace_id, member_id)
+
+        MemberService(db_session).remove_workspace_member(workspace_id, member_id, owner_id)
+        new_request(db_session)
+
+        with pytest.raises(NotFoundError):
+            require_membership(db_session, workspace_id, member_id)
+
+    def test_leave_enqueues_invalidation(self, db_session, test_user2, shared_workspace):
+        WorkspaceService(db_session).leave_workspace(shared_workspace.id, test_user2.id)
+
+        events = db_session.query(OutboxEvent).filter(OutboxEvent.kind == ACL_EVENT).all()
+        assert [e.payload for e in events] == [{"workspace_id": shared_workspace.id, "user_id": test_user2.id}]
+
+    def test_delete_drops_whole_workspace(self, db_session, test_user, test_user2, shared_workspace, acl_enabled):
+        workspace_id = shared_workspace.id
+        require_membership(db_session, workspace_id, test_user.id)
+        require_membership(db_session, workspace_id, test_user2.id)
+
+        WorkspaceService(db_session).delete_workspace(workspace_id, test_user.id)
+
+        assert len(acl_cache) == 0
+        with pytest.raises(NotFoundError):
+            require_owner(db_session, workspace_id, test_user.id)
+
+
+class TestListener:
+
+    @pytest.mark.asyncio
+    async def test_published_invalidation_drops_entry(
+        self, db_session, test_user, test_workspace, redis_client, monkeypatch,
+    ):
+        monkeypatch.setattr(acl_module, "RESUBSCRIBE_DELAY_SECONDS", 0.01)
+        start_workspace_acl_listener(redis_client)
+        try:
+            for _ in range(100):
+                if acl_cache.subscribed:
+                    break
+                await asyncio.sleep(0.01)
+            require_membership(db_session, test_workspace.id, test_user.id)
+            assert len(acl_cache) == 1
+
+            # Zmiana zrobiona w innym workerze — tu dociera tylko przez pub/sub
+            assert await publish_acl_invalidations(
+                [{"workspace_id": test_workspace.id, "user_id": test_user.id}], redis_client,
+            )
+            for _ in range(100):
+                if len(acl_cache) == 0:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert len(acl_cache) == 0
+        finally:
+            await stop_workspace_acl_listener()
+
+        assert not acl_cache.enabled
@@ -12,10 +12,10 @@ from api.v1.workspaces.invites.schemas import (
     AcceptInviteResponse,
 )
 from core.exceptions import NotFoundError, ConflictError, AppException
-from core.models import WorkspaceInvite, WorkspaceMember
+from api.v1.notifications.service import create_notification
+from core.models import Notification, OutboxEvent, WorkspaceInvite, WorkspaceMember
 
 MOCK_EMAIL = "api.v1.workspaces.invites.service.send_workspace_invite_email"
-MOCK_BROADCAST = "api.v1.workspaces.invites.service.broadcast_notification"
 MOCK_NOTIFICATION = "api.v1.workspaces.invites.service.create_notification"
 
 
@@ -39,7 +39,7 @@ class TestCreateInvite:
     @pytest.mark.asyncio
     async def test_returns_invite_response(self, db_session, test_workspace, test_user, test_user2):
         service = InviteService(db_session)
-        with patch(MOCK_NOTIFICATION), patch(MOCK_BROADCAST, new_callable=AsyncMock), patch(MOCK_EMAIL, new_callable=AsyncMock):
+        with patch(MOCK_NOTIFICATION, wraps=create_notification), patch(MOCK_EMAIL, new_callable=AsyncMock):
             result = await service.create_invite(test_workspace.id, test_user.id, test_user2.id, send_email=False)
         assert isinstance(result, InviteResponse)
         assert result.invited_id == test_user2.id
@@ -47,7 +47,7 @@ class TestCreateInvite:
     @pytest.mark.asyncio
     async def test_stores_invite_in_db(self, db_session, test_workspace, test_user, test_user2):
         service = InviteService(db_session)
-        with patch(MOCK_NOTIFICATION), patch(MOCK_BROADCAST, new_callable=AsyncMock):
+        with patch(MOCK_NOTIFICATION, wraps=create_notification):
             result = await service.create_invite(test_workspace.id, test_user.id, test_user2.id, send_email=False)
         invite = db_session.query(WorkspaceInvite).filter(WorkspaceInvite.id == result.id).first()
         assert invite is not None
@@ -56,17 +56,29 @@ class TestCreateInvite:
     @pytest.mark.asyncio
     async def test_token_is_generated(self, db_session, test_workspace, test_user, test_user2):
         service = InviteService(db_session)
-        with patch(MOCK_NOTIFICATION), patch(MOCK_BROADCAST, new_callable=AsyncMock):
+        with patch(MOCK_NOTIFICATION, wraps=create_notification):
             result = await service.create_invite(test_workspace.id, test_user.id, test_user2.id, send_email=False)
         assert len(result.invite_token) > 20
 
     @pytest.mark.asyncio
     async def test_creates_notification(self, db_session, test_workspace, test_user, test_user2):
         service = InviteService(db_session)
-        with patch(MOCK_NOTIFICATION) as mock_notif, patch(MOCK_BROADCAST, new_callable=AsyncMock):
+        with patch(MOCK_NOTIFICATION, wraps=create_notification) as mock_notif:
             await service.create_invite(test_workspace.id, test_user.id, test_user2.id, send_email=False)
         mock_notif.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_broadcast_goes_through_outbox(self, db_session, test_workspace, test_user, test_user2):
+        service = InviteService(db_session)
+        await service.create_invite(test_workspace.id, test_user.id, test_user2.id, send_email=False)
+
+        notification = db_session.query(Notification).filter_by(user_id=test_user2.id).one()
+        event = db_session.query(OutboxEvent).filter_by(kind="broadcast").one()
+        assert event.status == "pending"
+        assert event.payload["topic"] == f"notifications:{test_user2.id}"
+        assert event.payload["event"] == "new_invite"
+        assert event.payload["payload"]["notification_id"] == notification.id
+
     @pytest.mark.asyncio
     async def test_nonexistent_workspace_raises_not_found(self, db_session, test_user, test_user2):
         service = InviteService(db_session)
@@ -94,7 +106,7 @@ class TestCreateInvite:
     @pytest.mark.asyncio
     async def test_duplicate_invite_raises_conflict(self, db_session, test_workspace, test_user, test_user2):
         service = InviteService(db_session)
-        with patch(MOCK_NOTIFICATION), patch(MOCK_BROADCAST, new_callable=AsyncMock):
+        with patch(MOCK_NOTIFICATION, wraps=create_notification):
             await service.create_invite(test_workspace.id, test_user.id, test_user2.id, send_email=False)
 
         with pytest.raises(ConflictError):
@@ -5,10 +5,12 @@ api/v1/workspaces/service.py
 import pytest
 from datetime import datetime
 
+from fastapi import BackgroundTasks
+
 from api.v1.workspaces.service import WorkspaceService
 from api.v1.workspaces.schemas import WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse
 from core.exceptions import NotFoundError, AppException
-from core.models import Workspace, WorkspaceMember
+from core.models import BoardElement, Workspace, WorkspaceMember
 
 
 class TestCreateWorkspace:
@@ -157,6 +159,25 @@ class TestDeleteWorkspace:
         result = service.delete_workspace(test_workspace.id, test_user.id)
         assert "usunięty" in result["message"]
 
+    def test_schedules_storage_purge(self, db_session, test_user, test_workspace, test_board):
+        db_session.add(BoardElement(
+            board_id=test_board.id, element_id="img-1", type="image",
+            data={"src": "https://x/storage/v1/object/public/board-images/a.webp"},
+            created_by=test_user.id,
+        ))
+        db_session.commit()
+        background_tasks = BackgroundTasks()
+
+        service = WorkspaceService(db_session)
+        service.delete_workspace(test_workspace.id, test_user.id, background_tasks)
+
+        assert len(background_tasks.tasks) == 1
+        task = background_tasks.tasks[0]
+        assert task.func.__name__ == "purge_boards_storage"
+        assert task.args == (
+            [test_board.id], ["https://x/storage/v1/object/public/board-images/a.webp"],
+        )
+
     def test_non_owner_raises_403(self, db_session, test_workspace, test_user2):
         db_session.add(WorkspaceMember(
             workspace_id=test_workspace.id, user_id=test_user2.id,